@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import os
+import stat
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+# mount name -> directory the original files are served from
+ASSET_SOURCES = {
+    "static": Path("app/static"),
+    "logos": Path("resources/logos"),
+}
+ASSET_BUILD_DIR = Path("build/assets")
+ASSET_URL_PREFIX = "/assets"
+
+# Only these get fingerprinted; templates etc. are never served directly
+ASSET_SUFFIXES = {".css", ".js", ".png", ".jpg", ".jpeg", ".webp", ".svg", ".ico"}
+# Already-compressed formats gain nothing from gzip/brotli
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".ico"}
+# Anything smaller than this is sent as-is
+MIN_COMPRESS_SIZE = 512
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _content_hash(data: bytes, length: int = 12) -> str:
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def _hashed_name(rel_path: Path, digest: str) -> Path:
+    # styles/base_style.css -> styles/base_style.3f2a9c1b04de.css
+    return rel_path.with_name(f"{rel_path.stem}.{digest}{rel_path.suffix}")
+
+
+def _write_if_missing(path: Path, data: bytes) -> None:
+    # hashed names are content-addressed, so an existing file is already correct
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # per-process tmp name, several workers may build the same asset at once
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class AssetManifest:
+    """
+    Content-hashes static assets into a build directory and keeps the
+    logical path -> fingerprinted URL mapping for templates.
+    """
+
+    def __init__(
+        self,
+        sources: dict[str, Path] | None = None,
+        build_dir: Path = ASSET_BUILD_DIR,
+        url_prefix: str = ASSET_URL_PREFIX,
+    ):
+        self.sources = sources or ASSET_SOURCES
+        self.build_dir = Path(build_dir)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.entries: dict[str, str] = {}
+
+    def build(self) -> dict[str, str]:
+        """Fingerprint and precompress every asset. Safe to run on each startup."""
+        entries: dict[str, str] = {}
+        for mount, src_dir in self.sources.items():
+            if not src_dir.is_dir():
+                continue
+            for path in sorted(src_dir.rglob("*")):
+                if not path.is_file() or path.suffix.lower() not in ASSET_SUFFIXES:
+                    continue
+                data = path.read_bytes()
+                rel = path.relative_to(src_dir)
+                hashed = Path(mount) / _hashed_name(rel, _content_hash(data))
+                target = self.build_dir / hashed
+
+                _write_if_missing(target, data)
+                if (
+                    path.suffix.lower() in COMPRESSIBLE_SUFFIXES
+                    and len(data) >= MIN_COMPRESS_SIZE
+                ):
+                    _write_if_missing(
+                        target.with_name(target.name + ".gz"),
+                        gzip.compress(data, compresslevel=9, mtime=0),
+                    )
+                    if brotli is not None:
+                        _write_if_missing(
+                            target.with_name(target.name + ".br"),
+                            brotli.compress(data, quality=11),
+                        )
+
+                entries[f"{mount}/{rel.as_posix()}"] = hashed.as_posix()
+
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.build_dir / "manifest.json"
+        tmp = manifest.with_name(f"manifest.json.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entries, indent=2, sort_keys=True))
+        os.replace(tmp, manifest)
+        self.entries = entries
+        return entries
+
+    def load(self) -> dict[str, str]:
+        """Load a manifest written by a previous build step."""
+        with open(self.build_dir / "manifest.json", encoding="utf-8") as f:
+            self.entries = json.load(f)
+        return self.entries
+
+    def prune(self) -> int:
+        """Delete build outputs no longer referenced by the manifest."""
+        keep = set(self.entries.values())
+        removed = 0
+        for path in self.build_dir.rglob("*"):
+            if (
+                not path.is_file()
+                or path.name == "manifest.json"
+                or path.name.endswith(".tmp")
+            ):
+                continue
+            rel = path.relative_to(self.build_dir).as_posix()
+            base = rel.removesuffix(".gz").removesuffix(".br")
+            if base not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def url(self, mount: str, path: str) -> str:
+        """
+        Jinja helper: asset_url('static', 'styles/base_style.css').
+        Falls back to the plain mount URL for files that weren't fingerprinted.
+        """
+        key = f"{mount}/{path.lstrip('/')}"
+        hashed = self.entries.get(key)
+        if hashed is None:
+            return f"/{key}"
+        return f"{self.url_prefix}/{hashed}"
+
+
+def _accepted_encodings(scope) -> set[str]:
+    header = Headers(scope=scope).get("accept-encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Serves fingerprinted assets, preferring a .br/.gz sibling when the client
+    accepts it. Every hit is marked immutable since the URL changes with content.
+    """
+
+    encodings = (("br", ".br"), ("gzip", ".gz"))
+
+    async def get_response(self, path: str, scope):
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        response = None
+        accepted = _accepted_encodings(scope)
+        for encoding, suffix in self.encodings:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = self.lookup_path(path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                # same conditional GET (ETag, If-Modified-Since) as a plain file;
+                # the content type is guessed from the name without .br/.gz
+                response = self.file_response(full_path, stat_result, scope)
+                if response.status_code == 200:
+                    response.headers["content-encoding"] = encoding
+                break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+def build_assets(prune: bool = True) -> AssetManifest:
+    manifest = AssetManifest()
+    manifest.build()
+    if prune:
+        manifest.prune()
+    return manifest
+
+
+if __name__ == "__main__":
+    # Build step: python -m app.assets
+    manifest = build_assets()
+    print(f"Built {len(manifest.entries)} assets into {manifest.build_dir}")
+    if brotli is None:
+        print("brotli not installed, only gzip variants were written")
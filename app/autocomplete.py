@@ -0,0 +1,172 @@
+import threading
+from bisect import bisect_left, insort
+
+from app.db.db_control import MediaDB
+from app.utils import _norm_base, _parse_actor
+
+# API name -> lookup table
+KINDS = {"actors": "actors", "genres": "genres", "networks": "show_networks"}
+
+
+class _PrefixIndex:
+    """
+    Names of one table as sorted (key, id) lists. Keys are _norm_base()
+    forms. Whole names and pseudonyms go in `names`, every later word start
+    ("pacino" for "al pacino") in `words`. A prefix query is a bisect plus
+    a walk over the matches in order, so its cost doesn't depend on the
+    table size.
+    """
+
+    def __init__(self):
+        self.names: list[tuple[str, str]] = []
+        self.words: list[tuple[str, str]] = []
+        self.rows: dict[str, tuple[str, str | None]] = {}
+
+    @staticmethod
+    def _keys(name: str, pseudonym: str | None):
+        base = _norm_base(name)
+        names = [base]
+        if pseudonym:
+            names.append(_norm_base(pseudonym))
+        words = []
+        for key in names:
+            parts = key.split(" ")
+            words += [" ".join(parts[i:]) for i in range(1, len(parts))]
+        return names, words
+
+    def load(self, rows):
+        names, words = [], []
+        self.rows = {}
+        for row_id, name, pseudonym in rows:
+            self.rows[row_id] = (name, pseudonym)
+            name_keys, word_keys = self._keys(name, pseudonym)
+            names += [(k, row_id) for k in name_keys]
+            words += [(k, row_id) for k in word_keys]
+        self.names, self.words = sorted(names), sorted(words)
+
+    def remove(self, row_id: str):
+        row = self.rows.pop(row_id, None)
+        if row is None:
+            return
+        for entries, keys in zip((self.names, self.words), self._keys(*row)):
+            for key in keys:
+                i = bisect_left(entries, (key, row_id))
+                if i < len(entries) and entries[i] == (key, row_id):
+                    del entries[i]
+
+    def add(self, row_id: str, name: str, pseudonym: str | None):
+        self.remove(row_id)
+        self.rows[row_id] = (name, pseudonym)
+        for entries, keys in zip((self.names, self.words), self._keys(name, pseudonym)):
+            for key in keys:
+                insort(entries, (key, row_id))
+
+    def search(self, prefix: str, limit: int) -> list[str]:
+        """Ids whose name starts with prefix, then those with a word that does."""
+        found: dict[str, None] = {}
+        for entries in (self.names, self.words):
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(found) < limit:
+                key, row_id = entries[i]
+                if not key.startswith(prefix):
+                    break
+                found[row_id] = None
+                i += 1
+        return list(found)
+
+
+class Autocomplete:
+    """
+    In-memory prefix indexes over actor, genre and network names, one set
+    per worker. Loaded on first use; afterwards, when the database's
+    data_version moves, only the rows the change log names are re-read.
+    """
+
+    def __init__(self, db: MediaDB):
+        self.db = db
+        self._lock = threading.Lock()
+        self._indexes = {table: _PrefixIndex() for table in KINDS.values()}
+        self._loaded = False
+        self._last_seq = 0
+        self._data_version = None
+
+    def _load(self):
+        last_seq = self.db.current_change_seq()  # before the names: later ones are replayed
+        for table, index in self._indexes.items():
+            index.load(self.db.get_lookup_names(table))
+        self._last_seq = last_seq
+        self._loaded = True
+
+    def sync(self):
+        """Catch up with commits since the last call."""
+        version = self.db.backend.data_version()
+        if self._loaded and version is not None and version == self._data_version:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            else:
+                delta = self.db.get_lookup_changes(self._last_seq)
+                if delta["reset"]:
+                    self._load()
+                else:
+                    final: dict[tuple[str, str], str] = {}
+                    for table, row_id, op in delta["changes"]:
+                        final[(table, row_id)] = op
+                    upserts: dict[str, list[str]] = {}
+                    for (table, row_id), op in final.items():
+                        if op == "delete":
+                            self._indexes[table].remove(row_id)
+                        else:
+                            upserts.setdefault(table, []).append(row_id)
+                    for table, ids in upserts.items():
+                        for row_id, name, pseudonym in self.db.get_lookup_names(table, ids):
+                            self._indexes[table].add(row_id, name, pseudonym)
+                    self._last_seq = delta["last_seq"]
+            self._data_version = version
+
+    def search(self, kind: str, q: str, limit: int = 10) -> list[dict]:
+        """Names in `kind` (actors, genres, networks) matching what was typed so far."""
+        self.sync()
+        if kind == "actors" and "(" in q:
+            # "Name (Pseudonym" while typing: match on the name part
+            q = _parse_actor(q + ")")[0] or q
+        prefix = _norm_base(q)
+        if not prefix:
+            return []
+        index = self._indexes[KINDS[kind]]
+        with self._lock:
+            ids = index.search(prefix, limit)
+            rows = [(row_id, index.rows[row_id]) for row_id in ids]
+        out = []
+        for row_id, (name, pseudonym) in rows:
+            item = {"id": row_id, "name": name}
+            if kind == "actors":
+                item["pseudonym"] = pseudonym
+            out.append(item)
+        return out
+
+    def status(self) -> dict:
+        return {
+            "loaded": self._loaded,
+            "last_seq": self._last_seq,
+            **{kind: len(self._indexes[table].rows) for kind, table in KINDS.items()},
+        }
+
+
+if __name__ == "__main__":
+    # python -m app.autocomplete [db_path] kind query
+    import sys
+    import time
+
+    args = sys.argv[1:]
+    db_path = "dbs/scratch_test.db"
+    if args and args[0].endswith(".db"):
+        db_path, args = args[0], args[1:]
+    index = Autocomplete(MediaDB(db_path, read_cache=False))
+    t0 = time.perf_counter()
+    index.sync()
+    print(f"loaded {index.status()} in {time.perf_counter() - t0:.3f}s")
+    t0 = time.perf_counter()
+    print(index.search(args[0], args[1]))
+    print(f"{(time.perf_counter() - t0) * 1000:.2f} ms")
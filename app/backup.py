@@ -0,0 +1,231 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.db.db_control import MediaDB
+
+BACKUP_DIR = Path(os.environ.get("BACKUP_DIR", "backups"))
+# Seconds between scheduled backups
+BACKUP_INTERVAL = int(os.environ.get("BACKUP_INTERVAL", 24 * 3600))
+# Compressed snapshots to keep, oldest are deleted first
+BACKUP_RETENTION = int(os.environ.get("BACKUP_RETENTION", 7))
+# "backup" copies pages with the online backup API, "vacuum" writes a
+# compacted copy with VACUUM INTO
+BACKUP_MODE = os.environ.get("BACKUP_MODE", "backup")
+# Pages copied per backup step, and the pause between steps that lets other
+# connections take the lock. 256 pages of 4 KiB = 1 MiB per step.
+BACKUP_PAGES_PER_STEP = int(os.environ.get("BACKUP_PAGES_PER_STEP", 256))
+BACKUP_STEP_SLEEP = float(os.environ.get("BACKUP_STEP_SLEEP", 0.005))
+
+SNAPSHOT_SUFFIX = ".db.gz"
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # same shape as SQLite's CURRENT_TIMESTAMP
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_timestamp(value) -> datetime | None:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class BackupService:
+    """
+    Takes consistent snapshots of the live SQLite file without blocking the
+    app, gzips them into BACKUP_DIR and prunes old ones.
+
+    Restore with: gunzip -c backups/<name>.db.gz > dbs/scratch_test.db
+    """
+
+    def __init__(
+        self,
+        db: MediaDB,
+        backup_dir: Path = BACKUP_DIR,
+        retention: int = BACKUP_RETENTION,
+        mode: str = BACKUP_MODE,
+        pages_per_step: int = BACKUP_PAGES_PER_STEP,
+        step_sleep: float = BACKUP_STEP_SLEEP,
+    ):
+        if mode not in ("backup", "vacuum"):
+            raise ValueError(f"Unknown backup mode: {mode!r}")
+        self.db = db
+        # the file the backend actually opens, not whatever MediaDB was named
+        self.db_file = db.backend.db_file
+        self.backup_dir = Path(backup_dir)
+        self.retention = retention
+        self.mode = mode
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self._lock = threading.Lock()
+        self._progress = {"phase": "idle", "pages_total": 0, "pages_done": 0}
+        self.last_run: dict | None = None
+        self.runs = 0
+        self.failures = 0
+
+    # ====================== Status ====================== #
+
+    def last_backup(self) -> datetime | None:
+        return _parse_timestamp(self.db.get_app_meta()["last_backup"])
+
+    def is_due(self, interval: int = BACKUP_INTERVAL) -> bool:
+        last = self.last_backup()
+        return last is None or _utcnow() - last >= timedelta(seconds=interval)
+
+    def seconds_until_due(self, interval: int = BACKUP_INTERVAL) -> float:
+        last = self.last_backup()
+        if last is None:
+            return 0.0
+        return max(0.0, (last + timedelta(seconds=interval) - _utcnow()).total_seconds())
+
+    def snapshots(self) -> list[Path]:
+        """Existing snapshots, oldest first (names sort by timestamp)."""
+        if not self.backup_dir.is_dir():
+            return []
+        return sorted(self.backup_dir.glob(f"*{SNAPSHOT_SUFFIX}"))
+
+    def status(self) -> dict:
+        progress = dict(self._progress)
+        total = progress["pages_total"]
+        progress["percent"] = (
+            round(100.0 * progress["pages_done"] / total, 1) if total else None
+        )
+        last = self.last_backup()
+        return {
+            "running": self._lock.locked(),
+            "mode": self.mode,
+            "progress": progress,
+            "last_backup": last.isoformat() if last else None,
+            "last_run": self.last_run,
+            "runs": self.runs,
+            "failures": self.failures,
+            "snapshots": [p.name for p in self.snapshots()],
+        }
+
+    # ====================== Snapshot ====================== #
+
+    def _on_progress(self, status, remaining, total):
+        self._progress.update(pages_total=total, pages_done=total - remaining)
+
+    def _copy_online(self, dest: Path):
+        """
+        sqlite3's backup() in page steps. Between steps the source is unlocked,
+        so writers carry on; a write from another connection mid-backup makes
+        SQLite restart the copy, so the result is always a consistent snapshot.
+        """
+        src = sqlite3.connect(self.db_file)
+        dst = sqlite3.connect(dest)
+        try:
+            src.backup(
+                dst,
+                pages=self.pages_per_step,
+                progress=self._on_progress,
+                sleep=self.step_sleep,
+            )
+        finally:
+            dst.close()
+            src.close()
+
+    def _copy_vacuum(self, dest: Path):
+        """VACUUM INTO: one read transaction, output is defragmented and minimal."""
+        src = sqlite3.connect(self.db_file)
+        try:
+            self._progress.update(pages_total=0, pages_done=0)
+            src.execute("VACUUM INTO ?;", (str(dest),))
+        finally:
+            src.close()
+
+    def _compress(self, src: Path, dest: Path) -> int:
+        tmp = dest.with_name(dest.name + ".tmp")
+        with open(src, "rb") as fin, gzip.open(tmp, "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+        os.replace(tmp, dest)
+        return dest.stat().st_size
+
+    def rotate(self) -> list[str]:
+        """Delete the oldest snapshots beyond the retention count."""
+        snapshots = self.snapshots()
+        removed = []
+        for path in snapshots[: max(0, len(snapshots) - self.retention)]:
+            path.unlink(missing_ok=True)
+            removed.append(path.name)
+        return removed
+
+    def run(self, mode: str | None = None) -> dict:
+        """
+        Take one snapshot now and return its metrics. Returns {"skipped": True}
+        instead if another backup is still running.
+        """
+        mode = mode or self.mode
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "backup already running"}
+        started = _utcnow()
+        t0 = time.perf_counter()
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{Path(self.db_file).stem}-{started:%Y%m%dT%H%M%SZ}"
+        raw = self.backup_dir / f"{name}.db.part"
+        try:
+            raw.unlink(missing_ok=True)  # VACUUM INTO refuses to overwrite
+            self._progress.update(phase="copying", pages_total=0, pages_done=0)
+            if mode == "vacuum":
+                self._copy_vacuum(raw)
+            else:
+                self._copy_online(raw)
+            copy_seconds = time.perf_counter() - t0
+
+            self._progress["phase"] = "compressing"
+            raw_bytes = raw.stat().st_size
+            dest = self.backup_dir / f"{name}{SNAPSHOT_SUFFIX}"
+            size = self._compress(raw, dest)
+
+            self.db.set_last_backup(started.strftime(_TIMESTAMP_FORMAT))
+            removed = self.rotate()
+            self.last_run = {
+                "ok": True,
+                "mode": mode,
+                "file": dest.name,
+                "started": started.isoformat(),
+                "duration_s": round(time.perf_counter() - t0, 3),
+                "copy_s": round(copy_seconds, 3),
+                "bytes": raw_bytes,
+                "compressed_bytes": size,
+                "rotated": removed,
+            }
+            self.runs += 1
+            return self.last_run
+        except (sqlite3.Error, OSError) as e:
+            self.failures += 1
+            self.last_run = {
+                "ok": False,
+                "mode": mode,
+                "started": started.isoformat(),
+                "duration_s": round(time.perf_counter() - t0, 3),
+                "error": str(e),
+            }
+            raise
+        finally:
+            raw.unlink(missing_ok=True)
+            self._progress["phase"] = "idle"
+            self._lock.release()
+
+
+if __name__ == "__main__":
+    # One-off backup: python -m app.backup [db_path] [backup|vacuum]
+    import sys
+
+    db = MediaDB(sys.argv[1] if len(sys.argv) > 1 else "dbs/scratch_test.db")
+    service = BackupService(db)
+    result = service.run(sys.argv[2] if len(sys.argv) > 2 else None)
+    print(result)
@@ -0,0 +1,290 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.db.db_control import MediaDB
+from app.similar import _ranges
+
+# Longest actor-title-actor chain /api/path searches for
+COSTAR_MAX_DEGREES = int(os.environ.get("COSTAR_MAX_DEGREES", 12))
+
+# edge key: actor index in the high bits, title index in the low ones
+_SHIFT = np.int64(32)
+_LOW = np.int64((1 << 32) - 1)
+
+
+class _Snapshot:
+    """
+    Immutable CSR view of the graph; queries hold one while they run. The id
+    lists are shared with the graph, which only ever appends to them.
+    """
+
+    def __init__(self, keys: np.ndarray, actor_ids: list, actor_index: dict, title_keys: list):
+        self.actor_ids, self.actor_index, self.title_keys = actor_ids, actor_index, title_keys
+        self.n_actors, self.n_titles = len(actor_ids), len(title_keys)
+        actor, title = keys >> _SHIFT, keys & _LOW
+        # keys are sorted, so they are already grouped by actor
+        self.actor_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(actor, minlength=self.n_actors)))
+        )
+        self.actor_titles = title
+        order = np.argsort(title, kind="stable")
+        self.title_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(title, minlength=self.n_titles)))
+        )
+        self.title_actors = actor[order]
+
+    def actor(self, actor_id: str) -> int | None:
+        a = self.actor_index.get(actor_id)
+        return a if a is not None and a < self.n_actors else None
+
+    def titles_of(self, actors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(titles, actor each came from) for all credits of `actors`."""
+        lengths = self.actor_ptr[actors + 1] - self.actor_ptr[actors]
+        titles = self.actor_titles[_ranges(self.actor_ptr[actors], lengths)]
+        return titles, np.repeat(actors, lengths)
+
+    def actors_of(self, titles: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(actors, title each came from) for all credits of `titles`."""
+        lengths = self.title_ptr[titles + 1] - self.title_ptr[titles]
+        actors = self.title_actors[_ranges(self.title_ptr[titles], lengths)]
+        return actors, np.repeat(titles, lengths)
+
+
+class CoStarGraph:
+    """
+    Bipartite actor <-> title graph in CSR arrays, one per worker. Loaded
+    from the credit tables on first use, then kept current by replaying the
+    change log whenever the database's data_version moves, so edits from any
+    worker show up on the next query.
+    """
+
+    def __init__(self, db: MediaDB):
+        self.db = db
+        self._lock = threading.Lock()
+        self._actor_ids: list[str] = []
+        self._actor_index: dict[str, int] = {}
+        self._title_keys: list[tuple[str, str]] = []  # (kind, item_id)
+        self._title_index: dict[tuple[str, str], int] = {}
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._snapshot: _Snapshot | None = None
+        self._last_seq = 0
+        self._data_version = None
+        self.loaded_at: float | None = None
+
+    def _actor(self, actor_id: str) -> int:
+        i = self._actor_index.get(actor_id)
+        if i is None:
+            i = self._actor_index[actor_id] = len(self._actor_ids)
+            self._actor_ids.append(actor_id)
+        return i
+
+    def _title(self, key: tuple[str, str]) -> int:
+        i = self._title_index.get(key)
+        if i is None:
+            i = self._title_index[key] = len(self._title_keys)
+            self._title_keys.append(key)
+        return i
+
+    def _key(self, actor_id: str, kind: str, item_id: str) -> int:
+        return (self._actor(actor_id) << 32) | self._title((kind, item_id))
+
+    def _load(self):
+        last_seq = self.db.current_change_seq()  # before the edges: later ones are replayed
+        self._actor_ids, self._actor_index = [], {}
+        self._title_keys, self._title_index = [], {}
+        keys = [self._key(*edge) for edge in self.db.get_credit_edges()]
+        self._keys = np.unique(np.array(keys, dtype=np.int64))
+        self._last_seq = last_seq
+        self.loaded_at = time.time()
+
+    def _apply(self, changes: list[tuple]) -> bool:
+        # replayed in seq order, so the last op on a credit wins
+        final = {}
+        for actor_id, kind, item_id, op in changes:
+            final[self._key(actor_id, kind, item_id)] = op
+        removed = [k for k, op in final.items() if op == "delete"]
+        added = [k for k, op in final.items() if op == "upsert"]
+        # keys stay sorted; find positions by binary search instead of re-sorting
+        keys, changed = self._keys, False
+        if removed:
+            removed = np.sort(np.array(removed, dtype=np.int64))
+            pos = np.searchsorted(keys, removed)
+            hit = pos < len(keys)
+            hit[hit] = keys[pos[hit]] == removed[hit]
+            keys = np.delete(keys, pos[hit])
+            changed = bool(hit.any())
+        if added:
+            added = np.sort(np.array(added, dtype=np.int64))
+            pos = np.searchsorted(keys, added)
+            hit = pos < len(keys)
+            hit[hit] = keys[pos[hit]] == added[hit]
+            keys = np.insert(keys, pos[~hit], added[~hit])
+            changed = changed or not hit.all()
+        self._keys = keys
+        return changed
+
+    def sync(self) -> _Snapshot:
+        """Current snapshot, after catching up with any commits since the last call."""
+        version = self.db.backend.data_version()
+        snapshot = self._snapshot
+        if snapshot is not None and version is not None and version == self._data_version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                self._load()
+            else:
+                delta = self.db.get_credit_changes(self._last_seq)
+                if delta["reset"]:
+                    self._load()
+                else:
+                    changed = self._apply(delta["changes"])
+                    self._last_seq = delta["last_seq"]
+                    if not changed:
+                        self._data_version = version
+                        return self._snapshot
+            self._snapshot = _Snapshot(
+                self._keys, self._actor_ids, self._actor_index, self._title_keys
+            )
+            self._data_version = version
+            return self._snapshot
+
+    # ====================== Queries ====================== #
+
+    def costars(self, actor_id: str, limit: int = 20) -> dict | None:
+        """
+        Actors sharing the most titles with actor_id, most shared first.
+        None if the actor has no credits.
+        """
+        graph = self.sync()
+        a = graph.actor(actor_id)
+        if a is None:
+            return None
+        titles, _ = graph.titles_of(np.array([a]))
+        actors, _ = graph.actors_of(titles)
+        ids, shared = np.unique(actors[actors != a], return_counts=True)
+        top = np.lexsort((ids, -shared))[:limit]
+        costar_ids = [graph.actor_ids[i] for i in ids[top]]
+        names = self.db.get_actor_names(costar_ids)
+        return {
+            "actor_id": actor_id,
+            "titles": len(titles),
+            "costars_total": len(ids),
+            "costars": [
+                {"actor_id": c, "name": names.get(c), "shared_titles": int(n)}
+                for c, n in zip(costar_ids, shared[top])
+            ],
+        }
+
+    def path(self, source: str, target: str, max_degrees: int = COSTAR_MAX_DEGREES) -> list | None:
+        """
+        Shortest actor - title - actor - ... chain between two actors, by
+        bidirectional BFS: each step expands whichever side has the smaller
+        frontier, a whole layer at a time with array operations. None if
+        they aren't connected within max_degrees titles.
+        """
+        graph = self.sync()
+        s, t = graph.actor(source), graph.actor(target)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return self._describe(graph, [s], [])
+
+        # per side: distance of each actor (-1 unseen), the title it was
+        # reached through, and the actor each title was reached from
+        dist = [np.full(graph.n_actors, -1, np.int32) for _ in range(2)]
+        via = [np.full(graph.n_actors, -1, np.int32) for _ in range(2)]
+        title_from = [np.full(graph.n_titles, -1, np.int32) for _ in range(2)]
+        frontier = [np.array([s]), np.array([t])]
+        dist[0][s] = dist[1][t] = 0
+        depth = [0, 0]
+
+        while len(frontier[0]) and len(frontier[1]) and sum(depth) < max_degrees:
+            side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+            other = 1 - side
+            titles, from_actor = graph.titles_of(frontier[side])
+            fresh = title_from[side][titles] < 0
+            titles, first = np.unique(titles[fresh], return_index=True)
+            title_from[side][titles] = from_actor[fresh][first]
+
+            actors, from_title = graph.actors_of(titles)
+            fresh = dist[side][actors] < 0
+            actors, first = np.unique(actors[fresh], return_index=True)
+            depth[side] += 1
+            dist[side][actors] = depth[side]
+            via[side][actors] = from_title[fresh][first]
+            frontier[side] = actors
+
+            meet = actors[dist[other][actors] >= 0]
+            if len(meet):
+                m = int(meet[np.argmin(dist[other][meet])])
+                return self._join(graph, m, via, title_from, s, t)
+        return None
+
+    def _join(self, graph: _Snapshot, m: int, via, title_from, s: int, t: int) -> list:
+        actors, titles = [m], []
+        a = m
+        while a != s:
+            title = int(via[0][a])
+            a = int(title_from[0][title])
+            titles.insert(0, title)
+            actors.insert(0, a)
+        a = m
+        while a != t:
+            title = int(via[1][a])
+            a = int(title_from[1][title])
+            titles.append(title)
+            actors.append(a)
+        return self._describe(graph, actors, titles)
+
+    def _describe(self, graph: _Snapshot, actors: list[int], titles: list[int]) -> list[dict]:
+        """Alternating actor / title steps with names, for the API."""
+        actor_ids = [graph.actor_ids[a] for a in actors]
+        title_keys = [graph.title_keys[x] for x in titles]
+        names = self.db.get_actor_names(actor_ids)
+        info = {
+            (kind, item_id): row
+            for kind in ("movie", "show")
+            for item_id, row in self.db.get_credit_titles(
+                kind, [item for k, item in title_keys if k == kind]
+            ).items()
+        }
+        steps = []
+        for i, actor_id in enumerate(actor_ids):
+            steps.append({"actor_id": actor_id, "name": names.get(actor_id)})
+            if i < len(title_keys):
+                kind, item_id = title_keys[i]
+                steps.append({"type": kind, "id": item_id, **info.get((kind, item_id), {})})
+        return steps
+
+    def status(self) -> dict:
+        graph = self._snapshot
+        return {
+            "loaded": graph is not None,
+            "actors": graph.n_actors if graph else 0,
+            "titles": graph.n_titles if graph else 0,
+            "credits": len(self._keys),
+            "last_seq": self._last_seq,
+        }
+
+
+if __name__ == "__main__":
+    # python -m app.costars [db_path] actor_id [other_actor_id]
+    import sys
+
+    args = sys.argv[1:]
+    db_path = "dbs/scratch_test.db"
+    if args and args[0].endswith(".db"):
+        db_path, args = args[0], args[1:]
+    graph = CoStarGraph(MediaDB(db_path, read_cache=False))
+    t0 = time.perf_counter()
+    graph.sync()
+    print(f"loaded {graph.status()} in {time.perf_counter() - t0:.3f}s")
+    if len(args) == 1:
+        print(graph.costars(args[0]))
+    elif len(args) == 2:
+        t0 = time.perf_counter()
+        print(graph.path(args[0], args[1]))
+        print(f"{(time.perf_counter() - t0) * 1000:.1f} ms")
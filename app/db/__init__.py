@@ -1,2 +1,3 @@
 from .db_control import MediaDB
 from .db_manager import MediaDBManager
+from .psql_manager import PsqlMediaDBManager
@@ -0,0 +1,481 @@
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+import sqlalchemy.exc
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+# "sqlite" talks to the file with the stdlib driver, "sqlalchemy" goes through
+# the pooled engine from app/db/db_utils.py (PostgreSQL, or sqlite:/// for testing)
+MEDIADB_BACKEND = os.environ.get("MEDIADB_BACKEND", "sqlite")
+
+# Several uvicorn workers share one SQLite file: WAL lets readers run alongside
+# the single writer, busy_timeout makes a blocked writer wait instead of failing
+SQLITE_WAL = os.environ.get("SQLITE_WAL", "1") != "0"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+# Whole-transaction retries for writes that still hit SQLITE_BUSY
+WRITE_RETRIES = int(os.environ.get("WRITE_RETRIES", 5))
+WRITE_RETRY_BASE_DELAY = float(os.environ.get("WRITE_RETRY_BASE_DELAY", 0.05))
+# Serve reads from an in-memory copy of the SQLite file (see SnapshotSQLiteBackend)
+MEDIADB_MEMORY_SNAPSHOT = os.environ.get("MEDIADB_MEMORY_SNAPSHOT", "0") == "1"
+
+# Catch these instead of driver specific exceptions so callers work on any backend
+DatabaseError = (sqlite3.Error, sqlalchemy.exc.DBAPIError)
+IntegrityError = (sqlite3.IntegrityError, sqlalchemy.exc.IntegrityError)
+OperationalError = (sqlite3.OperationalError, sqlalchemy.exc.OperationalError)
+
+
+class _Dialect:
+    """
+    SQL fragments that differ between SQLite and PostgreSQL. MediaDB builds its
+    queries from these instead of hard-coding COLLATE NOCASE / json_each.
+    """
+
+    dialect = "sqlite"
+
+    def in_ids(self, col: str) -> str:
+        """`col` is one of the ids passed through ids_param()."""
+        if self.dialect == "postgresql":
+            return f"{col} = ANY(?)"
+        return f"{col} IN (SELECT value FROM json_each(?))"
+
+    def ids_param(self, ids) -> list | str:
+        if self.dialect == "postgresql":
+            return list(ids)
+        return json.dumps(list(ids))
+
+    def nocase(self, expr: str) -> str:
+        """Case-insensitive ordering/comparison of a text expression."""
+        if self.dialect == "postgresql":
+            return f"LOWER({expr})"
+        return f"{expr} COLLATE NOCASE"
+
+    def nocase_in(self, col: str) -> str:
+        """Case-insensitive membership test against names_param()."""
+        if self.dialect == "postgresql":
+            return f"LOWER({col}) = ANY(?)"
+        return f"{col} COLLATE NOCASE IN (SELECT value FROM json_each(?))"
+
+    def names_param(self, names) -> list | str:
+        if self.dialect == "postgresql":
+            return [n.lower() for n in names]
+        return json.dumps(list(names))
+
+
+class SQLiteBackend(_Dialect):
+    """Plain sqlite3, a fresh connection per unit of work."""
+
+    name = "sqlite"
+    dialect = "sqlite"
+    # sqlite3.connect(factory=...); app/timing.py swaps in a timed subclass
+    connection_factory = sqlite3.Connection
+
+    def __init__(
+        self,
+        db_file: str,
+        wal: bool = SQLITE_WAL,
+        busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS,
+    ):
+        self.db_file = db_file
+        self.wal = wal
+        self.busy_timeout_ms = busy_timeout_ms
+        self._wal_checked = False
+        self._watch: sqlite3.Connection | None = None
+        self._watch_lock = threading.Lock()
+        # set on the WriteQueue thread while a group transaction is open
+        self._batch = threading.local()
+
+    def set_write_batch(self, conn: sqlite3.Connection | None):
+        """
+        Make connect() on this thread join conn's open transaction, reads
+        included, so a queued write sees what the group wrote before it.
+        """
+        self._batch.conn = conn
+
+    def _open(self) -> sqlite3.Connection:
+        # timeout= is sqlite3's busy handler, i.e. PRAGMA busy_timeout
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=self.busy_timeout_ms / 1000,
+            factory=self.connection_factory,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        if self.wal:
+            if not self._wal_checked:
+                # journal_mode is stored in the file, one switch is enough
+                conn.execute("PRAGMA journal_mode = WAL;")
+                self._wal_checked = True
+            # WAL is crash-safe with NORMAL, only the last commits may be lost on power cut
+            conn.execute("PRAGMA synchronous = NORMAL;")
+        return conn
+
+    @contextmanager
+    def connect(self, write: bool = False):
+        """
+        Yield a connection; commit on success, roll back on error, always close.
+        write=True takes the write lock up front (BEGIN IMMEDIATE) so a writer
+        waits in busy_timeout rather than failing half way through on upgrade.
+        """
+        batch = getattr(self._batch, "conn", None)
+        if batch is not None:
+            # the writer thread owns the transaction, savepoints and commit
+            yield _BatchConnection(batch)
+            return
+        conn = self._open()
+        try:
+            if write:
+                conn.execute("BEGIN IMMEDIATE;")
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def executescript(self, script: str):
+        with self.connect() as conn:
+            conn.executescript(script)
+
+    def data_version(self) -> int:
+        """
+        Changes whenever any other connection, in this process or another
+        worker, commits to the file. Read from one long-lived connection,
+        since the value is only comparable on the same connection.
+        """
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = sqlite3.connect(
+                    self.db_file,
+                    timeout=self.busy_timeout_ms / 1000,
+                    check_same_thread=False,
+                )
+            return self._watch.execute("PRAGMA data_version;").fetchone()[0]
+
+    def close(self):
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+
+
+class _BatchConnection:
+    """
+    The group-commit connection as seen by one queued write method: its
+    commit() and rollback() calls are left to the writer thread.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class SnapshotSQLiteBackend(SQLiteBackend):
+    """
+    SQLiteBackend that answers reads from an in-memory copy of the file.
+    The copy is a named shared-cache memory database loaded with the backup
+    API; writes go to disk as usual. When the file's data_version moves (a
+    commit here or in another worker) a fresh copy is built under a new name
+    and swapped in, so readers never see a half-loaded snapshot. Readers that
+    arrive while a copy is being built keep reading the previous one; only
+    the writer whose commit triggered the reload waits for it.
+    """
+
+    name = "sqlite-snapshot"
+
+    def __init__(self, db_file: str, **kwargs):
+        super().__init__(db_file, **kwargs)
+        # one reload at a time; held for the whole copy
+        self._reload_lock = threading.Lock()
+        # only held to swap or open the current copy
+        self._snapshot_lock = threading.Lock()
+        self._generation = 0
+        self._uri: str | None = None
+        # the memory database lives as long as one connection to it is open
+        self._anchor: sqlite3.Connection | None = None
+        self._snapshot_version: int | None = None
+        self.reloads = 0
+        self.last_reload_ms: float | None = None
+
+    def _load(self):
+        version = self.data_version()
+        self._generation += 1
+        uri = f"file:mediadb_{id(self)}_{self._generation}?mode=memory&cache=shared"
+        t0 = time.perf_counter()
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        disk = super()._open()
+        try:
+            disk.backup(anchor)
+        finally:
+            disk.close()
+        with self._snapshot_lock:
+            old, self._anchor, self._uri = self._anchor, anchor, uri
+            self._snapshot_version = version
+        if old is not None:
+            old.close()  # readers still on the old copy keep it alive until they close
+        self.reloads += 1
+        self.last_reload_ms = (time.perf_counter() - t0) * 1000
+
+    def refresh(self, force: bool = False, wait: bool = True):
+        """
+        Reload the memory copy if the file changed since it was taken. With
+        wait=False, return at once if another thread is already reloading.
+        """
+        if not force and self._snapshot_version == self.data_version():
+            return
+        if not self._reload_lock.acquire(blocking=wait):
+            return
+        try:
+            if force or self._snapshot_version != self.data_version():
+                self._load()
+        finally:
+            self._reload_lock.release()
+
+    def _open_snapshot(self) -> sqlite3.Connection:
+        # only the very first read has no copy to fall back on
+        self.refresh(wait=self._uri is None)
+        # under the lock so the copy can't be swapped out and freed between
+        # reading the name and opening it (that would open an empty database)
+        with self._snapshot_lock:
+            conn = sqlite3.connect(self._uri, uri=True, factory=self.connection_factory)
+        conn.row_factory = sqlite3.Row
+        # a write here would be lost on the next reload
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    @contextmanager
+    def connect(self, write: bool = False):
+        if write or getattr(self._batch, "conn", None) is not None:
+            with super().connect(write=write) as conn:
+                yield conn
+            self.refresh()
+            return
+        conn = self._open_snapshot()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def executescript(self, script: str):
+        with super().connect(write=True) as conn:
+            conn.executescript(script)
+        self.refresh()
+
+    def close(self):
+        with self._snapshot_lock:
+            if self._anchor is not None:
+                self._anchor.close()
+                self._anchor = None
+        super().close()
+
+
+def _is_busy(e: Exception) -> bool:
+    code = getattr(e, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    msg = str(e).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def retry_busy(fn):
+    """
+    Re-run a whole write method when SQLite still reports BUSY/LOCKED after
+    busy_timeout, with jittered exponential backoff. The method must be a
+    complete transaction so a retry never repeats half of it.
+    """
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if attempt == WRITE_RETRIES or not _is_busy(e):
+                    raise
+                delay = WRITE_RETRY_BASE_DELAY * (2**attempt)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+    return wrapper
+
+
+class _Record(tuple):
+    """Row that supports row["col"], row[0], unpacking and dict(row), like sqlite3.Row."""
+
+    def __new__(cls, values, index: dict[str, int]):
+        rec = super().__new__(cls, values)
+        rec._index = index
+        return rec
+
+    def keys(self):
+        return list(self._index)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return super().__getitem__(key)
+
+
+class _Cursor:
+    """sqlite3.Cursor look-alike over a SQLAlchemy result."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._result = None
+        self._index: dict[str, int] = {}
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, sql: str, params=()):
+        return self._run(sql, _bind(params))
+
+    def executemany(self, sql: str, rows):
+        rows = [_bind(r) for r in rows]
+        if rows:
+            self._run(sql, rows)
+        return self
+
+    def _run(self, sql, params):
+        self._result = self._conn.execute(_to_text(sql), params)
+        self.rowcount = self._result.rowcount
+        self.lastrowid = getattr(self._result, "lastrowid", None)
+        if self._result.returns_rows:
+            self._index = {k: i for i, k in enumerate(self._result.keys())}
+        return self
+
+    def fetchone(self):
+        if self._result is None or not self._result.returns_rows:
+            return None
+        row = self._result.fetchone()
+        return None if row is None else _Record(row, self._index)
+
+    def fetchall(self):
+        if self._result is None or not self._result.returns_rows:
+            return []
+        return [_Record(row, self._index) for row in self._result.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+# string literals, quoted identifiers and comments (group 1) or a bare ?
+_QMARK = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/)|\?""", re.S
+)
+
+
+@lru_cache(maxsize=512)
+def _to_text(sql: str):
+    """
+    Turn qmark SQL into a text() clause with :p0, :p1 ... binds. Cached per SQL
+    string so SQLAlchemy's compiled cache is hit on every repeat of a query.
+    A ? inside a quoted literal or comment is left alone.
+    """
+    counter = iter(range(10_000))
+
+    def sub(m):
+        if m.group(1) is not None:
+            # text() would read ":name" in a literal as a bind too
+            return m.group(1).replace(":", "\\:")
+        return f":p{next(counter)}"
+
+    return text(_QMARK.sub(sub, sql))
+
+
+def _bind(params) -> dict:
+    return {f"p{i}": v for i, v in enumerate(params or ())}
+
+
+class _SQLAlchemyConnection:
+    """Gives a SQLAlchemy Connection the sqlite3-style surface MediaDB uses."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _Cursor(self._conn)
+
+    def execute(self, sql: str, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, rows):
+        return self.cursor().executemany(sql, rows)
+
+    def executescript(self, script: str):
+        driver_conn = self._conn.connection.driver_connection
+        if self._conn.dialect.name == "sqlite":
+            driver_conn.executescript(script)
+        else:
+            with driver_conn.cursor() as cur:
+                cur.execute(script)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+
+class SQLAlchemyBackend(_Dialect):
+    """Runs MediaDB on a pooled SQLAlchemy engine using Core text() statements."""
+
+    name = "sqlalchemy"
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        if self.dialect == "sqlite":
+            event.listen(engine, "connect", _sqlite_on_connect)
+
+    @contextmanager
+    def connect(self, write: bool = False):
+        with self.engine.connect() as conn:
+            try:
+                yield _SQLAlchemyConnection(conn)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def executescript(self, script: str):
+        with self.connect() as conn:
+            conn.executescript(script)
+
+    def data_version(self) -> None:
+        # no cheap cross-process change counter here, so nothing is cached
+        return None
+
+    def close(self):
+        self.engine.dispose()
+
+
+def _sqlite_on_connect(dbapi_conn, _record):
+    dbapi_conn.execute("PRAGMA foreign_keys = ON;")
+
+
+def get_backend(db_file: str | None = None):
+    """Build the backend selected by MEDIADB_BACKEND."""
+    if MEDIADB_BACKEND == "sqlalchemy":
+        from app.db.db_utils import engine
+
+        return SQLAlchemyBackend(engine)
+    if MEDIADB_BACKEND != "sqlite":
+        raise ValueError(f"Unknown MEDIADB_BACKEND: {MEDIADB_BACKEND!r}")
+    if MEDIADB_MEMORY_SNAPSHOT:
+        return SnapshotSQLiteBackend(db_file)
+    return SQLiteBackend(db_file)
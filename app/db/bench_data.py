@@ -0,0 +1,248 @@
+import itertools
+import os
+import random
+import sqlite3
+import string
+import time
+
+from app.db.db_control import MediaDB
+from app.utils import _sort_title
+
+# Default size of the generated catalog, roughly a large personal library
+BENCH_DB = os.environ.get("BENCH_DB", "dbs/bench.db")
+BENCH_MOVIES = int(os.environ.get("BENCH_MOVIES", 20000))
+BENCH_SHOWS = int(os.environ.get("BENCH_SHOWS", 3000))
+BENCH_ACTORS = int(os.environ.get("BENCH_ACTORS", 25000))
+
+_ALPHABET = string.digits + string.ascii_letters
+_WORDS = (
+    "the a of night day blood star house last dark return city man woman "
+    "girl boy dead love war king queen lost black white red time world "
+    "shadow fire ice iron gold secret river island road game heart moon "
+    "sun storm ghost machine empire garden winter summer crown wolf"
+).split()
+_FIRST = (
+    "John Mary James Anna Robert Linda Michael Sarah David Laura Peter Emma "
+    "Thomas Olivia Daniel Grace Henry Alice Samuel Chloe Victor Nora Oscar Ruth"
+).split()
+_LAST = (
+    "Smith Jones Taylor Brown Williams Wilson Johnson Davies Robinson Wright "
+    "Thompson Evans Walker White Roberts Green Hall Wood Jackson Clarke Moreau "
+    "Rossi Novak Tanaka Kowalski Silva Murphy"
+).split()
+_GENRES = (
+    "Action Adventure Animation Biography Comedy Crime Documentary Drama Family "
+    "Fantasy History Horror Music Musical Mystery Romance Sci-Fi Sport Thriller "
+    "War Western Noir Anime Kids Reality Talk-Show News Game-Show Short"
+).split()
+_NETWORKS = (
+    "BBC HBO NBC CBS ABC FOX AMC FX Showtime Netflix Hulu Starz Channel4 ITV "
+    "Syfy USA TNT Cartoon-Network Comedy-Central PBS"
+).split()
+
+
+def _id(rng: random.Random, length: int = 10) -> str:
+    return "".join(rng.choices(_ALPHABET, k=length))
+
+
+def _title(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(1, 4))
+    return " ".join(w.capitalize() for w in words)
+
+
+def _unique(rng: random.Random, make, n: int) -> list[str]:
+    """n values from make(), distinct ignoring case (names are NOCASE unique)."""
+    seen: set[str] = set()
+    out = []
+    while len(out) < n:
+        value = make(rng)
+        if value.lower() not in seen:
+            seen.add(value.lower())
+            out.append(value)
+    return out
+
+
+def _person(rng: random.Random) -> str:
+    # suffix keeps 25k+ names unique with small word lists
+    return f"{rng.choice(_FIRST)} {rng.choice(_LAST)} {_id(rng, 4)}"
+
+
+def build_bench_db(
+    path: str = BENCH_DB,
+    movies: int = BENCH_MOVIES,
+    shows: int = BENCH_SHOWS,
+    actors: int = BENCH_ACTORS,
+    collections: int = 200,
+    seed: int = 0,
+    analyze: bool = True,
+    sql_init_file: str = "sql/init.sql",
+    views_sql_file: str = "sql/views.sql",
+) -> dict:
+    """
+    Build a synthetic catalog with the production schema (tables, views,
+    change log, collection indexes) at `path`, replacing any existing file.
+    Same seed, same data. Returns row counts and the build time.
+    """
+    rng = random.Random(seed)
+    t0 = time.perf_counter()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    conn = sqlite3.connect(path)
+    try:
+        for script in (sql_init_file, views_sql_file):
+            with open(script, "r") as f:
+                conn.executescript(f.read())
+
+        genre_rows = [(_id(rng, 5), g) for g in _GENRES]
+        network_rows = [(_id(rng, 5), n) for n in _NETWORKS]
+        actor_rows = [
+            (_id(rng), name, None if rng.random() > 0.05 else _title(rng))
+            for name in _unique(rng, _person, actors)
+        ]
+        genre_ids = [g[0] for g in genre_rows]
+        network_ids = [n[0] for n in network_rows]
+        actor_ids = [a[0] for a in actor_rows]
+        # a few prolific actors, like real credits
+        actor_cum = list(
+            itertools.accumulate(1.0 / (i + 1) ** 0.6 for i in range(len(actor_ids)))
+        )
+
+        media, movie_rows, show_rows = [], [], []
+        credits_m, credits_s, genres_m, genres_s = [], [], [], []
+        for kind, count in (("movie", movies), ("show", shows)):
+            for _ in range(count):
+                media_id, own_id = _id(rng), _id(rng)
+                title = _title(rng)
+                media.append(
+                    (
+                        media_id,
+                        title,
+                        rng.randint(0, 5),
+                        None,
+                        None,
+                        int(rng.random() < 0.6),
+                        _sort_title(title),
+                        kind,
+                    )
+                )
+                cast = dict.fromkeys(
+                    rng.choices(actor_ids, cum_weights=actor_cum, k=rng.randint(2, 8))
+                )
+                tags = dict.fromkeys(rng.choices(genre_ids, k=rng.randint(1, 3)))
+                if kind == "movie":
+                    year = rng.randint(1920, 2025) if rng.random() > 0.03 else None
+                    movie_rows.append(
+                        (own_id, media_id, year, rng.randint(70, 200))
+                    )
+                    credits_m += [(own_id, a, i) for i, a in enumerate(cast, 1)]
+                    genres_m += [(own_id, g) for g in tags]
+                else:
+                    start = rng.randint(1950, 2024)
+                    end = None if rng.random() < 0.3 else start + rng.randint(0, 12)
+                    show_rows.append(
+                        (own_id, media_id, start, end, rng.choice(network_ids))
+                    )
+                    credits_s += [(own_id, a, i) for i, a in enumerate(cast, 1)]
+                    genres_s += [(own_id, g) for g in tags]
+
+        coll_rows = [
+            (_id(rng), name)
+            for name in _unique(rng, lambda r: f"{_title(r)} Collection", collections)
+        ]
+        movie_ids = [m[0] for m in movie_rows]
+        coll_links = {
+            (m, c[0])
+            for c in coll_rows
+            for m in rng.sample(movie_ids, min(len(movie_ids), rng.randint(2, 40)))
+        }
+
+        conn.executemany("INSERT INTO genres (id, name) VALUES (?, ?);", genre_rows)
+        conn.executemany(
+            "INSERT INTO show_networks (id, name) VALUES (?, ?);", network_rows
+        )
+        conn.executemany(
+            "INSERT INTO actors (id, name, pseudonym) VALUES (?, ?, ?);", actor_rows
+        )
+        conn.executemany(
+            "INSERT INTO media (id, title, rating, artwork_path, notes, obtained, "
+            "sort_title, type) VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+            media,
+        )
+        conn.executemany(
+            "INSERT INTO movies (id, media_id, year, duration) VALUES (?, ?, ?, ?);",
+            movie_rows,
+        )
+        conn.executemany(
+            "INSERT INTO shows (id, media_id, start_year, end_year, network) "
+            "VALUES (?, ?, ?, ?, ?);",
+            show_rows,
+        )
+        conn.executemany(
+            "INSERT INTO actor_movie_relationship (movie_id, actor_id, billing_order) "
+            "VALUES (?, ?, ?);",
+            credits_m,
+        )
+        conn.executemany(
+            "INSERT INTO actor_show_relationship (show_id, actor_id, billing_order) "
+            "VALUES (?, ?, ?);",
+            credits_s,
+        )
+        conn.executemany(
+            "INSERT INTO movie_genre_relationship (movie_id, genre_id) VALUES (?, ?);",
+            genres_m,
+        )
+        conn.executemany(
+            "INSERT INTO show_genre_relationship (show_id, genre_id) VALUES (?, ?);",
+            genres_s,
+        )
+        conn.executemany(
+            "INSERT INTO movie_collections (id, name) VALUES (?, ?);", coll_rows
+        )
+        conn.executemany(
+            "INSERT INTO movie_collection_relationship (movie_id, collection_id) "
+            "VALUES (?, ?);",
+            sorted(coll_links),
+        )
+        conn.execute("INSERT INTO app_meta DEFAULT VALUES;")
+        conn.commit()
+    finally:
+        conn.close()
+
+    # same post-create steps the app runs at startup
+    db = MediaDB(path, read_cache=False)
+    try:
+        db.init_change_log()
+        db.init_collections()
+        if analyze:
+            with db.backend.connect() as c:
+                c.execute("ANALYZE;")
+    finally:
+        db.close()
+
+    return {
+        "path": path,
+        "movies": len(movie_rows),
+        "shows": len(show_rows),
+        "actors": len(actor_rows),
+        "credits": len(credits_m) + len(credits_s),
+        "collections": len(coll_rows),
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.db.bench_data [path] [movies] [shows] [actors]
+    import sys
+
+    args = sys.argv[1:]
+    print(
+        build_bench_db(
+            args[0] if len(args) > 0 else BENCH_DB,
+            movies=int(args[1]) if len(args) > 1 else BENCH_MOVIES,
+            shows=int(args[2]) if len(args) > 2 else BENCH_SHOWS,
+            actors=int(args[3]) if len(args) > 3 else BENCH_ACTORS,
+        )
+    )
@@ -1,5 +1,134 @@
-import sqlite3
+import json
+import os
+import threading
+from functools import wraps
 from nanoid import generate
+from app.db.backends import DatabaseError, SQLiteBackend, retry_busy
+from app.utils import _parse_actor, _parse_obtained, _sort_title, _split_names
+
+
+# Per-type settings for the shared bulk patcher (_bulk_update)
+_PATCH_SPECS = {
+    "movie": {
+        "table": "movies",
+        "fields": ("year", "duration"),
+        "actor_rel": "actor_movie_relationship",
+        "genre_rel": "movie_genre_relationship",
+        "fk": "movie_id",
+    },
+    "show": {
+        "table": "shows",
+        "fields": ("start_year", "end_year", "network"),
+        "actor_rel": "actor_show_relationship",
+        "genre_rel": "show_genre_relationship",
+        "fk": "show_id",
+    },
+}
+
+# Play rollups per credit: key column -> (rollup table, _PATCH_SPECS link table)
+_ROLLUP_LINKS = {
+    "genre_id": ("play_rollup_genre", "genre_rel"),
+    "actor_id": ("play_rollup_actor", "actor_rel"),
+}
+
+
+# Name-unique lookup tables that autocomplete serves
+_LOOKUP_TABLES = ("actors", "genres", "show_networks")
+
+
+# Movie and show collections live in separate tables with the same shape
+_COLLECTION_SPECS = {
+    "movie": {
+        "table": "movie_collections",
+        "rel": "movie_collection_relationship",
+        "fk": "movie_id",
+        "media_table": "movies",
+        "year": "year",
+    },
+    "show": {
+        "table": "show_collections",
+        "rel": "show_collection_relationship",
+        "fk": "show_id",
+        "media_table": "shows",
+        "year": "start_year",
+    },
+}
+
+
+# Tables mirrored by the change feed and their key columns (see sql/changes.sql)
+SYNC_TABLES = {
+    "media": ("id",),
+    "movies": ("id",),
+    "shows": ("id",),
+    "actors": ("id",),
+    "genres": ("id",),
+    "show_networks": ("id",),
+    "movie_collections": ("id",),
+    "show_collections": ("id",),
+    "actor_movie_relationship": ("movie_id", "actor_id"),
+    "actor_show_relationship": ("show_id", "actor_id"),
+    "movie_genre_relationship": ("movie_id", "genre_id"),
+    "show_genre_relationship": ("show_id", "genre_id"),
+    "movie_collection_relationship": ("movie_id", "collection_id"),
+    "show_collection_relationship": ("show_id", "collection_id"),
+}
+
+
+# Memoise the whole-table listings until the database changes (any worker)
+MEDIADB_READ_CACHE = os.environ.get("MEDIADB_READ_CACHE", "1") != "0"
+
+_MISS = object()
+
+
+def _cached(fn):
+    """
+    Cache a read method per arguments, keyed on backend.data_version(). Any
+    commit from any connection or worker process bumps the version and drops
+    the whole cache, so results are never older than the last commit.
+    Cached results are shared between callers and must not be mutated.
+    """
+
+    @wraps(fn)
+    def wrapper(self, *args):
+        version = self.backend.data_version() if self.read_cache else None
+        if version is None or (self.writes is not None and self.writes.in_writer()):
+            # inside a write group: the uncommitted rows aren't in the cache
+            return fn(self, *args)
+        key = (fn.__name__, args)
+        with self._cache_lock:
+            if self._cache_version != version:
+                self._cache.clear()
+                self._cache_version = version
+            hit = self._cache.get(key, _MISS)
+        if hit is not _MISS:
+            return hit
+        result = fn(self, *args)
+        with self._cache_lock:
+            # only keep it if nothing was committed while we were reading
+            if self._cache_version == version:
+                self._cache[key] = result
+        return result
+
+    return wrapper
+
+
+def _queued(fn):
+    """
+    Run a write method on self.writes (app/db/writer.py) when one is running,
+    so concurrent writes share a transaction and a commit. The method must be
+    a complete unit of work; its connect(write=True) joins the group. On the
+    writer thread plain connect() and cached reads go through the group's
+    connection too, so read-then-write sees the writes queued before it.
+    """
+
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        writes = self.writes
+        if writes is None or not writes.running or writes.in_writer():
+            return fn(self, *args, **kwargs)
+        return writes.call(fn, self, *args, **kwargs)
+
+    return wrapper
 
 
 class MediaDB:
@@ -7,19 +136,24 @@ class MediaDB:
     Handles CRUD operations for media records.
     """
 
-    def __init__(self, db_file):
+    def __init__(self, db_file=None, backend=None, read_cache=MEDIADB_READ_CACHE):
         self.db_file = db_file
-        self.conn = sqlite3.connect(self.db_file)
-        self.cursor = self.conn.cursor()
+        # sqlite3 file by default; see app/db/backends.py for the SQLAlchemy one
+        self.backend = backend or SQLiteBackend(db_file)
         self.alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-        self.cursor.execute("PRAGMA foreign_keys = ON;")
+        self.read_cache = read_cache
+        self._cache: dict[tuple, list] = {}
+        self._cache_version: int | None = None
+        self._cache_lock = threading.Lock()
+        # WriteQueue for group commits, set by the app while it runs
+        self.writes = None
 
     def generate_id(self, length: int = 10) -> str:
         return generate(self.alphabet, length)
 
+    @_cached
     def get_counts(self):
-        with sqlite3.connect(self.db_file) as conn:
-            conn.row_factory = sqlite3.Row
+        with self.backend.connect() as conn:
             c = conn.cursor()
 
             movies_count = c.execute("SELECT COUNT(*) AS n FROM movies;").fetchone()[
@@ -35,21 +169,21 @@ class MediaDB:
                 ]
                 if shows_count == 0:
                     shows_count = 25
-            except sqlite3.OperationalError:
+            except DatabaseError:
                 shows_count = 25
 
             try:
                 media_total = c.execute("SELECT COUNT(*) AS n FROM media;").fetchone()[
                     "n"
                 ]
-            except sqlite3.OperationalError:
+            except DatabaseError:
                 media_total = None
 
             try:
                 not_obtained = c.execute(
-                    "SELECT COUNT(*) AS n FROM media WHERE COALESCE(obtained,0)=0;"
+                    "SELECT COUNT(*) AS n FROM media WHERE obtained = ?;", (False,)
                 ).fetchone()["n"]
-            except sqlite3.OperationalError:
+            except DatabaseError:
                 not_obtained = None
 
         return {
@@ -60,15 +194,14 @@ class MediaDB:
             "not_obtained": not_obtained,  # may be None
         }
 
+    @_cached
     def get_movies(self):
         """Retrieve all movies with a new connection."""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
+        with self.backend.connect() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """SELECT * FROM v_movie_table ORDER BY
-                    sort_title COLLATE NOCASE ASC,
+                f"""SELECT * FROM v_movie_table ORDER BY
+                    {self.backend.nocase("sort_title")} ASC,
                     (year IS NULL) ASC,   -- puts NULLs last
                     year ASC;"""
             )
@@ -76,33 +209,92 @@ class MediaDB:
 
     def get_movie_by_id(self, movie_id):
         """Retrieve a movie by its ID."""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
+        movies = self.get_movies_by_ids([movie_id])
+        return movies[0] if movies else None
+
+    def get_movies_by_ids(self, movie_ids: list[str]) -> list[dict]:
+        """
+        Retrieve many movies (with actors) in two queries, whatever the number of ids.
+        Results follow the order of movie_ids; unknown ids are skipped.
+        """
+        if not movie_ids:
+            return []
+        ids_param = self.backend.ids_param(movie_ids)
+        with self.backend.connect() as conn:
             cursor = conn.cursor()
-            row = cursor.execute(
-                "SELECT * FROM v_movie_table WHERE movie_id = ?;", (movie_id,)
-            ).fetchone()
+            rows = cursor.execute(
+                f"""
+                SELECT * FROM v_movie_table
+                WHERE {self.backend.in_ids("movie_id")};
+                """,
+                (ids_param,),
+            ).fetchall()
             actors = cursor.execute(
-                """
-            SELECT a.id, a.name AS full_name
+                f"""
+            SELECT am.movie_id, a.id, a.name AS full_name
             FROM actor_movie_relationship am
             JOIN actors a ON a.id = am.actor_id
-            WHERE am.movie_id = ?
-            ORDER BY a.name COLLATE NOCASE;
+            WHERE {self.backend.in_ids("am.movie_id")}
+            ORDER BY {self.backend.nocase("a.name")};
             """,
-                (movie_id,),
+                (ids_param,),
             ).fetchall()
 
+        actors_by_movie: dict[str, list[dict]] = {}
+        for a in actors:
+            actors_by_movie.setdefault(a["movie_id"], []).append(
+                {"id": a["id"], "full_name": a["full_name"]}
+            )
+
+        by_id = {}
+        for row in rows:
             movie = dict(row)
-            movie["actors"] = [dict(a) for a in actors]
-            return movie
+            movie["actors"] = actors_by_movie.get(movie["movie_id"], [])
+            by_id[movie["movie_id"]] = movie
+        return [by_id[i] for i in dict.fromkeys(movie_ids) if i in by_id]
+
+    def get_shows_by_ids(self, show_ids: list[str]) -> list[dict]:
+        """Retrieve many shows (with actors) in two queries, same contract as movies."""
+        if not show_ids:
+            return []
+        ids_param = self.backend.ids_param(show_ids)
+        with self.backend.connect() as conn:
+            cursor = conn.cursor()
+            rows = cursor.execute(
+                f"""
+                SELECT * FROM v_show_table
+                WHERE {self.backend.in_ids("show_id")};
+                """,
+                (ids_param,),
+            ).fetchall()
+            actors = cursor.execute(
+                f"""
+            SELECT asr.show_id, a.id, a.name AS full_name
+            FROM actor_show_relationship asr
+            JOIN actors a ON a.id = asr.actor_id
+            WHERE {self.backend.in_ids("asr.show_id")}
+            ORDER BY asr.billing_order, {self.backend.nocase("a.name")};
+            """,
+                (ids_param,),
+            ).fetchall()
+
+        actors_by_show: dict[str, list[dict]] = {}
+        for a in actors:
+            actors_by_show.setdefault(a["show_id"], []).append(
+                {"id": a["id"], "full_name": a["full_name"]}
+            )
 
+        by_id = {}
+        for row in rows:
+            show = dict(row)
+            show["actors"] = actors_by_show.get(show["show_id"], [])
+            by_id[show["show_id"]] = show
+        return [by_id[i] for i in dict.fromkeys(show_ids) if i in by_id]
+
+    @_cached
     def get_actors(self):
         """Retrieve all actors."""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
+        with self.backend.connect() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """SELECT
@@ -119,53 +311,89 @@ class MediaDB:
 
     def get_actor_by_id(self, actor_id: str):
         """Retrieve an actor and their movies/shows by actor ID."""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
+        actors = self.get_actors_by_ids([actor_id])
+        return actors[0] if actors else None
+
+    def get_actors_by_ids(self, actor_ids: list[str]) -> list[dict]:
+        """
+        Retrieve many actors with their filmography in three queries.
+        Results follow the order of actor_ids; unknown ids are skipped.
+        """
+        if not actor_ids:
+            return []
+        ids_param = self.backend.ids_param(actor_ids)
+        with self.backend.connect() as conn:
             cursor = conn.cursor()
 
             # Actor info
-            actor_row = cursor.execute(
-                "SELECT id AS actor_id, name AS full_name, pseudonym FROM actors WHERE id = ?;",
-                (actor_id,),
-            ).fetchone()
-            if not actor_row:
-                return None
+            actor_rows = cursor.execute(
+                f"""
+                SELECT id AS actor_id, name AS full_name, pseudonym FROM actors
+                WHERE {self.backend.in_ids("id")};
+                """,
+                (ids_param,),
+            ).fetchall()
 
             # Movies
             movies = cursor.execute(
-                """
-                SELECT DISTINCT movie_id AS id, title, year
-                FROM v_actor_page
-                WHERE actor_id = ? AND type = 'movie' AND movie_id IS NOT NULL
-                ORDER BY year ASC, sort_title;
+                f"""
+                SELECT DISTINCT am.actor_id, mo.id, mm.title, mo.year, mm.sort_title
+                FROM actor_movie_relationship am
+                JOIN movies mo ON mo.id = am.movie_id
+                JOIN media mm ON mm.id = mo.media_id
+                WHERE {self.backend.in_ids("am.actor_id")}
+                ORDER BY mo.year ASC, mm.sort_title;
                 """,
-                (actor_id,),
+                (ids_param,),
             ).fetchall()
 
             # Shows
             shows = cursor.execute(
-                """
-                SELECT DISTINCT show_id AS id, title, start_year, end_year
-                FROM v_actor_page
-                WHERE actor_id = ? AND type = 'show' AND show_id IS NOT NULL
-                ORDER BY sort_title;
+                f"""
+                SELECT DISTINCT asr.actor_id, s.id, ms.title, s.start_year, s.end_year,
+                    ms.sort_title
+                FROM actor_show_relationship asr
+                JOIN shows s ON s.id = asr.show_id
+                JOIN media ms ON ms.id = s.media_id
+                WHERE {self.backend.in_ids("asr.actor_id")}
+                ORDER BY ms.sort_title;
                 """,
-                (actor_id,),
+                (ids_param,),
             ).fetchall()
 
-        # Build dict for the template
-        return {
-            "actor_id": actor_row["actor_id"],
-            "full_name": actor_row["full_name"],
-            "pseudonym": actor_row["pseudonym"],
-            "movies": [dict(m) for m in movies],
-            "shows": [dict(s) for s in shows],
+        movies_by_actor: dict[str, list[dict]] = {}
+        for m in movies:
+            movies_by_actor.setdefault(m["actor_id"], []).append(
+                {"id": m["id"], "title": m["title"], "year": m["year"]}
+            )
+        shows_by_actor: dict[str, list[dict]] = {}
+        for s in shows:
+            shows_by_actor.setdefault(s["actor_id"], []).append(
+                {
+                    "id": s["id"],
+                    "title": s["title"],
+                    "start_year": s["start_year"],
+                    "end_year": s["end_year"],
+                }
+            )
+
+        # Build dicts for the template
+        by_id = {
+            row["actor_id"]: {
+                "actor_id": row["actor_id"],
+                "full_name": row["full_name"],
+                "pseudonym": row["pseudonym"],
+                "movies": movies_by_actor.get(row["actor_id"], []),
+                "shows": shows_by_actor.get(row["actor_id"], []),
+            }
+            for row in actor_rows
         }
+        return [by_id[i] for i in dict.fromkeys(actor_ids) if i in by_id]
 
+    @_queued
+    @retry_busy
     def insert_actor(self, full_name: str, pseudonym: str | None = None):
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
+        with self.backend.connect(write=True) as conn:
             cur = conn.cursor()
             cur.execute(
                 "INSERT INTO actors(id, name, pseudonym) VALUES (?, ?, ?)",
@@ -174,49 +402,524 @@ class MediaDB:
             conn.commit()
             return cur.lastrowid
 
-    def get_collections(self):
-        """Retrieve all collections."""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("""SELECT * FROM v_collections;""")
-            return cursor.fetchall()
+    # ====================== Collections ====================== #
+
+    def init_collections(self, collections_sql_file: str = "sql/collections.sql"):
+        """
+        Add the collection -> member indexes and case-insensitive unique names
+        to databases created before them. Names that only differ in case are
+        renamed "Name (2)", "Name (3)" ... first, or the unique index fails.
+        """
+        if self.backend.dialect != "sqlite":
+            return  # sql/init_psql.sql already has them
+        with self.backend.connect(write=True) as conn:
+            for spec in _COLLECTION_SPECS.values():
+                self._rename_collection_clashes(conn, spec["table"])
+        with open(collections_sql_file, "r") as f:
+            self.backend.executescript(f.read())
+
+    def _rename_collection_clashes(self, conn, table: str):
+        clashes = conn.execute(
+            f"""
+            SELECT id, name FROM {table}
+            WHERE name COLLATE NOCASE IN (
+                SELECT name FROM {table} GROUP BY name COLLATE NOCASE HAVING COUNT(*) > 1
+            )
+            ORDER BY name COLLATE NOCASE, rowid;
+            """
+        ).fetchall()
+        if not clashes:
+            return
+        taken = {r[0].lower() for r in conn.execute(f"SELECT name FROM {table};")}
+        first: dict[str, str] = {}
+        for row_id, name in clashes:
+            if name.lower() not in first:
+                first[name.lower()] = name  # the oldest keeps its name
+                continue
+            n = 2
+            while f"{name} ({n})".lower() in taken:
+                n += 1
+            new_name = f"{name} ({n})"
+            taken.add(new_name.lower())
+            conn.execute(f"UPDATE {table} SET name = ? WHERE id = ?;", (new_name, row_id))
+            print(
+                f"{table}: renamed {name!r} to {new_name!r}, "
+                f"it clashed with {first[name.lower()]!r}"
+            )
+
+    @_cached
+    def get_collections(self, kind: str | None = None) -> list[dict]:
+        """
+        Every movie and/or show collection with its member count. Counts come
+        from the (collection_id, ...) index, no member rows are read.
+        """
+        kinds = [kind] if kind else list(_COLLECTION_SPECS)
+        parts = [
+            f"""
+            SELECT c.id AS collection_id, c.name AS name, '{k}' AS type,
+                   (SELECT COUNT(*) FROM {spec['rel']} r
+                     WHERE r.collection_id = c.id) AS count
+            FROM {spec['table']} c
+            """
+            for k, spec in ((k, _COLLECTION_SPECS[k]) for k in kinds)
+        ]
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                " UNION ALL ".join(parts)
+                + f" ORDER BY {self.backend.nocase('name')}, type;"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_collection(self, kind: str, collection_id: str) -> dict | None:
+        spec = _COLLECTION_SPECS[kind]
+        with self.backend.connect() as conn:
+            row = conn.execute(
+                f"""
+                SELECT c.id AS collection_id, c.name AS name,
+                       (SELECT COUNT(*) FROM {spec['rel']} r
+                         WHERE r.collection_id = c.id) AS count
+                FROM {spec['table']} c WHERE c.id = ?;
+                """,
+                (collection_id,),
+            ).fetchone()
+        return {**dict(row), "type": kind} if row else None
+
+    def get_collection_members(
+        self,
+        kind: str,
+        collection_id: str,
+        limit: int = 50,
+        after: tuple[str, str] | None = None,
+    ) -> tuple[list[dict], tuple[str, str] | None]:
+        """
+        One page of members ordered by (sort_title, id). Pass the returned key
+        back as `after` for the next page; it is None on the last page. Each
+        page is an index range scan, so page 100 costs the same as page 1.
+        """
+        spec = _COLLECTION_SPECS[kind]
+        fk = spec["fk"]
+        where = "r.collection_id = ?"
+        params: list = [collection_id]
+        if after:
+            where += f" AND (md.sort_title, r.{fk}) > (?, ?)"
+            params.extend(after)
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT r.{fk} AS {fk}, md.id AS media_id, md.title AS title,
+                       md.sort_title AS sort_title, t.{spec['year']} AS year,
+                       md.rating AS rating, md.obtained AS obtained
+                FROM {spec['rel']} r
+                JOIN {spec['media_table']} t ON t.id = r.{fk}
+                JOIN media md ON md.id = t.media_id
+                WHERE {where}
+                ORDER BY md.sort_title, r.{fk}
+                LIMIT ?;
+                """,
+                (*params, limit + 1),
+            ).fetchall()
+        items = [dict(r) for r in rows[:limit]]
+        for item in items:
+            item["obtained"] = bool(item["obtained"])
+        next_key = None
+        if len(rows) > limit:
+            next_key = (items[-1]["sort_title"], items[-1][fk])
+        return items, next_key
+
+    def get_collections_for(self, kind: str, ids: list[str]) -> dict[str, list[dict]]:
+        """Which collections each movie/show belongs to, via the link table PK."""
+        spec = _COLLECTION_SPECS[kind]
+        fk = spec["fk"]
+        out: dict[str, list[dict]] = {i: [] for i in ids}
+        if not ids:
+            return out
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT r.{fk} AS member_id, c.id AS collection_id, c.name AS name
+                FROM {spec['rel']} r
+                JOIN {spec['table']} c ON c.id = r.collection_id
+                WHERE {self.backend.in_ids(f"r.{fk}")}
+                ORDER BY {self.backend.nocase("c.name")};
+                """,
+                (self.backend.ids_param(ids),),
+            ).fetchall()
+        for r in rows:
+            out[r["member_id"]].append(
+                {"collection_id": r["collection_id"], "name": r["name"]}
+            )
+        return out
+
+    @_queued
+    @retry_busy
+    def create_collection(self, kind: str, name: str) -> str:
+        """Raises ValueError on an empty name, IntegrityError if it already exists."""
+        spec = _COLLECTION_SPECS[kind]
+        name = " ".join(str(name).split())
+        if not name:
+            raise ValueError("collection name cannot be empty")
+        new_id = self.generate_id(5)
+        with self.backend.connect(write=True) as conn:
+            conn.execute(
+                f"INSERT INTO {spec['table']} (id, name) VALUES (?, ?);",
+                (new_id, name),
+            )
+        return new_id
+
+    @_queued
+    @retry_busy
+    def delete_collection(self, kind: str, collection_id: str) -> bool:
+        spec = _COLLECTION_SPECS[kind]
+        with self.backend.connect(write=True) as conn:
+            conn.execute(
+                f"DELETE FROM {spec['rel']} WHERE collection_id = ?;",
+                (collection_id,),
+            )
+            cur = conn.execute(
+                f"DELETE FROM {spec['table']} WHERE id = ?;", (collection_id,)
+            )
+            return cur.rowcount > 0
+
+    @_queued
+    @retry_busy
+    def add_collection_members(
+        self, kind: str, collection_id: str, ids: list[str]
+    ) -> int:
+        """
+        Link many movies/shows to a collection in one transaction. Existing
+        links are left alone. Raises KeyError listing unknown ids (collection
+        id included), in which case nothing is written.
+        """
+        spec = _COLLECTION_SPECS[kind]
+        ids = list(dict.fromkeys(ids))
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            self._check_collection_ids(cur, spec, collection_id, ids)
+            before = cur.execute(
+                f"SELECT COUNT(*) FROM {spec['rel']} WHERE collection_id = ?;",
+                (collection_id,),
+            ).fetchone()[0]
+            cur.executemany(
+                f"""
+                INSERT INTO {spec['rel']} ({spec['fk']}, collection_id)
+                VALUES (?, ?) ON CONFLICT DO NOTHING;
+                """,
+                [(i, collection_id) for i in ids],
+            )
+            after = cur.execute(
+                f"SELECT COUNT(*) FROM {spec['rel']} WHERE collection_id = ?;",
+                (collection_id,),
+            ).fetchone()[0]
+        return after - before
+
+    @_queued
+    @retry_busy
+    def remove_collection_members(
+        self, kind: str, collection_id: str, ids: list[str]
+    ) -> int:
+        """Unlink many movies/shows in one statement; returns how many were removed."""
+        spec = _COLLECTION_SPECS[kind]
+        if not ids:
+            return 0
+        with self.backend.connect(write=True) as conn:
+            cur = conn.execute(
+                f"""
+                DELETE FROM {spec['rel']}
+                WHERE collection_id = ? AND {self.backend.in_ids(spec['fk'])};
+                """,
+                (collection_id, self.backend.ids_param(ids)),
+            )
+            return cur.rowcount
+
+    def _check_collection_ids(self, cur, spec, collection_id: str, ids: list[str]):
+        missing = []
+        if not cur.execute(
+            f"SELECT 1 FROM {spec['table']} WHERE id = ?;", (collection_id,)
+        ).fetchone():
+            missing.append(collection_id)
+        found = {
+            r[0]
+            for r in cur.execute(
+                f"SELECT id FROM {spec['media_table']} "
+                f"WHERE {self.backend.in_ids('id')};",
+                (self.backend.ids_param(ids),),
+            ).fetchall()
+        }
+        missing += [i for i in ids if i not in found]
+        if missing:
+            raise KeyError(missing)
+
+    def get_artwork_path(self, media_id: str) -> str | None:
+        """Return the stored artwork path for a media row, if any."""
+        with self.backend.connect() as conn:
+            row = conn.execute(
+                "SELECT artwork_path FROM media WHERE id = ?;", (media_id,)
+            ).fetchone()
+        return row[0] if row and row[0] else None
+
+    def get_artwork_paths(self) -> list[str]:
+        """Return every non-empty artwork path, for bulk thumbnail generation."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT artwork_path FROM media "
+                "WHERE artwork_path IS NOT NULL AND artwork_path != '';"
+            ).fetchall()
+        return [r[0] for r in rows]
 
     def insert_movie(self, data):
         """Insert a new movie into the database."""
         pass
 
     def update_movie(self, movie_id, data):
-        """Update movie details by ID."""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
+        """Update movie details by ID. Only keys present in data are written."""
+        self.bulk_update_movies([{**data, "id": movie_id}])
+        return self.get_movie_by_id(movie_id)
+
+    def bulk_update_movies(self, patches: list[dict]) -> int:
+        """Apply sparse movie patches ({"id": ..., <changed fields>}) in one transaction."""
+        return self._bulk_update("movie", patches)
+
+    def bulk_update_shows(self, patches: list[dict]) -> int:
+        """Apply sparse show patches ({"id": ..., <changed fields>}) in one transaction."""
+        return self._bulk_update("show", patches)
+
+    @_queued
+    @retry_busy
+    def _bulk_update(self, kind: str, patches: list[dict]) -> int:
+        """
+        Shared movie/show patcher. Patches touching the same set of columns are
+        grouped into one executemany, and leading_actors/genre are applied as
+        diffs against the existing relationship rows. Raises KeyError if any id
+        is unknown, in which case nothing is written.
+        """
+        spec = _PATCH_SPECS[kind]
+        if not patches:
+            return 0
+        ids = [p["id"] for p in patches]
+
+        with self.backend.connect(write=True) as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                UPDATE movies
-                SET title = ?, year = ?, duration = ?, rating = ?
-                WHERE id = ?;
-                """,
-                (
-                    data.get("title"),
-                    data.get("year"),
-                    data.get("duration"),
-                    data.get("rating"),
-                    movie_id,
-                ),
+
+            media_ids = dict(
+                cur.execute(
+                    f"SELECT id, media_id FROM {spec['table']} "
+                    f"WHERE {self.backend.in_ids('id')};",
+                    (self.backend.ids_param(ids),),
+                ).fetchall()
             )
+            missing = [i for i in ids if i not in media_ids]
+            if missing:
+                raise KeyError(missing)
+
+            media_groups: dict[tuple, list] = {}
+            own_groups: dict[tuple, list] = {}
+            actor_lists: dict[str, list[str]] = {}
+            genre_lists: dict[str, list[str]] = {}
+            networks: set[str] = set()
+
+            for patch in patches:
+                row_id = patch["id"]
+                media_vals = {}
+                own_vals = {}
+                for field, value in patch.items():
+                    if field == "title":
+                        if not value or not str(value).strip():
+                            raise ValueError("title cannot be empty")
+                        media_vals["title"] = str(value).strip()
+                        media_vals["sort_title"] = _sort_title(str(value))
+                    elif field == "obtained":
+                        media_vals["obtained"] = bool(_parse_obtained(value))
+                    elif field in ("rating", "notes"):
+                        media_vals[field] = value
+                    elif field in spec["fields"]:
+                        own_vals[field] = value
+                        if field == "network" and value:
+                            networks.add(value)
+                    elif field == "leading_actors":
+                        actor_lists[row_id] = _split_names(value, ",")
+                    elif field == "genre":
+                        genre_lists[row_id] = _split_names(value, ",;")
+
+                if media_vals:
+                    cols = tuple(media_vals)
+                    media_groups.setdefault(cols, []).append(
+                        (*media_vals.values(), media_ids[row_id])
+                    )
+                if own_vals:
+                    cols = tuple(own_vals)
+                    own_groups.setdefault(cols, []).append((*own_vals.values(), row_id))
+
+            if networks:
+                network_ids = self._get_or_create_named(cur, "show_networks", networks)
+                own_groups = {
+                    cols: [
+                        tuple(
+                            network_ids.get(v, v) if c == "network" and v else v
+                            for c, v in zip(cols, row)
+                        )
+                        + row[len(cols) :]
+                        for row in rows
+                    ]
+                    for cols, rows in own_groups.items()
+                }
+
+            # one executemany per distinct column set, e.g. 500x obtained=1 is one
+            for cols, rows in media_groups.items():
+                assignments = ", ".join(f"{c} = ?" for c in cols)
+                cur.executemany(
+                    f"UPDATE media SET {assignments} WHERE id = ?;", rows
+                )
+            for cols, rows in own_groups.items():
+                assignments = ", ".join(f"{c} = ?" for c in cols)
+                cur.executemany(
+                    f"UPDATE {spec['table']} SET {assignments} WHERE id = ?;", rows
+                )
+
+            relinked = {}
+            if actor_lists:
+                relinked["actor_id"] = self._diff_actor_links(cur, spec, actor_lists)
+            if genre_lists:
+                relinked["genre_id"] = self._diff_genre_links(cur, spec, genre_lists)
+            if any(relinked.values()) and self._has_play_rollups(cur):
+                # plays of a relinked title now count towards other actors/genres
+                for col, linked_ids in relinked.items():
+                    if linked_ids:
+                        self._recount_play_rollup(
+                            cur, col, "SELECT value FROM json_each(?)",
+                            (json.dumps(sorted(linked_ids)),),
+                        )
+
             conn.commit()
+        return len(patches)
+
+    def _get_or_create_named(self, cur, table: str, names) -> dict[str, str]:
+        """Resolve names to ids in a name-unique lookup table, inserting new ones."""
+        names = list(dict.fromkeys(names))
+        found = {
+            name.lower(): row_id
+            for row_id, name in cur.execute(
+                f"SELECT id, name FROM {table} "
+                f"WHERE {self.backend.nocase_in('name')};",
+                (self.backend.names_param(names),),
+            ).fetchall()
+        }
+        new_rows = []
+        for name in names:
+            if name.lower() not in found:
+                found[name.lower()] = self.generate_id(5)
+                new_rows.append((found[name.lower()], name))
+        if new_rows:
+            cur.executemany(f"INSERT INTO {table} (id, name) VALUES (?, ?);", new_rows)
+        return {name: found[name.lower()] for name in names}
+
+    def _get_or_create_actors(self, cur, raw_names) -> dict[str, str]:
+        """Resolve raw actor strings (possibly 'Name (Pseudonym)') to actor ids."""
+        parsed = {}
+        for raw in raw_names:
+            base, pseudo = _parse_actor(raw)
+            if base:
+                parsed[raw] = (base, pseudo)
+        bases = list(dict.fromkeys(b for b, _ in parsed.values()))
+        found = {
+            name.lower(): row_id
+            for row_id, name in cur.execute(
+                "SELECT id, name FROM actors "
+                f"WHERE {self.backend.nocase_in('name')};",
+                (self.backend.names_param(bases),),
+            ).fetchall()
+        }
+        new_rows = []
+        for base, pseudo in parsed.values():
+            if base.lower() not in found:
+                found[base.lower()] = self.generate_id()
+                new_rows.append((found[base.lower()], base, pseudo))
+        if new_rows:
+            cur.executemany(
+                "INSERT INTO actors (id, name, pseudonym) VALUES (?, ?, ?);", new_rows
+            )
+        return {raw: found[base.lower()] for raw, (base, _) in parsed.items()}
+
+    def _diff_actor_links(self, cur, spec, actor_lists: dict[str, list[str]]) -> set[str]:
+        """Replace the credits of each title; returns the actors linked or unlinked."""
+        rel, fk = spec["actor_rel"], spec["fk"]
+        actor_ids = self._get_or_create_actors(
+            cur, {n for names in actor_lists.values() for n in names}
+        )
+        existing: dict[str, dict[str, int]] = {}
+        for row_id, actor_id, billing in cur.execute(
+            f"SELECT {fk}, actor_id, billing_order FROM {rel} "
+            f"WHERE {self.backend.in_ids(fk)};",
+            (self.backend.ids_param(actor_lists),),
+        ).fetchall():
+            existing.setdefault(row_id, {})[actor_id] = billing
+
+        deletes, upserts = [], []
+        for row_id, names in actor_lists.items():
+            wanted: dict[str, int] = {}
+            for name in names:
+                actor_id = actor_ids.get(name)
+                if actor_id and actor_id not in wanted:
+                    wanted[actor_id] = len(wanted) + 1
+            have = existing.get(row_id, {})
+            deletes += [(row_id, a) for a in have if a not in wanted]
+            upserts += [
+                (row_id, a, billing)
+                for a, billing in wanted.items()
+                if have.get(a) != billing
+            ]
+        if deletes:
+            cur.executemany(
+                f"DELETE FROM {rel} WHERE {fk} = ? AND actor_id = ?;", deletes
+            )
+        if upserts:
+            cur.executemany(
+                f"""
+                INSERT INTO {rel} ({fk}, actor_id, billing_order) VALUES (?, ?, ?)
+                ON CONFLICT({fk}, actor_id)
+                DO UPDATE SET billing_order = excluded.billing_order;
+                """,
+                upserts,
+            )
+        return {a for _, a in deletes} | {a for _, a, billing in upserts}
+
+    def _diff_genre_links(self, cur, spec, genre_lists: dict[str, list[str]]) -> set[str]:
+        """Replace the genres of each title; returns the genres linked or unlinked."""
+        rel, fk = spec["genre_rel"], spec["fk"]
+        genre_ids = self._get_or_create_named(
+            cur, "genres", {g for names in genre_lists.values() for g in names}
+        )
+        existing: dict[str, set[str]] = {}
+        for row_id, genre_id in cur.execute(
+            f"SELECT {fk}, genre_id FROM {rel} "
+            f"WHERE {self.backend.in_ids(fk)};",
+            (self.backend.ids_param(genre_lists),),
+        ).fetchall():
+            existing.setdefault(row_id, set()).add(genre_id)
+
+        deletes, inserts = [], []
+        for row_id, names in genre_lists.items():
+            wanted = {genre_ids[g] for g in names}
+            have = existing.get(row_id, set())
+            deletes += [(row_id, g) for g in have - wanted]
+            inserts += [(row_id, g) for g in wanted - have]
+        if deletes:
+            cur.executemany(
+                f"DELETE FROM {rel} WHERE {fk} = ? AND genre_id = ?;", deletes
+            )
+        if inserts:
+            cur.executemany(
+                f"INSERT INTO {rel} ({fk}, genre_id) VALUES (?, ?);", inserts
+            )
+        return {g for _, g in deletes} | {g for _, g in inserts}
 
     def delete_movie(self, movie_id):
         """Delete a movie by ID."""
         pass
 
+    @_cached
     def get_shows(self):
         """Retrieve all shows."""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
+        with self.backend.connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""SELECT * FROM v_show_table;""")
             return cursor.fetchall()
@@ -245,6 +948,1357 @@ class MediaDB:
         """Retrieve media by type (movie, show, etc.)."""
         pass
 
+    # ====================== App meta ====================== #
+
+    def get_app_meta(self) -> dict:
+        """The single app_meta row (last_updated, last_backup), or Nones if empty."""
+        with self.backend.connect() as conn:
+            row = conn.execute(
+                "SELECT last_updated, last_backup FROM app_meta LIMIT 1;"
+            ).fetchone()
+        if row is None:
+            return {"last_updated": None, "last_backup": None}
+        return dict(row)
+
+    @_queued
+    @retry_busy
+    def set_last_backup(self, when: str):
+        """Record a finished backup; app_meta has no key, so it holds one row."""
+        with self.backend.connect(write=True) as conn:
+            cur = conn.execute("UPDATE app_meta SET last_backup = ?;", (when,))
+            if cur.rowcount == 0:
+                conn.execute("INSERT INTO app_meta (last_backup) VALUES (?);", (when,))
+
+    # ====================== Change feed ====================== #
+
+    @retry_busy
+    def init_change_log(self, changes_sql_file: str = "sql/changes.sql"):
+        """
+        Create the change log table and triggers if missing. On a database that
+        already holds data, seed one upsert per existing row so that a client
+        syncing from seq 0 receives the whole catalog.
+        """
+        if self.backend.dialect != "sqlite":
+            raise NotImplementedError("The change log triggers are SQLite only")
+        with open(changes_sql_file, "r") as f:
+            sql_script = f.read()
+        with self.backend.connect(write=True) as conn:
+            conn.executescript(sql_script)
+            seeded = conn.execute(
+                "SELECT seeded FROM change_log_meta WHERE id = 1;"
+            ).fetchone()[0]
+            if seeded:
+                return
+            if conn.execute("SELECT 1 FROM change_log LIMIT 1;").fetchone() is None:
+                for table, keys in SYNC_TABLES.items():
+                    key2 = keys[1] if len(keys) > 1 else "NULL"
+                    conn.execute(
+                        f"""
+                        INSERT INTO change_log (tbl, key1, key2, op)
+                        SELECT '{table}', {keys[0]}, {key2}, 'upsert' FROM {table};
+                        """
+                    )
+            conn.execute("UPDATE change_log_meta SET seeded = 1 WHERE id = 1;")
+            conn.commit()
+
+    def get_changes(self, since: int = 0, limit: int = 1000, after: str | None = None) -> dict:
+        """
+        Compacted changes after `since`: only the latest op per row is returned,
+        upserts carry the current row, deletes carry just the key.
+        Clients store `next` and pass it back as `since` while `has_more` is set.
+        since=0 is a full sync: every current row, whatever was compacted, up to
+        `limit` rows a page. While its `cursor` is set, pass it back as `after`;
+        `next` stays the seq taken before the first page.
+        """
+        with self.backend.connect() as conn:
+            cursor = conn.cursor()
+            if since <= 0:
+                return self._full_sync_page(cursor, limit, after)
+
+            purged_through = cursor.execute(
+                "SELECT purged_through FROM change_log_meta WHERE id = 1;"
+            ).fetchone()["purged_through"]
+            if since < purged_through:
+                # tombstones the client needs are gone, it has to start over
+                return {
+                    "since": since,
+                    "next": 0,
+                    "has_more": True,
+                    "reset": True,
+                    "upserts": {},
+                    "deletes": {},
+                    "cursor": None,
+                }
+
+            log_rows = cursor.execute(
+                """
+                SELECT seq, tbl, key1, key2, op FROM change_log
+                WHERE seq > ? ORDER BY seq LIMIT ?;
+                """,
+                (since, limit),
+            ).fetchall()
+
+            # later entries overwrite earlier ones for the same row
+            latest: dict[tuple, str] = {}
+            for r in log_rows:
+                latest[(r["tbl"], r["key1"], r["key2"])] = r["op"]
+
+            upsert_keys: dict[str, list] = {}
+            deletes: dict[str, list] = {}
+            for (table, key1, key2), op in latest.items():
+                key = [key1] if key2 is None else [key1, key2]
+                if op == "delete":
+                    deletes.setdefault(table, []).append(key)
+                else:
+                    upsert_keys.setdefault(table, []).append(key)
+
+            upserts: dict[str, list] = {}
+            for table, keys in upsert_keys.items():
+                key_cols = SYNC_TABLES[table]
+                if len(key_cols) == 1:
+                    where = f"{key_cols[0]} IN (SELECT value FROM json_each(?))"
+                    param = json.dumps([k[0] for k in keys])
+                else:
+                    where = (
+                        f"({key_cols[0]}, {key_cols[1]}) IN ("
+                        "SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') "
+                        "FROM json_each(?))"
+                    )
+                    param = json.dumps(keys)
+                rows = cursor.execute(
+                    f"SELECT * FROM {table} WHERE {where};", (param,)
+                ).fetchall()
+                # rows deleted after this page show up as deletes on a later page
+                if rows:
+                    upserts[table] = [dict(r) for r in rows]
+
+        return {
+            "since": since,
+            "next": log_rows[-1]["seq"] if log_rows else since,
+            "has_more": len(log_rows) == limit,
+            "reset": False,
+            "upserts": upserts,
+            "deletes": deletes,
+            "cursor": None,
+        }
+
+    def _full_sync_page(self, cursor, limit: int, after: str | None) -> dict:
+        """
+        One page of the full sync: tables in SYNC_TABLES order, rows in key order,
+        resumed from the (table, key) in `after`. Rows edited behind the cursor
+        are picked up by the log from `next`, which was read before any of them.
+        """
+        tables = list(SYNC_TABLES)
+        if after:
+            try:
+                state = json.loads(after)
+                last_seq, start, key = int(state["next"]), state["table"], state["key"]
+                if start not in SYNC_TABLES or len(key) != len(SYNC_TABLES[start]):
+                    raise ValueError
+            except (ValueError, TypeError, KeyError):
+                raise ValueError(f"Bad sync cursor: {after!r}")
+        else:
+            # seq first: a change racing the reads is sent again next time
+            last_seq = cursor.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM change_log;"
+            ).fetchone()[0]
+            start, key = tables[0], None
+
+        upserts = {}
+        next_cursor = None
+        room = limit
+        for table in tables[tables.index(start):]:
+            key_cols = SYNC_TABLES[table]
+            cols = ", ".join(key_cols)
+            where, params = "", ()
+            if key is not None:
+                where = f"WHERE ({cols}) > ({', '.join('?' * len(key_cols))})"
+                params = tuple(key)
+                key = None
+            rows = cursor.execute(
+                f"SELECT * FROM {table} {where} ORDER BY {cols} LIMIT ?;", (*params, room)
+            ).fetchall()
+            if rows:
+                upserts[table] = [dict(r) for r in rows]
+            room -= len(rows)
+            if room == 0:
+                next_cursor = json.dumps(
+                    {"next": last_seq, "table": table, "key": [rows[-1][c] for c in key_cols]}
+                )
+                break
+
+        return {
+            "since": 0,
+            "next": last_seq,
+            "has_more": next_cursor is not None,
+            "reset": False,
+            "upserts": upserts,
+            "deletes": {},
+            "cursor": next_cursor,
+        }
+
+    def current_change_seq(self) -> int:
+        """Latest change_log seq, for caches that load everything then follow changes."""
+        with self.backend.connect() as conn:
+            return conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM change_log;"
+            ).fetchone()[0]
+
+    @retry_busy
+    def compact_change_log(self, tombstone_days: int = 30) -> dict:
+        """
+        Drop log entries superseded by a later entry for the same row, and
+        tombstones older than tombstone_days (clients behind that must resync).
+        """
+        with self.backend.connect(write=True) as conn:
+            superseded = conn.execute(
+                """
+                DELETE FROM change_log WHERE seq NOT IN (
+                    SELECT MAX(seq) FROM change_log GROUP BY tbl, key1, key2
+                );
+                """
+            ).rowcount
+            purge_upto = conn.execute(
+                """
+                SELECT MAX(seq) FROM change_log
+                WHERE op = 'delete' AND changed_at < datetime('now', ?);
+                """,
+                (f"-{int(tombstone_days)} days",),
+            ).fetchone()[0]
+            tombstones = 0
+            if purge_upto is not None:
+                tombstones = conn.execute(
+                    "DELETE FROM change_log WHERE op = 'delete' AND seq <= ?;",
+                    (purge_upto,),
+                ).rowcount
+                conn.execute(
+                    """
+                    UPDATE change_log_meta
+                    SET purged_through = MAX(purged_through, ?) WHERE id = 1;
+                    """,
+                    (purge_upto,),
+                )
+            conn.execute(
+                "UPDATE change_log_meta SET last_compacted = CURRENT_TIMESTAMP WHERE id = 1;"
+            )
+            conn.commit()
+        return {"superseded": superseded, "tombstones": tombstones}
+
+    # ====================== Library files ====================== #
+
+    def init_library(self, library_sql_file: str = "sql/library.sql"):
+        """Create the scanner's media_files / library_dirs tables if missing."""
+        if self.backend.dialect != "sqlite":
+            raise NotImplementedError("The library scanner tables are SQLite only")
+        with open(library_sql_file, "r") as f:
+            self.backend.executescript(f.read())
+
+    def get_title_index_rows(self) -> list[tuple]:
+        """(media_id, type, title, year) for every title; year is start_year for shows."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT m.id, m.type, m.title, COALESCE(mv.year, s.start_year)
+                FROM media m
+                LEFT JOIN movies mv ON mv.media_id = m.id
+                LEFT JOIN shows s ON s.media_id = m.id;
+                """
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def get_library_dirs(self) -> dict[str, tuple[str | None, int]]:
+        """path -> (parent, mtime_ns) as of the last scan."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                "SELECT path, parent, mtime_ns FROM library_dirs;"
+            ).fetchall()
+        return {r[0]: (r[1], r[2]) for r in rows}
+
+    def get_unmatched_files(self) -> list[str]:
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                "SELECT path FROM media_files WHERE media_id IS NULL;"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def get_media_files(self, media_id: str) -> list[dict]:
+        """The title's files, with container info where it has been probed."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT f.path, f.size, f.mtime_ns, f.season, f.episode,
+                       i.container, i.duration_s, i.streams
+                FROM media_files f
+                LEFT JOIN media_info i
+                  ON i.path = f.path AND i.size = f.size AND i.mtime_ns = f.mtime_ns
+                WHERE f.media_id = ? ORDER BY f.season, f.episode, f.path;
+                """,
+                (media_id,),
+            ).fetchall()
+        out = []
+        for r in rows:
+            row = dict(r)
+            row["streams"] = json.loads(row["streams"]) if row["streams"] else None
+            out.append(row)
+        return out
+
+    def get_files_to_probe(self, force: bool = False) -> list[tuple]:
+        """(path, size, mtime_ns) of matched files without fresh media_info."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT f.path, f.size, f.mtime_ns FROM media_files f
+                LEFT JOIN media_info i ON i.path = f.path
+                WHERE f.media_id IS NOT NULL
+                  AND ({int(force)} OR i.path IS NULL
+                       OR i.size != f.size OR i.mtime_ns != f.mtime_ns);
+                """
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    @_queued
+    @retry_busy
+    def apply_media_info(self, rows: list[tuple], overwrite: bool = False) -> int:
+        """
+        Store probe results, (path, size, mtime_ns, container, duration_s,
+        streams_json, error), then set movies.duration (minutes) from the
+        longest fresh file of each movie. Existing durations are kept unless
+        overwrite. Returns the number of movies updated.
+        """
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            cur.executemany(
+                """
+                INSERT OR REPLACE INTO media_info
+                    (path, size, mtime_ns, container, duration_s, streams, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?);
+                """,
+                rows,
+            )
+            # longest rather than summed: several files are usually versions
+            # (4K and 1080p), not parts
+            return cur.execute(
+                f"""
+                UPDATE movies SET duration = probed.minutes
+                FROM (
+                    SELECT f.media_id,
+                           CAST(ROUND(MAX(i.duration_s) / 60.0) AS INTEGER) AS minutes
+                    FROM media_files f
+                    JOIN media_info i
+                      ON i.path = f.path AND i.size = f.size AND i.mtime_ns = f.mtime_ns
+                    WHERE f.media_id IS NOT NULL AND i.duration_s > 0
+                    GROUP BY f.media_id
+                ) AS probed
+                WHERE movies.media_id = probed.media_id
+                  AND probed.minutes > 0
+                  AND movies.duration IS NOT probed.minutes
+                  AND ({int(overwrite)} OR movies.duration IS NULL);
+                """
+            ).rowcount
+
+    @_queued
+    @retry_busy
+    def apply_library_scan(
+        self,
+        dirs: list[tuple],
+        removed: list[str],
+        files: list[tuple],
+        rematched: list[tuple],
+    ) -> dict:
+        """
+        Write one scan in a single transaction.
+
+        dirs: (path, parent, mtime_ns) for every directory that was re-listed;
+        its files are replaced by the rows in files, (path, dir, media_id,
+        size, mtime_ns, season, episode). removed: directories that are gone,
+        with their files. rematched: (media_id, path) for files that were
+        unmatched before and match now.
+
+        Titles with a file get obtained = 1. Titles that had files and lost
+        all of them go back to 0; titles the scanner never matched are left
+        as they were entered by hand.
+        """
+        touched = [(d[0],) for d in dirs] + [(d,) for d in removed]
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            before: set[str] = set()
+            for (path,) in touched:
+                before.update(
+                    r[0]
+                    for r in cur.execute(
+                        "SELECT DISTINCT media_id FROM media_files "
+                        "WHERE dir = ? AND media_id IS NOT NULL;",
+                        (path,),
+                    ).fetchall()
+                )
+            cur.executemany("DELETE FROM media_files WHERE dir = ?;", touched)
+            cur.executemany(
+                "DELETE FROM library_dirs WHERE path = ?;", [(d,) for d in removed]
+            )
+            cur.executemany(
+                """
+                INSERT INTO library_dirs (path, parent, mtime_ns) VALUES (?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    parent = excluded.parent,
+                    mtime_ns = excluded.mtime_ns,
+                    scanned_at = CURRENT_TIMESTAMP;
+                """,
+                dirs,
+            )
+            cur.executemany(
+                """
+                INSERT OR REPLACE INTO media_files
+                    (path, dir, media_id, size, mtime_ns, season, episode)
+                VALUES (?, ?, ?, ?, ?, ?, ?);
+                """,
+                files,
+            )
+            cur.executemany(
+                "UPDATE media_files SET media_id = ? WHERE path = ?;", rematched
+            )
+            found = cur.execute(
+                """
+                UPDATE media SET obtained = 1
+                WHERE obtained = 0
+                  AND id IN (SELECT media_id FROM media_files);
+                """
+            ).rowcount
+            lost = 0
+            for media_id in before:
+                lost += cur.execute(
+                    """
+                    UPDATE media SET obtained = 0
+                    WHERE id = ? AND obtained = 1
+                      AND NOT EXISTS (SELECT 1 FROM media_files WHERE media_id = ?);
+                    """,
+                    (media_id, media_id),
+                ).rowcount
+        return {"obtained": found, "lost": lost}
+
+    # ====================== Watch history ====================== #
+
+    def init_plays(self, plays_sql_file: str = "sql/plays.sql"):
+        """Create the plays table and its rollups if missing."""
+        if self.backend.dialect != "sqlite":
+            raise NotImplementedError("Watch history is SQLite only")
+        with open(plays_sql_file, "r") as f:
+            self.backend.executescript(f.read())
+
+    def get_episode_index_rows(self) -> list[tuple]:
+        """(show media_id, season, episode, episode_name, episode id) for every episode."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT s.media_id, e.season_number, e.episode_number,
+                       e.episode_name, e.id
+                FROM show_episodes e JOIN shows s ON s.id = e.show_id;
+                """
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def get_unresolved_play_titles(self) -> list[str]:
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT raw_title FROM plays WHERE media_id IS NULL;"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def _add_play_rollups(self, cur, where: str, params: tuple, months: bool = True):
+        """
+        Add the plays matching `where` (on alias p) to the rollups. Called in
+        the same transaction that inserted or resolved them, so the rollups
+        always agree with the plays table.
+        """
+        if months:
+            cur.execute(
+                f"""
+                INSERT INTO play_rollup_month (month, plays, seconds)
+                SELECT substr(p.played_at, 1, 7), COUNT(*), COALESCE(SUM(p.seconds), 0)
+                FROM plays p WHERE {where}
+                GROUP BY substr(p.played_at, 1, 7)
+                ON CONFLICT (month) DO UPDATE SET
+                    plays = plays + excluded.plays,
+                    seconds = seconds + excluded.seconds;
+                """,
+                params,
+            )
+        cur.execute(
+            f"""
+            INSERT INTO play_rollup_title
+                (media_id, plays, seconds, first_played, last_played)
+            SELECT p.media_id, COUNT(*), COALESCE(SUM(p.seconds), 0),
+                   MIN(p.played_at), MAX(p.played_at)
+            FROM plays p WHERE p.media_id IS NOT NULL AND {where}
+            GROUP BY p.media_id
+            ON CONFLICT (media_id) DO UPDATE SET
+                plays = plays + excluded.plays,
+                seconds = seconds + excluded.seconds,
+                first_played = MIN(first_played, excluded.first_played),
+                last_played = MAX(last_played, excluded.last_played);
+            """,
+            params,
+        )
+        for spec in _PATCH_SPECS.values():
+            for col, (rollup, rel) in _ROLLUP_LINKS.items():
+                cur.execute(
+                    f"""
+                    INSERT INTO {rollup} ({col}, plays, seconds)
+                    SELECT r.{col}, COUNT(*), COALESCE(SUM(p.seconds), 0)
+                    FROM plays p
+                    JOIN {spec['table']} t ON t.media_id = p.media_id
+                    JOIN {spec[rel]} r ON r.{spec['fk']} = t.id
+                    WHERE {where}
+                    GROUP BY r.{col}
+                    ON CONFLICT ({col}) DO UPDATE SET
+                        plays = plays + excluded.plays,
+                        seconds = seconds + excluded.seconds;
+                    """,
+                    params,
+                )
+
+    @_queued
+    @retry_busy
+    def import_plays(self, rows: list[tuple]) -> int:
+        """
+        Insert plays, (media_id, episode_id, raw_title, season, played_at,
+        seconds, profile, device, source), skipping ones already imported,
+        and add the new ones to the rollups. Returns the number inserted.
+        """
+        if not rows:
+            return 0
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            # new rows get ids above the current max (INTEGER PRIMARY KEY)
+            before = cur.execute("SELECT COALESCE(MAX(id), 0) FROM plays;").fetchone()[0]
+            cur.executemany(
+                """
+                INSERT OR IGNORE INTO plays (media_id, episode_id, raw_title, season,
+                                             played_at, seconds, profile, device, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                rows,
+            )
+            inserted = cur.execute(
+                "SELECT COUNT(*) FROM plays WHERE id > ?;", (before,)
+            ).fetchone()[0]
+            if inserted:
+                self._add_play_rollups(cur, "p.id > ?", (before,))
+        return inserted
+
+    @_queued
+    @retry_busy
+    def resolve_plays(self, matches: list[tuple]) -> int:
+        """
+        Attach unresolved plays to titles added since they were imported.
+        matches: (raw_title, media_id, episode_id). Returns plays resolved.
+        """
+        if not matches:
+            return 0
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            ids = []
+            for raw_title, media_id, episode_id in matches:
+                ids += [
+                    r[0]
+                    for r in cur.execute(
+                        """
+                        UPDATE plays SET media_id = ?, episode_id = ?
+                        WHERE raw_title = ? AND media_id IS NULL RETURNING id;
+                        """,
+                        (media_id, episode_id, raw_title),
+                    ).fetchall()
+                ]
+            if ids:
+                # months already counted them when they were imported
+                self._add_play_rollups(
+                    cur,
+                    "p.id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(ids),),
+                    months=False,
+                )
+        return len(ids)
+
+    @retry_busy
+    def rebuild_play_rollups(self) -> dict:
+        """Recompute every rollup from the raw plays, e.g. after credits changed."""
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            self._rebuild_play_rollups(cur)
+            plays = cur.execute("SELECT COUNT(*) FROM plays;").fetchone()[0]
+        return {"plays": plays}
+
+    def _has_play_rollups(self, cur) -> bool:
+        if self.backend.dialect != "sqlite":
+            return False
+        return cur.execute("PRAGMA table_info(play_rollup_actor);").fetchone() is not None
+
+    def _recount_play_rollup(self, cur, col: str, ids_sql: str, params: tuple = ()):
+        """
+        Recount the actor or genre rollup (col is actor_id or genre_id) for the
+        ids `ids_sql` selects, after their credits or genre links changed.
+        """
+        rollup, rel = _ROLLUP_LINKS[col]
+        cur.execute(f"DELETE FROM {rollup} WHERE {col} IN ({ids_sql});", params)
+        for spec in _PATCH_SPECS.values():
+            cur.execute(
+                f"""
+                INSERT INTO {rollup} ({col}, plays, seconds)
+                SELECT r.{col}, COUNT(*), COALESCE(SUM(p.seconds), 0)
+                FROM plays p
+                JOIN {spec['table']} t ON t.media_id = p.media_id
+                JOIN {spec[rel]} r ON r.{spec['fk']} = t.id
+                WHERE r.{col} IN ({ids_sql})
+                GROUP BY r.{col}
+                ON CONFLICT ({col}) DO UPDATE SET
+                    plays = plays + excluded.plays,
+                    seconds = seconds + excluded.seconds;
+                """,
+                params,
+            )
+
+    def _rebuild_play_rollups(self, cur):
+        for table in (
+            "play_rollup_title",
+            "play_rollup_month",
+            "play_rollup_genre",
+            "play_rollup_actor",
+        ):
+            cur.execute(f"DELETE FROM {table};")
+        self._add_play_rollups(cur, "1", ())
+
+    @_cached
+    def get_play_stats(self, top: int = 20) -> dict:
+        """Everything the stats page shows, read from the rollups only."""
+        with self.backend.connect() as conn:
+            cur = conn.cursor()
+            months = [
+                dict(r)
+                for r in cur.execute(
+                    "SELECT month, plays, seconds FROM play_rollup_month ORDER BY month;"
+                ).fetchall()
+            ]
+            titles = [
+                dict(r)
+                for r in cur.execute(
+                    """
+                    SELECT r.media_id, m.title, m.type,
+                           COALESCE(mv.id, s.id) AS item_id,
+                           r.plays, r.seconds, r.first_played, r.last_played
+                    FROM play_rollup_title r
+                    JOIN media m ON m.id = r.media_id
+                    LEFT JOIN movies mv ON mv.media_id = m.id
+                    LEFT JOIN shows s ON s.media_id = m.id
+                    ORDER BY r.plays DESC, r.seconds DESC LIMIT ?;
+                    """,
+                    (top,),
+                ).fetchall()
+            ]
+            genres = [
+                dict(r)
+                for r in cur.execute(
+                    """
+                    SELECT g.id AS genre_id, g.name, r.plays, r.seconds
+                    FROM play_rollup_genre r JOIN genres g ON g.id = r.genre_id
+                    ORDER BY r.plays DESC, r.seconds DESC LIMIT ?;
+                    """,
+                    (top,),
+                ).fetchall()
+            ]
+            actors = [
+                dict(r)
+                for r in cur.execute(
+                    """
+                    SELECT a.id AS actor_id, a.name, r.plays, r.seconds
+                    FROM play_rollup_actor r JOIN actors a ON a.id = r.actor_id
+                    ORDER BY r.plays DESC, r.seconds DESC LIMIT ?;
+                    """,
+                    (top,),
+                ).fetchall()
+            ]
+        return {
+            "plays": sum(m["plays"] for m in months),
+            "seconds": sum(m["seconds"] for m in months),
+            "months": months,
+            "titles": titles,
+            "genres": genres,
+            "actors": actors,
+        }
+
+    # ====================== Similar titles ====================== #
+
+    def init_similar(self, similar_sql_file: str = "sql/similar.sql"):
+        """Create the precomputed "more like this" table if missing."""
+        if self.backend.dialect != "sqlite":
+            raise NotImplementedError("Similar titles are SQLite only")
+        with open(similar_sql_file, "r") as f:
+            self.backend.executescript(f.read())
+
+    def get_similarity_features(self, kind: str) -> list[tuple]:
+        """
+        (media_id, feature, billing_order) for every credit and genre of one
+        kind; features are "a:<actor_id>" or "g:<genre_id>" (billing NULL).
+        """
+        spec = _PATCH_SPECS[kind]
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT t.media_id, 'a:' || r.actor_id, r.billing_order
+                FROM {spec['actor_rel']} r JOIN {spec['table']} t ON t.id = r.{spec['fk']}
+                UNION ALL
+                SELECT t.media_id, 'g:' || r.genre_id, NULL
+                FROM {spec['genre_rel']} r JOIN {spec['table']} t ON t.id = r.{spec['fk']};
+                """
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def get_similar_meta(self) -> dict:
+        with self.backend.connect() as conn:
+            row = conn.execute(
+                "SELECT last_seq, built_at FROM similar_meta WHERE id = 1;"
+            ).fetchone()
+        return dict(row)
+
+    def get_similar_changes(self, since: int) -> dict:
+        """
+        Titles whose type row, credits or genres changed after change_log seq
+        `since`, plus deleted media ids. reset is set when the log was
+        compacted past `since` and only a full rebuild is safe.
+        """
+        with self.backend.connect() as conn:
+            cur = conn.cursor()
+            purged_through = cur.execute(
+                "SELECT purged_through FROM change_log_meta WHERE id = 1;"
+            ).fetchone()[0]
+            last_seq = cur.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM change_log;"
+            ).fetchone()[0]
+            media_ids: set[str] = set()
+            for spec in _PATCH_SPECS.values():
+                media_ids.update(
+                    r[0]
+                    for r in cur.execute(
+                        f"""
+                        SELECT DISTINCT t.media_id FROM change_log c
+                        JOIN {spec['table']} t ON t.id = c.key1
+                        WHERE c.seq > ? AND c.tbl IN (?, ?, ?);
+                        """,
+                        (since, spec["table"], spec["actor_rel"], spec["genre_rel"]),
+                    ).fetchall()
+                )
+            deleted = {
+                r[0]
+                for r in cur.execute(
+                    """
+                    SELECT DISTINCT key1 FROM change_log
+                    WHERE seq > ? AND tbl = 'media' AND op = 'delete';
+                    """,
+                    (since,),
+                ).fetchall()
+            }
+        return {
+            "last_seq": max(last_seq, since),
+            "media_ids": media_ids,
+            "deleted": deleted,
+            "reset": since < purged_through,
+        }
+
+    def get_similar_listers(self, media_ids: list[str]) -> set[str]:
+        """Titles whose stored neighbours include any of media_ids."""
+        if not media_ids:
+            return set()
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT DISTINCT media_id FROM similar_titles
+                WHERE similar_id IN (SELECT value FROM json_each(?));
+                """,
+                (json.dumps(list(media_ids)),),
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def get_similar_thresholds(self, top_k: int) -> dict[str, float]:
+        """
+        Lowest stored score per title, or 0 when its list has room: a new
+        neighbour has to beat this to get in.
+        """
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT media_id, COUNT(*), MIN(score) FROM similar_titles
+                GROUP BY media_id;
+                """
+            ).fetchall()
+        return {r[0]: (r[2] if r[1] >= top_k else 0.0) for r in rows}
+
+    @_queued
+    @retry_busy
+    def save_similar(
+        self, rows: list[tuple], media_ids: list[str], last_seq: int, full: bool = False
+    ) -> int:
+        """
+        Replace the neighbour lists of media_ids (all of them when full) with
+        rows of (media_id, rank, similar_id, score), and record the change_log
+        seq they are current with. Returns the number of rows written.
+        """
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            # titles can have been deleted since their lists were computed
+            gone = {
+                r[0]
+                for r in cur.execute(
+                    """
+                    SELECT value FROM json_each(?)
+                    WHERE value NOT IN (SELECT id FROM media);
+                    """,
+                    (json.dumps(list(dict.fromkeys(r[0] for r in rows))),),
+                ).fetchall()
+            }
+            if gone:
+                rows = [r for r in rows if r[0] not in gone]
+            if full:
+                # building the index once afterwards beats updating it per row
+                cur.execute("DROP INDEX IF EXISTS idx_similar_titles_similar;")
+                cur.execute("DELETE FROM similar_titles;")
+            elif media_ids:
+                cur.execute(
+                    """
+                    DELETE FROM similar_titles
+                    WHERE media_id IN (SELECT value FROM json_each(?));
+                    """,
+                    (json.dumps(list(media_ids)),),
+                )
+            cur.executemany(
+                """
+                INSERT INTO similar_titles (media_id, rank, similar_id, score)
+                VALUES (?, ?, ?, ?);
+                """,
+                rows,
+            )
+            if full:
+                cur.execute(
+                    "CREATE INDEX idx_similar_titles_similar ON similar_titles (similar_id);"
+                )
+            cur.execute(
+                f"""
+                UPDATE similar_meta SET last_seq = ?
+                {", built_at = CURRENT_TIMESTAMP" if full else ""} WHERE id = 1;
+                """,
+                (last_seq,),
+            )
+        return len(rows)
+
+    @_cached
+    def get_similar(self, media_id: str, limit: int = 12) -> list[dict]:
+        """Precomputed neighbours of one title, best first."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT st.similar_id AS media_id, m.title, m.type,
+                       COALESCE(mv.id, s.id) AS item_id,
+                       COALESCE(mv.year, s.start_year) AS year, st.score
+                FROM similar_titles st
+                JOIN media m ON m.id = st.similar_id
+                LEFT JOIN movies mv ON mv.media_id = m.id
+                LEFT JOIN shows s ON s.media_id = m.id
+                WHERE st.media_id = ?
+                ORDER BY st.rank LIMIT ?;
+                """,
+                (media_id, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ====================== Co-star graph ====================== #
+
+    def get_credit_edges(self) -> list[tuple]:
+        """(actor_id, kind, movie or show id) for every credit."""
+        with self.backend.connect() as conn:
+            cur = conn.cursor()
+            rows = []
+            for kind, spec in _PATCH_SPECS.items():
+                rows += cur.execute(
+                    f"SELECT actor_id, ?, {spec['fk']} FROM {spec['actor_rel']};",
+                    (kind,),
+                ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def get_credit_changes(self, since: int) -> dict:
+        """
+        Credits added or removed after change_log seq `since`, oldest first,
+        as (actor_id, kind, item_id, op). reset is set when the log was
+        compacted past `since` and the graph must be reloaded.
+        """
+        tables = {spec["actor_rel"]: kind for kind, spec in _PATCH_SPECS.items()}
+        with self.backend.connect() as conn:
+            cur = conn.cursor()
+            purged_through = cur.execute(
+                "SELECT purged_through FROM change_log_meta WHERE id = 1;"
+            ).fetchone()[0]
+            rows = cur.execute(
+                f"""
+                SELECT seq, tbl, key1, key2, op FROM change_log
+                WHERE seq > ? AND tbl IN ({", ".join("?" * len(tables))})
+                ORDER BY seq;
+                """,
+                (since, *tables),
+            ).fetchall()
+        return {
+            # from the rows read, a commit after them is picked up next time
+            "last_seq": rows[-1][0] if rows else since,
+            "changes": [(r[3], tables[r[1]], r[2], r[4]) for r in rows],
+            "reset": since < purged_through,
+        }
+
+    def get_actor_names(self, actor_ids: list[str]) -> dict[str, str]:
+        if not actor_ids:
+            return {}
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, name FROM actors WHERE {self.backend.in_ids('id')};",
+                (self.backend.ids_param(actor_ids),),
+            ).fetchall()
+        return {r[0]: r[1] for r in rows}
+
+    def get_credit_titles(self, kind: str, item_ids: list[str]) -> dict[str, dict]:
+        """item_id -> {media_id, title, year} for movies or shows."""
+        if not item_ids:
+            return {}
+        spec = _PATCH_SPECS[kind]
+        year = "t.year" if kind == "movie" else "t.start_year"
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT t.id, m.id AS media_id, m.title, {year} AS year
+                FROM {spec['table']} t JOIN media m ON m.id = t.media_id
+                WHERE {self.backend.in_ids('t.id')};
+                """,
+                (self.backend.ids_param(item_ids),),
+            ).fetchall()
+        return {r[0]: {"media_id": r[1], "title": r[2], "year": r[3]} for r in rows}
+
+    # ====================== Autocomplete ====================== #
+
+    def get_lookup_names(self, table: str, ids: list[str] | None = None) -> list[tuple]:
+        """
+        (id, name, pseudonym) from actors, genres or show_networks; every row,
+        or only `ids`. pseudonym is None outside actors.
+        """
+        if table not in _LOOKUP_TABLES:
+            raise ValueError(f"Not a lookup table: {table}")
+        pseudonym = "pseudonym" if table == "actors" else "NULL"
+        where = f"WHERE {self.backend.in_ids('id')}" if ids is not None else ""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, name, {pseudonym} FROM {table} {where};",
+                (self.backend.ids_param(ids),) if ids is not None else (),
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def get_lookup_changes(self, since: int) -> dict:
+        """
+        Rows of the lookup tables changed after change_log seq `since`, as
+        (table, id, op) oldest first. last_seq and reset as in get_credit_changes.
+        """
+        with self.backend.connect() as conn:
+            cur = conn.cursor()
+            purged_through = cur.execute(
+                "SELECT purged_through FROM change_log_meta WHERE id = 1;"
+            ).fetchone()[0]
+            rows = cur.execute(
+                f"""
+                SELECT seq, tbl, key1, op FROM change_log
+                WHERE seq > ? AND tbl IN ({", ".join("?" * len(_LOOKUP_TABLES))})
+                ORDER BY seq;
+                """,
+                (since, *_LOOKUP_TABLES),
+            ).fetchall()
+        return {
+            "last_seq": rows[-1][0] if rows else since,
+            "changes": [tuple(r)[1:] for r in rows],
+            "reset": since < purged_through,
+        }
+
+    # ====================== Duplicates ====================== #
+
+    def init_dedupe(self, dedupe_sql_file: str = "sql/dedupe.sql"):
+        """Create the duplicate review queue if missing."""
+        if self.backend.dialect != "sqlite":
+            raise NotImplementedError("Duplicate detection is SQLite only")
+        with open(dedupe_sql_file, "r") as f:
+            self.backend.executescript(f.read())
+
+    def get_actor_dedupe_rows(self) -> list[tuple]:
+        """(id, name, pseudonym, credits) for every actor."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT a.id, a.name, a.pseudonym,
+                       (SELECT COUNT(*) FROM actor_movie_relationship r WHERE r.actor_id = a.id)
+                     + (SELECT COUNT(*) FROM actor_show_relationship r WHERE r.actor_id = a.id)
+                FROM actors a;
+                """
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def get_title_dedupe_rows(self) -> list[tuple]:
+        """(media_id, type, title, year, obtained, credits) for every movie and show."""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT m.id, m.type, m.title, COALESCE(mv.year, s.start_year), m.obtained,
+                       (SELECT COUNT(*) FROM actor_movie_relationship r WHERE r.movie_id = mv.id)
+                     + (SELECT COUNT(*) FROM actor_show_relationship r WHERE r.show_id = s.id)
+                FROM media m
+                LEFT JOIN movies mv ON mv.media_id = m.id
+                LEFT JOIN shows s ON s.media_id = m.id
+                WHERE m.type IN ('movie', 'show');
+                """
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    @_queued
+    @retry_busy
+    def save_duplicate_candidates(self, kind: str, rows: list[tuple]) -> dict:
+        """
+        Record a scan's (keep_id, drop_id, score, reason) pairs. New pairs
+        are queued as pending; pairs already reviewed keep their decision;
+        pending pairs the scan no longer finds are dropped.
+        """
+        table = "actors" if kind == "actor" else "media"
+        found = json.dumps([list(r) for r in rows])
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            # json_extract rather than ->>, which needs SQLite 3.38
+            pairs = """
+                SELECT json_extract(value, '$[0]') AS keep_id,
+                       json_extract(value, '$[1]') AS drop_id,
+                       json_extract(value, '$[2]') AS score,
+                       json_extract(value, '$[3]') AS reason
+                FROM json_each(?)
+            """
+            stale = cur.execute(
+                f"""
+                DELETE FROM duplicate_candidates
+                WHERE kind = ? AND status = 'pending'
+                  AND (min(keep_id, drop_id), max(keep_id, drop_id)) NOT IN (
+                      SELECT min(keep_id, drop_id), max(keep_id, drop_id)
+                      FROM ({pairs}));
+                """,
+                (kind, found),
+            ).rowcount
+            # rows can have been deleted since the scan read them
+            added = cur.execute(
+                f"""
+                INSERT OR IGNORE INTO duplicate_candidates
+                    (kind, keep_id, drop_id, score, reason)
+                SELECT ?, keep_id, drop_id, score, reason FROM ({pairs})
+                WHERE keep_id IN (SELECT id FROM {table})
+                  AND drop_id IN (SELECT id FROM {table});
+                """,
+                (kind, found),
+            ).rowcount
+        return {"added": added, "stale": stale}
+
+    @_cached
+    def get_duplicate_candidates(
+        self, kind: str, status: str = "pending", limit: int = 50, offset: int = 0
+    ) -> dict:
+        """One page of the review queue, most likely duplicates first."""
+        if kind == "actor":
+            label = "{t}.name AS {a}_name, {t}.pseudonym AS {a}_pseudonym"
+            joins = "LEFT JOIN actors {t} ON {t}.id = c.{a}_id"
+        else:
+            label = (
+                "{t}.title AS {a}_name, {t}.type AS {a}_type, "
+                "COALESCE({t}mv.year, {t}s.start_year) AS {a}_year"
+            )
+            joins = (
+                "LEFT JOIN media {t} ON {t}.id = c.{a}_id "
+                "LEFT JOIN movies {t}mv ON {t}mv.media_id = {t}.id "
+                "LEFT JOIN shows {t}s ON {t}s.media_id = {t}.id"
+            )
+        with self.backend.connect() as conn:
+            cur = conn.cursor()
+            total = cur.execute(
+                "SELECT COUNT(*) FROM duplicate_candidates WHERE kind = ? AND status = ?;",
+                (kind, status),
+            ).fetchone()[0]
+            rows = cur.execute(
+                f"""
+                SELECT c.id, c.score, c.reason, c.status, c.found_at, c.decided_at,
+                       c.keep_id, {label.format(a="keep", t="k")},
+                       c.drop_id, {label.format(a="drop", t="d")}
+                FROM duplicate_candidates c
+                {joins.format(a="keep", t="k")}
+                {joins.format(a="drop", t="d")}
+                WHERE c.kind = ? AND c.status = ?
+                ORDER BY c.score DESC, c.id LIMIT ? OFFSET ?;
+                """,
+                (kind, status, limit, offset),
+            ).fetchall()
+        items = []
+        for r in rows:
+            item = {k: r[k] for k in ("id", "score", "reason", "status", "found_at", "decided_at")}
+            for side in ("keep", "drop"):
+                item[side] = {
+                    k[len(side) + 1 :]: r[k] for k in r.keys() if k.startswith(side + "_")
+                }
+            items.append(item)
+        return {"kind": kind, "status": status, "total": total, "items": items}
+
+    @_queued
+    @retry_busy
+    def review_duplicates(
+        self, candidate_ids: list[int], status: str, keep_id: str | None = None
+    ) -> int:
+        """
+        Approve, reject or reset pairs that haven't been merged yet. keep_id
+        swaps which side survives when it names the current drop_id.
+        """
+        with self.backend.connect(write=True) as conn:
+            cur = conn.execute(
+                """
+                UPDATE duplicate_candidates SET
+                    status = ?,
+                    decided_at = CASE WHEN ? = 'pending' THEN NULL ELSE CURRENT_TIMESTAMP END,
+                    keep_id = CASE WHEN drop_id = ? THEN drop_id ELSE keep_id END,
+                    drop_id = CASE WHEN drop_id = ? THEN keep_id ELSE drop_id END
+                WHERE id IN (SELECT value FROM json_each(?)) AND status != 'merged';
+                """,
+                (status, status, keep_id, keep_id, json.dumps(list(candidate_ids))),
+            )
+        return cur.rowcount
+
+    @_queued
+    @retry_busy
+    def approve_duplicates_above(self, kind: str, min_score: float) -> int:
+        """Approve every pending pair scoring at least min_score."""
+        with self.backend.connect(write=True) as conn:
+            cur = conn.execute(
+                """
+                UPDATE duplicate_candidates
+                SET status = 'approved', decided_at = CURRENT_TIMESTAMP
+                WHERE kind = ? AND status = 'pending' AND score >= ?;
+                """,
+                (kind, min_score),
+            )
+        return cur.rowcount
+
+    @_queued
+    @retry_busy
+    def merge_duplicates(self, kind: str) -> dict:
+        """
+        Merge every approved pair of `kind` in one transaction, with a few
+        set-based statements over a temp drop -> keep map rather than per
+        pair. Chains (b into a, c into b) collapse onto the final survivor.
+        """
+        table = "actors" if kind == "actor" else "media"
+        with self.backend.connect(write=True) as conn:
+            cur = conn.cursor()
+            pairs = cur.execute(
+                f"""
+                SELECT id, keep_id, drop_id FROM duplicate_candidates
+                WHERE kind = ? AND status = 'approved'
+                  AND keep_id IN (SELECT id FROM {table})
+                  AND drop_id IN (SELECT id FROM {table})
+                ORDER BY score DESC, id;
+                """,
+                (kind,),
+            ).fetchall()
+            parent: dict[str, str] = {}
+
+            def find(x):
+                root = x
+                while parent.get(root, root) != root:
+                    root = parent[root]
+                while x != root:
+                    parent[x], x = root, parent[x]
+                return root
+
+            for _, keep_id, drop_id in pairs:
+                keep_root, drop_root = find(keep_id), find(drop_id)
+                if keep_root != drop_root:
+                    parent[drop_root] = keep_root
+            mapping = [(x, find(x)) for x in list(parent) if find(x) != x]
+            result = {"pairs": len(pairs), "merged": len(mapping)}
+            if not mapping:
+                return result
+
+            cur.execute("DROP TABLE IF EXISTS temp._merge_map;")
+            cur.execute(
+                "CREATE TEMP TABLE _merge_map (drop_id TEXT PRIMARY KEY, keep_id TEXT NOT NULL);"
+            )
+            cur.executemany("INSERT INTO temp._merge_map VALUES (?, ?);", mapping)
+            tables = {
+                r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type = 'table';")
+            }
+            if kind == "actor":
+                result.update(self._merge_actors(cur, tables))
+            else:
+                result.update(self._merge_titles(cur, tables))
+
+            cur.execute(
+                """
+                UPDATE duplicate_candidates
+                SET status = 'merged', decided_at = CURRENT_TIMESTAMP
+                WHERE id IN (SELECT value FROM json_each(?));
+                """,
+                (json.dumps([p[0] for p in pairs]),),
+            )
+            # open pairs naming a merged-away row now name its survivor;
+            # ones that became self-pairs or repeats are dropped below
+            for col in ("keep_id", "drop_id"):
+                cur.execute(
+                    f"""
+                    UPDATE OR IGNORE duplicate_candidates SET {col} = m.keep_id
+                    FROM temp._merge_map m
+                    WHERE duplicate_candidates.{col} = m.drop_id
+                      AND kind = ? AND status != 'merged';
+                    """,
+                    (kind,),
+                )
+            cur.execute(
+                f"""
+                DELETE FROM duplicate_candidates
+                WHERE kind = ? AND status != 'merged'
+                  AND (keep_id NOT IN (SELECT id FROM {table})
+                       OR drop_id NOT IN (SELECT id FROM {table}));
+                """,
+                (kind,),
+            )
+            cur.execute("DROP TABLE temp._merge_map;")
+        return result
+
+    def _merge_actors(self, cur, tables: set[str]) -> dict:
+        moved = 0
+        for spec in _PATCH_SPECS.values():
+            rel, fk = spec["actor_rel"], spec["fk"]
+            # a title crediting both keeps the better billing
+            cur.execute(
+                f"""
+                INSERT INTO {rel} ({fk}, actor_id, billing_order)
+                SELECT r.{fk}, m.keep_id, MIN(r.billing_order)
+                FROM {rel} r JOIN temp._merge_map m ON m.drop_id = r.actor_id
+                GROUP BY r.{fk}, m.keep_id
+                ON CONFLICT ({fk}, actor_id)
+                DO UPDATE SET billing_order = MIN(billing_order, excluded.billing_order);
+                """
+            )
+            moved += cur.execute(
+                f"DELETE FROM {rel} WHERE actor_id IN (SELECT drop_id FROM temp._merge_map);"
+            ).rowcount
+        cur.execute(
+            """
+            UPDATE actors SET pseudonym = d.pseudonym
+            FROM temp._merge_map m JOIN actors d ON d.id = m.drop_id
+            WHERE actors.id = m.keep_id AND COALESCE(actors.pseudonym, '') = ''
+              AND COALESCE(d.pseudonym, '') != '';
+            """
+        )
+        cur.execute("DELETE FROM actors WHERE id IN (SELECT drop_id FROM temp._merge_map);")
+        if "play_rollup_actor" in tables:
+            # recount the survivors: titles crediting both were counted twice
+            self._recount_play_rollup(
+                cur,
+                "actor_id",
+                "SELECT drop_id FROM temp._merge_map UNION SELECT keep_id FROM temp._merge_map",
+            )
+        return {"credits_moved": moved}
+
+    def _merge_titles(self, cur, tables: set[str]) -> dict:
+        fill = {
+            "movie": ("year", "director", "duration"),
+            "show": ("start_year", "end_year", "network"),
+        }
+        for kind, spec in _PATCH_SPECS.items():
+            table, fk = spec["table"], spec["fk"]
+            cur.execute("DROP TABLE IF EXISTS temp._merge_items;")
+            cur.execute(
+                f"""
+                CREATE TEMP TABLE _merge_items AS
+                SELECT d.id AS drop_id, k.id AS keep_id
+                FROM temp._merge_map m
+                JOIN {table} d ON d.media_id = m.drop_id
+                JOIN {table} k ON k.media_id = m.keep_id;
+                """
+            )
+            cur.execute(
+                f"""
+                INSERT INTO {spec['actor_rel']} ({fk}, actor_id, billing_order)
+                SELECT m.keep_id, r.actor_id, MIN(r.billing_order)
+                FROM {spec['actor_rel']} r JOIN temp._merge_items m ON m.drop_id = r.{fk}
+                GROUP BY m.keep_id, r.actor_id
+                ON CONFLICT ({fk}, actor_id)
+                DO UPDATE SET billing_order = MIN(billing_order, excluded.billing_order);
+                """
+            )
+            for rel, col in (
+                (spec["genre_rel"], "genre_id"),
+                (_COLLECTION_SPECS[kind]["rel"], "collection_id"),
+            ):
+                cur.execute(
+                    f"""
+                    INSERT OR IGNORE INTO {rel} ({fk}, {col})
+                    SELECT m.keep_id, r.{col}
+                    FROM {rel} r JOIN temp._merge_items m ON m.drop_id = r.{fk};
+                    """
+                )
+            # fields the survivor is missing come from the duplicate
+            assignments = ", ".join(f"{c} = COALESCE({table}.{c}, d.{c})" for c in fill[kind])
+            cur.execute(
+                f"""
+                UPDATE {table} SET {assignments}
+                FROM temp._merge_items m JOIN {table} d ON d.id = m.drop_id
+                WHERE {table}.id = m.keep_id;
+                """
+            )
+            if kind == "show":
+                if "plays" in tables:
+                    # episodes both have: plays follow to the survivor's copy
+                    cur.execute(
+                        """
+                        UPDATE plays SET episode_id = ke.id
+                        FROM show_episodes de
+                        JOIN temp._merge_items m ON m.drop_id = de.show_id
+                        JOIN show_episodes ke ON ke.show_id = m.keep_id
+                         AND ke.season_number = de.season_number
+                         AND ke.episode_number = de.episode_number
+                        WHERE plays.episode_id = de.id;
+                        """
+                    )
+                cur.execute(
+                    """
+                    UPDATE OR IGNORE show_episodes SET show_id = m.keep_id
+                    FROM temp._merge_items m WHERE show_episodes.show_id = m.drop_id;
+                    """
+                )
+            cur.execute("DROP TABLE temp._merge_items;")
+
+        cur.execute(
+            """
+            UPDATE media SET
+                rating = COALESCE(media.rating, d.rating),
+                artwork_path = COALESCE(NULLIF(media.artwork_path, ''), d.artwork_path),
+                notes = COALESCE(NULLIF(media.notes, ''), d.notes),
+                obtained = MAX(media.obtained, d.obtained)
+            FROM temp._merge_map m JOIN media d ON d.id = m.drop_id
+            WHERE media.id = m.keep_id;
+            """
+        )
+        moved = {}
+        for name in ("media_files", "plays"):
+            if name in tables:
+                moved[f"{name}_moved"] = cur.execute(
+                    f"""
+                    UPDATE {name} SET media_id = m.keep_id FROM temp._merge_map m
+                    WHERE {name}.media_id = m.drop_id;
+                    """
+                ).rowcount
+        cur.execute("DELETE FROM media WHERE id IN (SELECT drop_id FROM temp._merge_map);")
+        if moved.get("plays_moved"):
+            # the plays now count towards other titles, genres and actors
+            self._rebuild_play_rollups(cur)
+        return moved
+
     def close(self):
-        """Close the database connection."""
-        self.conn.close()
+        """Release the backend's connections."""
+        self.backend.close()
@@ -5,7 +5,13 @@ from app.resource_loader import (
     get_genres as premade_genres_list,
     get_actors as premade_actors_list,
 )
-from app.utils import _norm_base, _parse_actor, _get_or_create_actor_id, _parse_years
+from app.utils import (
+    _norm_base,
+    _parse_actor,
+    _get_or_create_actor_id,
+    _parse_years,
+    _sort_title,
+)
 import logging
 
 from dotenv import load_dotenv
@@ -16,6 +22,30 @@ logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 
+def _bool_to01(s: pd.Series) -> pd.Series:
+    return (
+        s.astype(str)
+        .str.strip()
+        .str.lower()
+        .map(
+            {
+                "yes": 1,
+                "true": 1,
+                "1": 1,
+                "y": 1,
+                "no": 0,
+                "false": 0,
+                "0": 0,
+                "n": 0,
+                "": 0,
+                "nan": 0,
+            }
+        )
+        .fillna(0)
+        .astype("Int64")
+    )
+
+
 class MediaDBManager:
     """
     Manages the media database, including init and data import/seeding.
@@ -64,10 +94,23 @@ class MediaDBManager:
         except sqlite3.Error as e:
             print(f"Error executing views SQL script: {e}")
 
+    def initialise_change_log(self, changes_sql_file="sql/changes.sql"):
+        """Creates the change log table and the triggers that feed /api/changes."""
+        try:
+            with open(changes_sql_file, "r") as f:
+                sql_script = f.read()
+
+            self.cursor.executescript(sql_script)
+            self.conn.commit()
+            print(f"Change log initialized from {changes_sql_file}")
+        except sqlite3.Error as e:
+            print(f"Error executing change log SQL script: {e}")
+
     def initialise_database(self):
-        """Initialises the database by creating tables and views."""
+        """Initialises the database by creating tables, views and the change log."""
         self.initialise_tables()
         self.initialise_views()
+        self.initialise_change_log()
 
     # ====================== Helpers ====================== #
 
@@ -75,11 +118,7 @@ class MediaDBManager:
         return generate(self.alphabet, length)
 
     def normalize_sort_title(self, title: str) -> str:
-        sort_title = title.strip().lower()
-        for prefix in ("the ", "a ", "an "):
-            if sort_title.startswith(prefix):
-                return sort_title[len(prefix) :]
-        return sort_title
+        return _sort_title(title)
 
     def get_normalised_df(self, csv_file: str) -> pd.DataFrame:
         df = pd.read_csv(csv_file)
@@ -115,6 +154,49 @@ class MediaDBManager:
         )
         return new_id
 
+    # ====================== CSV Normalisation ====================== #
+
+    def _prepare_media_df(self, csv_file: str) -> pd.DataFrame:
+        """Columns shared by movies and shows: title, sort_title, obtained, rating, notes, artwork."""
+        df = pd.read_csv(csv_file)
+        df.columns = df.columns.str.strip().str.lower()
+
+        # Drop rows with no title
+        df = df.dropna(subset=["title"])  # drop actual NaN
+        df["title"] = df["title"].str.strip()  # strip whitespace
+        df = df[df["title"] != ""].copy()
+
+        # Normalized fields
+        df["sort_title"] = df["title"].apply(self.normalize_sort_title)
+
+        if "obtained" in df.columns:
+            df["obtained"] = _bool_to01(df["obtained"])
+        else:
+            df["obtained"] = 0
+
+        df["rating"] = (
+            pd.to_numeric(df.get("rating"), errors="coerce").fillna(0).astype(int)  # type: ignore
+        )
+        df["notes"] = (
+            df["notes"].fillna("").astype(str) if "notes" in df.columns else ""
+        )
+        df["artwork_path"] = (
+            df["artwork_path"].fillna("").astype(str)
+            if "artwork_path" in df.columns
+            else pd.Series([""] * len(df), dtype=str, index=df.index)
+        )  # type: ignore
+        return df
+
+    def prepare_movies_df(self) -> pd.DataFrame:
+        """Read and normalise the movies CSV."""
+        df = self._prepare_media_df(self.movies_csv)
+        df["year"] = pd.to_numeric(df.get("year"), errors="coerce").astype("Int64")  # type: ignore
+        return df
+
+    def prepare_shows_df(self) -> pd.DataFrame:
+        """Read and normalise the shows CSV."""
+        return self._prepare_media_df(self.shows_csv)
+
     # ====================== Insertion Methods ====================== #
     def insert_genres(self, movie_csv_file: str | None = None) -> int:
         """Insert genres into the database if they don't exist.
@@ -249,55 +331,7 @@ class MediaDBManager:
 
     def insert_movies(self) -> int:
         """Insert movies and link genres/actors from the CSV into DB."""
-        df = pd.read_csv(self.movies_csv)
-        df.columns = df.columns.str.strip().str.lower()
-
-        # Drop rows with no title
-        df = df.dropna(subset=["title"])  # drop actual NaN
-        df["title"] = df["title"].str.strip()  # strip whitespace
-        df = df[df["title"] != ""]
-
-        # Normalized fields
-        df["sort_title"] = df["title"].apply(self.normalize_sort_title)
-        df["year"] = pd.to_numeric(df.get("year"), errors="coerce").astype("Int64")  # type: ignore
-
-        def _bool_to01(s: pd.Series) -> pd.Series:
-            return (
-                s.astype(str)
-                .str.strip()
-                .str.lower()
-                .map(
-                    {
-                        "yes": 1,
-                        "true": 1,
-                        "1": 1,
-                        "y": 1,
-                        "no": 0,
-                        "false": 0,
-                        "0": 0,
-                        "n": 0,
-                        "": 0,
-                        "nan": 0,
-                    }
-                )
-                .fillna(0)
-                .astype("Int64")
-            )
-
-        if "obtained" in df.columns:
-            df["obtained"] = _bool_to01(df["obtained"])
-        else:
-            df["obtained"] = 0
-
-        df["rating"] = (
-            pd.to_numeric(df.get("rating"), errors="coerce").fillna(0).astype(int)  # type: ignore
-        )
-        df["notes"] = df.get("notes", "").fillna("").astype(str)  # type: ignore
-        df["artwork_path"] = (
-            df["artwork_path"].fillna("").astype(str)
-            if "artwork_path" in df.columns
-            else pd.Series([""] * len(df), dtype=str)
-        )  # type: ignore
+        df = self.prepare_movies_df()
 
         # Helpers
         def _clean(s: str) -> str:
@@ -414,53 +448,7 @@ class MediaDBManager:
 
     def insert_shows(self) -> int:
         """Insert shows and link genres/actors/networks from the CSV into DB."""
-
-        df = pd.read_csv(self.shows_csv)
-        df.columns = df.columns.str.strip().str.lower()
-
-        # Drop rows with no title
-        df = df.dropna(subset=["title"])
-        df["title"] = df["title"].str.strip()
-        df = df[df["title"] != ""]
-
-        # Normalized / coerced fields
-        df["sort_title"] = df["title"].apply(self.normalize_sort_title)
-
-        def _bool_to01(s: pd.Series) -> pd.Series:
-            return (
-                s.astype(str)
-                .str.strip()
-                .str.lower()
-                .map(
-                    {
-                        "yes": 1,
-                        "true": 1,
-                        "1": 1,
-                        "y": 1,
-                        "no": 0,
-                        "false": 0,
-                        "0": 0,
-                        "n": 0,
-                        "": 0,
-                        "nan": 0,
-                    }
-                )
-                .fillna(0)
-                .astype("Int64")
-            )
-
-        if "obtained" in df.columns:
-            df["obtained"] = _bool_to01(df["obtained"])
-        else:
-            df["obtained"] = 0
-
-        df["rating"] = pd.to_numeric(df.get("rating"), errors="coerce").fillna(0).astype(int)  # type: ignore
-        df["notes"] = df.get("notes", "").fillna("").astype(str)  # type: ignore
-        df["artwork_path"] = (
-            df["artwork_path"].fillna("").astype(str)
-            if "artwork_path" in df.columns
-            else pd.Series([""] * len(df), dtype=str)
-        )  # type: ignore
+        df = self.prepare_shows_df()
 
         # Helpers
         def _clean(s: str) -> str:
@@ -11,14 +11,26 @@ DB_PORT = os.environ.get("PSQL_DB_PORT", "5432")
 DB_NAME = os.environ.get("PSQL_DB_NAME", "media-db")
 DB_USER = os.environ.get("PSQL_DB_USER", "mediadb_admin")
 DB_PASSWORD = os.environ.get("PSQL_DB_PASSWORD", "password")
+# Full URL override, e.g. sqlite:///dbs/scratch_test.db to run the SQLAlchemy
+# backend against the local SQLite file
+DATABASE_URL = os.environ.get("DATABASE_URL")
 
 
 def get_database_url():
+    if DATABASE_URL:
+        return DATABASE_URL
     return (
         f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
 
 
+def get_connect_args(url: str) -> dict:
+    # sql/init_psql.sql puts everything in the "app" schema
+    if url.startswith("postgresql"):
+        return {"options": "-csearch_path=app,public"}
+    return {}
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -27,6 +39,7 @@ engine = create_engine(
     get_database_url(),
     pool_pre_ping=True,
     future=True,
+    connect_args=get_connect_args(get_database_url()),
 )
 
 SessionLocal = sessionmaker(
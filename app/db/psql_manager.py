@@ -0,0 +1,368 @@
+import csv
+import io
+import logging
+from contextlib import contextmanager
+
+import pandas as pd
+
+from app.db.db_manager import MediaDBManager
+from app.resource_loader import (
+    get_genres as premade_genres_list,
+    get_actors as premade_actors_list,
+)
+from app.utils import _parse_actor, _parse_years
+
+log = logging.getLogger(__name__)
+
+# Staging tables live for one load transaction only. `key` ties credits and
+# genres back to their media row without needing the generated ids.
+_STAGING_SQL = """
+CREATE TEMP TABLE stg_media (
+  key          INTEGER PRIMARY KEY,
+  type         TEXT NOT NULL,
+  media_id     TEXT NOT NULL,
+  sub_id       TEXT NOT NULL,
+  title        TEXT NOT NULL,
+  sort_title   TEXT NOT NULL,
+  rating       INTEGER,
+  artwork_path TEXT,
+  notes        TEXT,
+  obtained     BOOLEAN NOT NULL,
+  year         INTEGER,
+  duration     INTEGER,
+  start_year   INTEGER,
+  end_year     INTEGER,
+  network      CITEXT
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE stg_credit (
+  media_key INTEGER,
+  name      CITEXT NOT NULL,
+  pseudonym TEXT,
+  billing   INTEGER
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE stg_genre (
+  media_key INTEGER,
+  name      CITEXT NOT NULL
+) ON COMMIT DROP;
+"""
+
+_STAGING_COLUMNS = {
+    "stg_media": (
+        "key", "type", "media_id", "sub_id", "title", "sort_title", "rating",
+        "artwork_path", "notes", "obtained", "year", "duration", "start_year",
+        "end_year", "network",
+    ),
+    "stg_credit": ("media_key", "name", "pseudonym", "billing"),
+    "stg_genre": ("media_key", "name"),
+}
+
+# Set-based resolution from staging into the real tables, in FK order.
+# Rows with a NULL media_key are lookup seeds (premade genres/actors) only.
+_LOAD_SQL = """
+INSERT INTO genres (name)
+SELECT DISTINCT name FROM stg_genre
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO actors (name, pseudonym)
+SELECT DISTINCT ON (name) name, pseudonym
+FROM stg_credit
+ORDER BY name, pseudonym NULLS LAST
+ON CONFLICT (name) DO UPDATE
+  SET pseudonym = COALESCE(actors.pseudonym, EXCLUDED.pseudonym);
+
+-- a network cell may already be an id, only create the ones given by name
+INSERT INTO show_networks (name)
+SELECT DISTINCT s.network FROM stg_media s
+WHERE s.network IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM show_networks n WHERE n.id = s.network::text)
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO media (id, title, rating, artwork_path, notes, obtained, sort_title, type)
+SELECT media_id, title, rating, artwork_path, notes, obtained, sort_title, type
+FROM stg_media;
+
+INSERT INTO movies (id, media_id, year, duration)
+SELECT sub_id, media_id, year, duration
+FROM stg_media WHERE type = 'movie';
+
+INSERT INTO shows (id, media_id, start_year, end_year, network)
+SELECT s.sub_id, s.media_id, s.start_year, s.end_year,
+       COALESCE(by_id.id, by_name.id)
+FROM stg_media s
+LEFT JOIN show_networks by_id ON by_id.id = s.network::text
+LEFT JOIN show_networks by_name ON by_name.name = s.network
+WHERE s.type = 'show';
+
+INSERT INTO actor_movie_relationship (movie_id, actor_id, billing_order)
+SELECT m.sub_id, a.id, c.billing
+FROM stg_credit c
+JOIN stg_media m ON m.key = c.media_key AND m.type = 'movie'
+JOIN actors a ON a.name = c.name
+ON CONFLICT DO NOTHING;
+
+INSERT INTO actor_show_relationship (show_id, actor_id, billing_order)
+SELECT m.sub_id, a.id, c.billing
+FROM stg_credit c
+JOIN stg_media m ON m.key = c.media_key AND m.type = 'show'
+JOIN actors a ON a.name = c.name
+ON CONFLICT DO NOTHING;
+
+INSERT INTO movie_genre_relationship (movie_id, genre_id)
+SELECT m.sub_id, g.id
+FROM stg_genre sg
+JOIN stg_media m ON m.key = sg.media_key AND m.type = 'movie'
+JOIN genres g ON g.name = sg.name
+ON CONFLICT DO NOTHING;
+
+INSERT INTO show_genre_relationship (show_id, genre_id)
+SELECT m.sub_id, g.id
+FROM stg_genre sg
+JOIN stg_media m ON m.key = sg.media_key AND m.type = 'show'
+JOIN genres g ON g.name = sg.name
+ON CONFLICT DO NOTHING;
+"""
+
+_ANALYZE_TABLES = (
+    "media", "movies", "shows", "actors", "genres", "show_networks",
+    "actor_movie_relationship", "actor_show_relationship",
+    "movie_genre_relationship", "show_genre_relationship",
+)
+
+
+def _clean(s) -> str:
+    return " ".join(str(s).strip().split())
+
+
+def _split_list(cell) -> list[str]:
+    if pd.isna(cell) or not cell:
+        return []
+    return [_clean(x) for x in str(cell).split(",") if _clean(x)]
+
+
+def _premade(loader) -> list[str]:
+    try:
+        return loader()
+    except FileNotFoundError:
+        return []  # resources/*.csv are optional
+
+
+def _int_or_none(val):
+    return None if val is None or pd.isna(val) else int(val)
+
+
+class _CopyStream(io.TextIOBase):
+    """
+    File-like object over an iterator of row tuples, rendered as CSV on demand
+    so COPY FROM STDIN never needs the whole table in memory.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator="\n")
+        self._pending = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._pending) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            # None -> unquoted empty field, which COPY csv reads as NULL
+            self._writer.writerow(["" if v is None else v for v in row])
+            self._pending += self._buf.getvalue()
+            self._buf.seek(0)
+            self._buf.truncate()
+        if size < 0:
+            size = len(self._pending)
+        out, self._pending = self._pending[:size], self._pending[size:]
+        return out
+
+
+class PsqlMediaDBManager(MediaDBManager):
+    """
+    Loads the CSVs into the PostgreSQL schema (sql/init_psql.sql). Rows go
+    through the same normalisation as the SQLite importer, are streamed into
+    temp staging tables with COPY, and then resolved into the real tables
+    with a handful of set-based statements in one transaction.
+    """
+
+    def __init__(
+        self,
+        movies_csv,
+        shows_csv,
+        engine=None,
+        sql_init_file="sql/init_psql.sql",
+        views_sql_file="sql/views_psql.sql",
+    ):
+        if engine is None:
+            from app.db.db_utils import engine
+        self.engine = engine
+        self.movies_csv = movies_csv
+        self.shows_csv = shows_csv
+        self.sql_init_file = sql_init_file
+        self.views_sql_file = views_sql_file
+        self.alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+    @contextmanager
+    def _connect(self):
+        """Raw psycopg2 connection from the pool; one transaction per block."""
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET search_path TO app, public")
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # ====================== Database Initialisation ====================== #
+
+    def initialise_database(self):
+        """Creates the schema and views unless app.media already exists."""
+        with self._connect() as conn, conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('app.media')")
+            if cur.fetchone()[0] is not None:
+                log.info("PostgreSQL schema already present, skipping init")
+                return
+            for path in (self.sql_init_file, self.views_sql_file):
+                with open(path, "r") as f:
+                    cur.execute(f.read())
+                print(f"Database schema initialized from {path}")
+
+    # ====================== Staging Rows ====================== #
+
+    def _credit_rows(self, key: int, row, actor_cols: list[str]):
+        """Same billing rules as insert_movies: left-to-right, deduped by base name."""
+        seen: set[str] = set()
+        billing = 1
+        for col in actor_cols:
+            for raw_actor in _split_list(row[col]):
+                base, pseudo = _parse_actor(raw_actor)
+                if not base or len(base) < 3 or base.lower() in seen:
+                    continue
+                seen.add(base.lower())
+                yield (key, base, pseudo, billing)
+                billing += 1
+
+    def _genre_rows(self, key: int, row, genre_cols: list[str]):
+        seen: set[str] = set()
+        for col in genre_cols:
+            for g in _split_list(row[col]):
+                if g.lower() not in seen:
+                    seen.add(g.lower())
+                    yield (key, g)
+
+    def build_staging_rows(self) -> dict[str, list[tuple]]:
+        """Normalise both CSVs into rows for the three staging tables."""
+        media, credits, genres = [], [], []
+
+        # lookup seeds, not linked to any media row
+        genres.extend((None, _clean(g)) for g in _premade(premade_genres_list) if _clean(g))
+        for a in _premade(premade_actors_list):
+            base, pseudo = _parse_actor(a)
+            if base:
+                credits.append((None, base, pseudo, None))
+
+        key = 0
+        for kind, df in (
+            ("movie", self.prepare_movies_df()),
+            ("show", self.prepare_shows_df()),
+        ):
+            actor_cols = df.filter(regex=r"(?i)actor", axis=1).columns.tolist()
+            genre_cols = df.filter(regex=r"(?i)genre", axis=1).columns.tolist()
+            for _, row in df.iterrows():
+                key += 1
+                year = duration = start_year = end_year = network = None
+                if kind == "movie":
+                    year = _int_or_none(row.get("year"))
+                    duration = _int_or_none(row.get("duration"))
+                else:
+                    start_year, end_year = _parse_years(
+                        row.get("year") or row.get("years") or ""
+                    )
+                    networks = _split_list(row.get("network"))
+                    network = networks[0] if networks else None
+
+                media.append(
+                    (
+                        key,
+                        kind,
+                        self.generate_id(),
+                        self.generate_id(),
+                        row["title"],
+                        row["sort_title"],
+                        int(row["rating"]),
+                        row["artwork_path"],
+                        row["notes"],
+                        bool(row["obtained"]) if pd.notna(row["obtained"]) else False,
+                        year,
+                        duration,
+                        start_year,
+                        end_year,
+                        network,
+                    )
+                )
+                credits.extend(self._credit_rows(key, row, actor_cols))
+                genres.extend(self._genre_rows(key, row, genre_cols))
+
+        return {"stg_media": media, "stg_credit": credits, "stg_genre": genres}
+
+    # ====================== Bulk Load ====================== #
+
+    def _copy(self, cur, table: str, rows) -> None:
+        cols = ", ".join(_STAGING_COLUMNS[table])
+        cur.copy_expert(
+            f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv)",
+            _CopyStream(rows),
+        )
+
+    def load(self) -> dict[str, int]:
+        """
+        COPY everything into staging and resolve it in one transaction.
+        Returns the number of staged rows per table.
+        """
+        staged = self.build_staging_rows()
+        with self._connect() as conn, conn.cursor() as cur:
+            cur.execute(_STAGING_SQL)
+            for table, rows in staged.items():
+                self._copy(cur, table, rows)
+            cur.execute(_LOAD_SQL)
+            cur.execute("UPDATE app_meta SET last_updated = now()")
+
+        # fresh statistics so the planner sees the new row counts
+        with self._connect() as conn, conn.cursor() as cur:
+            cur.execute(f"ANALYZE {', '.join(_ANALYZE_TABLES)}")
+
+        return {table: len(rows) for table, rows in staged.items()}
+
+    def full_run(self):
+        """Runs the full init process in order."""
+        log.info("Starting PostgreSQL initialization and bulk import...")
+        self.initialise_database()
+        counts = self.load()
+        log.info(
+            "Data import complete: %d media, %d credits, %d genre links staged",
+            counts["stg_media"],
+            counts["stg_credit"],
+            counts["stg_genre"],
+        )
+        return counts
+
+    def close(self):
+        """Connections are pooled by the engine, nothing to close here."""
+        pass
+
+
+if __name__ == "__main__":
+    # python -m app.db.psql_manager movies.csv shows.csv
+    import sys
+
+    PsqlMediaDBManager(sys.argv[1], sys.argv[2]).full_run()
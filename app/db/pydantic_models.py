@@ -29,6 +29,7 @@ class MovieUpdate(BaseModel):
     rating: Optional[float] = None
     notes: Optional[str] = None
     obtained: Optional[str] = None
+    duration: Optional[int] = None
 
     @classmethod
     def as_form(
@@ -52,6 +53,26 @@ class MovieUpdate(BaseModel):
         )
 
 
+class MoviePatch(MovieUpdate):
+    id: str
+
+
+class ShowUpdate(BaseModel):
+    title: Optional[str] = None
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    network: Optional[str] = None
+    genre: Optional[str] = None
+    leading_actors: Optional[str] = None
+    rating: Optional[float] = None
+    notes: Optional[str] = None
+    obtained: Optional[str] = None
+
+
+class ShowPatch(ShowUpdate):
+    id: str
+
+
 class ShowOut(BaseModel):
     media_id: str
     show_id: str
@@ -82,8 +103,110 @@ class ActorOut(BaseModel):
     movies: List[MovieOut] = []
 
 
+class BatchIn(BaseModel):
+    ids: List[str]
+
+
+class CollectionIn(BaseModel):
+    name: str
+
+
 class PageOut(BaseModel):
     items: Union[List[MovieOut], List[ShowOut]]
     limit: int
     offset: int
     total: int
+
+
+# ---- repository DTOs (app/db/repository.py) ----
+
+
+class NamedRef(BaseModel):
+    id: str
+    name: str
+
+
+class CreditOut(NamedRef):
+    pseudonym: Optional[str] = None
+    billing_order: int
+
+
+class MovieListItem(BaseModel):
+    movie_id: str
+    media_id: str
+    title: str
+    sort_title: str
+    rating: Optional[int] = None
+    year: Optional[int] = None
+    obtained: bool = False
+    genres: List[str] = []
+    leading_actors: List[str] = []
+
+
+class MovieDetail(BaseModel):
+    movie_id: str
+    media_id: str
+    title: str
+    sort_title: str
+    rating: Optional[int] = None
+    year: Optional[int] = None
+    duration: Optional[int] = None
+    notes: Optional[str] = None
+    artwork_path: Optional[str] = None
+    obtained: bool = False
+    director: Optional[NamedRef] = None
+    actors: List[CreditOut] = []
+    genres: List[NamedRef] = []
+    collections: List[NamedRef] = []
+
+
+class ShowListItem(BaseModel):
+    show_id: str
+    media_id: str
+    title: str
+    sort_title: str
+    rating: Optional[int] = None
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    network: Optional[str] = None
+    obtained: bool = False
+    genres: List[str] = []
+    leading_actors: List[str] = []
+
+
+class EpisodeOut(BaseModel):
+    id: str
+    season_number: int
+    episode_number: int
+    episode_name: Optional[str] = None
+
+
+class ShowDetail(BaseModel):
+    show_id: str
+    media_id: str
+    title: str
+    sort_title: str
+    rating: Optional[int] = None
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    notes: Optional[str] = None
+    artwork_path: Optional[str] = None
+    obtained: bool = False
+    network: Optional[NamedRef] = None
+    actors: List[CreditOut] = []
+    genres: List[NamedRef] = []
+    collections: List[NamedRef] = []
+    episodes: List[EpisodeOut] = []
+
+
+class ActorDetail(BaseModel):
+    id: str
+    name: str
+    pseudonym: Optional[str] = None
+    movies: List[MovieListItem] = []
+    shows: List[ShowListItem] = []
+
+
+class GenreCount(NamedRef):
+    movies: int = 0
+    shows: int = 0
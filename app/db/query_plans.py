@@ -0,0 +1,498 @@
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from collections import Counter
+from dataclasses import dataclass, field
+
+from app.db.bench_data import BENCH_DB, build_bench_db
+from app.db.db_control import MediaDB
+from app.timing import normalize_sql
+
+# Known-good plans; regenerate with --update after an intended plan change
+PLAN_BASELINE = os.environ.get("PLAN_BASELINE", "sql/query_plan_baseline.json")
+# Scanning a lookup table this small (genres, networks) is fine, don't flag it
+PLAN_SMALL_TABLE_ROWS = int(os.environ.get("PLAN_SMALL_TABLE_ROWS", 1000))
+
+# Plan lines that read a whole table or index, or sort/dedupe in a temp table
+_SCAN = re.compile(r"^SCAN (\S+)(?: USING (COVERING )?INDEX (\S+))?")
+_TEMP_BTREE = re.compile(r"^USE TEMP B-TREE FOR (.+)$")
+_AUTO_INDEX = re.compile(r"AUTOMATIC (?:PARTIAL )?COVERING INDEX \((.+)\)")
+_TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)(?:\s+(?:AS\s+)?([A-Za-z_][A-Za-z0-9_]*))?",
+    re.IGNORECASE,
+)
+_SQL_KEYWORDS = {
+    "on", "where", "join", "left", "inner", "cross", "group", "order", "limit",
+    "using", "union", "natural", "set", "values",
+}
+
+
+# ====================== Capturing MediaDB's SQL ====================== #
+
+
+class _RecordingCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        self.connection.statements.append((sql, tuple(params)))
+        return super().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        seq = list(seq)
+        if seq:
+            self.connection.statements.append((sql, tuple(seq[0])))
+        return super().executemany(sql, seq)
+
+
+class _RecordingConnection(sqlite3.Connection):
+    statements: list  # set per capture, see _recorder()
+
+    def cursor(self, factory=_RecordingCursor):
+        return super().cursor(factory)
+
+
+def _recorder(statements: list) -> type:
+    return type("Recorder", (_RecordingConnection,), {"statements": statements})
+
+
+def _sample(conn: sqlite3.Connection) -> dict:
+    """Real ids from the benchmark database to call MediaDB with."""
+
+    def ids(sql, n=20):
+        return [r[0] for r in conn.execute(sql + f" LIMIT {n}")]
+
+    movie_ids = ids("SELECT id FROM movies ORDER BY id")
+    show_ids = ids("SELECT id FROM shows ORDER BY id")
+    actor_ids = ids(
+        "SELECT actor_id FROM actor_movie_relationship "
+        "GROUP BY actor_id ORDER BY COUNT(*) DESC"
+    )
+    collection = conn.execute(
+        "SELECT collection_id FROM movie_collection_relationship "
+        "GROUP BY collection_id ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()[0]
+    after = conn.execute(
+        "SELECT md.sort_title, r.movie_id FROM movie_collection_relationship r "
+        "JOIN movies m ON m.id = r.movie_id JOIN media md ON md.id = m.media_id "
+        "WHERE r.collection_id = ? ORDER BY md.sort_title, r.movie_id LIMIT 1",
+        (collection,),
+    ).fetchone()
+    return {
+        "movie_ids": movie_ids,
+        "show_ids": show_ids,
+        "actor_ids": actor_ids,
+        "collection": collection,
+        "after": tuple(after),
+        # full sync resumed partway through a two-column key
+        "sync_cursor": json.dumps(
+            {"next": 0, "table": "actor_movie_relationship", "key": [movie_ids[0], ""]}
+        ),
+    }
+
+
+def _workload(db: MediaDB, s: dict):
+    """
+    (name, call) for every MediaDB method that touches the database. Writes
+    run too: capture always works on a throwaway copy.
+    """
+    m, sh, a = s["movie_ids"], s["show_ids"], s["actor_ids"]
+    movie_patch = {
+        "id": m[0],
+        "title": "The Plan Check",
+        "rating": 4,
+        "year": 2001,
+        "leading_actors": "Plan Actor One, Plan Actor Two",
+        "genre": "Drama, Plan Genre",
+    }
+    show_patch = {"id": sh[0], "obtained": "yes", "network": "Plan Network"}
+    return [
+        ("get_counts", lambda: db.get_counts()),
+        ("get_movies", lambda: db.get_movies()),
+        ("get_movies_by_ids", lambda: db.get_movies_by_ids(m)),
+        ("get_shows", lambda: db.get_shows()),
+        ("get_shows_by_ids", lambda: db.get_shows_by_ids(sh)),
+        ("get_actors", lambda: db.get_actors()),
+        ("get_actors_by_ids", lambda: db.get_actors_by_ids(a)),
+        ("get_collections", lambda: db.get_collections()),
+        ("get_collection", lambda: db.get_collection("movie", s["collection"])),
+        (
+            "get_collection_members",
+            lambda: db.get_collection_members("movie", s["collection"], 20),
+        ),
+        (
+            "get_collection_members_after",
+            lambda: db.get_collection_members(
+                "movie", s["collection"], 20, s["after"]
+            ),
+        ),
+        ("get_collections_for", lambda: db.get_collections_for("movie", m)),
+        ("get_artwork_path", lambda: db.get_artwork_path("missing")),
+        ("get_artwork_paths", lambda: db.get_artwork_paths()),
+        ("get_media_by_type", lambda: db.get_media_by_type("movie")),
+        ("get_app_meta", lambda: db.get_app_meta()),
+        ("get_changes", lambda: db.get_changes(1, 500)),
+        ("get_changes_full", lambda: db.get_changes(0)),
+        ("get_changes_full_after", lambda: db.get_changes(0, 1000, s["sync_cursor"])),
+        ("insert_actor", lambda: db.insert_actor("Plan Check Actor")),
+        ("bulk_update_movies", lambda: db.bulk_update_movies([movie_patch])),
+        ("bulk_update_shows", lambda: db.bulk_update_shows([show_patch])),
+        ("create_collection", lambda: db.create_collection("movie", "Plan Check")),
+        (
+            "add_collection_members",
+            lambda: db.add_collection_members("movie", s["collection"], m[:5]),
+        ),
+        (
+            "remove_collection_members",
+            lambda: db.remove_collection_members("movie", s["collection"], m[:5]),
+        ),
+        ("delete_collection", lambda: db.delete_collection("movie", s["collection"])),
+        ("set_last_backup", lambda: db.set_last_backup("2000-01-01 00:00:00")),
+        ("compact_change_log", lambda: db.compact_change_log(30)),
+    ]
+
+
+def capture_queries(db_file: str) -> list[tuple[str, str, tuple]]:
+    """
+    Run the workload against db_file and return (query key, sql, params) for
+    every statement MediaDB sent. Keys are "<method>#<n>", stable as long as
+    the method issues its statements in the same order.
+    """
+    db = MediaDB(db_file, read_cache=False)
+    statements: list = []
+    db.backend.connection_factory = _recorder(statements)
+    try:
+        with db.backend.connect() as conn:
+            sample = _sample(conn)
+        out = []
+        for name, call in _workload(db, sample):
+            statements.clear()
+            call()
+            n = 0
+            for sql, params in statements:
+                if sql.lstrip().upper().startswith(("PRAGMA", "BEGIN", "COMMIT")):
+                    continue
+                n += 1
+                out.append((f"{name}#{n}", sql, params))
+        return out
+    finally:
+        db.close()
+
+
+# ====================== Plans and findings ====================== #
+
+
+@dataclass
+class Finding:
+    kind: str  # scan | index-scan | temp-btree | auto-index
+    table: str
+    detail: str
+
+    def key(self) -> str:
+        return f"{self.kind}:{self.table}:{self.detail}"
+
+
+@dataclass
+class QueryPlan:
+    key: str
+    sql: str
+    plan: list[str]
+    findings: list[Finding] = field(default_factory=list)
+    suggestions: list[str] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        return {
+            "sql": normalize_sql(self.sql, max_len=2000),
+            "plan": self.plan,
+            # a list, not a set: a second temp B-tree in one plan is a regression too
+            "findings": sorted(f.key() for f in self.findings),
+        }
+
+
+def explain(conn: sqlite3.Connection, sql: str, params=()) -> list[str]:
+    """EXPLAIN QUERY PLAN as indented lines, children under their parent."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def findings_for(plan: list[str], small_tables: set[str] = frozenset()) -> list[Finding]:
+    """Scans and temp B-trees in a plan. `small_tables` are names/aliases to ignore."""
+    out = []
+    for line in plan:
+        detail = line.strip()
+        if detail.startswith("SCAN CONSTANT ROW") or "VIRTUAL TABLE" in detail:
+            continue  # json_each() over the bound ids, or a literal row
+        if detail.startswith("SCAN ("):
+            continue  # a materialised subquery, already counted where it's built
+        if (m := _SCAN.match(detail)) and m.group(1) in small_tables:
+            continue
+        if m := _SCAN.match(detail):
+            kind = "index-scan" if m.group(3) else "scan"
+            out.append(Finding(kind, m.group(1), detail))
+        elif m := _TEMP_BTREE.match(detail):
+            out.append(Finding("temp-btree", "", detail))
+        if m := _AUTO_INDEX.search(detail):
+            table = detail.split()[1] if detail.startswith(("SEARCH", "SCAN")) else ""
+            out.append(Finding("auto-index", table, detail))
+    return out
+
+
+# ====================== Index advisor ====================== #
+
+
+def _expand_views(conn: sqlite3.Connection, sql: str) -> str:
+    """Append the bodies of any views used, so their tables and columns count too."""
+    views = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view'"))
+    seen = set()
+    text = sql
+    for _ in range(3):  # views over views
+        for name, body in views.items():
+            if name not in seen and re.search(rf"\b{name}\b", text):
+                seen.add(name)
+                text += "\n" + body
+    return text
+
+
+def _aliases(sql: str) -> dict[str, str]:
+    """alias -> table, including each table as its own alias."""
+    out = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        out[table] = table
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            out[alias] = table
+    return out
+
+
+def _referenced_columns(conn, sql: str, alias: str, table: str) -> list[str]:
+    cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+    used = []
+    for col in cols:
+        qualified = re.search(rf"\b{alias}\.{col}\b", sql)
+        bare = alias == table and re.search(rf"(?<!\.)\b{col}\b", sql)
+        if qualified or bare:
+            used.append(col)
+    return used
+
+
+def _leading_columns(conn, table: str) -> set[str]:
+    """First column of every existing index on table."""
+    out = set()
+    for idx in conn.execute(f"PRAGMA index_list({table})"):
+        info = conn.execute(f"PRAGMA index_info({idx[1]})").fetchone()
+        if info and info[2]:
+            out.add(info[2])
+    return out
+
+
+def _candidates(conn, sql: str, findings: list[Finding]) -> list[tuple[str, tuple]]:
+    """
+    (table, columns) to try: every referenced column alone, every ordered
+    pair (equality column then sort column), and each column followed by all
+    the others so the index covers the query.
+    """
+    text = _expand_views(conn, sql)
+    aliases = _aliases(text)
+    out = []
+    for f in findings:
+        if f.kind == "auto-index" and f.table in aliases:
+            terms = _AUTO_INDEX.search(f.detail).group(1).split(" AND ")
+            out.append((aliases[f.table], tuple(t.split("=")[0].strip() for t in terms)))
+            continue
+        if f.kind not in ("scan", "index-scan") or f.table not in aliases:
+            continue
+        table = aliases[f.table]
+        used = _referenced_columns(conn, text, f.table, table)
+        indexed = _leading_columns(conn, table)
+        for col in used:
+            rest = tuple(c for c in used if c != col)
+            if col not in indexed:
+                out.append((table, (col,)))
+            out += [(table, (col, other)) for other in rest]
+            if len(rest) > 1:
+                out.append((table, (col, *rest)))
+    return [
+        (t, tuple(_with_collation(text, c) for c in cols))
+        for t, cols in dict.fromkeys(out)
+    ]
+
+
+def _with_collation(sql: str, col: str) -> str:
+    # ORDER BY x COLLATE NOCASE can only use an index built with that collation
+    if re.search(rf"\b{col}\s+COLLATE\s+NOCASE", sql, re.IGNORECASE):
+        return f"{col} COLLATE NOCASE"
+    return col
+
+
+def _index_sql(table: str, cols: tuple) -> str:
+    name = f"ix_{table}_{'_'.join(c.split()[0] for c in cols)}"[:60]
+    return f"CREATE INDEX {name} ON {table} ({', '.join(cols)});"
+
+
+def _score(findings: list[Finding]) -> int:
+    weights = {"scan": 4, "auto-index": 3, "temp-btree": 2, "index-scan": 1}
+    return sum(weights[f.kind] for f in findings)
+
+
+def advise(
+    conn: sqlite3.Connection,
+    sql: str,
+    params,
+    findings: list[Finding],
+    small_tables: set[str] = frozenset(),
+):
+    """
+    Try candidate indexes for the scanned tables one at a time (created and
+    rolled back in a savepoint) and keep those that make the plan cheaper.
+    Returns CREATE INDEX statements, best first.
+    """
+    base = _score(findings)
+    scored = []
+    for table, cols in _candidates(conn, sql, findings):
+        ddl = _index_sql(table, cols)
+        conn.execute("SAVEPOINT advise;")
+        try:
+            conn.execute(ddl)
+            after = _score(findings_for(explain(conn, sql, params), small_tables))
+        except sqlite3.Error:
+            continue
+        finally:
+            conn.execute("ROLLBACK TO advise;")
+            conn.execute("RELEASE advise;")
+        if after < base:
+            scored.append((after, len(cols), ddl))
+    return [ddl for _, _, ddl in sorted(scored)[:3]]
+
+
+def _small_tables(conn: sqlite3.Connection) -> set[str]:
+    tables = [
+        r[0]
+        for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%'"
+        )
+    ]
+    return {
+        t
+        for t in tables
+        if conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+        < PLAN_SMALL_TABLE_ROWS
+    }
+
+
+def analyse(db_file: str, suggest: bool = True) -> list[QueryPlan]:
+    """Capture every MediaDB statement on a copy of db_file and explain each one."""
+    with tempfile.TemporaryDirectory() as tmp:
+        work = os.path.join(tmp, "plans.db")
+        shutil.copyfile(db_file, work)
+        captured = capture_queries(work)
+        # explain against the original data, not what the writes left behind
+        shutil.copyfile(db_file, work)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(work + suffix):
+                os.remove(work + suffix)
+        conn = sqlite3.connect(work, isolation_level=None)
+        try:
+            small = _small_tables(conn)
+            plans = []
+            for key, sql, params in captured:
+                plan = explain(conn, sql, params)
+                skip = {
+                    alias
+                    for alias, table in _aliases(_expand_views(conn, sql)).items()
+                    if table in small
+                }
+                qp = QueryPlan(key, sql, plan, findings_for(plan, skip))
+                if suggest and qp.findings:
+                    qp.suggestions = advise(conn, sql, params, qp.findings, skip)
+                plans.append(qp)
+            return plans
+        finally:
+            conn.close()
+
+
+# ====================== Regression guard ====================== #
+
+
+def load_baseline(path: str = PLAN_BASELINE) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(plans: list[QueryPlan], path: str = PLAN_BASELINE):
+    data = {qp.key: qp.to_json() for qp in plans}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(plans: list[QueryPlan], baseline: dict) -> list[str]:
+    """
+    Regressions against the baseline: a tracked query that picked up a finding
+    it didn't have (a SEARCH became a SCAN, a new temp B-tree, ...). Queries
+    not in the baseline are new and only regress if they have findings at all.
+    """
+    problems = []
+    for qp in plans:
+        new = Counter(f.key() for f in qp.findings)
+        known = Counter(baseline.get(qp.key, {}).get("findings", []))
+        if qp.key not in baseline and new:
+            problems.append(f"{qp.key}: new query with findings: {sorted(new.elements())}")
+        elif added := new - known:
+            problems.append(f"{qp.key}: plan regressed: {sorted(added.elements())}")
+    return problems
+
+
+def assert_no_plan_regressions(db_file: str = BENCH_DB, path: str = PLAN_BASELINE):
+    """For test suites: raise AssertionError listing every regressed query."""
+    problems = compare(analyse(db_file, suggest=False), load_baseline(path))
+    if problems:
+        raise AssertionError("query plan regressions:\n  " + "\n  ".join(problems))
+
+
+def report(plans: list[QueryPlan], baseline: dict) -> str:
+    lines = []
+    for qp in plans:
+        if not qp.findings:
+            continue
+        known = set(baseline.get(qp.key, {}).get("findings", []))
+        lines.append(f"{qp.key}: {normalize_sql(qp.sql)}")
+        for f in qp.findings:
+            mark = " " if f.key() in known else "+"
+            lines.append(f"  {mark} [{f.kind}] {f.detail}")
+        for ddl in qp.suggestions:
+            lines.append(f"    suggest: {ddl}")
+    clean = sum(1 for qp in plans if not qp.findings)
+    lines.append(f"{len(plans)} statements, {clean} without scans or temp B-trees")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python -m app.db.query_plans [--build] [--update] [db_path]
+    #   --build   regenerate the benchmark database first
+    #   --update  accept the current plans as the new baseline
+    # Exits 1 if a tracked query's plan regressed.
+    import sys
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db_file = args[0] if args else BENCH_DB
+    if "--build" in sys.argv or not os.path.exists(db_file):
+        print(build_bench_db(db_file))
+
+    plans = analyse(db_file)
+    baseline = load_baseline()
+    print(report(plans, baseline))
+    if "--update" in sys.argv:
+        save_baseline(plans)
+        print(f"Baseline written to {PLAN_BASELINE}")
+        sys.exit(0)
+    problems = compare(plans, baseline)
+    for p in problems:
+        print(f"REGRESSION {p}")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,345 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import (
+    Session,
+    contains_eager,
+    joinedload,
+    raiseload,
+    selectinload,
+)
+
+from app.db.orm_models import (
+    Actor,
+    ActorMovie,
+    ActorShow,
+    Genre,
+    Media,
+    Movie,
+    MovieCollectionLink,
+    MovieGenre,
+    Show,
+    ShowCollectionLink,
+    ShowGenre,
+)
+from app.db.pydantic_models import (
+    ActorDetail,
+    CreditOut,
+    EpisodeOut,
+    GenreCount,
+    MovieDetail,
+    MovieListItem,
+    NamedRef,
+    ShowDetail,
+    ShowListItem,
+)
+
+# Every query below ends in raiseload("*"): touching a relationship that wasn't
+# loaded up front raises instead of quietly issuing one query per row.
+
+# Listing pages: 1 query for the page + 1 per selectinload. Independent of rows.
+_MOVIE_LIST_LOADS = (
+    selectinload(Movie.actor_links).joinedload(ActorMovie.actor),
+    selectinload(Movie.genre_links).joinedload(MovieGenre.genre),
+)
+_SHOW_LIST_LOADS = (
+    joinedload(Show.network),
+    selectinload(Show.actor_links).joinedload(ActorShow.actor),
+    selectinload(Show.genre_links).joinedload(ShowGenre.genre),
+)
+
+# page query + one per selectinload (joinedloads ride along in the same query)
+MOVIE_LIST_MAX_QUERIES = 3
+SHOW_LIST_MAX_QUERIES = 3
+
+
+def _credits(links) -> list[CreditOut]:
+    links = sorted(links, key=lambda l: (l.billing_order, l.actor.name.lower()))
+    return [
+        CreditOut(
+            id=l.actor.id,
+            name=l.actor.name,
+            pseudonym=l.actor.pseudonym,
+            billing_order=l.billing_order,
+        )
+        for l in links
+    ]
+
+
+def _genres(links) -> list[NamedRef]:
+    refs = [NamedRef(id=l.genre.id, name=l.genre.name) for l in links]
+    return sorted(refs, key=lambda r: r.name.lower())
+
+
+def _collections(links) -> list[NamedRef]:
+    refs = [NamedRef(id=l.collection.id, name=l.collection.name) for l in links]
+    return sorted(refs, key=lambda r: r.name.lower())
+
+
+def _movie_item(movie: Movie) -> MovieListItem:
+    md = movie.media
+    return MovieListItem(
+        movie_id=movie.id,
+        media_id=md.id,
+        title=md.title,
+        sort_title=md.sort_title,
+        rating=md.rating,
+        year=movie.year,
+        obtained=bool(md.obtained),
+        genres=[g.name for g in _genres(movie.genre_links)],
+        leading_actors=[c.name for c in _credits(movie.actor_links)],
+    )
+
+
+def _show_item(show: Show) -> ShowListItem:
+    md = show.media
+    return ShowListItem(
+        show_id=show.id,
+        media_id=md.id,
+        title=md.title,
+        sort_title=md.sort_title,
+        rating=md.rating,
+        start_year=show.start_year,
+        end_year=show.end_year,
+        network=show.network.name if show.network else None,
+        obtained=bool(md.obtained),
+        genres=[g.name for g in _genres(show.genre_links)],
+        leading_actors=[c.name for c in _credits(show.actor_links)],
+    )
+
+
+class MediaRepository:
+    """
+    Read side over the ORM models in orm_models.py. Each method loads
+    everything its DTO needs with a fixed number of statements, whatever
+    the number of rows.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    # ====================== Movies ====================== #
+
+    def list_movies(self, limit: int = 50, offset: int = 0) -> list[MovieListItem]:
+        stmt = (
+            select(Movie)
+            .join(Movie.media)
+            .options(contains_eager(Movie.media), *_MOVIE_LIST_LOADS, raiseload("*"))
+            .order_by(Media.sort_title, Movie.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return [_movie_item(m) for m in self.session.scalars(stmt)]
+
+    def get_movie(self, movie_id: str) -> MovieDetail | None:
+        stmt = (
+            select(Movie)
+            .where(Movie.id == movie_id)
+            .options(
+                joinedload(Movie.media),
+                joinedload(Movie.director),
+                selectinload(Movie.actor_links).joinedload(ActorMovie.actor),
+                selectinload(Movie.genre_links).joinedload(MovieGenre.genre),
+                selectinload(Movie.collection_links).joinedload(
+                    MovieCollectionLink.collection
+                ),
+                raiseload("*"),
+            )
+        )
+        movie = self.session.scalars(stmt).first()
+        if movie is None:
+            return None
+        md = movie.media
+        return MovieDetail(
+            movie_id=movie.id,
+            media_id=md.id,
+            title=md.title,
+            sort_title=md.sort_title,
+            rating=md.rating,
+            year=movie.year,
+            duration=movie.duration,
+            notes=md.notes,
+            artwork_path=md.artwork_path,
+            obtained=bool(md.obtained),
+            director=(
+                NamedRef(id=movie.director.id, name=movie.director.name)
+                if movie.director
+                else None
+            ),
+            actors=_credits(movie.actor_links),
+            genres=_genres(movie.genre_links),
+            collections=_collections(movie.collection_links),
+        )
+
+    # ====================== Shows ====================== #
+
+    def list_shows(self, limit: int = 50, offset: int = 0) -> list[ShowListItem]:
+        stmt = (
+            select(Show)
+            .join(Show.media)
+            .options(contains_eager(Show.media), *_SHOW_LIST_LOADS, raiseload("*"))
+            .order_by(Media.sort_title, Show.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return [_show_item(s) for s in self.session.scalars(stmt)]
+
+    def get_show(self, show_id: str) -> ShowDetail | None:
+        stmt = (
+            select(Show)
+            .where(Show.id == show_id)
+            .options(
+                joinedload(Show.media),
+                joinedload(Show.network),
+                selectinload(Show.actor_links).joinedload(ActorShow.actor),
+                selectinload(Show.genre_links).joinedload(ShowGenre.genre),
+                selectinload(Show.collection_links).joinedload(
+                    ShowCollectionLink.collection
+                ),
+                selectinload(Show.episodes),
+                raiseload("*"),
+            )
+        )
+        show = self.session.scalars(stmt).first()
+        if show is None:
+            return None
+        md = show.media
+        episodes = sorted(show.episodes, key=lambda e: (e.season_number, e.episode_number))
+        return ShowDetail(
+            show_id=show.id,
+            media_id=md.id,
+            title=md.title,
+            sort_title=md.sort_title,
+            rating=md.rating,
+            start_year=show.start_year,
+            end_year=show.end_year,
+            notes=md.notes,
+            artwork_path=md.artwork_path,
+            obtained=bool(md.obtained),
+            network=(
+                NamedRef(id=show.network.id, name=show.network.name)
+                if show.network
+                else None
+            ),
+            actors=_credits(show.actor_links),
+            genres=_genres(show.genre_links),
+            collections=_collections(show.collection_links),
+            episodes=[
+                EpisodeOut(
+                    id=e.id,
+                    season_number=e.season_number,
+                    episode_number=e.episode_number,
+                    episode_name=e.episode_name,
+                )
+                for e in episodes
+            ],
+        )
+
+    # ====================== Actors ====================== #
+
+    def get_actor(self, actor_id: str) -> ActorDetail | None:
+        movie_path = selectinload(Actor.movie_links).selectinload(ActorMovie.movie)
+        show_path = selectinload(Actor.show_links).selectinload(ActorShow.show)
+        stmt = (
+            select(Actor)
+            .where(Actor.id == actor_id)
+            .options(
+                movie_path.joinedload(Movie.media),
+                *(movie_path.options(opt) for opt in _MOVIE_LIST_LOADS),
+                show_path.joinedload(Show.media),
+                *(show_path.options(opt) for opt in _SHOW_LIST_LOADS),
+                raiseload("*"),
+            )
+        )
+        actor = self.session.scalars(stmt).first()
+        if actor is None:
+            return None
+        movies = sorted(
+            (_movie_item(l.movie) for l in actor.movie_links),
+            key=lambda m: (m.year or 0, m.sort_title),
+        )
+        shows = sorted(
+            (_show_item(l.show) for l in actor.show_links),
+            key=lambda s: (s.start_year or 0, s.sort_title),
+        )
+        return ActorDetail(
+            id=actor.id,
+            name=actor.name,
+            pseudonym=actor.pseudonym,
+            movies=movies,
+            shows=shows,
+        )
+
+    # ====================== Aggregates ====================== #
+
+    def genre_counts(self) -> list[GenreCount]:
+        """Per-genre title counts in one Core query, no ORM objects loaded."""
+        movie_counts = (
+            select(MovieGenre.genre_id, func.count().label("n"))
+            .group_by(MovieGenre.genre_id)
+            .subquery()
+        )
+        show_counts = (
+            select(ShowGenre.genre_id, func.count().label("n"))
+            .group_by(ShowGenre.genre_id)
+            .subquery()
+        )
+        stmt = (
+            select(
+                Genre.id,
+                Genre.name,
+                func.coalesce(movie_counts.c.n, 0),
+                func.coalesce(show_counts.c.n, 0),
+            )
+            .outerjoin(movie_counts, movie_counts.c.genre_id == Genre.id)
+            .outerjoin(show_counts, show_counts.c.genre_id == Genre.id)
+            .order_by(func.lower(Genre.name))
+        )
+        return [
+            GenreCount(id=gid, name=name, movies=movies, shows=shows)
+            for gid, name, movies, shows in self.session.execute(stmt)
+        ]
+
+
+# ====================== Query Counting (tests) ====================== #
+
+
+class QueryCounter:
+    """Records the SQL statements an engine emits while active."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    with count_queries(engine) as counter:
+        repo.list_movies()
+    counter.count -> number of statements sent to the database
+    """
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(engine, limit: int):
+    """Fail if the block emits more than `limit` statements, listing what ran."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {s.strip()}" for s in counter.statements)
+        raise AssertionError(
+            f"expected at most {limit} queries, got {counter.count}:\n{listing}"
+        )
@@ -0,0 +1,215 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.db.backends import retry_busy
+
+# How long the writer waits for more writes to join a group before committing.
+# Every write in a group shares one transaction and one fsync.
+WRITE_GROUP_WINDOW_MS = float(os.environ.get("WRITE_GROUP_WINDOW_MS", 2))
+WRITE_GROUP_MAX = int(os.environ.get("WRITE_GROUP_MAX", 64))
+# Pending writes before callers are pushed back on
+WRITE_QUEUE_SIZE = int(os.environ.get("WRITE_QUEUE_SIZE", 1000))
+# How long a caller waits for room in a full queue before WriteQueueFull
+WRITE_QUEUE_TIMEOUT = float(os.environ.get("WRITE_QUEUE_TIMEOUT", 2))
+
+_STOP = object()
+
+
+class WriteQueueFull(RuntimeError):
+    """The write queue stayed full for WRITE_QUEUE_TIMEOUT seconds."""
+
+
+class WriteQueue:
+    """
+    One writer thread per process owns all web-originated writes. Queued
+    calls are grouped: the first one opens a BEGIN IMMEDIATE transaction,
+    anything arriving within WRITE_GROUP_WINDOW_MS joins it, and the group
+    commits once. Each call runs in its own SAVEPOINT, so one failing write
+    is rolled back alone and its caller gets the exception while the rest of
+    the group still commits. Results are handed back once the commit is durable.
+    If BEGIN or COMMIT stays BUSY the whole group is re-run with retry_busy's
+    backoff before its callers get the error.
+
+    MediaDB's write methods route themselves here (see _queued in
+    db_control.py) while the queue is running, and run directly otherwise.
+    """
+
+    def __init__(
+        self,
+        db,
+        window_ms: float = WRITE_GROUP_WINDOW_MS,
+        max_group: int = WRITE_GROUP_MAX,
+        max_queue: int = WRITE_QUEUE_SIZE,
+        put_timeout: float = WRITE_QUEUE_TIMEOUT,
+    ):
+        self.db = db
+        self.backend = db.backend
+        self.window = window_ms / 1000
+        self.max_group = max_group
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+        self.writes = 0
+        self.groups = 0
+        self.failed = 0
+        self.rejected = 0
+        self.largest_group = 0
+        self.last_commit_ms: float | None = None
+
+    # ====================== Lifecycle ====================== #
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_writer(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def start(self):
+        if not self.running:
+            self._thread = threading.Thread(
+                target=self._run, name="mediadb-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Finish everything already queued, then stop the thread."""
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    # ====================== Submitting ====================== #
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) to run inside the next group. Raises
+        WriteQueueFull if there is no room after put_timeout seconds.
+        """
+        future: Future = Future()
+        try:
+            self._queue.put((future, fn, args, kwargs), timeout=self.put_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise WriteQueueFull(
+                f"{self._queue.qsize()} writes pending, try again shortly"
+            ) from None
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """submit() and wait for the committed result (or the write's exception)."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    # ====================== Writer thread ====================== #
+
+    def _next_group(self) -> tuple[list, bool]:
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        group = [first]
+        deadline = time.perf_counter() + self.window
+        while len(group) < self.max_group:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            group, stopping = self._next_group()
+            if group:
+                self._commit_group(group)
+        # anything that slipped in behind the stop marker
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._commit_group([item])
+
+    @retry_busy
+    def _write_group(self, pending: list) -> list:
+        """
+        Run every call of the group in one transaction. BUSY on BEGIN or
+        COMMIT re-runs the whole group (retry_busy); nothing was kept then.
+        """
+        outcomes = []
+        with self.backend.connect(write=True) as conn:
+            self.backend.set_write_batch(conn)
+            try:
+                for i, (future, fn, args, kwargs) in enumerate(pending):
+                    conn.execute(f"SAVEPOINT w{i};")
+                    try:
+                        result = fn(*args, **kwargs)
+                    except Exception as e:
+                        conn.execute(f"ROLLBACK TO w{i};")
+                        outcomes.append((future, None, e))
+                    else:
+                        outcomes.append((future, result, None))
+                    conn.execute(f"RELEASE w{i};")
+            finally:
+                self.backend.set_write_batch(None)
+        return outcomes
+
+    def _commit_group(self, group: list):
+        # skip callers that cancelled while queued
+        pending = [item for item in group if item[0].set_running_or_notify_cancel()]
+        if not pending:
+            return
+        t0 = time.perf_counter()
+        try:
+            outcomes = self._write_group(pending)
+        except Exception as e:
+            # BEGIN or COMMIT failed for good, nothing in the group was written
+            for future, *_ in pending:
+                future.set_exception(e)
+            with self._stats_lock:
+                self.failed += len(pending)
+            return
+
+        refresh = getattr(self.backend, "refresh", None)
+        if refresh is not None:
+            refresh()  # memory snapshot backend: readers see the group next
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        with self._stats_lock:
+            self.groups += 1
+            self.writes += len(pending)
+            self.failed += sum(1 for _, _, e in outcomes if e is not None)
+            self.largest_group = max(self.largest_group, len(pending))
+            self.last_commit_ms = round((time.perf_counter() - t0) * 1000, 3)
+
+    # ====================== Status ====================== #
+
+    def status(self) -> dict:
+        with self._stats_lock:
+            return {
+                "running": self.running,
+                "queued": self._queue.qsize(),
+                "writes": self.writes,
+                "groups": self.groups,
+                "mean_group": round(self.writes / self.groups, 2) if self.groups else None,
+                "largest_group": self.largest_group,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "last_commit_ms": self.last_commit_ms,
+                "window_ms": self.window * 1000,
+            }
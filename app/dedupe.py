@@ -0,0 +1,271 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from app.db.db_control import MediaDB
+from app.utils import _title_key
+
+# Pairs scoring below this (0..1 string similarity) aren't queued
+DEDUPE_MIN_SCORE = float(os.environ.get("DEDUPE_MIN_SCORE", 0.88))
+# Blocks bigger than this are compared by sorted neighbourhood instead of
+# every pair ("smith j" on a large catalog)
+DEDUPE_MAX_BLOCK = int(os.environ.get("DEDUPE_MAX_BLOCK", 64))
+# Neighbours each name is compared with inside an oversized block
+DEDUPE_WINDOW = int(os.environ.get("DEDUPE_WINDOW", 8))
+
+KINDS = ("actor", "title")
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+# "Godfather, The": library-style trailing article
+_TRAILING_ARTICLE = re.compile(r",\s*(?:the|a|an)\s*$", re.I)
+# tokens that tell apart people or titles that are otherwise spelled the same:
+# Jr/Sr, II/III, sequel numbers
+_ROMAN = {"ii", "iii", "iv", "vi", "vii", "viii", "ix", "xi", "xii"}
+_SUFFIXES = {"jr", "sr"} | _ROMAN
+_SOUNDEX = {
+    c: digit
+    for digit, letters in enumerate(("aehiouwy", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"))
+    for c in letters
+}
+
+
+def _fold(name: str) -> list[str]:
+    """Tokens of name without accents, case or punctuation."""
+    s = name
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s)
+        s = "".join(c for c in s if not unicodedata.combining(c))
+    s = s.lower().replace("'", "").replace("’", "").replace("&", " and ")
+    return _NON_WORD.sub(" ", s).split()
+
+
+def _is_marker(token: str) -> bool:
+    return token in _SUFFIXES or token.isdigit()
+
+
+@lru_cache(maxsize=1 << 16)  # names share few distinct words
+def _soundex(word: str) -> str:
+    """Classic four-character Soundex; '' if word has no letters."""
+    letters = [c for c in word if c in _SOUNDEX]
+    if not letters:
+        return ""
+    out, last = [letters[0]], _SOUNDEX[letters[0]]
+    for c in letters[1:]:
+        code = _SOUNDEX[c]
+        if code and code != last:
+            out.append(str(code))
+        if c not in "hw":  # h and w don't separate equal codes
+            last = code
+    return "".join(out)[:4].ljust(4, "0")
+
+
+class _Entry:
+    __slots__ = ("id", "text", "words", "markers", "group", "year", "rank")
+
+    def __init__(self, row_id, tokens, group="", year=None, rank=()):
+        self.id = row_id
+        markers = [t for t in tokens if _is_marker(t)]
+        self.markers = frozenset(markers)
+        self.words = [t for t in tokens if not _is_marker(t)] if markers else tokens
+        self.text = " ".join(tokens)
+        self.group = group  # only entries of the same group are compared
+        self.year = year
+        self.rank = rank  # higher survives a merge
+
+
+def _actor_keys(e: _Entry) -> list[str]:
+    words = e.words
+    if not words:
+        return []
+    # same words in any order; same letters in any order (transposed
+    # letters, a space in the wrong place)
+    keys = ["w:" + " ".join(sorted(words)), "c:" + "".join(sorted("".join(words)))]
+    if len(words) >= 2:
+        first, last = words[0], words[-1]
+        # sounds the same: Jon/John, Stephenson/Stevenson
+        sounds = _soundex(first) + _soundex(last)
+        if len(sounds) == 8:
+            keys.append("s:" + sounds)
+        # same surname and initial: first-name typos, "J.K." vs "JK"
+        keys.append(f"i:{last} {first[0]}")
+    return keys
+
+
+def _title_keys(e: _Entry) -> list[str]:
+    words = e.words
+    # numbers have to match anyway, so "1917" and "300" stay apart
+    keys = ["w:" + e.text]
+    if words:
+        keys.append("c:" + "".join(sorted("".join(words))))
+        # consonant skeleton: vowel slips and doubled letters
+        skeleton = re.sub(r"(.)\1+", r"\1", re.sub(r"[aeiouy\s]", "", " ".join(words)))
+        if len(skeleton) >= 3:
+            keys.append("k:" + skeleton)
+    return keys
+
+
+def _actor_entries(rows) -> list[_Entry]:
+    out = []
+    for actor_id, name, pseudonym, credits in rows:
+        tokens = _fold(name)
+        if tokens:
+            # more credits wins, then the longer (usually fuller) spelling
+            rank = (credits, bool(pseudonym), len(name), name)
+            out.append(_Entry(actor_id, tokens, rank=rank))
+    return out
+
+
+def _title_entries(rows) -> list[_Entry]:
+    out = []
+    for media_id, kind, title, year, obtained, credits in rows:
+        tokens = _title_key(_TRAILING_ARTICLE.sub("", title)).split()
+        if tokens:
+            # obtained wins, then more credits, then a known year
+            rank = (obtained, credits, year is not None, len(title), title)
+            out.append(_Entry(media_id, tokens, group=kind, year=year, rank=rank))
+    return out
+
+
+_SPECS = {
+    "actor": (_actor_entries, _actor_keys),
+    "title": (_title_entries, _title_keys),
+}
+
+
+def _candidate_pairs(
+    entries: list[_Entry], keys_of, max_block: int, window: int
+) -> tuple[set, dict]:
+    """
+    Index pairs sharing at least one blocking key. Small blocks yield every
+    pair; oversized ones only pairs within `window` in sorted order.
+    """
+    blocks: dict[str, list[int]] = {}
+    for i, e in enumerate(entries):
+        for key in keys_of(e):
+            blocks.setdefault(e.group + "|" + key, []).append(i)
+    pairs: set[tuple[int, int]] = set()
+    stats = {"blocks": 0, "oversized": 0}
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        stats["blocks"] += 1
+        if len(members) <= max_block:
+            pairs.update(
+                (a, b) for n, a in enumerate(members) for b in members[n + 1 :]
+            )
+        else:
+            stats["oversized"] += 1
+            members = sorted(members, key=lambda i: entries[i].text)
+            pairs.update(
+                (members[n], b)
+                for n in range(len(members))
+                for b in members[n + 1 : n + 1 + window]
+            )
+    return pairs, stats
+
+
+def _score(a: _Entry, b: _Entry, kind: str, min_score: float) -> tuple[float, str] | None:
+    """(similarity, reason) for a candidate pair, or None if it can't be one."""
+    if a.markers != b.markers:
+        # Jr vs Sr, Rocky II vs III; for titles also Rocky vs Rocky II
+        if kind == "title" or (a.markers and b.markers):
+            return None
+    if kind == "title" and a.year and b.year and abs(a.year - b.year) > 1:
+        return None  # remakes
+    suffix = "; suffix on one side" if a.markers != b.markers else ""
+    if a.words == b.words:
+        return 1.0, "same once accents, case and punctuation are ignored" + suffix
+    if sorted(a.words) == sorted(b.words):
+        return 0.99, "same words in another order" + suffix
+    if "".join(a.words) == "".join(b.words):
+        return 0.98, "same letters, spaced differently" + suffix  # "J K" / "JK"
+    matcher = SequenceMatcher(None, " ".join(a.words), " ".join(b.words), autojunk=False)
+    # cheap upper bounds of ratio() first
+    if matcher.real_quick_ratio() < min_score or matcher.quick_ratio() < min_score:
+        return None
+    score = matcher.ratio()
+    if score < min_score:
+        return None
+    return round(score, 4), "similar spelling" + suffix
+
+
+class DuplicateFinder:
+    """
+    Finds actors and titles that are probably the same thing spelled
+    differently, for review in duplicate_candidates. Names are only compared
+    within blocks that share a cheap key (folded words, Soundex of first and
+    last name, surname + initial; for titles the folded title, its letters
+    and its consonants), so a scan is far from the O(n^2) of comparing all.
+    """
+
+    def __init__(self, db: MediaDB):
+        self.db = db
+        self._lock = threading.Lock()
+        self.last_run: dict | None = None
+
+    def find(self, kind: str, min_score: float = DEDUPE_MIN_SCORE) -> tuple[list, dict]:
+        """(keep_id, drop_id, score, reason) pairs for one kind, and scan stats."""
+        build, keys_of = _SPECS[kind]
+        if kind == "actor":
+            rows = self.db.get_actor_dedupe_rows()
+        else:
+            rows = self.db.get_title_dedupe_rows()
+        entries = build(rows)
+        pairs, stats = _candidate_pairs(entries, keys_of, DEDUPE_MAX_BLOCK, DEDUPE_WINDOW)
+        found = []
+        for i, j in pairs:
+            a, b = entries[i], entries[j]
+            scored = _score(a, b, kind, min_score)
+            if scored is None:
+                continue
+            keep, drop = (a, b) if a.rank >= b.rank else (b, a)
+            found.append((keep.id, drop.id, *scored))
+        found.sort(key=lambda r: -r[2])
+        return found, {"rows": len(entries), "compared": len(pairs), **stats}
+
+    def scan(self, kinds=KINDS) -> dict:
+        """Rescan and refresh the pending part of the review queue."""
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "scan already running"}
+        try:
+            result = {}
+            for kind in kinds:
+                t0 = time.perf_counter()
+                found, stats = self.find(kind)
+                saved = self.db.save_duplicate_candidates(kind, found)
+                result[kind] = {
+                    **stats,
+                    "candidates": len(found),
+                    **saved,
+                    "duration_s": round(time.perf_counter() - t0, 3),
+                }
+            self.last_run = result
+            return result
+        finally:
+            self._lock.release()
+
+    def status(self) -> dict:
+        return {"running": self._lock.locked(), "last_run": self.last_run}
+
+
+if __name__ == "__main__":
+    # python -m app.dedupe [db_path] [actor|title] [--merge]
+    import sys
+
+    args = [a for a in sys.argv[1:] if a != "--merge"]
+    db_path = "dbs/scratch_test.db"
+    if args and args[0].endswith(".db"):
+        db_path, args = args[0], args[1:]
+    db = MediaDB(db_path, read_cache=False)
+    db.init_dedupe()
+    kinds = args or KINDS
+    if "--merge" in sys.argv:
+        for kind in kinds:
+            t0 = time.perf_counter()
+            print(kind, db.merge_duplicates(kind), f"{time.perf_counter() - t0:.3f}s")
+    else:
+        print(DuplicateFinder(db).scan(kinds))
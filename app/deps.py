@@ -1,11 +1,71 @@
-from fastapi import Request, Depends
+from fastapi import Request, Depends, HTTPException, status
 from fastapi.templating import Jinja2Templates
 from app.db.db_control import MediaDB
+from app.autocomplete import Autocomplete
+from app.backup import BackupService
+from app.costars import CoStarGraph
+from app.dedupe import DuplicateFinder
+from app.images import ThumbnailService
+from app.library import LibraryScanner
+from app.maintenance import MaintenanceService
+from app.similar import SimilarityEngine
 
 
 def get_db(request: Request) -> MediaDB:
     return request.app.state.mediaDB
 
 
+def get_sqlite_db(request: Request) -> MediaDB | None:
+    """The database, or None if it isn't the SQLite schema."""
+    db = request.app.state.mediaDB
+    return db if db.backend.dialect == "sqlite" else None
+
+
 def get_templates(request: Request) -> Jinja2Templates:
     return request.app.state.templates
+
+
+def get_thumbnails(request: Request) -> ThumbnailService:
+    return request.app.state.thumbnails
+
+
+def get_backups(request: Request) -> BackupService | None:
+    return request.app.state.backups
+
+
+def get_maintenance(request: Request) -> MaintenanceService | None:
+    return request.app.state.maintenance
+
+
+def get_library(request: Request) -> LibraryScanner | None:
+    return request.app.state.library
+
+
+def get_similar(request: Request) -> SimilarityEngine | None:
+    return request.app.state.similar
+
+
+def get_costars(request: Request) -> CoStarGraph | None:
+    return request.app.state.costars
+
+
+def get_autocomplete(request: Request) -> Autocomplete | None:
+    return request.app.state.autocomplete
+
+
+def get_dedupe(request: Request) -> DuplicateFinder | None:
+    return request.app.state.dedupe
+
+
+def require(getter, detail: str = "Not available with this database"):
+    """
+    Dependency returning what getter returns, or a 501 with detail if that is
+    None (a service that isn't set up for this database or configuration).
+    """
+
+    def dependency(service=Depends(getter)):
+        if service is None:
+            raise HTTPException(status.HTTP_501_NOT_IMPLEMENTED, detail)
+        return service
+
+    return dependency
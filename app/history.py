@@ -0,0 +1,190 @@
+import csv
+import os
+import re
+import time
+from datetime import datetime
+
+from app.db.db_control import MediaDB
+from app.library import TitleIndex
+from app.utils import _title_key
+
+# Rows per import transaction
+PLAYS_BATCH_SIZE = int(os.environ.get("PLAYS_BATCH_SIZE", 5000))
+# Plays shorter than this (seconds) are skipped: autoplay previews, misclicks
+PLAYS_MIN_SECONDS = int(os.environ.get("PLAYS_MIN_SECONDS", 60))
+
+# "Season 2", "Part 1", "Volume 3", "Book 1", "Chapter 4", "Series 5"
+_SEASON = re.compile(r"^(?:season|part|volume|book|chapter|series|collection)\s+(\d+)$", re.I)
+_LIMITED = re.compile(r"^(?:limited series|miniseries)$", re.I)
+_DURATION = re.compile(r"^(\d+):(\d{2}):(\d{2})$")
+# Netflix supplemental videos that aren't really plays
+_SKIPPED_TYPES = {"TRAILER", "HOOK", "TEASER_TRAILER", "RECAP", "PREVIEW", "BUMPER"}
+
+
+def _parse_date(value: str) -> str | None:
+    """ISO date/datetime from the formats the exports use."""
+    value = value.strip()
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%m/%d/%y", "%m/%d/%Y", "%d/%m/%Y"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.isoformat(sep=" ") if "%H" in fmt else parsed.date().isoformat()
+    return None
+
+
+def _parse_duration(value: str | None) -> int | None:
+    m = _DURATION.match((value or "").strip())
+    if not m:
+        return None
+    h, mi, s = map(int, m.groups())
+    return h * 3600 + mi * 60 + s
+
+
+class HistoryResolver:
+    """
+    Netflix-style titles -> (media_id, episode_id, season). "Show: Season 2:
+    Episode Name" tries the longest prefix that is a show, then the episode by
+    name within it. Lookups are memoised per raw title, since a history is
+    mostly the same shows over and over.
+    """
+
+    def __init__(self, db: MediaDB):
+        self.index = TitleIndex(db.get_title_index_rows())
+        self.episodes: dict[tuple, str] = {}
+        for media_id, season, episode, name, episode_id in db.get_episode_index_rows():
+            if name:
+                self.episodes[(media_id, season, _title_key(name))] = episode_id
+                self.episodes.setdefault((media_id, None, _title_key(name)), episode_id)
+        self._memo: dict[str, tuple] = {}
+
+    def resolve(self, raw_title: str) -> tuple[str | None, str | None, int | None]:
+        hit = self._memo.get(raw_title)
+        if hit is None:
+            hit = self._memo[raw_title] = self._resolve(raw_title)
+        return hit
+
+    @property
+    def unresolved(self) -> int:
+        """Distinct titles seen so far that matched nothing."""
+        return sum(1 for hit in self._memo.values() if hit[0] is None)
+
+    def _resolve(self, raw_title: str):
+        # movies (and shows watched as a whole) match on the full title
+        media_id = self.index.match(raw_title)
+        if media_id:
+            return media_id, None, None
+        parts = [p.strip() for p in raw_title.split(":")]
+        if len(parts) > 1:
+            for i in range(len(parts) - 1, 0, -1):
+                show = ":".join(parts[:i])
+                media_id = self.index.match(show, kind="show")
+                if media_id is None:
+                    continue
+                rest = parts[i:]
+                season = None
+                m = _SEASON.match(rest[0])
+                if m:
+                    season = int(m.group(1))
+                    rest = rest[1:]
+                elif _LIMITED.match(rest[0]):
+                    season = 1
+                    rest = rest[1:]
+                name = _title_key(":".join(rest)) if rest else ""
+                episode_id = self.episodes.get((media_id, season, name)) if name else None
+                return media_id, episode_id, season
+        return None, None, None
+
+
+def read_history(path: str):
+    """
+    Stream plays out of a viewing-history CSV without loading it: either the
+    simple "Title,Date" export or ViewingActivity.csv (Profile Name, Start
+    Time, Duration, Title, Supplemental Video Type, Device Type, ...).
+    Yields (raw_title, played_at, seconds, profile, device).
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            title = (row.get("Title") or "").strip()
+            played_at = _parse_date(row.get("Start Time") or row.get("Date") or "")
+            if not title or not played_at:
+                continue
+            if (row.get("Supplemental Video Type") or "").strip().upper() in _SKIPPED_TYPES:
+                continue
+            seconds = _parse_duration(row.get("Duration"))
+            if seconds is not None and seconds < PLAYS_MIN_SECONDS:
+                continue
+            yield (
+                title,
+                played_at,
+                seconds,
+                (row.get("Profile Name") or "").strip(),
+                (row.get("Device Type") or "").strip() or None,
+            )
+
+
+def import_history(
+    db: MediaDB, path: str, source: str | None = None, batch_size: int = PLAYS_BATCH_SIZE
+) -> dict:
+    """Import one CSV in batches; re-importing the same file adds nothing."""
+    t0 = time.perf_counter()
+    resolver = HistoryResolver(db)
+    source = source or os.path.basename(path)
+    read = inserted = resolved = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        inserted += db.import_plays(batch)
+        batch.clear()
+
+    for title, played_at, seconds, profile, device in read_history(path):
+        media_id, episode_id, season = resolver.resolve(title)
+        read += 1
+        resolved += media_id is not None
+        batch.append(
+            (media_id, episode_id, title, season, played_at, seconds, profile, device, source)
+        )
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return {
+        "source": source,
+        "rows": read,
+        "inserted": inserted,
+        "resolved": resolved,
+        "unresolved_titles": resolver.unresolved,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def resolve_pending(db: MediaDB) -> dict:
+    """Retry plays whose title wasn't in the catalog when they were imported."""
+    resolver = HistoryResolver(db)
+    matches = []
+    for raw_title in db.get_unresolved_play_titles():
+        media_id, episode_id, _ = resolver.resolve(raw_title)
+        if media_id:
+            matches.append((raw_title, media_id, episode_id))
+    return {"titles": len(matches), "plays": db.resolve_plays(matches)}
+
+
+if __name__ == "__main__":
+    # python -m app.history [db_path] ViewingActivity.csv ...
+    # python -m app.history [db_path] --resolve | --rebuild
+    import sys
+
+    args = sys.argv[1:]
+    db_path = "dbs/scratch_test.db"
+    if args and args[0].endswith(".db"):
+        db_path, args = args[0], args[1:]
+    db = MediaDB(db_path, read_cache=False)
+    db.init_plays()
+    for arg in args:
+        if arg == "--resolve":
+            print(resolve_pending(db))
+        elif arg == "--rebuild":
+            print(db.rebuild_play_rollups())
+        else:
+            print(import_history(db, arg))
@@ -0,0 +1,247 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+# Relative media.artwork_path values are resolved against this directory
+ARTWORK_DIR = Path(os.environ.get("ARTWORK_DIR", "resources/artwork"))
+LOGOS_DIR = Path("resources/logos")
+THUMB_CACHE_DIR = Path(os.environ.get("THUMB_CACHE_DIR", "build/thumbs"))
+THUMB_CACHE_MAX_BYTES = int(
+    os.environ.get("THUMB_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+
+THUMB_WIDTHS = (160, 320, 640)
+THUMB_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+THUMB_QUALITY = 80
+
+
+def _file_hash(path: Path, length: int = 16) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+
+def snap_width(width: int | None) -> int:
+    """Round a requested width up to the nearest fixed thumbnail width."""
+    if not width:
+        return THUMB_WIDTHS[0]
+    for w in THUMB_WIDTHS:
+        if width <= w:
+            return w
+    return THUMB_WIDTHS[-1]
+
+
+def render_thumbnail(src: str, dest: str, width: int, fmt: str) -> int:
+    """
+    Resize one image and write it atomically. Top-level so it can run in a
+    process pool. Returns the number of bytes written.
+    """
+    pil_format = THUMB_FORMATS[fmt][0]
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.width > width:
+            height = max(1, round(im.height * width / im.width))
+            im = im.resize((width, height), Image.Resampling.LANCZOS)
+        if pil_format == "JPEG" and im.mode not in ("RGB", "L"):
+            # flatten transparency onto white, JPEG has no alpha
+            bg = Image.new("RGB", im.size, (255, 255, 255))
+            im = im.convert("RGBA")
+            bg.paste(im, mask=im.getchannel("A"))
+            im = bg
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if pil_format == "WEBP":
+            im.save(tmp, pil_format, quality=THUMB_QUALITY, method=4)
+        else:
+            im.save(tmp, pil_format, quality=THUMB_QUALITY, optimize=True)
+    os.replace(tmp, dest)
+    return os.path.getsize(dest)
+
+
+class ThumbnailCache:
+    """
+    Size-bounded on-disk cache of generated thumbnails with LRU eviction.
+    Recency survives restarts through file mtimes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = THUMB_CACHE_DIR,
+        max_bytes: int = THUMB_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.cache_dir.rglob("*"):
+            if path.is_file() and not path.name.endswith(".tmp"):
+                st = path.stat()
+                files.append((st.st_mtime, str(path), st.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self.total_bytes += size
+
+    def touch(self, path: Path) -> bool:
+        """Mark a cached file as recently used. Returns False on a miss."""
+        key = str(path)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.total_bytes -= self._entries.pop(key, 0)
+            return False
+        return True
+
+    def add(self, path: Path, size: int):
+        key = str(path)
+        with self._lock:
+            self.total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            old, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+
+
+class ThumbnailService:
+    """
+    Lazily generates and caches fixed-width WebP/JPEG thumbnails for artwork
+    and logos. Cache keys are the source content hash, so replacing an image
+    on disk produces new thumbnails and a new ETag.
+    """
+
+    def __init__(self, cache: ThumbnailCache | None = None):
+        self.cache = cache or ThumbnailCache()
+        # (path, size, mtime) -> content hash, so we don't rehash on every hit
+        self._hashes: dict[tuple[str, int, float], str] = {}
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def resolve_source(self, artwork_path: str | None) -> Path | None:
+        if not artwork_path:
+            return None
+        path = Path(artwork_path)
+        if not path.is_absolute():
+            path = ARTWORK_DIR / path
+        return path if path.is_file() else None
+
+    def source_hash(self, src: Path) -> str:
+        st = src.stat()
+        key = (str(src), st.st_size, st.st_mtime)
+        digest = self._hashes.get(key)
+        if digest is None:
+            digest = _file_hash(src)
+            self._hashes[key] = digest
+        return digest
+
+    def thumb_path(self, digest: str, width: int, fmt: str) -> Path:
+        return self.cache.cache_dir / digest[:2] / f"{digest}_{width}.{fmt}"
+
+    def etag(self, digest: str, width: int, fmt: str) -> str:
+        return f'"{digest}-{width}-{fmt}"'
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, src: Path, width: int, fmt: str) -> tuple[Path, str]:
+        """
+        Return (thumbnail path, etag), generating the thumbnail on first use.
+        Raises OSError (PIL.UnidentifiedImageError included) if src isn't a
+        readable image.
+        """
+        width = snap_width(width)
+        digest = self.source_hash(src)
+        dest = self.thumb_path(digest, width, fmt)
+        if self.cache.touch(dest):
+            return dest, self.etag(digest, width, fmt)
+
+        # one generator per thumbnail, concurrent requests wait for it
+        try:
+            with self._lock_for(str(dest)):
+                if not self.cache.touch(dest):
+                    size = render_thumbnail(str(src), str(dest), width, fmt)
+                    self.cache.add(dest, size)
+        finally:
+            with self._locks_guard:
+                self._key_locks.pop(str(dest), None)
+        return dest, self.etag(digest, width, fmt)
+
+    def warm(
+        self,
+        sources: list[Path],
+        widths: tuple[int, ...] = THUMB_WIDTHS,
+        formats: tuple[str, ...] = tuple(THUMB_FORMATS),
+        max_workers: int | None = None,
+    ) -> int:
+        """Pre-generate every missing thumbnail for the given sources in parallel."""
+        jobs = []
+        for src in sources:
+            digest = self.source_hash(src)
+            for width in widths:
+                for fmt in formats:
+                    dest = self.thumb_path(digest, width, fmt)
+                    if not dest.exists():
+                        jobs.append((str(src), str(dest), width, fmt))
+        if not jobs:
+            return 0
+
+        generated = 0
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(render_thumbnail, *job): job for job in jobs}
+            for fut in as_completed(futures):
+                dest = futures[fut][1]
+                try:
+                    size = fut.result()
+                except OSError as e:
+                    print(f"Thumbnail failed for {futures[fut][0]}: {e}")
+                    continue
+                self.cache.add(Path(dest), size)
+                generated += 1
+        return generated
+
+
+def pick_format(fmt: str | None, accept: str) -> str:
+    if fmt in THUMB_FORMATS:
+        return fmt
+    return "webp" if "image/webp" in accept else "jpeg"
+
+
+if __name__ == "__main__":
+    # Bulk warm: python -m app.images [db_path]
+    import sys
+    from app.db.db_control import MediaDB
+
+    db = MediaDB(sys.argv[1] if len(sys.argv) > 1 else "dbs/scratch_test.db")
+    service = ThumbnailService()
+    sources = [
+        src
+        for src in (service.resolve_source(p) for p in db.get_artwork_paths())
+        if src is not None
+    ]
+    sources += sorted(LOGOS_DIR.glob("*.png"))
+    count = service.warm(sources)
+    print(f"Generated {count} thumbnails for {len(sources)} images")
@@ -0,0 +1,332 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from app.db.db_control import MediaDB
+from app.media_info import MediaInfoExtractor
+from app.utils import _title_key
+
+# Media directories to scan, separated like PATH (":" on Linux)
+LIBRARY_DIRS = [d for d in os.environ.get("LIBRARY_DIRS", "").split(os.pathsep) if d]
+# Directories listed in parallel; os.scandir releases the GIL while it waits
+# on the disk, which is most of the time on spinning or network drives
+LIBRARY_SCAN_WORKERS = int(os.environ.get("LIBRARY_SCAN_WORKERS", 8))
+# Seconds between incremental background scans, 0 disables them
+LIBRARY_SCAN_INTERVAL = int(os.environ.get("LIBRARY_SCAN_INTERVAL", 3600))
+# Read container headers of new files after each scan to fill in durations
+LIBRARY_PROBE = os.environ.get("LIBRARY_PROBE", "1") != "0"
+LIBRARY_EXTENSIONS = frozenset(
+    e if e.startswith(".") else f".{e}"
+    for e in os.environ.get(
+        "LIBRARY_EXTENSIONS", "mkv,mp4,m4v,avi,mov,wmv,mpg,mpeg,ts,m2ts,webm,iso"
+    ).lower().split(",")
+)
+
+_EPISODE = re.compile(r"\bs(\d{1,2})\s?e(\d{1,3})\b|\b(\d{1,2})x(\d{2,3})\b", re.I)
+_YEAR = re.compile(r"(?<!\d)(19\d{2}|20\d{2})(?!\d)")
+# [release group], {imdb-tt...}; a bracketed year is kept
+_BRACKETED = re.compile(r"\[(?!(?:19|20)\d\d\])[^\]]*\]|\{[^}]*\}")
+# release tags: everything from the first one on is not part of the title
+_RELEASE_TAG = re.compile(
+    r"\b(2160p|1080[pi]|720p|576p|480p|4k|uhd|hdr10?|bluray|blu ray|bdrip|brrip|"
+    r"web ?dl|webrip|hdtv|dvdrip|dvd|x ?26[45]|h ?26[45]|hevc|xvid|aac|ac3|dts|"
+    r"remux|proper|repack|extended|unrated|remastered|directors cut|imax)\b.*$",
+    re.I,
+)
+_SEASON_DIR = re.compile(r"^(season|series|s)\s*\d+$|^specials$", re.I)
+
+
+class ParsedName(NamedTuple):
+    title: str
+    year: int | None = None
+    season: int | None = None
+    episode: int | None = None
+
+
+def parse_media_name(name: str) -> ParsedName:
+    """
+    Title, year and episode from a file or folder name, e.g.
+    "The.Matrix.1999.1080p.BluRay.mkv" -> ("The Matrix", 1999),
+    "Show Name - S02E05 - Pilot.mkv" -> ("Show Name", None, 2, 5).
+    """
+    stem, ext = os.path.splitext(name)
+    if ext.lower() not in LIBRARY_EXTENSIONS:
+        stem = name  # folder, or a dot inside the title
+    s = _BRACKETED.sub(" ", stem).replace("_", " ")
+    if " " not in s.strip():
+        s = s.replace(".", " ")  # dotted scene names
+    season = episode = year = None
+
+    m = _EPISODE.search(s)
+    if m:
+        season = int(m.group(1) or m.group(3))
+        episode = int(m.group(2) or m.group(4))
+        s = s[: m.start()]
+    # the last year that isn't the whole title ("2001 A Space Odyssey (1968)")
+    for y in _YEAR.finditer(s):
+        if s[: y.start()].strip(" .-(["):
+            year = int(y.group(1))
+            cut = y.start()
+    if year is not None:
+        s = s[:cut]
+    s = _RELEASE_TAG.sub("", s)
+    title = " ".join(re.sub(r"[()\[\]]", " ", s).split()).strip(" -.")
+    return ParsedName(title, year, season, episode)
+
+
+class TitleIndex:
+    """
+    In-memory lookup of catalog titles by _title_key, for names that come
+    from outside the database. Built from MediaDB.get_title_index_rows().
+    """
+
+    def __init__(self, rows: list[tuple]):
+        self._by_key: dict[str, list[tuple]] = defaultdict(list)
+        for media_id, kind, title, year in rows:
+            key = _title_key(title)
+            if key:
+                self._by_key[key].append((media_id, kind, year))
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def match(self, title: str, year: int | None = None, kind: str | None = None):
+        """media_id for title (and year, type if known), or None if unknown or ambiguous."""
+        candidates = self._by_key.get(_title_key(title), [])
+        if kind:
+            candidates = [c for c in candidates if c[1] == kind]
+        if not candidates:
+            return None
+        if year is not None:
+            for tolerance in (0, 1):  # release year vs premiere year
+                near = [c for c in candidates if c[2] and abs(c[2] - year) <= tolerance]
+                if len(near) == 1:
+                    return near[0][0]
+                if near:
+                    return None
+            undated = [c for c in candidates if not c[2]]
+            return undated[0][0] if len(undated) == 1 else None
+        return candidates[0][0] if len(candidates) == 1 else None
+
+
+def match_file(index: TitleIndex, path: str) -> tuple[str | None, ParsedName]:
+    """
+    Match one file: its own name first, then the folders above it ("Movie
+    (2010)/movie.mkv", "Show/Season 2/S02E03.mkv"), skipping season folders.
+    """
+    parsed = parse_media_name(os.path.basename(path))
+    kind = "show" if parsed.episode is not None else None
+    if parsed.title:
+        media_id = index.match(parsed.title, parsed.year, kind)
+        if media_id:
+            return media_id, parsed
+    parent = os.path.dirname(path)
+    for _ in range(3):
+        name = os.path.basename(parent)
+        if not name:
+            break
+        if not _SEASON_DIR.match(name):
+            folder = parse_media_name(name)
+            media_id = index.match(folder.title, folder.year or parsed.year, kind)
+            if media_id:
+                return media_id, parsed
+        parent = os.path.dirname(parent)
+    return None, parsed
+
+
+def _list_dir(path: str, extensions=LIBRARY_EXTENSIONS):
+    """(mtime_ns, [(file, size, mtime_ns)], [subdir]) for one directory."""
+    # mtime before listing: a change during the listing shows up next scan
+    mtime = os.stat(path).st_mtime_ns
+    files, subdirs = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in extensions:
+                    st = entry.stat()
+                    files.append((entry.path, st.st_size, st.st_mtime_ns))
+            except OSError:
+                continue  # vanished or unreadable entry
+    return mtime, files, subdirs
+
+
+class LibraryScanner:
+    """
+    Walks the media directories, matches video files to catalog titles and
+    records them in media_files, setting media.obtained to match.
+
+    Incremental scans (the default) stat every known directory but only
+    re-list the ones whose mtime changed, i.e. that had entries added,
+    removed or renamed. Files of unchanged directories keep their rows.
+    """
+
+    def __init__(
+        self,
+        db: MediaDB,
+        roots: list[str] = LIBRARY_DIRS,
+        workers: int = LIBRARY_SCAN_WORKERS,
+        extensions=LIBRARY_EXTENSIONS,
+        probe: bool = LIBRARY_PROBE,
+    ):
+        self.db = db
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.workers = workers
+        self.extensions = extensions
+        self.media_info = MediaInfoExtractor(db) if probe else None
+        self._lock = threading.Lock()
+        # catalog titles as of the last scan; unmatched files are only
+        # matched again when they change
+        self._index: TitleIndex | None = None
+        self._index_signature: int | None = None
+        self.last_run: dict | None = None
+        self.runs = 0
+
+    def _visit(self, path: str, known: dict, full: bool):
+        """Runs on the pool: stat, and list only if the directory changed."""
+        try:
+            if not full and path in known:
+                mtime = os.stat(path).st_mtime_ns
+                if mtime == known[path][1]:
+                    return path, mtime, None, None
+            return (path, *_list_dir(path, self.extensions))
+        except OSError as e:
+            return path, None, e, None
+
+    def _walk(self, full: bool):
+        known = self.db.get_library_dirs()
+        children: dict[str, list[str]] = defaultdict(list)
+        for path, (parent, _) in known.items():
+            if parent:
+                children[parent].append(path)
+
+        seen: set[str] = set()
+        listed: dict[str, tuple] = {}  # path -> (parent, mtime, files)
+        errors: dict[str, str] = {}
+        live_roots = []
+        parents: dict[str, str | None] = {}
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="scan") as pool:
+            pending = set()
+            for root in self.roots:
+                if os.path.isdir(root):
+                    live_roots.append(root)
+                    parents[root] = None
+                    pending.add(pool.submit(self._visit, root, known, full))
+                else:
+                    # unmounted drive: keep what we know rather than drop it all
+                    errors[root] = "not a directory"
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, mtime, files, subdirs = future.result()
+                    seen.add(path)
+                    if isinstance(files, OSError):
+                        errors[path] = str(files)
+                        # unreadable now, keep it and everything under it
+                        seen.update(p for p in known if p.startswith(path + os.sep))
+                        continue
+                    if files is None:
+                        subdirs = children.get(path, [])
+                    else:
+                        listed[path] = (parents[path], mtime, files)
+                    for sub in subdirs:
+                        parents[sub] = path
+                        pending.add(pool.submit(self._visit, sub, known, full))
+
+        removed = [
+            p
+            for p in known
+            if p not in seen and any(p.startswith(r + os.sep) or p == r for r in live_roots)
+        ]
+        return listed, removed, errors
+
+    def scan(self, full: bool = False) -> dict:
+        """
+        Scan all roots and write the result. Returns counts and timings, or
+        {"skipped": True} if a scan is already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "scan already running"}
+        started = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        try:
+            listed, removed, errors = self._walk(full)
+            walk_s = time.perf_counter() - t0
+
+            rows = self.db.get_title_index_rows()
+            signature = hash(tuple(rows))
+            if signature != self._index_signature:
+                self._index = TitleIndex(rows)
+            index = self._index
+            dirs, files = [], []
+            matched = 0
+            for path, (parent, mtime, entries) in listed.items():
+                dirs.append((path, parent, mtime))
+                for file_path, size, file_mtime in entries:
+                    media_id, parsed = match_file(index, file_path)
+                    matched += media_id is not None
+                    files.append(
+                        (file_path, path, media_id, size, file_mtime,
+                         parsed.season, parsed.episode)
+                    )
+            # files seen earlier whose title has since been added to the catalog
+            rematched = []
+            if signature != self._index_signature:
+                for file_path in self.db.get_unmatched_files():
+                    if os.path.dirname(file_path) in listed:
+                        continue
+                    media_id, _ = match_file(index, file_path)
+                    if media_id:
+                        rematched.append((media_id, file_path))
+            result = self.db.apply_library_scan(dirs, removed, files, rematched)
+            self._index_signature = signature
+
+            self.last_run = {
+                "ok": True,
+                "full": full,
+                "started": started.isoformat(),
+                "duration_s": round(time.perf_counter() - t0, 3),
+                "walk_s": round(walk_s, 3),
+                "dirs_listed": len(dirs),
+                "dirs_removed": len(removed),
+                "files_listed": len(files),
+                "files_matched": matched,
+                "files_rematched": len(rematched),
+                "errors": errors,
+                **result,
+            }
+            if self.media_info:
+                self.last_run["media_info"] = self.media_info.run()
+            self.runs += 1
+            return self.last_run
+        finally:
+            self._lock.release()
+
+    def status(self) -> dict:
+        return {
+            "running": self._lock.locked(),
+            "roots": self.roots,
+            "runs": self.runs,
+            "last_run": self.last_run,
+        }
+
+
+if __name__ == "__main__":
+    # python -m app.library [--full] [db_path] dir [dir ...]
+    import sys
+
+    args = sys.argv[1:]
+    full = "--full" in args
+    args = [a for a in args if a != "--full"]
+    db = MediaDB(args[0] if args else "dbs/scratch_test.db")
+    db.init_library()
+    scanner = LibraryScanner(db, args[1:] or LIBRARY_DIRS)
+    print(scanner.scan(full=full))
@@ -0,0 +1,370 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from app.db.bench_data import build_bench_db
+
+LOADTEST_DB = os.environ.get("LOADTEST_DB", "dbs/bench.db")
+LOADTEST_DIR = Path(os.environ.get("LOADTEST_DIR", "build/loadtest"))
+LOADTEST_CONCURRENCY = int(os.environ.get("LOADTEST_CONCURRENCY", 16))
+LOADTEST_DURATION = float(os.environ.get("LOADTEST_DURATION", 20))
+LOADTEST_WARMUP = float(os.environ.get("LOADTEST_WARMUP", 2))
+
+# Relative weights of each scenario in the traffic mix; override with --mix
+DEFAULT_MIX = {
+    "home": 15,
+    "movies": 3,
+    "actor": 40,
+    "movies_data": 12,
+    "movie_edit": 5,
+}
+
+
+# ====================== Scenarios ====================== #
+
+
+def _sample_ids(db_file: str, n: int = 2000) -> dict[str, list[str]]:
+    conn = sqlite3.connect(db_file)
+    try:
+        return {
+            "movies": [r[0] for r in conn.execute(f"SELECT id FROM movies LIMIT {n}")],
+            "actors": [
+                r[0]
+                for r in conn.execute(
+                    "SELECT actor_id FROM actor_movie_relationship "
+                    f"GROUP BY actor_id ORDER BY random() LIMIT {n}"
+                )
+            ],
+        }
+    finally:
+        conn.close()
+
+
+def _scenarios(ids: dict[str, list[str]]):
+    """
+    name -> (route label, request builder). The label is the route template
+    so results group like /debug/metrics does.
+    """
+    movies, actors = ids["movies"], ids["actors"]
+
+    def edit(rng: random.Random):
+        patch = rng.choice(
+            (
+                {"rating": rng.randint(0, 5)},
+                {"obtained": rng.choice(("yes", "no"))},
+                {"notes": f"load test {rng.random():.6f}"},
+            )
+        )
+        return "POST", f"/movies/{rng.choice(movies)}/edit", patch
+
+    return {
+        "home": ("GET /", lambda rng: ("GET", "/", None)),
+        "movies": ("GET /movies", lambda rng: ("GET", "/movies", None)),
+        "actor": (
+            "GET /actors/{actor_id}",
+            lambda rng: ("GET", f"/actors/{rng.choice(actors)}", None),
+        ),
+        "movies_data": (
+            "GET /api/movies_data",
+            lambda rng: ("GET", "/api/movies_data", None),
+        ),
+        "movie_edit": ("POST /movies/{movie_id}/edit", edit),
+    }
+
+
+def parse_mix(text: str | None) -> dict[str, float]:
+    """'home=10,actor=40' -> weights; scenarios left out are not run."""
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ====================== Runner ====================== #
+
+
+def _percentile(sorted_ms: list[float], q: float) -> float | None:
+    if not sorted_ms:
+        return None
+    # nearest rank: the smallest value with at least q of the samples at or below it
+    idx = max(0, math.ceil(q * len(sorted_ms)) - 1)
+    return round(sorted_ms[idx], 3)
+
+
+class _Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def add(self, route: str, ms: float, status: int | str):
+        """status is the HTTP status, or the exception name if the request failed."""
+        self.samples.setdefault(route, []).append(ms)
+        counts = self.statuses.setdefault(route, {})
+        counts[str(status)] = counts.get(str(status), 0) + 1
+        if isinstance(status, str) or status >= 500:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, seconds: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            routes[route] = {
+                "requests": len(ordered),
+                "errors": self.errors.get(route, 0),
+                "statuses": dict(sorted(self.statuses[route].items())),
+                "rps": round(len(ordered) / seconds, 2),
+                "mean_ms": round(sum(ordered) / len(ordered), 3),
+                "p50_ms": _percentile(ordered, 0.50),
+                "p95_ms": _percentile(ordered, 0.95),
+                "p99_ms": _percentile(ordered, 0.99),
+                "max_ms": round(ordered[-1], 3),
+            }
+        everything = sorted(ms for s in self.samples.values() for ms in s)
+        total = {
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "rps": round(len(everything) / seconds, 2) if seconds else 0.0,
+            "p50_ms": _percentile(everything, 0.50),
+            "p95_ms": _percentile(everything, 0.95),
+            "p99_ms": _percentile(everything, 0.99),
+            "max_ms": round(everything[-1], 3) if everything else None,
+        }
+        return {"total": total, "routes": routes}
+
+
+async def _worker(client, scenarios, names, weights, rng, deadline, recorder):
+    while time.perf_counter() < deadline:
+        route, build = scenarios[rng.choices(names, weights)[0]]
+        method, url, body = build(rng)
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(method, url, json=body)
+            await resp.aread()
+            status = resp.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        if recorder is not None:
+            recorder.add(route, (time.perf_counter() - t0) * 1000, status)
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    ids: dict[str, list[str]],
+    mix: dict[str, float],
+    concurrency: int = LOADTEST_CONCURRENCY,
+    duration: float = LOADTEST_DURATION,
+    warmup: float = LOADTEST_WARMUP,
+    seed: int = 0,
+) -> dict:
+    """Closed loop: `concurrency` clients each send the next request as soon as one returns."""
+    scenarios = _scenarios(ids)
+    unknown = set(mix) - set(scenarios)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {sorted(unknown)}")
+    names = [n for n in mix if mix[n] > 0]
+    weights = [mix[n] for n in names]
+
+    async def phase(seconds, recorder):
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(
+            *(
+                _worker(client, scenarios, names, weights,
+                        random.Random(seed * 1000 + i), deadline, recorder)
+                for i in range(concurrency)
+            )
+        )
+
+    if warmup > 0:
+        await phase(warmup, None)  # caches, connections, page cache
+    recorder = _Recorder()
+    t0 = time.perf_counter()
+    await phase(duration, recorder)
+    return recorder.summary(time.perf_counter() - t0)
+
+
+# ====================== Targets ====================== #
+
+
+async def run_in_process(db_file: str, **kwargs) -> dict:
+    """Serve app.main through httpx's ASGI transport, no sockets involved."""
+    db_path = Path(db_file)
+    if db_path.parent != Path("dbs"):
+        raise ValueError("in-process runs serve a file from dbs/")
+    # read by app.main at import
+    os.environ["MEDIADB_NAME"] = db_path.name
+    os.environ.setdefault("BACKUP_INTERVAL", "0")
+    from app.main import app
+
+    # unhandled errors become 500s, as they would behind uvicorn
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=60
+        ) as client:
+            return await drive(client, _sample_ids(db_file), **kwargs)
+
+
+async def run_against(url: str, db_file: str, concurrency: int, **kwargs) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        return await drive(client, _sample_ids(db_file), concurrency=concurrency, **kwargs)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(db_file: str, workers: int) -> tuple[subprocess.Popen, str]:
+    """uvicorn on a free localhost port serving db_file, like production."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "MEDIADB_NAME": Path(db_file).name,
+        "BACKUP_INTERVAL": "0",
+        "WEB_WORKERS": str(workers),
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(url + "/", timeout=2).status_code < 500:
+                return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not come up within 60s")
+
+
+# ====================== Reporting ====================== #
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_table(result: dict, baseline: dict | None = None) -> str:
+    lines = [
+        f"{'route':34} {'reqs':>7} {'err':>5} {'rps':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>9}"
+    ]
+    rows = list(result["routes"].items()) + [("TOTAL", result["total"])]
+    for route, r in rows:
+        line = (
+            f"{route:34} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} "
+            f"{r['p50_ms'] or 0:>8.1f} {r['p95_ms'] or 0:>8.1f} "
+            f"{r['p99_ms'] or 0:>8.1f} {r['max_ms'] or 0:>9.1f}"
+        )
+        if baseline:
+            old = baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+            if old and old.get("p95_ms") and r["p95_ms"]:
+                change = 100.0 * (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"]
+                line += f"  p95 {change:+.0f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def save(result: dict, out: Path | None = None) -> Path:
+    if out is None:
+        LOADTEST_DIR.mkdir(parents=True, exist_ok=True)
+        out = LOADTEST_DIR / f"loadtest-{datetime.now():%Y%m%dT%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2) + "\n")
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load test the app on the benchmark database (latencies in ms)."
+    )
+    parser.add_argument("--db", default=LOADTEST_DB)
+    parser.add_argument("--build", action="store_true", help="regenerate the database")
+    parser.add_argument("--url", help="test a running server instead of in-process")
+    parser.add_argument(
+        "--spawn", type=int, metavar="WORKERS",
+        help="start uvicorn with this many workers on localhost and test it",
+    )
+    parser.add_argument("-c", "--concurrency", type=int, default=LOADTEST_CONCURRENCY)
+    parser.add_argument("-d", "--duration", type=float, default=LOADTEST_DURATION)
+    parser.add_argument("--warmup", type=float, default=LOADTEST_WARMUP)
+    parser.add_argument("--mix", help="e.g. home=10,actor=40,movie_edit=0")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, help="JSON result path")
+    parser.add_argument("--compare", type=Path, help="earlier JSON result to diff p95 against")
+    args = parser.parse_args(argv)
+
+    if args.build or not os.path.exists(args.db):
+        print(build_bench_db(args.db))
+
+    mix = parse_mix(args.mix)
+    opts = dict(duration=args.duration, warmup=args.warmup, mix=mix, seed=args.seed)
+    proc = None
+    try:
+        if args.spawn:
+            proc, url = spawn_server(args.db, args.spawn)
+            target = f"{url} ({args.spawn} workers)"
+            result = asyncio.run(run_against(url, args.db, args.concurrency, **opts))
+        elif args.url:
+            target = args.url
+            result = asyncio.run(run_against(args.url, args.db, args.concurrency, **opts))
+        else:
+            target = "in-process"
+            result = asyncio.run(
+                run_in_process(args.db, concurrency=args.concurrency, **opts)
+            )
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    result["meta"] = {
+        "started": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "target": target,
+        "db": args.db,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "mix": mix,
+        "seed": args.seed,
+    }
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print(format_table(result, baseline))
+    print(f"Results written to {save(result, args.out)}")
+
+
+if __name__ == "__main__":
+    # python -m app.loadtest --duration 30 --concurrency 32
+    main()
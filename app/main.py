@@ -1,14 +1,55 @@
+import asyncio
+import os
 from fastapi import FastAPI, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
+from app.db.writer import WriteQueue, WriteQueueFull
+from app.db.backends import DatabaseError, SQLiteBackend, get_backend
 from app.db.db_control import MediaDB
 from contextlib import asynccontextmanager
-from app.routers import api_router, movies_router, actors_router, shows_router
+from app.routers import (
+    api_router,
+    changes_router,
+    collections_api_router,
+    backup_router,
+    maintenance_router,
+    library_router,
+    similar_router,
+    costars_router,
+    autocomplete_router,
+    plays_router,
+    duplicates_router,
+    movies_router,
+    actors_router,
+    shows_router,
+    images_router,
+    collections_router,
+    debug_router,
+    stream_router,
+    stats_router,
+)
+from app.assets import PrecompressedStaticFiles, build_assets
+from app.backup import BACKUP_INTERVAL, BackupService
+from app.autocomplete import Autocomplete
+from app.costars import CoStarGraph
+from app.dedupe import DuplicateFinder
+from app.images import ThumbnailService
+from app.library import LIBRARY_DIRS, LIBRARY_SCAN_INTERVAL, LibraryScanner
+from app.maintenance import MAINTENANCE_TICK, MaintenanceService
+from app.similar import SIMILAR_REFRESH_INTERVAL, SimilarityEngine
+from app.timing import (
+    DEBUG_METRICS,
+    ServerTimingMiddleware,
+    TimedJinja2Templates,
+    TimedJSONResponse,
+    instrument_backend,
+)
 
 
 DB_DIR = "dbs"
-DB_NAME = "scratch_test.db"
+# file under dbs/ to serve, e.g. MEDIADB_NAME=bench.db for load tests
+DB_NAME = os.environ.get("MEDIADB_NAME", "scratch_test.db")
 
 
 def check_db_exists():
@@ -19,23 +60,273 @@ def check_db_exists():
     )
 
 
+CHANGE_LOG_COMPACT_INTERVAL = int(os.environ.get("CHANGE_LOG_COMPACT_INTERVAL", 3600))
+CHANGE_LOG_TOMBSTONE_DAYS = int(os.environ.get("CHANGE_LOG_TOMBSTONE_DAYS", 30))
+
+
+async def compact_change_log_periodically(db: MediaDB):
+    while True:
+        await asyncio.sleep(CHANGE_LOG_COMPACT_INTERVAL)
+        try:
+            await asyncio.to_thread(db.compact_change_log, CHANGE_LOG_TOMBSTONE_DAYS)
+        except DatabaseError as e:
+            print(f"Change log compaction failed: {e}")
+
+
+# Wait this long before retrying a failed backup
+BACKUP_RETRY_INTERVAL = int(os.environ.get("BACKUP_RETRY_INTERVAL", 300))
+
+
+async def backup_periodically(service: BackupService):
+    while True:
+        await asyncio.sleep(service.seconds_until_due(BACKUP_INTERVAL))
+        try:
+            result = await asyncio.to_thread(service.run)
+            print(f"Backup finished: {result}")
+        except (DatabaseError, OSError) as e:
+            print(f"Backup failed: {e}")
+            await asyncio.sleep(BACKUP_RETRY_INTERVAL)
+
+
+async def maintain_periodically(service: MaintenanceService):
+    while True:
+        await asyncio.sleep(MAINTENANCE_TICK)
+        try:
+            ran = await asyncio.to_thread(service.tick)
+            if ran:
+                print(f"Maintenance: {ran}")
+        except DatabaseError as e:
+            print(f"Maintenance failed: {e}")
+
+
+async def scan_library_periodically(scanner: LibraryScanner):
+    while True:
+        try:
+            result = await asyncio.to_thread(scanner.scan)
+            print(f"Library scan finished: {result}")
+        except (DatabaseError, OSError) as e:
+            print(f"Library scan failed: {e}")
+        await asyncio.sleep(LIBRARY_SCAN_INTERVAL)
+
+
+async def refresh_similar_periodically(engine: SimilarityEngine):
+    while True:
+        try:
+            result = await asyncio.to_thread(engine.refresh)
+            if result.get("recomputed"):
+                print(f"Similar titles refreshed: {result}")
+        except DatabaseError as e:
+            print(f"Similar titles refresh failed: {e}")
+        await asyncio.sleep(SIMILAR_REFRESH_INTERVAL)
+
+
+async def preload(services: dict):
+    """Build the per-worker in-memory indexes now rather than on the first query."""
+    for label, service in services.items():
+        try:
+            await asyncio.to_thread(service.sync)
+            print(f"{label} loaded: {service.status()}")
+        except DatabaseError as e:
+            # retried by the first query
+            print(f"{label} load failed: {e}")
+
+
+# Number of uvicorn worker processes for `python -m app.main`; 1 = dev mode with reload
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", 1))
+MAINTENANCE_LOCK = f"{DB_DIR}/.maintenance.lock"
+
+
+def acquire_maintenance_lock():
+    """
+    With several workers only one should run migrations, backups and change
+    log compaction. Whoever gets this file lock does; the OS drops it when that
+    process exits, and the worker uvicorn starts in its place picks it up.
+    Returns the open lock file (keep it referenced) or None.
+    """
+    try:
+        import fcntl
+    except ImportError:  # no flock on Windows, assume a single worker
+        return open(MAINTENANCE_LOCK, "a+")
+    os.makedirs(DB_DIR, exist_ok=True)
+    lock_file = open(MAINTENANCE_LOCK, "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Checking if backup is needed...")
+    compactor = None
+    backups = None
+    maintenance = None
+    scans = None
+    similar = None
+    preloading = None
+    if app.state.writes:
+        # every worker has its own writer; WAL + busy_timeout order them
+        app.state.writes.start()
+        app.state.mediaDB.writes = app.state.writes
+    lock_file = acquire_maintenance_lock()
+    if lock_file:
+        if app.state.backups and BACKUP_INTERVAL > 0:
+            # runs straight away if the last backup is older than BACKUP_INTERVAL
+            backups = asyncio.create_task(backup_periodically(app.state.backups))
+        if app.state.mediaDB.backend.dialect == "sqlite":
+            app.state.mediaDB.init_change_log()
+            app.state.mediaDB.init_collections()
+            app.state.mediaDB.init_plays()
+            app.state.mediaDB.init_similar()
+            app.state.mediaDB.init_dedupe()
+            compactor = asyncio.create_task(
+                compact_change_log_periodically(app.state.mediaDB)
+            )
+            if app.state.similar and SIMILAR_REFRESH_INTERVAL > 0:
+                similar = asyncio.create_task(
+                    refresh_similar_periodically(app.state.similar)
+                )
+        if app.state.library:
+            app.state.mediaDB.init_library()
+            if LIBRARY_SCAN_INTERVAL > 0:
+                scans = asyncio.create_task(
+                    scan_library_periodically(app.state.library)
+                )
+        if app.state.maintenance and MAINTENANCE_TICK > 0:
+            maintenance = asyncio.create_task(
+                maintain_periodically(app.state.maintenance)
+            )
+    indexes = {
+        "Co-star graph": app.state.costars,
+        "Autocomplete": app.state.autocomplete,
+    }
+    indexes = {label: service for label, service in indexes.items() if service}
+    if indexes:
+        preloading = asyncio.create_task(preload(indexes))
     yield
+    if app.state.writes:
+        app.state.mediaDB.writes = None
+        app.state.writes.stop()
+    if maintenance:
+        maintenance.cancel()
+    if scans:
+        scans.cancel()
+    if similar:
+        similar.cancel()
+    if preloading:
+        preloading.cancel()
+    if compactor:
+        compactor.cancel()
+    if backups:
+        backups.cancel()
+    if lock_file:
+        lock_file.close()
 
 
-app = FastAPI(lifespan=lifespan)
-app.state.mediaDB = MediaDB("dbs/scratch_test.db")
-app.state.templates = Jinja2Templates(directory="app/static/templates")
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse if DEBUG_METRICS else JSONResponse,
+)
+app.state.mediaDB = MediaDB(
+    f"{DB_DIR}/{DB_NAME}", backend=get_backend(f"{DB_DIR}/{DB_NAME}")
+)
+app.state.assets = build_assets()
+app.state.thumbnails = ThumbnailService()
+# online backups copy the SQLite file itself, so only when we opened the
+# file (an SQLAlchemy engine may point at some other database)
+app.state.backups = (
+    BackupService(app.state.mediaDB)
+    if isinstance(app.state.mediaDB.backend, SQLiteBackend)
+    else None
+)
+# ANALYZE, checkpoints, vacuum and quick_check while the app is idle
+app.state.maintenance = (
+    MaintenanceService(app.state.mediaDB)
+    if isinstance(app.state.mediaDB.backend, SQLiteBackend)
+    else None
+)
+# matches video files under LIBRARY_DIRS to titles, sets obtained
+app.state.library = (
+    LibraryScanner(app.state.mediaDB)
+    if LIBRARY_DIRS and app.state.mediaDB.backend.dialect == "sqlite"
+    else None
+)
+# precomputed "more like this" lists, refreshed from the change log
+app.state.similar = (
+    SimilarityEngine(app.state.mediaDB)
+    if app.state.mediaDB.backend.dialect == "sqlite"
+    else None
+)
+# actor <-> title graph for co-stars and paths, one per worker
+app.state.costars = (
+    CoStarGraph(app.state.mediaDB)
+    if app.state.mediaDB.backend.dialect == "sqlite"
+    else None
+)
+# prefix indexes over actor, genre and network names, one per worker
+app.state.autocomplete = (
+    Autocomplete(app.state.mediaDB)
+    if app.state.mediaDB.backend.dialect == "sqlite"
+    else None
+)
+# duplicate actor/title review queue, scanned on request
+app.state.dedupe = (
+    DuplicateFinder(app.state.mediaDB)
+    if app.state.mediaDB.backend.dialect == "sqlite"
+    else None
+)
+# single writer thread with group commit, for the sqlite3 backends
+app.state.writes = (
+    WriteQueue(app.state.mediaDB)
+    if hasattr(app.state.mediaDB.backend, "set_write_batch")
+    else None
+)
+if DEBUG_METRICS:
+    # Server-Timing on every response, histograms at /debug/metrics
+    instrument_backend(app.state.mediaDB.backend)
+    app.add_middleware(ServerTimingMiddleware)
+    app.state.templates = TimedJinja2Templates(directory="app/static/templates")
+else:
+    app.state.templates = Jinja2Templates(directory="app/static/templates")
+app.state.templates.env.globals["asset_url"] = app.state.assets.url
+app.mount(
+    "/assets",
+    PrecompressedStaticFiles(directory=app.state.assets.build_dir),
+    name="assets",
+)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 # app.mount("/scripts", StaticFiles(directory="static/scripts"), name="scripts")
 app.mount("/logos", StaticFiles(directory="resources/logos"), name="logos")
 
 app.include_router(api_router)
+app.include_router(changes_router)
+app.include_router(collections_api_router)
+app.include_router(backup_router)
+app.include_router(maintenance_router)
+app.include_router(library_router)
+app.include_router(similar_router)
+app.include_router(costars_router)
+app.include_router(autocomplete_router)
+app.include_router(plays_router)
+app.include_router(duplicates_router)
 app.include_router(movies_router, include_in_schema=False)
 app.include_router(actors_router, include_in_schema=False)
 app.include_router(shows_router, include_in_schema=False)
+app.include_router(images_router)
+app.include_router(collections_router, include_in_schema=False)
+app.include_router(stream_router)
+app.include_router(stats_router, include_in_schema=False)
+if DEBUG_METRICS:
+    app.include_router(debug_router, include_in_schema=False)
+
+
+@app.exception_handler(WriteQueueFull)
+def write_queue_full(request: Request, exc: WriteQueueFull):
+    # backpressure: clients should retry rather than pile up more writes
+    return JSONResponse(
+        {"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"}
+    )
 
 
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
@@ -46,16 +337,13 @@ def index(request: Request):
     )
 
 
-@app.get("/collections", response_class=HTMLResponse, include_in_schema=False)
-def list_collections(request: Request):
-    # collections = mediaDB.get_collections()
-    # return templates.TemplateResponse(
-    #     "collections.html", {"request": request, "collections": collections}
-    # )
-    pass
-
-
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8080, reload=True)
+    if WEB_WORKERS > 1:
+        # production: N processes sharing the SQLite file in WAL mode
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8080, workers=WEB_WORKERS)
+    else:
+        # dev: timings on unless asked not to; the reloaded app inherits it
+        os.environ.setdefault("DEBUG_METRICS", "1")
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8080, reload=True)
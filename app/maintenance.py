@@ -0,0 +1,307 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.db.db_control import MediaDB
+
+# Seconds between scheduler ticks; each tick runs whatever jobs are due
+MAINTENANCE_TICK = float(os.environ.get("MAINTENANCE_TICK", 30))
+# Nothing committed for this long counts as idle; heavy jobs only run then
+MAINTENANCE_IDLE_SECONDS = float(os.environ.get("MAINTENANCE_IDLE_SECONDS", 60))
+# Wall clock budget per job. Jobs that can be split (vacuum) stop early,
+# statements that can't (ANALYZE, quick_check) are interrupted.
+MAINTENANCE_BUDGET_MS = float(os.environ.get("MAINTENANCE_BUDGET_MS", 500))
+# Rows changed (change_log entries) since the last run before stats are rebuilt
+ANALYZE_CHANGE_THRESHOLD = int(os.environ.get("ANALYZE_CHANGE_THRESHOLD", 1000))
+# Rows sampled per index by ANALYZE / PRAGMA optimize, 0 = all of them
+ANALYSIS_LIMIT = int(os.environ.get("ANALYSIS_LIMIT", 1000))
+# PRAGMA optimize at least this often even without big changes
+OPTIMIZE_INTERVAL = int(os.environ.get("OPTIMIZE_INTERVAL", 6 * 3600))
+# Checkpoint once the WAL holds this many frames (pages); TRUNCATE when idle
+WAL_CHECKPOINT_PAGES = int(os.environ.get("WAL_CHECKPOINT_PAGES", 1000))
+# Free pages released per incremental_vacuum step, and the share of free
+# pages above which a file without auto_vacuum is reported as bloated
+VACUUM_STEP_PAGES = int(os.environ.get("VACUUM_STEP_PAGES", 256))
+VACUUM_FREE_RATIO = float(os.environ.get("VACUUM_FREE_RATIO", 0.1))
+# One full VACUUM (when idle) to switch such a file to auto_vacuum=INCREMENTAL
+VACUUM_CONVERT = os.environ.get("VACUUM_CONVERT", "0") == "1"
+# Seconds between PRAGMA quick_check runs
+QUICK_CHECK_INTERVAL = int(os.environ.get("QUICK_CHECK_INTERVAL", 24 * 3600))
+
+JOBS = ("optimize", "checkpoint", "vacuum", "quick_check")
+
+
+def _utcnow_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class MaintenanceService:
+    """
+    Idle-time housekeeping for the SQLite file: fresh planner statistics
+    after large changes, WAL checkpoints, incremental vacuum and a periodic
+    quick_check. tick() is called by the app on a timer and decides what
+    is due; run(job) forces one job now.
+
+    Uses its own autocommit connections (VACUUM and checkpoints can't run
+    inside a transaction), with the same busy timeout as the app.
+    """
+
+    def __init__(
+        self,
+        db: MediaDB,
+        idle_seconds: float = MAINTENANCE_IDLE_SECONDS,
+        budget_ms: float = MAINTENANCE_BUDGET_MS,
+        change_threshold: int = ANALYZE_CHANGE_THRESHOLD,
+        analysis_limit: int = ANALYSIS_LIMIT,
+        optimize_interval: int = OPTIMIZE_INTERVAL,
+        wal_checkpoint_pages: int = WAL_CHECKPOINT_PAGES,
+        vacuum_step_pages: int = VACUUM_STEP_PAGES,
+        vacuum_free_ratio: float = VACUUM_FREE_RATIO,
+        vacuum_convert: bool = VACUUM_CONVERT,
+        quick_check_interval: int = QUICK_CHECK_INTERVAL,
+    ):
+        self.db = db
+        self.db_file = db.backend.db_file
+        self.idle_seconds = idle_seconds
+        self.budget = budget_ms / 1000
+        self.change_threshold = change_threshold
+        self.analysis_limit = analysis_limit
+        self.optimize_interval = optimize_interval
+        self.wal_checkpoint_pages = wal_checkpoint_pages
+        self.vacuum_step_pages = vacuum_step_pages
+        self.vacuum_free_ratio = vacuum_free_ratio
+        self.vacuum_convert = vacuum_convert
+        self.quick_check_interval = quick_check_interval
+        self._lock = threading.Lock()
+        self._current: str | None = None
+        # idle tracking: data_version changes on every commit by anyone
+        self._data_version: int | None = None
+        self._quiet_since = time.monotonic()
+        # change_log seq at the last optimize; None runs one on the first tick
+        self._analyzed_seq: int | None = None
+        self._started = time.monotonic()
+        self._last_done: dict[str, float] = {}
+        self.last_runs: dict[str, dict] = {}
+        self.ticks = 0
+
+    # ====================== Connections ====================== #
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA foreign_keys = ON;")
+        return conn
+
+    def _with_budget(self, conn: sqlite3.Connection, budget: float):
+        """Interrupt the statement running on conn once budget seconds pass."""
+        deadline = time.perf_counter() + budget
+        conn.set_progress_handler(lambda: int(time.perf_counter() > deadline), 1000)
+
+    def _pragma(self, conn: sqlite3.Connection, name: str) -> int:
+        return conn.execute(f"PRAGMA {name};").fetchone()[0]
+
+    # ====================== Idle detection ====================== #
+
+    def _observe(self):
+        version = self.db.backend.data_version()
+        if version != self._data_version:
+            self._data_version = version
+            self._quiet_since = time.monotonic()
+
+    def is_idle(self) -> bool:
+        writes = self.db.writes
+        if writes is not None and writes.status()["queued"]:
+            return False
+        return time.monotonic() - self._quiet_since >= self.idle_seconds
+
+    def _change_seq(self, conn: sqlite3.Connection) -> int:
+        try:
+            row = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'change_log';"
+            ).fetchone()
+        except sqlite3.OperationalError:  # no AUTOINCREMENT table at all yet
+            return 0
+        return row[0] if row else 0
+
+    # ====================== Jobs ====================== #
+
+    def _optimize(self, conn: sqlite3.Connection) -> dict:
+        seq = self._change_seq(conn)
+        changes = None if self._analyzed_seq is None else seq - self._analyzed_seq
+        conn.execute(f"PRAGMA analysis_limit = {int(self.analysis_limit)};")
+        self._with_budget(conn, self.budget)
+        if changes is not None and changes >= self.change_threshold:
+            # big import or bulk edit: rebuild all stats, not just the stale ones
+            conn.execute("ANALYZE;")
+            action = "analyze"
+        else:
+            conn.execute("PRAGMA optimize;")
+            action = "optimize"
+        self._analyzed_seq = seq
+        return {"action": action, "changes": changes}
+
+    def _checkpoint(self, conn: sqlite3.Connection) -> dict:
+        if self._pragma(conn, "journal_mode") != "wal":
+            return {"action": "skipped", "reason": "not in WAL mode"}
+        # PASSIVE never waits on readers or writers; TRUNCATE also shrinks the
+        # -wal file back to zero but has to wait for readers, so idle only
+        mode = "TRUNCATE" if self.is_idle() else "PASSIVE"
+        before = self._wal_frames()
+        busy, frames, done = conn.execute(f"PRAGMA wal_checkpoint({mode});").fetchone()
+        return {
+            "mode": mode,
+            "busy": bool(busy),
+            "wal_frames_before": before,
+            "wal_frames": frames,
+            "checkpointed": done,
+        }
+
+    def _vacuum(self, conn: sqlite3.Connection) -> dict:
+        auto_vacuum = self._pragma(conn, "auto_vacuum")
+        free = self._pragma(conn, "freelist_count")
+        pages = self._pragma(conn, "page_count")
+        ratio = free / pages if pages else 0.0
+        out = {"free_pages": free, "page_count": pages, "free_ratio": round(ratio, 4)}
+        if auto_vacuum == 2:  # INCREMENTAL
+            deadline = time.perf_counter() + self.budget
+            released = 0
+            # small steps, each its own write transaction, so writers get in between
+            while free and time.perf_counter() < deadline:
+                # frees one page per step, so it has to be read to the end
+                conn.execute(
+                    f"PRAGMA incremental_vacuum({self.vacuum_step_pages});"
+                ).fetchall()
+                left = self._pragma(conn, "freelist_count")
+                released += free - left
+                if left >= free:
+                    break
+                free = left
+            return {**out, "action": "incremental", "released_pages": released}
+        if ratio < self.vacuum_free_ratio:
+            return {**out, "action": "skipped"}
+        if not self.vacuum_convert:
+            return {**out, "action": "skipped", "reason": "bloated, set VACUUM_CONVERT=1"}
+        if not self.is_idle():
+            return {**out, "action": "skipped", "reason": "not idle"}
+        # one-off rewrite of the whole file, from then on vacuum is incremental.
+        # No budget: an interrupted VACUUM just rolls back and would retry forever.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        conn.execute("VACUUM;")
+        return {**out, "action": "converted", "free_pages": self._pragma(conn, "freelist_count")}
+
+    def _quick_check(self, conn: sqlite3.Connection) -> dict:
+        self._with_budget(conn, self.budget)
+        rows = [r[0] for r in conn.execute("PRAGMA quick_check(20);")]
+        ok = rows == ["ok"]
+        if not ok:
+            print(f"quick_check found problems in {self.db_file}: {rows}")
+        return {"ok": ok, "problems": [] if ok else rows}
+
+    # ====================== Scheduling ====================== #
+
+    def _is_due(self, job: str) -> bool:
+        last = self._last_done.get(job)
+        elapsed = None if last is None else time.monotonic() - last
+        if job == "optimize":
+            return elapsed is None or elapsed >= self.optimize_interval or (
+                self._changes_since_optimize() >= self.change_threshold
+            )
+        if job == "checkpoint":
+            return self._wal_frames() >= self.wal_checkpoint_pages or (
+                self.is_idle() and self._wal_frames() > 0
+            )
+        if job == "vacuum":
+            return self.is_idle()
+        if job == "quick_check":
+            # first one a full interval after startup, not on every restart
+            last = last if last is not None else self._started
+            return self.is_idle() and time.monotonic() - last >= self.quick_check_interval
+        return False
+
+    def _changes_since_optimize(self) -> int:
+        if self._analyzed_seq is None:
+            return self.change_threshold
+        conn = self._connect()
+        try:
+            return self._change_seq(conn) - self._analyzed_seq
+        finally:
+            conn.close()
+
+    def _wal_frames(self) -> int:
+        """WAL size in frames, from the file size (no lock needed)."""
+        try:
+            size = os.path.getsize(self.db_file + "-wal")
+        except OSError:
+            return 0
+        return max(0, size - 32) // 4120  # 32 byte header, 24 + 4096 per frame
+
+    def run(self, job: str) -> dict:
+        """
+        Run one job now and return its timings. Returns {"skipped": True}
+        instead if another job is running.
+        """
+        if job not in JOBS:
+            raise ValueError(f"Unknown maintenance job: {job!r}")
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": f"{self._current} is running"}
+        self._current = job
+        started = _utcnow_iso()
+        t0 = time.perf_counter()
+        conn = self._connect()
+        try:
+            result = getattr(self, f"_{job}")(conn)
+            result = {"ok": True, **result}
+        except sqlite3.OperationalError as e:
+            if "interrupted" not in str(e):
+                result = {"ok": False, "error": str(e)}
+            else:
+                result = {"ok": False, "error": "budget exceeded"}
+        finally:
+            conn.close()
+            self._current = None
+            self._lock.release()
+        result.update(started=started, duration_ms=round((time.perf_counter() - t0) * 1000, 2))
+        self._last_done[job] = time.monotonic()
+        # our own ANALYZE/checkpoint commits shouldn't count as activity
+        self._data_version = self.db.backend.data_version()
+        self.last_runs[job] = result
+        return result
+
+    def tick(self) -> dict:
+        """One scheduler pass: run every job that is due, in order."""
+        self.ticks += 1
+        self._observe()
+        ran = {}
+        for job in JOBS:
+            try:
+                due = self._is_due(job)
+            except sqlite3.Error as e:
+                print(f"Maintenance {job} check failed: {e}")
+                continue
+            if due:
+                ran[job] = self.run(job)
+        return ran
+
+    # ====================== Status ====================== #
+
+    def status(self) -> dict:
+        return {
+            "running": self._current,
+            "idle": self.is_idle(),
+            "idle_for_s": round(time.monotonic() - self._quiet_since, 1),
+            "wal_frames": self._wal_frames(),
+            "budget_ms": self.budget * 1000,
+            "ticks": self.ticks,
+            "last_runs": self.last_runs,
+        }
+
+
+if __name__ == "__main__":
+    # One-off run: python -m app.maintenance [db_path] [job ...]
+    import sys
+
+    db = MediaDB(sys.argv[1] if len(sys.argv) > 1 else "dbs/scratch_test.db")
+    service = MaintenanceService(db)
+    for job in sys.argv[2:] or JOBS:
+        print(job, service.run(job))
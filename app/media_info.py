@@ -0,0 +1,409 @@
+import json
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import wraps
+
+from app.db.db_control import MediaDB
+
+# Files probed in parallel; each probe touches only a few header pages
+MEDIA_INFO_WORKERS = int(os.environ.get("MEDIA_INFO_WORKERS", 8))
+# Matroska files are read up to this far looking for Info/Tracks before the
+# first Cluster; past that only the SeekHead is followed
+MKV_SCAN_LIMIT = int(os.environ.get("MKV_SCAN_LIMIT", 16 * 1024 * 1024))
+
+
+class ProbeError(ValueError):
+    pass
+
+
+def _lenient(parse):
+    """Public form of a header parser: {} instead of an error for bad input."""
+
+    @wraps(parse)
+    def wrapper(buf) -> dict:
+        try:
+            return parse(buf)
+        except (ProbeError, struct.error, IndexError):
+            return {}
+
+    return wrapper
+
+
+# ====================== MP4 / MOV (ISO BMFF boxes) ====================== #
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts"}
+_HANDLERS = {b"vide": "video", b"soun": "audio", b"subt": "subtitle", b"text": "subtitle"}
+
+
+def _boxes(buf, start: int, end: int):
+    """Yield (type, payload_start, box_end) for the boxes in buf[start:end]."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", buf, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            # truncated file: stop rather than read garbage
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _mp4_language(code: int) -> str | None:
+    # ISO-639-2/T packed as three 5-bit letters
+    if not code or code == 0x7FFF:
+        return None
+    lang = "".join(chr(((code >> s) & 0x1F) + 0x60) for s in (10, 5, 0))
+    return None if lang == "und" else lang
+
+
+def _mp4_track(buf, start: int, end: int) -> dict:
+    track: dict = {}
+    stack = [(start, end)]
+    while stack:
+        s, e = stack.pop()
+        for kind, p, box_end in _boxes(buf, s, e):
+            if kind in _MP4_CONTAINERS:
+                stack.append((p, box_end))
+            elif kind == b"hdlr":
+                handler = bytes(buf[p + 8 : p + 12])
+                track["type"] = _HANDLERS.get(handler, handler.decode("latin-1"))
+            elif kind == b"mdhd":
+                version = buf[p]
+                if version == 1:
+                    timescale, duration = struct.unpack_from(">IQ", buf, p + 20)
+                    lang = struct.unpack_from(">H", buf, p + 32)[0]
+                else:
+                    timescale, duration = struct.unpack_from(">II", buf, p + 12)
+                    lang = struct.unpack_from(">H", buf, p + 20)[0]
+                if timescale:
+                    track["duration_s"] = round(duration / timescale, 3)
+                if _mp4_language(lang):
+                    track["language"] = _mp4_language(lang)
+            elif kind == b"stsd":
+                # first sample entry: size, codec fourcc, then codec-specific fields
+                entry = p + 8
+                if entry + 8 > box_end:
+                    continue
+                track["codec"] = bytes(buf[entry + 4 : entry + 8]).decode("latin-1").strip()
+                fields = entry + 16  # after reserved(6) + data_reference_index(2)
+                if track.get("type") == "video" and fields + 28 <= box_end:
+                    track["width"], track["height"] = struct.unpack_from(
+                        ">HH", buf, fields + 16
+                    )
+                elif track.get("type") == "audio" and fields + 20 <= box_end:
+                    track["channels"] = struct.unpack_from(">H", buf, fields + 8)[0]
+                    track["sample_rate"] = struct.unpack_from(">I", buf, fields + 16)[0] >> 16
+    return track
+
+
+def _parse_mp4(buf) -> dict:
+    end = len(buf)
+    moov = next(((p, e) for kind, p, e in _boxes(buf, 0, end) if kind == b"moov"), None)
+    if moov is None:
+        raise ProbeError("no moov box")
+    duration = None
+    streams = []
+    for kind, p, e in _boxes(buf, *moov):
+        if kind == b"mvhd":
+            if buf[p] == 1:
+                timescale, length = struct.unpack_from(">IQ", buf, p + 20)
+            else:
+                timescale, length = struct.unpack_from(">II", buf, p + 12)
+            if timescale and length not in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                duration = length / timescale
+        elif kind == b"trak":
+            streams.append(_mp4_track(buf, p, e))
+    if duration is None:
+        durations = [s["duration_s"] for s in streams if s.get("duration_s")]
+        duration = max(durations) if durations else None
+    for s in streams:
+        s.pop("duration_s", None)
+    return {"container": "mp4", "duration_s": duration, "streams": streams}
+
+
+probe_mp4 = _lenient(_parse_mp4)
+
+
+# ====================== Matroska / WebM (EBML) ====================== #
+
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_SEEK_HEAD = 0x114D9B74
+_SEEK = 0x4DBB
+_SEEK_ID = 0x53AB
+_SEEK_POSITION = 0x53AC
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_LANGUAGE = 0x22B59C
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_AUDIO = 0xE1
+_SAMPLING_FREQUENCY = 0xB5
+_CHANNELS = 0x9F
+_CLUSTER = 0x1F43B675
+_DOC_TYPE = 0x4282
+_TRACK_TYPES = {1: "video", 2: "audio", 17: "subtitle"}
+
+
+def _vint(buf, pos: int, keep_marker: bool) -> tuple[int, int, bool]:
+    """EBML variable length integer at pos -> (value, length, all ones)."""
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ProbeError(f"bad EBML vint at {pos}")
+    value = first if keep_marker else first & (mask - 1)
+    for b in buf[pos + 1 : pos + length]:
+        value = (value << 8) | b
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _elements(buf, start: int, end: int):
+    """Yield (id, data_start, data_end) for the EBML elements in buf[start:end]."""
+    pos = start
+    while pos < end:
+        element_id, n, _ = _vint(buf, pos, True)
+        size, m, unknown = _vint(buf, pos + n, False)
+        data = pos + n + m
+        data_end = end if unknown else min(data + size, end)
+        yield element_id, data, data_end
+        if unknown:
+            return  # only the Segment (or a live Cluster) has unknown size
+        pos = data + size
+
+
+def _uint(buf, s: int, e: int) -> int:
+    return int.from_bytes(buf[s:e], "big")
+
+
+def _float(buf, s: int, e: int) -> float:
+    if e == s:
+        return 0.0
+    if e - s not in (4, 8):
+        raise ProbeError(f"bad EBML float size {e - s}")
+    return struct.unpack_from(">f" if e - s == 4 else ">d", buf, s)[0]
+
+
+def _text(buf, s: int, e: int) -> str:
+    return bytes(buf[s:e]).rstrip(b"\0").decode("utf-8", "replace")
+
+
+def _mkv_track(buf, s: int, e: int) -> dict:
+    track: dict = {}
+    for eid, ds, de in _elements(buf, s, e):
+        if eid == _TRACK_TYPE:
+            kind = _uint(buf, ds, de)
+            track["type"] = _TRACK_TYPES.get(kind, str(kind))
+        elif eid == _CODEC_ID:
+            track["codec"] = _text(buf, ds, de)
+        elif eid == _LANGUAGE:
+            lang = _text(buf, ds, de)
+            if lang and lang != "und":
+                track["language"] = lang
+        elif eid == _VIDEO:
+            for vid, vs, ve in _elements(buf, ds, de):
+                if vid == _PIXEL_WIDTH:
+                    track["width"] = _uint(buf, vs, ve)
+                elif vid == _PIXEL_HEIGHT:
+                    track["height"] = _uint(buf, vs, ve)
+        elif eid == _AUDIO:
+            for aid, as_, ae in _elements(buf, ds, de):
+                if aid == _SAMPLING_FREQUENCY:
+                    track["sample_rate"] = int(_float(buf, as_, ae))
+                elif aid == _CHANNELS:
+                    track["channels"] = _uint(buf, as_, ae)
+    return track
+
+
+def _parse_mkv(buf) -> dict:
+    end = len(buf)
+    header = next(_elements(buf, 0, end), None)
+    if header is None or header[0] != _EBML:
+        raise ProbeError("no EBML header")
+    doc_type = "matroska"
+    for eid, ds, de in _elements(buf, header[1], header[2]):
+        if eid == _DOC_TYPE:
+            doc_type = _text(buf, ds, de)
+    segment = next(
+        ((ds, de) for eid, ds, de in _elements(buf, header[2], end) if eid == _SEGMENT),
+        None,
+    )
+    if segment is None:
+        raise ProbeError("no Segment")
+    seg_start, seg_end = segment
+
+    found: dict[int, tuple[int, int]] = {}
+    seeks: dict[int, int] = {}
+    limit = min(seg_end, seg_start + MKV_SCAN_LIMIT)
+    for eid, ds, de in _elements(buf, seg_start, seg_end):
+        if eid in (_INFO, _TRACKS):
+            found[eid] = (ds, de)
+        elif eid == _SEEK_HEAD:
+            for sid, ss, se in _elements(buf, ds, de):
+                if sid != _SEEK:
+                    continue
+                target = position = None
+                for fid, fs, fe in _elements(buf, ss, se):
+                    if fid == _SEEK_ID:
+                        target = _uint(buf, fs, fe)
+                    elif fid == _SEEK_POSITION:
+                        position = _uint(buf, fs, fe)
+                if target is not None and position is not None:
+                    seeks[target] = seg_start + position
+        if len(found) == 2 or eid == _CLUSTER or de >= limit:
+            break
+    # Info / Tracks written after the media data: follow the SeekHead
+    for eid in (_INFO, _TRACKS):
+        if eid not in found and eid in seeks and seeks[eid] < seg_end:
+            element = next(_elements(buf, seeks[eid], seg_end), None)
+            if element and element[0] == eid:
+                found[eid] = (element[1], element[2])
+
+    duration = None
+    if _INFO in found:
+        scale = 1_000_000
+        raw = None
+        for eid, ds, de in _elements(buf, *found[_INFO]):
+            if eid == _TIMECODE_SCALE:
+                scale = _uint(buf, ds, de)
+            elif eid == _DURATION:
+                raw = _float(buf, ds, de)
+        if raw is not None:
+            duration = raw * scale / 1e9
+    streams = []
+    if _TRACKS in found:
+        streams = [
+            _mkv_track(buf, ds, de)
+            for eid, ds, de in _elements(buf, *found[_TRACKS])
+            if eid == _TRACK_ENTRY
+        ]
+    container = "webm" if doc_type == "webm" else "mkv"
+    return {"container": container, "duration_s": duration, "streams": streams}
+
+
+probe_mkv = _lenient(_parse_mkv)
+
+
+# ====================== Probing ====================== #
+
+
+def probe(path: str) -> dict:
+    """
+    Duration and stream list from the container header of an MP4/MOV or
+    Matroska/WebM file. The file is memory-mapped, so only the pages the
+    parser touches are read from disk. Raises ProbeError or OSError.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < 16:
+            raise ProbeError("file too small")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = memoryview(mm)
+            try:
+                magic = bytes(buf[:12])
+                if magic[:4] == b"\x1a\x45\xdf\xa3":
+                    info = _parse_mkv(buf)
+                elif magic[4:8] in (b"ftyp", b"moov", b"free", b"mdat", b"wide", b"skip"):
+                    info = _parse_mp4(buf)
+                else:
+                    raise ProbeError("not an MP4 or Matroska file")
+            except (struct.error, IndexError) as e:
+                raise ProbeError(f"truncated or corrupt header: {e}") from None
+            finally:
+                buf.release()
+    if info["duration_s"] is not None:
+        info["duration_s"] = round(info["duration_s"], 3)
+    return info
+
+
+def _probe_row(item: tuple) -> tuple:
+    path, size, mtime_ns = item
+    try:
+        info = probe(path)
+    except (ProbeError, OSError) as e:
+        return (path, size, mtime_ns, None, None, None, str(e))
+    return (
+        path,
+        size,
+        mtime_ns,
+        info["container"],
+        info["duration_s"],
+        json.dumps(info["streams"]),
+        None,
+    )
+
+
+class MediaInfoExtractor:
+    """
+    Probes the scanner's media_files whose cached media_info is missing or
+    stale (size or mtime changed) and fills in movies.duration, in minutes,
+    from the longest matched file of each movie.
+    """
+
+    def __init__(self, db: MediaDB, workers: int = MEDIA_INFO_WORKERS):
+        self.db = db
+        self.workers = workers
+        self.last_run: dict | None = None
+
+    def run(self, force: bool = False, overwrite: bool = False) -> dict:
+        """
+        force re-probes files even when the cache is fresh; overwrite
+        replaces durations that are already set (e.g. from the CSV).
+        """
+        started = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        todo = self.db.get_files_to_probe(force)
+        rows = []
+        if todo:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="probe") as pool:
+                rows = list(pool.map(_probe_row, todo))
+        probe_s = time.perf_counter() - t0
+        updated = self.db.apply_media_info(rows, overwrite)
+        self.last_run = {
+            "started": started.isoformat(),
+            "duration_s": round(time.perf_counter() - t0, 3),
+            "probe_s": round(probe_s, 3),
+            "probed": len(rows),
+            "failed": sum(1 for r in rows if r[6]),
+            "durations_updated": updated,
+        }
+        return self.last_run
+
+
+if __name__ == "__main__":
+    # python -m app.media_info file ...          print what the headers say
+    # python -m app.media_info --db [db_path]    probe the library, fill durations
+    import sys
+
+    args = sys.argv[1:]
+    if args[:1] == ["--db"]:
+        db = MediaDB(args[1] if len(args) > 1 else "dbs/scratch_test.db")
+        db.init_library()
+        print(MediaInfoExtractor(db).run(overwrite="--overwrite" in args))
+    else:
+        for path in args:
+            try:
+                print(path, probe(path))
+            except (ProbeError, OSError) as e:
+                print(path, f"error: {e}")
@@ -2,3 +2,18 @@ from .movies import router as movies_router
 from .actors import router as actors_router
 from .shows import router as shows_router
 from .api import router as api_router
+from .changes import router as changes_router
+from .collections_api import router as collections_api_router
+from .backup import router as backup_router
+from .maintenance import router as maintenance_router
+from .library import router as library_router
+from .similar import router as similar_router
+from .costars import router as costars_router
+from .autocomplete import router as autocomplete_router
+from .plays import router as plays_router
+from .duplicates import router as duplicates_router
+from .images import router as images_router
+from .collections import router as collections_router
+from .debug import router as debug_router
+from .stream import router as stream_router
+from .stats import router as stats_router
@@ -2,7 +2,7 @@ from fastapi import Request, Form, status, APIRouter, Depends
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
 from app.db.db_control import MediaDB
-from sqlite3 import IntegrityError
+from app.db.backends import IntegrityError
 from app.db.pydantic_models import ActorIn
 from contextlib import asynccontextmanager
 from app.deps import get_db, get_templates
@@ -1,8 +1,16 @@
 from fastapi import APIRouter
-from app.db.pydantic_models import MovieOut, PageOut, ShowOut
-from fastapi import Request, Depends
+from app.db.pydantic_models import (
+    BatchIn,
+    MovieOut,
+    MoviePatch,
+    PageOut,
+    ShowOut,
+    ShowPatch,
+)
+from fastapi import HTTPException, Request, Depends, status
 from app.db.db_control import MediaDB
 from app.deps import get_db
+from app.timing import span
 
 router = APIRouter(prefix="/api", tags=["api"])
 
@@ -10,8 +18,8 @@ router = APIRouter(prefix="/api", tags=["api"])
 @router.get("/movies_data", response_model=PageOut)
 def read_movies_data(request: Request, db: MediaDB = Depends(get_db)):
     rows = db.get_movies()
-    movies = [dict(row) for row in rows]
-    movies_out = [MovieOut(**m) for m in movies]
+    with span("serialize"):
+        movies_out = [MovieOut(**dict(row)) for row in rows]
     return PageOut(
         items=movies_out, limit=len(movies_out), offset=0, total=len(movies_out)
     )
@@ -20,8 +28,56 @@ def read_movies_data(request: Request, db: MediaDB = Depends(get_db)):
 @router.get("/shows_data", response_model=PageOut)
 def read_shows_data(request: Request, db: MediaDB = Depends(get_db)):
     rows = db.get_shows()
-    shows = [dict(row) for row in rows]
-    shows_out = [ShowOut(**s) for s in shows]
+    with span("serialize"):
+        shows_out = [ShowOut(**dict(row)) for row in rows]
     return PageOut(
         items=shows_out, limit=len(shows_out), offset=0, total=len(shows_out)
     )
+
+
+def _batch_response(ids: list[str], items: list[dict], key: str) -> dict:
+    found = {item[key] for item in items}
+    return {"items": items, "missing": [i for i in ids if i not in found]}
+
+
+@router.post("/movies/batch")
+def read_movies_batch(batch: BatchIn, db: MediaDB = Depends(get_db)):
+    """Movie detail records (with actors) for many ids in one round trip."""
+    return _batch_response(batch.ids, db.get_movies_by_ids(batch.ids), "movie_id")
+
+
+@router.post("/shows/batch")
+def read_shows_batch(batch: BatchIn, db: MediaDB = Depends(get_db)):
+    return _batch_response(batch.ids, db.get_shows_by_ids(batch.ids), "show_id")
+
+
+@router.post("/actors/batch")
+def read_actors_batch(batch: BatchIn, db: MediaDB = Depends(get_db)):
+    return _batch_response(batch.ids, db.get_actors_by_ids(batch.ids), "actor_id")
+
+
+def _apply_bulk(update, patches) -> dict:
+    changes = [p.model_dump(exclude_unset=True) for p in patches]
+    if any(len(c) < 2 for c in changes):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Patch with no fields")
+    try:
+        updated = update(changes)
+    except KeyError as e:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, {"missing": e.args[0]})
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    return {"success": True, "updated": updated}
+
+
+@router.patch("/movies")
+def bulk_update_movies(patches: list[MoviePatch], db: MediaDB = Depends(get_db)):
+    """
+    Apply many sparse movie patches in one transaction. Only fields present in
+    each patch are written; leading_actors/genre replace the linked lists.
+    """
+    return _apply_bulk(db.bulk_update_movies, patches)
+
+
+@router.patch("/shows")
+def bulk_update_shows(patches: list[ShowPatch], db: MediaDB = Depends(get_db)):
+    return _apply_bulk(db.bulk_update_shows, patches)
@@ -0,0 +1,19 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from app.autocomplete import Autocomplete
+from app.deps import get_autocomplete, require
+
+router = APIRouter(prefix="/api", tags=["autocomplete"])
+
+require_autocomplete = require(get_autocomplete, "Autocomplete needs the SQLite database")
+
+
+@router.get("/autocomplete/{kind}")
+def read_autocomplete(
+    kind: Literal["actors", "genres", "networks"],
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=100),
+    autocomplete: Autocomplete = Depends(require_autocomplete),
+):
+    """Existing names starting with q, then names with a word starting with q."""
+    return autocomplete.search(kind, q, limit)
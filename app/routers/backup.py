@@ -0,0 +1,27 @@
+from typing import Literal
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from app.backup import BackupService
+from app.deps import get_backups, require
+
+router = APIRouter(prefix="/api", tags=["backup"])
+
+require_backups = require(get_backups, "Backups need the SQLite database")
+
+
+@router.get("/backup")
+def read_backup_status(backups: BackupService = Depends(require_backups)):
+    """Progress of a running backup, last run metrics and stored snapshots."""
+    return backups.status()
+
+
+@router.post("/backup", status_code=status.HTTP_202_ACCEPTED)
+def start_backup(
+    background: BackgroundTasks,
+    mode: Literal["backup", "vacuum"] | None = Query(None),
+    backups: BackupService = Depends(require_backups),
+):
+    """Start a snapshot now; poll GET /api/backup for progress."""
+    if backups.status()["running"]:
+        raise HTTPException(status.HTTP_409_CONFLICT, "A backup is already running")
+    background.add_task(backups.run, mode)
+    return {"accepted": True}
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.db.db_control import MediaDB
+from app.deps import get_sqlite_db, require
+
+router = APIRouter(prefix="/api", tags=["changes"])
+
+
+@router.get("/changes")
+def read_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    after: str | None = None,
+    db: MediaDB = Depends(require(get_sqlite_db, "Change feed needs the SQLite schema")),
+):
+    """
+    Delta sync feed. since=0 pages through the whole catalog: pass each page's
+    `cursor` back as `after` until it is null, then keep passing back `next`
+    as `since`. If `reset` is true the client's copy is too old and must be
+    rebuilt from since=0.
+    """
+    try:
+        return db.get_changes(since, limit, after)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
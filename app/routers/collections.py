@@ -0,0 +1,56 @@
+from typing import Literal
+from fastapi import Request, APIRouter, Depends, HTTPException, Query, status
+from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse
+from app.db.db_control import MediaDB
+from app.deps import get_db, get_templates
+from app.utils import _decode_cursor, _encode_cursor
+
+
+router = APIRouter(prefix="/collections", tags=["collections"])
+
+COLLECTION_PAGE_SIZE = 100
+
+
+@router.get("", response_class=HTMLResponse, include_in_schema=False)
+def list_collections(
+    request: Request,
+    db: MediaDB = Depends(get_db),
+    templates: Jinja2Templates = Depends(get_templates),
+):
+    collections = db.get_collections()
+    return templates.TemplateResponse(
+        "collections.html", {"request": request, "collections": collections}
+    )
+
+
+@router.get(
+    "/{kind}/{collection_id}", response_class=HTMLResponse, include_in_schema=False
+)
+def collection_detail(
+    request: Request,
+    kind: Literal["movie", "show"],
+    collection_id: str,
+    cursor: str | None = Query(None),
+    db: MediaDB = Depends(get_db),
+    templates: Jinja2Templates = Depends(get_templates),
+):
+    collection = db.get_collection(kind, collection_id)
+    if collection is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Collection not found")
+    try:
+        after = _decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    members, next_key = db.get_collection_members(
+        kind, collection_id, COLLECTION_PAGE_SIZE, after
+    )
+    return templates.TemplateResponse(
+        "collection_detail.html",
+        {
+            "request": request,
+            "collection": collection,
+            "members": members,
+            "next_cursor": _encode_cursor(next_key),
+        },
+    )
@@ -0,0 +1,107 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.db.backends import IntegrityError
+from app.db.db_control import MediaDB
+from app.db.pydantic_models import BatchIn, CollectionIn
+from app.deps import get_db
+from app.utils import _decode_cursor, _encode_cursor
+
+router = APIRouter(prefix="/api", tags=["collections"])
+
+CollectionKind = Literal["movie", "show"]
+
+
+@router.get("/collections")
+def read_collections(
+    type: CollectionKind | None = Query(None), db: MediaDB = Depends(get_db)
+):
+    """All collections with member counts, optionally only one type."""
+    return {"items": db.get_collections(type)}
+
+
+@router.post("/collections/{kind}", status_code=status.HTTP_201_CREATED)
+def create_collection(
+    kind: CollectionKind, body: CollectionIn, db: MediaDB = Depends(get_db)
+):
+    try:
+        collection_id = db.create_collection(kind, body.name)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    except IntegrityError:
+        raise HTTPException(status.HTTP_409_CONFLICT, "Collection already exists")
+    return db.get_collection(kind, collection_id)
+
+
+@router.post("/collections/{kind}/membership")
+def read_collection_membership(
+    kind: CollectionKind, batch: BatchIn, db: MediaDB = Depends(get_db)
+):
+    """Collections each of the given movie/show ids belongs to."""
+    return {"items": db.get_collections_for(kind, batch.ids)}
+
+
+@router.get("/collections/{kind}/{collection_id}")
+def read_collection(
+    kind: CollectionKind, collection_id: str, db: MediaDB = Depends(get_db)
+):
+    collection = db.get_collection(kind, collection_id)
+    if collection is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Collection not found")
+    return collection
+
+
+@router.delete("/collections/{kind}/{collection_id}")
+def delete_collection(
+    kind: CollectionKind, collection_id: str, db: MediaDB = Depends(get_db)
+):
+    if not db.delete_collection(kind, collection_id):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Collection not found")
+    return {"success": True}
+
+
+@router.get("/collections/{kind}/{collection_id}/members")
+def read_collection_members(
+    kind: CollectionKind,
+    collection_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None),
+    db: MediaDB = Depends(get_db),
+):
+    """
+    Keyset-paginated members ordered by sort title. Pass `next_cursor` back
+    as `cursor` until it comes back null.
+    """
+    try:
+        after = _decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    if db.get_collection(kind, collection_id) is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Collection not found")
+    items, next_key = db.get_collection_members(kind, collection_id, limit, after)
+    return {"items": items, "next_cursor": _encode_cursor(next_key)}
+
+
+@router.post("/collections/{kind}/{collection_id}/members")
+def add_collection_members(
+    kind: CollectionKind,
+    collection_id: str,
+    batch: BatchIn,
+    db: MediaDB = Depends(get_db),
+):
+    """Add many members in one transaction; ids already in the collection are skipped."""
+    try:
+        added = db.add_collection_members(kind, collection_id, batch.ids)
+    except KeyError as e:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, {"missing": e.args[0]})
+    return {"success": True, "added": added}
+
+
+@router.delete("/collections/{kind}/{collection_id}/members")
+def remove_collection_members(
+    kind: CollectionKind,
+    collection_id: str,
+    batch: BatchIn,
+    db: MediaDB = Depends(get_db),
+):
+    removed = db.remove_collection_members(kind, collection_id, batch.ids)
+    return {"success": True, "removed": removed}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.costars import CoStarGraph
+from app.deps import get_costars, require
+
+router = APIRouter(prefix="/api", tags=["costars"])
+
+require_costars = require(get_costars, "The co-star graph needs the SQLite database")
+
+
+@router.get("/actors/{actor_id}/costars")
+def read_costars(
+    actor_id: str,
+    limit: int = Query(20, ge=1, le=500),
+    costars: CoStarGraph = Depends(require_costars),
+):
+    """Actors who appear in the most titles with this one."""
+    result = costars.costars(actor_id, limit)
+    if result is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Actor has no credits")
+    return result
+
+
+@router.get("/path")
+def read_costar_path(
+    source: str = Query(..., alias="from"),
+    target: str = Query(..., alias="to"),
+    costars: CoStarGraph = Depends(require_costars),
+):
+    """Shortest chain of shared titles between two actors."""
+    path = costars.path(source, target)
+    if path is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "No path between these actors")
+    return {"degrees": len(path) // 2, "path": path}
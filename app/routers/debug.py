@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+
+from app import timing
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+def _require_metrics():
+    # looked up on each call: METRICS only exists when DEBUG_METRICS is on
+    if timing.METRICS is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Metrics are disabled")
+    return timing.METRICS
+
+
+@router.get("/metrics")
+def read_metrics(request: Request, top: int = Query(20, ge=0, le=500)):
+    """
+    Per-route latency histograms (ms, p50/p95/p99 are bucket estimates),
+    the most expensive normalised queries and write queue counters, for
+    this worker process.
+    """
+    snapshot = _require_metrics().snapshot(top_queries=top)
+    writes = getattr(request.app.state, "writes", None)
+    snapshot["writes"] = writes.status() if writes else None
+    return snapshot
+
+
+@router.delete("/metrics")
+def reset_metrics():
+    _require_metrics().reset()
+    return {"success": True}
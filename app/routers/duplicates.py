@@ -0,0 +1,74 @@
+from typing import Literal
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from app.db.db_control import MediaDB
+from app.dedupe import KINDS, DuplicateFinder
+from app.deps import get_db, get_dedupe, require
+
+router = APIRouter(prefix="/api", tags=["duplicates"])
+
+require_dedupe = require(get_dedupe, "Duplicate detection needs the SQLite database")
+
+DuplicateKind = Literal["actor", "title"]
+
+
+@router.get("/duplicates", dependencies=[Depends(require_dedupe)])
+def read_duplicates(
+    kind: DuplicateKind = "actor",
+    status_: Literal["pending", "approved", "rejected", "merged"] = Query(
+        "pending", alias="status"
+    ),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: MediaDB = Depends(get_db),
+):
+    """The review queue: likely duplicate pairs, most similar first."""
+    return db.get_duplicate_candidates(kind, status_, limit, offset)
+
+
+@router.get("/duplicates/scan")
+def read_duplicate_scan(dedupe: DuplicateFinder = Depends(require_dedupe)):
+    """Counts and timings of the last scan."""
+    return dedupe.status()
+
+
+@router.post("/duplicates/scan", status_code=status.HTTP_202_ACCEPTED)
+def start_duplicate_scan(
+    background: BackgroundTasks,
+    kind: DuplicateKind | None = Query(None, description="Both kinds if omitted"),
+    dedupe: DuplicateFinder = Depends(require_dedupe),
+):
+    if dedupe.status()["running"]:
+        raise HTTPException(status.HTTP_409_CONFLICT, "A scan is already running")
+    background.add_task(dedupe.scan, (kind,) if kind else KINDS)
+    return {"accepted": True}
+
+
+@router.post("/duplicates/approve", dependencies=[Depends(require_dedupe)])
+def approve_duplicates(
+    kind: DuplicateKind,
+    min_score: float = Query(..., ge=0, le=1),
+    db: MediaDB = Depends(get_db),
+):
+    """Approve every pending pair scoring at least min_score."""
+    return {"approved": db.approve_duplicates_above(kind, min_score)}
+
+
+@router.post("/duplicates/merge", dependencies=[Depends(require_dedupe)])
+def merge_duplicates(kind: DuplicateKind, db: MediaDB = Depends(get_db)):
+    """Merge all approved pairs of one kind, in one transaction."""
+    return db.merge_duplicates(kind)
+
+
+@router.post(
+    "/duplicates/{candidate_id}/{decision}", dependencies=[Depends(require_dedupe)]
+)
+def review_duplicate(
+    candidate_id: int,
+    decision: Literal["approve", "reject", "reset"],
+    keep: str | None = Query(None, description="Id to keep, if not the proposed one"),
+    db: MediaDB = Depends(get_db),
+):
+    new_status = {"approve": "approved", "reject": "rejected", "reset": "pending"}[decision]
+    if not db.review_duplicates([candidate_id], new_status, keep):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "No open pair with this id")
+    return {"id": candidate_id, "status": new_status}
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
+from app.db.db_control import MediaDB
+from app.deps import get_db, get_thumbnails
+from app.images import LOGOS_DIR, THUMB_FORMATS, ThumbnailService, pick_format
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+THUMB_CACHE_CONTROL = "public, max-age=86400"
+
+
+def _thumbnail_response(
+    request: Request,
+    thumbs: ThumbnailService,
+    src,
+    w: int | None,
+    fmt: str | None,
+):
+    fmt = pick_format(fmt, request.headers.get("accept", ""))
+    try:
+        path, etag = thumbs.get(src, w, fmt)
+    except OSError as e:
+        # corrupt or not an image at all (PIL.UnidentifiedImageError)
+        print(f"Thumbnail failed for {src}: {e}")
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Image could not be read")
+    headers = {
+        "ETag": etag,
+        "Cache-Control": THUMB_CACHE_CONTROL,
+        "Vary": "Accept",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(path, media_type=THUMB_FORMATS[fmt][1], headers=headers)
+
+
+@router.get("/artwork/{media_id}")
+def artwork_thumbnail(
+    request: Request,
+    media_id: str,
+    w: int | None = None,
+    fmt: str | None = None,
+    db: MediaDB = Depends(get_db),
+    thumbs: ThumbnailService = Depends(get_thumbnails),
+):
+    """Sized thumbnail of a movie/show's artwork (w snaps to 160/320/640)."""
+    src = thumbs.resolve_source(db.get_artwork_path(media_id))
+    if src is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Artwork not found")
+    return _thumbnail_response(request, thumbs, src, w, fmt)
+
+
+@router.get("/logos/{filename}")
+def logo_thumbnail(
+    request: Request,
+    filename: str,
+    w: int | None = None,
+    fmt: str | None = None,
+    thumbs: ThumbnailService = Depends(get_thumbnails),
+):
+    src = LOGOS_DIR / filename
+    if "/" in filename or ".." in filename or not src.is_file():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Logo not found")
+    return _thumbnail_response(request, thumbs, src, w, fmt)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from app.db.db_control import MediaDB
+from app.deps import get_db, get_library, require
+from app.library import LibraryScanner
+
+router = APIRouter(prefix="/api", tags=["library"])
+
+require_library = require(
+    get_library, "Set LIBRARY_DIRS (SQLite database only) to scan for files"
+)
+
+
+@router.get("/library")
+def read_library_status(library: LibraryScanner = Depends(require_library)):
+    """Scanned roots and the counts and timings of the last scan."""
+    return library.status()
+
+
+@router.post("/library/scan", status_code=status.HTTP_202_ACCEPTED)
+def start_library_scan(
+    background: BackgroundTasks,
+    full: bool = Query(False, description="Re-list every directory, not just changed ones"),
+    library: LibraryScanner = Depends(require_library),
+):
+    if library.status()["running"]:
+        raise HTTPException(status.HTTP_409_CONFLICT, "A scan is already running")
+    background.add_task(library.scan, full)
+    return {"accepted": True}
+
+
+@router.get("/media/{media_id}/files", dependencies=[Depends(require_library)])
+def read_media_files(media_id: str, db: MediaDB = Depends(get_db)):
+    """Files the scanner matched to this title, with their stream info."""
+    return db.get_media_files(media_id)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from app.deps import get_maintenance, require
+from app.maintenance import JOBS, MaintenanceService
+
+router = APIRouter(prefix="/api", tags=["maintenance"])
+
+require_maintenance = require(get_maintenance, "Maintenance needs the SQLite database")
+
+
+@router.get("/maintenance")
+def read_maintenance_status(
+    maintenance: MaintenanceService = Depends(require_maintenance),
+):
+    """Idle state, WAL size and the result and timing of each job's last run."""
+    return maintenance.status()
+
+
+@router.post("/maintenance/{job}", status_code=status.HTTP_202_ACCEPTED)
+def start_maintenance(
+    job: str,
+    background: BackgroundTasks,
+    maintenance: MaintenanceService = Depends(require_maintenance),
+):
+    """Run one job now (optimize, checkpoint, vacuum, quick_check)."""
+    if job not in JOBS:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Unknown job: {job}")
+    if maintenance.status()["running"]:
+        raise HTTPException(status.HTTP_409_CONFLICT, "A maintenance job is running")
+    background.add_task(maintenance.run, job)
+    return {"accepted": True}
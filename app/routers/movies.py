@@ -4,6 +4,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from app.db.db_control import MediaDB
 from app.db.pydantic_models import MovieOut, MovieUpdate
 from app.deps import get_db, get_templates
+from app.timing import span
 
 router = APIRouter(prefix="/movies", tags=["movies"])
 
@@ -15,7 +16,8 @@ def list_movies(
     templates: Jinja2Templates = Depends(get_templates),
 ):
     rows = db.get_movies()  # returns sqlite3.Row[]
-    movies = [MovieOut(**dict(row)) for row in rows]
+    with span("serialize"):
+        movies = [MovieOut(**dict(row)) for row in rows]
     return templates.TemplateResponse(
         "movies.html", {"request": request, "movies": movies}
     )
@@ -35,15 +37,18 @@ def movie_detail(
             "404.html", {"request": request}, status_code=404
         )
 
+    similar = (
+        db.get_similar(movie["media_id"])
+        if db.backend.dialect == "sqlite"
+        else []
+    )
     return templates.TemplateResponse(
-        "movie_detail.html", {"request": request, "movie": movie}
+        "movie_detail.html", {"request": request, "movie": movie, "similar": similar}
     )
 
 
 @router.post("/{movie_id}/edit")
-async def update_movie(
-    movie_id: int, patch: MovieUpdate, db: MediaDB = Depends(get_db)
-):
+def update_movie(movie_id: str, patch: MovieUpdate, db: MediaDB = Depends(get_db)):
     """Updates a movie entry in the database."""
     changes = patch.model_dump(exclude_unset=True)
     if not changes:
@@ -52,6 +57,8 @@ async def update_movie(
         updated = db.update_movie(movie_id, changes)
     except KeyError:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Movie not found")
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
     except Exception as e:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, str(e))
 
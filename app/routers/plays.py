@@ -0,0 +1,36 @@
+import shutil
+import tempfile
+from fastapi import APIRouter, Depends, Query, UploadFile
+from app.db.db_control import MediaDB
+from app.deps import get_sqlite_db, require
+from app.history import import_history, resolve_pending
+
+router = APIRouter(prefix="/api", tags=["plays"])
+
+require_plays = require(get_sqlite_db, "Watch history needs the SQLite database")
+
+
+@router.get("/stats/plays")
+def read_play_stats(
+    top: int = Query(20, ge=1, le=500), db: MediaDB = Depends(require_plays)
+):
+    """Totals, plays per month and the most watched titles, genres and actors."""
+    return db.get_play_stats(top)
+
+
+@router.post("/plays/import")
+def import_plays(file: UploadFile, db: MediaDB = Depends(require_plays)):
+    """
+    Import a viewing-history CSV (Title,Date or ViewingActivity.csv).
+    Uploading the same export again adds nothing.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".csv") as tmp:
+        shutil.copyfileobj(file.file, tmp)
+        tmp.flush()
+        return import_history(db, tmp.name, source=file.filename)
+
+
+@router.post("/plays/resolve")
+def resolve_plays(db: MediaDB = Depends(require_plays)):
+    """Match plays whose titles have since been added to the catalog."""
+    return resolve_pending(db)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from app.db.db_control import MediaDB
+from app.deps import get_db, get_similar, require
+from app.similar import SimilarityEngine
+
+router = APIRouter(prefix="/api", tags=["similar"])
+
+require_similar = require(get_similar, "Similar titles need the SQLite database")
+
+
+@router.get("/similar")
+def read_similar_status(similar: SimilarityEngine = Depends(require_similar)):
+    """Timings and counts of the last "more like this" refresh."""
+    return similar.status()
+
+
+@router.post("/similar/refresh", status_code=status.HTTP_202_ACCEPTED)
+def start_similar_refresh(
+    background: BackgroundTasks,
+    full: bool = Query(False, description="Rescore every title, not just changed ones"),
+    similar: SimilarityEngine = Depends(require_similar),
+):
+    if similar.status()["running"]:
+        raise HTTPException(status.HTTP_409_CONFLICT, "A refresh is already running")
+    background.add_task(similar.refresh, full)
+    return {"accepted": True}
+
+
+@router.get("/media/{media_id}/similar", dependencies=[Depends(require_similar)])
+def read_similar_titles(
+    media_id: str,
+    limit: int = Query(12, ge=1, le=100),
+    db: MediaDB = Depends(get_db),
+):
+    """Precomputed titles sharing the most (weighted) cast and genres."""
+    return db.get_similar(media_id, limit)
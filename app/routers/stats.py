@@ -0,0 +1,20 @@
+from fastapi import Request, APIRouter, Depends
+from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse
+from app.db.db_control import MediaDB
+from app.deps import get_templates
+from app.routers.plays import require_plays
+
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("", response_class=HTMLResponse, include_in_schema=False)
+def play_stats(
+    request: Request,
+    db: MediaDB = Depends(require_plays),
+    templates: Jinja2Templates = Depends(get_templates),
+):
+    """Watch history stats, read from the rollup tables only."""
+    stats = db.get_play_stats()
+    return templates.TemplateResponse("stats.html", {"request": request, "stats": stats})
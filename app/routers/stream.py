@@ -0,0 +1,41 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.db.db_control import MediaDB
+from app.deps import get_db, get_library, require
+from app.streaming import MediaFileResponse
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+
+@router.api_route(
+    "/{media_id}",
+    methods=["GET", "HEAD"],
+    dependencies=[Depends(require(get_library, "Set LIBRARY_DIRS to stream files"))],
+)
+def stream_media(
+    media_id: str,
+    season: int | None = Query(None, ge=0),
+    episode: int | None = Query(None, ge=0),
+    db: MediaDB = Depends(get_db),
+):
+    """
+    The file the library scanner matched to a movie, or to one episode of a
+    show (?season=&episode=, else the first one). Supports Range / If-Range,
+    so players can seek.
+    """
+    files = db.get_media_files(media_id)  # episodes come in order
+    if season is not None or episode is not None:
+        files = [
+            f
+            for f in files
+            if (season is None or f["season"] == season)
+            and (episode is None or f["episode"] == episode)
+        ]
+    elif all(f["episode"] is None for f in files):
+        # several versions of a movie: the biggest is usually the best one
+        files.sort(key=lambda f: -f["size"])
+    for f in files:
+        if os.path.isfile(f["path"]):
+            return MediaFileResponse(f["path"])
+    raise HTTPException(status.HTTP_404_NOT_FOUND, "No file for this title")
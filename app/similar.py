@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.db.db_control import MediaDB
+
+# Neighbours stored per title
+SIMILAR_TOP_K = int(os.environ.get("SIMILAR_TOP_K", 20))
+# Seconds between checks of the change log for catalog edits
+SIMILAR_REFRESH_INTERVAL = int(os.environ.get("SIMILAR_REFRESH_INTERVAL", 60))
+# Incremental refreshes keep the IDF weights of the last full build; rebuild
+# everything this often (seconds) so they don't drift
+SIMILAR_FULL_INTERVAL = int(os.environ.get("SIMILAR_FULL_INTERVAL", 24 * 3600))
+# Weight of a genre relative to a top-billed actor
+SIMILAR_GENRE_WEIGHT = float(os.environ.get("SIMILAR_GENRE_WEIGHT", 0.5))
+# Score cells (rows x titles) computed at once; bounds memory of a refresh
+SIMILAR_BLOCK_CELLS = int(os.environ.get("SIMILAR_BLOCK_CELLS", 4 * 1024 * 1024))
+# Recompute the whole kind when an incremental refresh touches more than this
+SIMILAR_FULL_RATIO = float(os.environ.get("SIMILAR_FULL_RATIO", 0.25))
+
+# Features on more than this share of titles (genres, mostly) are scored with
+# a dense matrix product; expanding their postings per row would cost more
+_DENSE_SHARE = 1 / 32
+_MAX_DENSE = 512
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenated arange(s, s + n) for each (s, n), without a Python loop."""
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+class FeatureMatrix:
+    """
+    TF-IDF title x feature matrix of one kind. Actors weigh 1/sqrt(billing
+    order), genres SIMILAR_GENRE_WEIGHT; both times IDF, rows L2-normalised,
+    so a row product is a cosine similarity.
+
+    Rare features are kept as CSR (title -> features) and CSC (feature ->
+    titles) arrays; frequent ones as a small dense title x feature matrix.
+    """
+
+    def __init__(self, rows: list[tuple], genre_weight: float = SIMILAR_GENRE_WEIGHT):
+        if rows:
+            media, features, billing = zip(*rows)
+        else:
+            media, features, billing = (), (), ()
+        self.ids, title = np.unique(np.array(media, dtype=object), return_inverse=True)
+        _, feature = np.unique(np.array(features, dtype=object), return_inverse=True)
+        self.position = {media_id: i for i, media_id in enumerate(self.ids)}
+        n = self.n = len(self.ids)
+        n_features = int(feature.max()) + 1 if len(feature) else 0
+
+        billing = np.array([b or 0 for b in billing], dtype=np.float64)
+        weight = np.where(billing > 0, 1 / np.sqrt(np.maximum(billing, 1)), genre_weight)
+        df = np.bincount(feature, minlength=n_features)
+        idf = np.log((1 + n) / (1 + df)) + 1
+        weight = weight * idf[feature]
+        norm = np.sqrt(np.bincount(title, weight * weight, minlength=n))
+        weight = (weight / norm[title]).astype(np.float32)
+
+        # features shared by many titles go dense
+        dense = np.flatnonzero(df > max(n * _DENSE_SHARE, 1))
+        dense = dense[np.argsort(-df[dense])][:_MAX_DENSE]
+        dense_col = np.full(n_features, -1)
+        dense_col[dense] = np.arange(len(dense))
+        is_dense = dense_col[feature] >= 0
+        self.dense = np.zeros((n, len(dense)), dtype=np.float32)
+        self.dense[title[is_dense], dense_col[feature[is_dense]]] = weight[is_dense]
+
+        title, feature, weight = title[~is_dense], feature[~is_dense], weight[~is_dense]
+        order = np.argsort(title, kind="stable")
+        self.row_ptr = np.concatenate(([0], np.cumsum(np.bincount(title, minlength=n))))
+        self.row_feature, self.row_weight = feature[order], weight[order]
+        order = np.argsort(feature, kind="stable")
+        self.col_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(feature, minlength=n_features)))
+        )
+        self.col_title, self.col_weight = title[order], weight[order]
+
+    def scores(self, rows: np.ndarray) -> np.ndarray:
+        """Cosine similarity of `rows` against every title, shape (len(rows), n)."""
+        n = self.n
+        if self.dense.shape[1]:
+            out = self.dense[rows] @ self.dense.T
+        else:
+            out = np.zeros((len(rows), n), dtype=np.float32)
+        # sparse part: for each nonzero (q, f, w) of the query rows, every
+        # title j with f contributes w * w_jf to out[q, j]
+        lengths = self.row_ptr[rows + 1] - self.row_ptr[rows]
+        nz = _ranges(self.row_ptr[rows], lengths)
+        if len(nz):
+            query = np.repeat(np.arange(len(rows)), lengths)
+            feature, weight = self.row_feature[nz], self.row_weight[nz]
+            fan_out = self.col_ptr[feature + 1] - self.col_ptr[feature]
+            postings = _ranges(self.col_ptr[feature], fan_out)
+            cell = np.repeat(query * n, fan_out) + self.col_title[postings]
+            contrib = np.repeat(weight, fan_out) * self.col_weight[postings]
+            out += np.bincount(cell, contrib, minlength=len(rows) * n).reshape(len(rows), n)
+        out[np.arange(len(rows)), rows] = 0  # not similar to itself
+        return out
+
+    def blocks(self, rows: np.ndarray, cells: int = SIMILAR_BLOCK_CELLS):
+        """(rows, scores) in chunks of at most `cells` scores."""
+        step = max(1, cells // max(self.n, 1))
+        for i in range(0, len(rows), step):
+            chunk = rows[i : i + step]
+            yield chunk, self.scores(chunk)
+
+    def top_k(self, chunk: np.ndarray, scores: np.ndarray, k: int) -> list[tuple]:
+        """(media_id, rank, similar_id, score) rows for a scored chunk."""
+        k = min(k, self.n - 1)
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        # scores are sorted, so the positive ones are a prefix of each row
+        keep_row, keep_col = np.nonzero(best_scores > 0)
+        return list(
+            zip(
+                self.ids[chunk[keep_row]].tolist(),
+                (keep_col + 1).tolist(),
+                self.ids[best[keep_row, keep_col]].tolist(),
+                best_scores[keep_row, keep_col].astype(np.float64).round(4).tolist(),
+            )
+        )
+
+
+class SimilarityEngine:
+    """
+    Keeps similar_titles current. A full build scores every title against
+    every other of its kind. After that, refresh() reads the change log and
+    recomputes only the lists that can have changed:
+
+    - titles whose credits or genres changed (or that were deleted),
+    - titles listing one of those as a neighbour,
+    - titles for which one of them now beats their weakest neighbour.
+
+    The last set comes from the changed titles' own score rows (cosine is
+    symmetric), so nothing else has to be scored.
+    """
+
+    def __init__(self, db: MediaDB, top_k: int = SIMILAR_TOP_K):
+        self.db = db
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        # media_id -> score a new neighbour must beat; loaded on first use
+        self._thresholds: dict[str, float] | None = None
+        self.last_run: dict | None = None
+        self.runs = 0
+
+    def _due_full(self, meta: dict, changes: dict) -> bool:
+        if changes["reset"] or not meta["built_at"]:
+            return True
+        built = datetime.fromisoformat(meta["built_at"]).replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - built > timedelta(seconds=SIMILAR_FULL_INTERVAL)
+
+    def _refresh_kind(self, kind: str, full: bool, changed: set[str]) -> tuple:
+        matrix = FeatureMatrix(self.db.get_similarity_features(kind))
+        if full:
+            rows = np.arange(matrix.n)
+        else:
+            changed_rows = np.array(
+                sorted(matrix.position[m] for m in changed if m in matrix.position),
+                dtype=np.int64,
+            )
+            recompute = set(self.db.get_similar_listers(sorted(changed)))
+            thresholds = self._thresholds
+            floor = np.array(
+                [thresholds.get(m, 0.0) for m in matrix.ids], dtype=np.float32
+            )
+            for _, scores in matrix.blocks(changed_rows):
+                beaten = np.flatnonzero((scores > floor).any(axis=0))
+                recompute.update(matrix.ids[beaten])
+            recompute.update(changed)
+            rows = np.array(
+                sorted(matrix.position[m] for m in recompute if m in matrix.position),
+                dtype=np.int64,
+            )
+            if len(rows) > SIMILAR_FULL_RATIO * matrix.n:
+                rows = np.arange(matrix.n)
+            # titles that lost every feature just get their list cleared
+            changed = recompute
+        out = []
+        for chunk, scores in matrix.blocks(rows):
+            out += matrix.top_k(chunk, scores, self.top_k)
+        replaced = set(matrix.ids[rows]) | (set() if full else changed)
+        return out, replaced, matrix.n
+
+    def refresh(self, full: bool = False) -> dict:
+        """Bring similar_titles up to date with the change log."""
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "refresh already running"}
+        t0 = time.perf_counter()
+        try:
+            meta = self.db.get_similar_meta()
+            changes = self.db.get_similar_changes(meta["last_seq"])
+            full = full or self._due_full(meta, changes)
+            changed = changes["media_ids"] | changes["deleted"]
+            if not full and not changed:
+                if changes["last_seq"] > meta["last_seq"]:
+                    self.db.save_similar([], [], changes["last_seq"])
+                return {"changed": 0}
+            if not full and self._thresholds is None:
+                self._thresholds = self.db.get_similar_thresholds(self.top_k)
+
+            rows, replaced, titles = [], set(), 0
+            for kind in ("movie", "show"):
+                kind_rows, kind_replaced, n = self._refresh_kind(kind, full, changed)
+                rows += kind_rows
+                replaced |= kind_replaced
+                titles += n
+            self.db.save_similar(rows, sorted(replaced), changes["last_seq"], full)
+
+            # keep the thresholds in step with what was just written
+            if self._thresholds is None:
+                self._thresholds = {}
+            if full:
+                self._thresholds.clear()
+            for media_id in replaced:
+                self._thresholds.pop(media_id, None)
+            counts: dict[str, int] = {}
+            for media_id, rank, _, score in rows:
+                counts[media_id] = rank
+                if rank == self.top_k:
+                    self._thresholds[media_id] = score
+            for media_id, rank in counts.items():
+                if rank < self.top_k:
+                    self._thresholds[media_id] = 0.0
+
+            self.last_run = {
+                "full": full,
+                "titles": titles,
+                "changed": len(changed),
+                "recomputed": len(replaced),
+                "neighbours": len(rows),
+                "last_seq": changes["last_seq"],
+                "duration_s": round(time.perf_counter() - t0, 3),
+            }
+            self.runs += 1
+            return self.last_run
+        finally:
+            self._lock.release()
+
+    def status(self) -> dict:
+        return {
+            "running": self._lock.locked(),
+            "top_k": self.top_k,
+            "runs": self.runs,
+            "last_run": self.last_run,
+        }
+
+
+if __name__ == "__main__":
+    # python -m app.similar [db_path] [--full]
+    import sys
+
+    args = [a for a in sys.argv[1:] if a != "--full"]
+    db = MediaDB(args[0] if args else "dbs/scratch_test.db", read_cache=False)
+    db.init_change_log()
+    db.init_similar()
+    print(SimilarityEngine(db).refresh(full="--full" in sys.argv))
@@ -0,0 +1,222 @@
+import hashlib
+import mimetypes
+import os
+import secrets
+from email.utils import formatdate
+
+import anyio
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response
+
+# Bytes per read on the async fallback path; also the most one client holds
+# in memory at a time, since send() waits for the socket to drain
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 256 * 1024))
+# Threads reading media files. Separate from the default pool that runs sync
+# routes, so many slow clients can't starve the rest of the app.
+STREAM_READ_THREADS = int(os.environ.get("STREAM_READ_THREADS", 16))
+
+_VIDEO_TYPES = {
+    ".mkv": "video/x-matroska",
+    ".mp4": "video/mp4",
+    ".m4v": "video/mp4",
+    ".mov": "video/quicktime",
+    ".webm": "video/webm",
+    ".avi": "video/x-msvideo",
+    ".wmv": "video/x-ms-wmv",
+    ".mpg": "video/mpeg",
+    ".mpeg": "video/mpeg",
+    ".ts": "video/mp2t",
+    ".m2ts": "video/mp2t",
+}
+
+_read_limiter: anyio.CapacityLimiter | None = None
+
+
+def _limiter() -> anyio.CapacityLimiter:
+    # created lazily, it has to belong to the running event loop
+    global _read_limiter
+    if _read_limiter is None:
+        _read_limiter = anyio.CapacityLimiter(STREAM_READ_THREADS)
+    return _read_limiter
+
+
+def media_type_for(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return _VIDEO_TYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+class _BadRange(ValueError):
+    """Range header that isn't bytes=first-last[, ...]: 400."""
+
+
+def parse_range(header: str, size: int) -> list[tuple[int, int]]:
+    """
+    Byte ranges of a Range header as sorted, merged [start, end) pairs.
+    Ranges starting past the end are dropped; an empty result means 416.
+    Raises _BadRange if the header can't be parsed.
+    """
+    unit, eq, spec = header.partition("=")
+    if not eq or unit.strip().lower() != "bytes":
+        raise _BadRange(header)
+    ranges = []
+    for part in spec.split(","):
+        first, dash, last = part.strip().partition("-")
+        if not dash or not (first or last) or not (first + last).isdigit():
+            raise _BadRange(header)
+        if not first:
+            # suffix: the last N bytes
+            start, end = max(size - int(last), 0), size
+        else:
+            start = int(first)
+            end = min(int(last) + 1, size) if last else size
+            if last and int(last) < start:
+                raise _BadRange(header)
+        if start < end:
+            ranges.append((start, end))
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class MediaFileResponse(Response):
+    """
+    Response for large media files with its own Range handling: 206 for one
+    range, multipart/byteranges for several, 416 past the end, If-Range
+    against the ETag or Last-Modified. Every range is sent the same way:
+
+    - One descriptor is opened and fstat'ed up front, so the headers and the
+      bytes describe the same file even if it is replaced mid-request.
+    - If the server supports the ASGI zero-copy extension
+      (http.response.zerocopysend), the kernel sends the range straight
+      from the page cache with sendfile.
+    - Otherwise the range is read with os.pread, STREAM_CHUNK_SIZE at a
+      time, on a limited thread pool. Each send() waits for the client to
+      take the chunk, so memory stays bounded per connection.
+    """
+
+    chunk_size = STREAM_CHUNK_SIZE
+
+    def __init__(self, path: str, status_code: int = 200, headers=None, media_type=None):
+        self.path = path
+        self.status_code = status_code
+        self.media_type = media_type or media_type_for(path)
+        self.background = None
+        self.init_headers(headers)
+        self.headers.setdefault("content-disposition", "inline")
+        self.headers.setdefault("accept-ranges", "bytes")
+        self._fd: int | None = None
+        self._zerocopy = False
+
+    def _set_stat_headers(self, st: os.stat_result):
+        tag = hashlib.md5(f"{st.st_mtime}-{st.st_size}".encode(), usedforsecurity=False)
+        self.headers.setdefault("content-length", str(st.st_size))
+        self.headers.setdefault("last-modified", formatdate(st.st_mtime, usegmt=True))
+        self.headers.setdefault("etag", f'"{tag.hexdigest()}"')
+
+    def _wanted_ranges(self, scope, size: int) -> list[tuple[int, int]] | None:
+        """None for the whole file; raises _BadRange, [] if unsatisfiable."""
+        request_headers = Headers(scope=scope)
+        header = request_headers.get("range")
+        if self.status_code != 200 or not header:
+            return None
+        if_range = request_headers.get("if-range")
+        if if_range and if_range not in (self.headers["etag"], self.headers["last-modified"]):
+            return None  # the file changed since the client's copy
+        return parse_range(header, size)
+
+    async def __call__(self, scope, receive, send):
+        self._zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        header_only = scope["method"].upper() == "HEAD"
+        self._fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            st = os.fstat(self._fd)
+            size = st.st_size
+            self._set_stat_headers(st)
+            try:
+                ranges = self._wanted_ranges(scope, size)
+            except _BadRange:
+                await PlainTextResponse("Malformed range header.", 400)(scope, receive, send)
+                return
+            if ranges is None:
+                await self._send_file(send, [(0, size)], self.status_code, header_only)
+            elif not ranges:
+                await PlainTextResponse(
+                    "Range not satisfiable.", 416, headers={"content-range": f"*/{size}"}
+                )(scope, receive, send)
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self.headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+                self.headers["content-length"] = str(end - start)
+                await self._send_file(send, ranges, 206, header_only)
+            else:
+                await self._send_multipart(send, ranges, size, header_only)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    async def _send_file(self, send, ranges, status: int, header_only: bool, parts=None):
+        """Headers, then each range (preceded by parts[i] if given) and the trailer."""
+        await send({"type": "http.response.start", "status": status, "headers": self.raw_headers})
+        if header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        for i, (start, end) in enumerate(ranges):
+            if parts:
+                await send({"type": "http.response.body", "body": parts[i], "more_body": True})
+            await self._send_range(send, start, end, more_body=bool(parts))
+        if parts:
+            await send({"type": "http.response.body", "body": parts[-1], "more_body": False})
+
+    async def _send_multipart(self, send, ranges, size: int, header_only: bool):
+        boundary = secrets.token_hex(13)
+        # part headers; the CRLF ending each part's bytes opens the next one
+        parts = [
+            (
+                f"--{boundary}\r\n"
+                f"Content-Type: {self.media_type}\r\n"
+                f"Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n"
+            ).encode("latin-1")
+            for start, end in ranges
+        ]
+        parts = parts[:1] + [b"\r\n" + p for p in parts[1:]]
+        parts.append(f"\r\n--{boundary}--\r\n".encode("latin-1"))
+        length = sum(len(p) for p in parts) + sum(end - start for start, end in ranges)
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(length)
+        await self._send_file(send, ranges, 206, header_only, parts)
+
+    async def _send_range(self, send, start: int, end: int, more_body: bool = False):
+        if start >= end:
+            if not more_body:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if self._zerocopy:
+            await send(
+                {
+                    "type": "http.response.zerocopysend",
+                    "file": self._fd,
+                    "offset": start,
+                    "count": end - start,
+                    "more_body": more_body,
+                }
+            )
+            return
+        limiter = _limiter()
+        while start < end:
+            chunk = await anyio.to_thread.run_sync(
+                os.pread, self._fd, min(self.chunk_size, end - start), start,
+                limiter=limiter,
+            )
+            if not chunk:  # truncated since the fstat
+                break
+            start += len(chunk)
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body or start < end}
+            )
+        if start < end and not more_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,373 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+
+from fastapi.responses import JSONResponse
+from fastapi.templating import Jinja2Templates
+from starlette.datastructures import MutableHeaders
+
+# Server-Timing headers, query timing and /debug/metrics. Off unless set to
+# 1 (the reload dev server in app/main.py turns it on): when off there is no
+# middleware, no hooks and no route.
+DEBUG_METRICS = os.environ.get("DEBUG_METRICS", "0") != "0"
+# Individual queries listed in the Server-Timing header, slowest first
+SERVER_TIMING_MAX_QUERIES = int(os.environ.get("SERVER_TIMING_MAX_QUERIES", 5))
+
+# Histogram bucket upper bounds in ms; the last bucket is everything above
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current: ContextVar["RequestTimings | None"] = ContextVar("request_timings", default=None)
+
+
+# ====================== SQL normalisation ====================== #
+
+_SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_SPACE = re.compile(r"\s+")
+_SQL_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str, max_len: int = 160) -> str:
+    """One line, literals replaced by ?, so the same query groups together."""
+    sql = _SQL_COMMENT.sub(" ", sql)
+    sql = _SQL_STRING.sub("?", sql)
+    sql = _SQL_NUMBER.sub("?", sql)
+    sql = _SQL_PARAM_LIST.sub("(?...)", sql)
+    sql = _SQL_SPACE.sub(" ", sql).strip().rstrip(";")
+    return sql if len(sql) <= max_len else sql[: max_len - 3] + "..."
+
+
+# ====================== Per-request spans ====================== #
+
+
+class RequestTimings:
+    """Spans collected while one request is handled."""
+
+    def __init__(self):
+        self.totals: dict[str, float] = {}
+        self.descs: dict[str, str] = {}
+        self.queries: list[tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, ms: float, desc: str | None = None):
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0.0) + ms
+            if desc:
+                self.descs[name] = desc
+
+    def add_query(self, sql: str, ms: float):
+        with self._lock:
+            self.queries.append((sql, ms))
+            self.totals["db"] = self.totals.get("db", 0.0) + ms
+
+    def header(self, total_ms: float) -> str:
+        parts = []
+        for name, ms in self.totals.items():
+            desc = self.descs.get(name)
+            if name == "db":
+                n = len(self.queries)
+                desc = f"{n} {'query' if n == 1 else 'queries'}"
+            parts.append(_metric(name, ms, desc))
+        slowest = sorted(self.queries, key=lambda q: q[1], reverse=True)
+        for i, (sql, ms) in enumerate(slowest[:SERVER_TIMING_MAX_QUERIES], 1):
+            parts.append(_metric(f"q{i}", ms, normalize_sql(sql)))
+        parts.append(_metric("total", total_ms))
+        return ", ".join(parts)
+
+
+def _metric(name: str, ms: float, desc: str | None = None) -> str:
+    out = f"{name};dur={ms:.2f}"
+    if desc:
+        escaped = desc.replace("\\", "\\\\").replace('"', '\\"')
+        out += f';desc="{escaped}"'
+    return out
+
+
+@contextmanager
+def span(name: str, desc: str | None = None):
+    """Time a block into the current request's Server-Timing; no-op outside one."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - t0) * 1000, desc)
+
+
+def record_query(sql: str, ms: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.add_query(sql, ms)
+    if METRICS is not None:
+        METRICS.observe_query(sql, ms)
+
+
+# ====================== Database hooks ====================== #
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Times execute plus the fetches that follow it as one query."""
+
+    _sql: str | None = None
+    _ms: float = 0.0
+
+    def _flush(self):
+        if self._sql is not None:
+            record_query(self._sql, self._ms)
+            self._sql = None
+
+    def execute(self, sql, params=()):
+        self._flush()
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._sql, self._ms = sql, (time.perf_counter() - t0) * 1000
+
+    def executemany(self, sql, seq):
+        self._flush()
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq)
+        finally:
+            self._sql, self._ms = sql, (time.perf_counter() - t0) * 1000
+
+    def _timed_fetch(self, fetch, *args):
+        t0 = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            self._ms += (time.perf_counter() - t0) * 1000
+            self._flush()
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._ms += (time.perf_counter() - t0) * 1000
+        return row
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed_fetch(super().fetchmany)
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors (and conn.execute) are timed."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+
+def instrument_engine(engine):
+    """Same query timing for the SQLAlchemy backend, via engine events."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        t0 = conn.info["query_start"].pop()
+        record_query(statement, (time.perf_counter() - t0) * 1000)
+
+
+def _timed_open(open_fn):
+    @wraps(open_fn)
+    def wrapper(*args, **kwargs):
+        with span("db-connect"):
+            return open_fn(*args, **kwargs)
+
+    return wrapper
+
+
+def instrument_backend(backend):
+    """
+    MediaDB hook: time connection setup and every query on this backend.
+    Call once on the backend the app uses, e.g. instrument_backend(db.backend).
+    """
+    if hasattr(backend, "connection_factory"):
+        backend.connection_factory = TimedConnection
+        backend._open = _timed_open(backend._open)
+        if hasattr(backend, "_open_snapshot"):
+            backend._open_snapshot = _timed_open(backend._open_snapshot)
+    elif hasattr(backend, "engine"):
+        instrument_engine(backend.engine)
+
+
+# ====================== Templates ====================== #
+
+
+class TimedJinja2Templates(Jinja2Templates):
+    """TemplateResponse renders eagerly, so timing the call times the render."""
+
+    def TemplateResponse(self, *args, **kwargs):
+        name = kwargs.get("name")
+        if name is None:
+            name = next((a for a in args if isinstance(a, str)), None)
+        with span("render", name):
+            return super().TemplateResponse(*args, **kwargs)
+
+
+class TimedJSONResponse(JSONResponse):
+    """Default response class while metrics are on: json.dumps shows up as serialize."""
+
+    def render(self, content) -> bytes:
+        with span("serialize"):
+            return super().render(content)
+
+
+# ====================== Aggregated metrics ====================== #
+
+
+class _Histogram:
+    __slots__ = ("count", "sum", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, ms: float):
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate, interpolated linearly inside the bucket holding the q-th value."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets):
+            if n and seen + n >= rank:
+                est = lower + (bound - lower) * (rank - seen) / n
+                return round(min(est, self.max), 3)
+            seen += n
+            lower = float(bound)
+        return round(self.max, 3)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 3) if self.count else None,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets": dict(
+                zip([f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["inf"], self.buckets)
+            ),
+        }
+
+
+class Metrics:
+    """Per-route latency histograms and per-query totals, process wide."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[str, _Histogram] = {}
+        self.queries: dict[str, _Histogram] = {}
+        self.started = time.time()
+
+    def observe_request(self, route: str, ms: float):
+        with self._lock:
+            self.routes.setdefault(route, _Histogram()).observe(ms)
+
+    def observe_query(self, sql: str, ms: float):
+        key = normalize_sql(sql)
+        with self._lock:
+            self.queries.setdefault(key, _Histogram()).observe(ms)
+
+    def snapshot(self, top_queries: int = 20) -> dict:
+        with self._lock:
+            routes = {k: h.snapshot() for k, h in sorted(self.routes.items())}
+            slowest = sorted(self.queries.items(), key=lambda kv: kv[1].sum, reverse=True)
+            queries = [
+                {"sql": sql, "total_ms": round(h.sum, 3), **h.snapshot()}
+                for sql, h in slowest[:top_queries]
+            ]
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started, 1),
+            "routes": routes,
+            "queries": queries,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+            self.queries.clear()
+
+
+METRICS: Metrics | None = Metrics() if DEBUG_METRICS else None
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        # static mounts: group by mount point rather than by file
+        path = scope.get("root_path") or "<unmatched>"
+    return f"{scope['method']} {path}"
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: collects spans for each request, adds the
+    Server-Timing header and feeds the per-route histograms.
+    """
+
+    def __init__(self, app, metrics: Metrics | None = None):
+        self.app = app
+        self.metrics = metrics or METRICS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        t0 = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                total = (time.perf_counter() - t0) * 1000
+                headers.append("Server-Timing", timings.header(total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if self.metrics is not None:
+                self.metrics.observe_request(
+                    _route_label(scope), (time.perf_counter() - t0) * 1000
+                )
@@ -1,4 +1,7 @@
+import base64
+import json
 import re
+import unicodedata
 from nanoid import generate
 import pandas as pd
 
@@ -47,6 +50,59 @@ def _get_or_create_actor_id(__self, name: str):
         return actor_id
 
 
+def _sort_title(title: str) -> str:
+    # lower-case and drop a leading article so "The Matrix" sorts under M
+    sort_title = title.strip().lower()
+    for prefix in ("the ", "a ", "an "):
+        if sort_title.startswith(prefix):
+            return sort_title[len(prefix) :]
+    return sort_title
+
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def _title_key(title: str) -> str:
+    """
+    Loose matching key for titles from other sources (file names, watch
+    history): sort_title without accents or punctuation, '&' read as 'and'.
+    """
+    s = unicodedata.normalize("NFKD", _sort_title(title))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = s.replace("&", " and ").replace("'", "").replace("’", "")
+    return " ".join(_NON_WORD.sub(" ", s).split())
+
+
+_TRUTHY = {"yes", "true", "1", "y"}
+_FALSY = {"no", "false", "0", "n", "", "nan", "none"}
+
+
+def _parse_obtained(val) -> int:
+    """Map the yes/no style values used in CSVs and forms to 0/1."""
+    if isinstance(val, bool):
+        return int(val)
+    s = str(val).strip().lower() if val is not None else ""
+    if s in _TRUTHY:
+        return 1
+    if s in _FALSY:
+        return 0
+    raise ValueError(f"Unrecognised obtained value: {val!r}")
+
+
+def _split_names(cell: str | None, seps: str = ",") -> list[str]:
+    """Split a 'A, B, C' style cell into cleaned, case-insensitively unique names."""
+    if not cell:
+        return []
+    names: list[str] = []
+    seen: set[str] = set()
+    for raw in re.split(f"[{re.escape(seps)}]", str(cell)):
+        name = " ".join(raw.strip().split())
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
 def _parse_years(val: str | float | int) -> tuple[int | None, int | None]:
     """
     Parse year values which might be single years ('2015'),
@@ -72,3 +128,25 @@ def _parse_years(val: str | float | int) -> tuple[int | None, int | None]:
         return int(s), None
 
     return None, None
+
+
+def _encode_cursor(key: tuple | None) -> str | None:
+    """Opaque keyset pagination token for a (sort_title, id) key."""
+    if key is None:
+        return None
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str | None) -> tuple | None:
+    """Inverse of _encode_cursor. Raises ValueError on a malformed token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(key, list) or len(key) != 2:
+        raise ValueError("invalid cursor")
+    return tuple(key)
@@ -0,0 +1,235 @@
+-- Change log for delta sync (/api/changes).
+-- Every insert/update/delete on a tracked table appends a row here; seq only
+-- ever grows (AUTOINCREMENT never reuses values, even after compaction).
+CREATE TABLE
+    IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        key1 TEXT NOT NULL,
+        key2 TEXT,
+        op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+CREATE INDEX IF NOT EXISTS idx_change_log_key ON change_log (tbl, key1, key2);
+
+-- Clients syncing from before purged_through must do a full resync
+CREATE TABLE
+    IF NOT EXISTS change_log_meta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        purged_through INTEGER NOT NULL DEFAULT 0,
+        seeded INTEGER NOT NULL DEFAULT 0,
+        last_compacted TIMESTAMP
+    );
+
+INSERT OR IGNORE INTO change_log_meta (id, purged_through) VALUES (1, 0);
+
+-- media
+CREATE TRIGGER IF NOT EXISTS trg_media_ins AFTER INSERT ON media BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('media', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_media_upd AFTER UPDATE ON media BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'media', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('media', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_media_del AFTER DELETE ON media BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('media', OLD.id, NULL, 'delete');
+END;
+
+-- movies
+CREATE TRIGGER IF NOT EXISTS trg_movies_ins AFTER INSERT ON movies BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movies', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movies_upd AFTER UPDATE ON movies BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'movies', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movies', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movies_del AFTER DELETE ON movies BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movies', OLD.id, NULL, 'delete');
+END;
+
+-- shows
+CREATE TRIGGER IF NOT EXISTS trg_shows_ins AFTER INSERT ON shows BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('shows', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shows_upd AFTER UPDATE ON shows BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'shows', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('shows', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shows_del AFTER DELETE ON shows BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('shows', OLD.id, NULL, 'delete');
+END;
+
+-- actors
+CREATE TRIGGER IF NOT EXISTS trg_actors_ins AFTER INSERT ON actors BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actors', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actors_upd AFTER UPDATE ON actors BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'actors', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actors', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actors_del AFTER DELETE ON actors BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actors', OLD.id, NULL, 'delete');
+END;
+
+-- genres
+CREATE TRIGGER IF NOT EXISTS trg_genres_ins AFTER INSERT ON genres BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('genres', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_genres_upd AFTER UPDATE ON genres BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'genres', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('genres', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_genres_del AFTER DELETE ON genres BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('genres', OLD.id, NULL, 'delete');
+END;
+
+-- show_networks
+CREATE TRIGGER IF NOT EXISTS trg_show_networks_ins AFTER INSERT ON show_networks BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_networks', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_networks_upd AFTER UPDATE ON show_networks BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'show_networks', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_networks', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_networks_del AFTER DELETE ON show_networks BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_networks', OLD.id, NULL, 'delete');
+END;
+
+-- movie_collections
+CREATE TRIGGER IF NOT EXISTS trg_movie_collections_ins AFTER INSERT ON movie_collections BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_collections', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_collections_upd AFTER UPDATE ON movie_collections BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'movie_collections', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_collections', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_collections_del AFTER DELETE ON movie_collections BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_collections', OLD.id, NULL, 'delete');
+END;
+
+-- show_collections
+CREATE TRIGGER IF NOT EXISTS trg_show_collections_ins AFTER INSERT ON show_collections BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_collections', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_collections_upd AFTER UPDATE ON show_collections BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'show_collections', OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_collections', NEW.id, NULL, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_collections_del AFTER DELETE ON show_collections BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_collections', OLD.id, NULL, 'delete');
+END;
+
+-- actor_movie_relationship
+CREATE TRIGGER IF NOT EXISTS trg_actor_movie_relationship_ins AFTER INSERT ON actor_movie_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actor_movie_relationship', NEW.movie_id, NEW.actor_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actor_movie_relationship_upd AFTER UPDATE ON actor_movie_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'actor_movie_relationship', OLD.movie_id, OLD.actor_id, 'delete' WHERE OLD.movie_id IS NOT NEW.movie_id OR OLD.actor_id IS NOT NEW.actor_id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actor_movie_relationship', NEW.movie_id, NEW.actor_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actor_movie_relationship_del AFTER DELETE ON actor_movie_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actor_movie_relationship', OLD.movie_id, OLD.actor_id, 'delete');
+END;
+
+-- actor_show_relationship
+CREATE TRIGGER IF NOT EXISTS trg_actor_show_relationship_ins AFTER INSERT ON actor_show_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actor_show_relationship', NEW.show_id, NEW.actor_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actor_show_relationship_upd AFTER UPDATE ON actor_show_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'actor_show_relationship', OLD.show_id, OLD.actor_id, 'delete' WHERE OLD.show_id IS NOT NEW.show_id OR OLD.actor_id IS NOT NEW.actor_id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actor_show_relationship', NEW.show_id, NEW.actor_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actor_show_relationship_del AFTER DELETE ON actor_show_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('actor_show_relationship', OLD.show_id, OLD.actor_id, 'delete');
+END;
+
+-- movie_genre_relationship
+CREATE TRIGGER IF NOT EXISTS trg_movie_genre_relationship_ins AFTER INSERT ON movie_genre_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_genre_relationship', NEW.movie_id, NEW.genre_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_genre_relationship_upd AFTER UPDATE ON movie_genre_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'movie_genre_relationship', OLD.movie_id, OLD.genre_id, 'delete' WHERE OLD.movie_id IS NOT NEW.movie_id OR OLD.genre_id IS NOT NEW.genre_id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_genre_relationship', NEW.movie_id, NEW.genre_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_genre_relationship_del AFTER DELETE ON movie_genre_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_genre_relationship', OLD.movie_id, OLD.genre_id, 'delete');
+END;
+
+-- show_genre_relationship
+CREATE TRIGGER IF NOT EXISTS trg_show_genre_relationship_ins AFTER INSERT ON show_genre_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_genre_relationship', NEW.show_id, NEW.genre_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_genre_relationship_upd AFTER UPDATE ON show_genre_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'show_genre_relationship', OLD.show_id, OLD.genre_id, 'delete' WHERE OLD.show_id IS NOT NEW.show_id OR OLD.genre_id IS NOT NEW.genre_id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_genre_relationship', NEW.show_id, NEW.genre_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_genre_relationship_del AFTER DELETE ON show_genre_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_genre_relationship', OLD.show_id, OLD.genre_id, 'delete');
+END;
+
+-- movie_collection_relationship
+CREATE TRIGGER IF NOT EXISTS trg_movie_collection_relationship_ins AFTER INSERT ON movie_collection_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_collection_relationship', NEW.movie_id, NEW.collection_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_collection_relationship_upd AFTER UPDATE ON movie_collection_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'movie_collection_relationship', OLD.movie_id, OLD.collection_id, 'delete' WHERE OLD.movie_id IS NOT NEW.movie_id OR OLD.collection_id IS NOT NEW.collection_id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_collection_relationship', NEW.movie_id, NEW.collection_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_collection_relationship_del AFTER DELETE ON movie_collection_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('movie_collection_relationship', OLD.movie_id, OLD.collection_id, 'delete');
+END;
+
+-- show_collection_relationship
+CREATE TRIGGER IF NOT EXISTS trg_show_collection_relationship_ins AFTER INSERT ON show_collection_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_collection_relationship', NEW.show_id, NEW.collection_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_collection_relationship_upd AFTER UPDATE ON show_collection_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op)
+SELECT 'show_collection_relationship', OLD.show_id, OLD.collection_id, 'delete' WHERE OLD.show_id IS NOT NEW.show_id OR OLD.collection_id IS NOT NEW.collection_id;
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_collection_relationship', NEW.show_id, NEW.collection_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_show_collection_relationship_del AFTER DELETE ON show_collection_relationship BEGIN
+INSERT INTO change_log (tbl, key1, key2, op) VALUES ('show_collection_relationship', OLD.show_id, OLD.collection_id, 'delete');
+END;
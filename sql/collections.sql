@@ -0,0 +1,9 @@
+-- Collection lookups in both directions. The primary keys cover
+-- title -> collections; these cover collection -> titles (and its counts).
+CREATE INDEX IF NOT EXISTS idx_mc_collection ON movie_collection_relationship (collection_id, movie_id);
+
+CREATE INDEX IF NOT EXISTS idx_sc_collection ON show_collection_relationship (collection_id, show_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_movie_collections_name_nocase ON movie_collections (name COLLATE NOCASE);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_show_collections_name_nocase ON show_collections (name COLLATE NOCASE);
@@ -0,0 +1,29 @@
+-- Duplicate review queue (app/dedupe.py). A scan proposes pairs of actors or
+-- titles that look like the same thing spelled differently; someone approves
+-- or rejects them, and approved pairs are merged in bulk: drop_id's credits,
+-- genres, files and plays move to keep_id, then drop_id is deleted.
+-- Rejected pairs stay so later scans don't propose them again.
+CREATE TABLE
+    IF NOT EXISTS duplicate_candidates (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL CHECK (kind IN ('actor', 'title')),
+        keep_id TEXT NOT NULL,
+        drop_id TEXT NOT NULL,
+        score REAL NOT NULL,
+        reason TEXT,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK (
+            status IN ('pending', 'approved', 'rejected', 'merged')
+        ),
+        found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        decided_at TIMESTAMP,
+        CHECK (keep_id != drop_id)
+    );
+
+-- one row per pair, whichever side is kept
+CREATE UNIQUE INDEX IF NOT EXISTS ux_duplicate_candidates_pair ON duplicate_candidates (
+    kind,
+    min(keep_id, drop_id),
+    max(keep_id, drop_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_duplicate_candidates_status ON duplicate_candidates (kind, status, score DESC);
@@ -29,12 +29,17 @@ CREATE TABLE app_meta (
 );
 
 
-CREATE TABLE IF NOT EXISTS people (
+CREATE TABLE IF NOT EXISTS actors (
   id   TEXT PRIMARY KEY DEFAULT nanoid(10),
   name CITEXT NOT NULL UNIQUE,
   pseudonym TEXT
 );
 
+CREATE TABLE IF NOT EXISTS directors (
+  id   TEXT PRIMARY KEY DEFAULT nanoid(10),
+  name CITEXT NOT NULL UNIQUE
+);
+
 CREATE TABLE media (
   id           TEXT PRIMARY KEY DEFAULT nanoid(10),
   title        TEXT NOT NULL,
@@ -56,7 +61,7 @@ CREATE TABLE movies (
   director  TEXT,
   duration  INTEGER,
   FOREIGN KEY (media_id) REFERENCES media (id) ON DELETE CASCADE,
-  FOREIGN KEY (director) REFERENCES people (id) ON DELETE SET NULL
+  FOREIGN KEY (director) REFERENCES directors (id) ON DELETE SET NULL
 );
 
 CREATE INDEX idx_movies_media_id ON movies (media_id);
@@ -116,7 +121,7 @@ CREATE TABLE actor_movie_relationship (
   billing_order INTEGER NOT NULL CHECK (billing_order >= 1),
   PRIMARY KEY (movie_id, actor_id),
   FOREIGN KEY (movie_id) REFERENCES movies (id) ON DELETE CASCADE,
-  FOREIGN KEY (actor_id) REFERENCES people (id) ON DELETE RESTRICT
+  FOREIGN KEY (actor_id) REFERENCES actors (id) ON DELETE RESTRICT
 );
 
 CREATE INDEX idx_am_actor ON actor_movie_relationship (actor_id);
@@ -127,7 +132,7 @@ CREATE TABLE actor_show_relationship (
   billing_order INTEGER NOT NULL CHECK (billing_order >= 1),
   PRIMARY KEY (show_id, actor_id),
   FOREIGN KEY (show_id) REFERENCES shows (id) ON DELETE CASCADE,
-  FOREIGN KEY (actor_id) REFERENCES people (id) ON DELETE RESTRICT
+  FOREIGN KEY (actor_id) REFERENCES actors (id) ON DELETE RESTRICT
 );
 
 CREATE INDEX idx_as_actor ON actor_show_relationship (actor_id);
@@ -0,0 +1,43 @@
+-- Files found by the library scanner (app/library.py).
+-- library_dirs remembers each scanned directory's mtime so an incremental
+-- scan can skip directories whose entries haven't changed.
+CREATE TABLE
+    IF NOT EXISTS library_dirs (
+        path TEXT PRIMARY KEY,
+        parent TEXT,
+        mtime_ns INTEGER NOT NULL,
+        scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+CREATE INDEX IF NOT EXISTS idx_library_dirs_parent ON library_dirs (parent);
+
+-- One row per video file; media_id is NULL until a title matches
+CREATE TABLE
+    IF NOT EXISTS media_files (
+        path TEXT PRIMARY KEY,
+        dir TEXT NOT NULL,
+        media_id TEXT,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        season INTEGER,
+        episode INTEGER,
+        FOREIGN KEY (media_id) REFERENCES media (id) ON DELETE SET NULL
+    );
+
+CREATE INDEX IF NOT EXISTS idx_media_files_dir ON media_files (dir);
+
+CREATE INDEX IF NOT EXISTS idx_media_files_media ON media_files (media_id);
+
+-- Container header metadata (app/media_info.py), valid while size and
+-- mtime_ns still match the file on disk
+CREATE TABLE
+    IF NOT EXISTS media_info (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        container TEXT,
+        duration_s REAL,
+        streams TEXT,
+        error TEXT,
+        probed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
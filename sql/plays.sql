@@ -0,0 +1,59 @@
+-- Watch history (app/history.py). One row per viewing; media_id/episode_id
+-- stay NULL until the title resolves to something in the catalog.
+CREATE TABLE
+    IF NOT EXISTS plays (
+        id INTEGER PRIMARY KEY,
+        media_id TEXT,
+        episode_id TEXT,
+        raw_title TEXT NOT NULL,
+        season INTEGER,
+        played_at TEXT NOT NULL,
+        seconds INTEGER,
+        profile TEXT NOT NULL DEFAULT '',
+        device TEXT,
+        source TEXT,
+        FOREIGN KEY (media_id) REFERENCES media (id) ON DELETE SET NULL,
+        FOREIGN KEY (episode_id) REFERENCES show_episodes (id) ON DELETE SET NULL,
+        -- re-importing the same export adds nothing
+        UNIQUE (raw_title, played_at, profile)
+    );
+
+CREATE INDEX IF NOT EXISTS idx_plays_media ON plays (media_id, played_at);
+
+CREATE INDEX IF NOT EXISTS idx_plays_unresolved ON plays (raw_title) WHERE media_id IS NULL;
+
+-- Rollups, updated with deltas as plays are imported or resolved, so the
+-- stats page never has to aggregate the raw plays.
+CREATE TABLE
+    IF NOT EXISTS play_rollup_title (
+        media_id TEXT PRIMARY KEY,
+        plays INTEGER NOT NULL DEFAULT 0,
+        seconds INTEGER NOT NULL DEFAULT 0,
+        first_played TEXT,
+        last_played TEXT
+    );
+
+CREATE TABLE
+    IF NOT EXISTS play_rollup_month (
+        month TEXT PRIMARY KEY,
+        plays INTEGER NOT NULL DEFAULT 0,
+        seconds INTEGER NOT NULL DEFAULT 0
+    );
+
+CREATE TABLE
+    IF NOT EXISTS play_rollup_genre (
+        genre_id TEXT PRIMARY KEY,
+        plays INTEGER NOT NULL DEFAULT 0,
+        seconds INTEGER NOT NULL DEFAULT 0
+    );
+
+CREATE TABLE
+    IF NOT EXISTS play_rollup_actor (
+        actor_id TEXT PRIMARY KEY,
+        plays INTEGER NOT NULL DEFAULT 0,
+        seconds INTEGER NOT NULL DEFAULT 0
+    );
+
+CREATE INDEX IF NOT EXISTS idx_play_rollup_title_plays ON play_rollup_title (plays DESC);
+
+CREATE INDEX IF NOT EXISTS idx_play_rollup_actor_plays ON play_rollup_actor (plays DESC);
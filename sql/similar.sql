@@ -0,0 +1,25 @@
+-- "More like this" (app/similar.py). The top SIMILAR_TOP_K neighbours of
+-- every title, same type only, precomputed so pages just read them.
+-- similar_id has no foreign key on purpose: a cascade would silently shorten
+-- the lists; the refresh finds and recomputes them through the change log.
+CREATE TABLE
+    IF NOT EXISTS similar_titles (
+        media_id TEXT NOT NULL,
+        rank INTEGER NOT NULL,
+        similar_id TEXT NOT NULL,
+        score REAL NOT NULL,
+        FOREIGN KEY (media_id) REFERENCES media (id) ON DELETE CASCADE,
+        PRIMARY KEY (media_id, rank)
+    ) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_similar_titles_similar ON similar_titles (similar_id);
+
+-- change_log seq the lists are up to date with
+CREATE TABLE
+    IF NOT EXISTS similar_meta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_seq INTEGER NOT NULL DEFAULT 0,
+        built_at TIMESTAMP
+    );
+
+INSERT OR IGNORE INTO similar_meta (id, last_seq) VALUES (1, 0);
@@ -57,10 +57,11 @@ FROM
     media md
     LEFT JOIN movies mv ON md.id = mv.media_id
 WHERE
-    md.type = 'movie'
-    -- ORDER BY
-    --     md.sort_title COLLATE NOCASE ASC;
-    -- Actor page view
+    md.type = 'movie';
+
+-- ORDER BY
+--     md.sort_title COLLATE NOCASE ASC;
+-- Actor page view
 create view
     v_actor_page AS
 SELECT
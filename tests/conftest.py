@@ -0,0 +1,100 @@
+import os
+import shutil
+
+import pytest
+from fastapi import FastAPI
+from fastapi.templating import Jinja2Templates
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.assets import AssetManifest
+from app.db.backends import SQLAlchemyBackend, SQLiteBackend
+from app.db.bench_data import build_bench_db
+from app.db.db_control import MediaDB
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def _repo_cwd(monkeypatch):
+    # sql/*.sql paths are relative to the repo root, as in the app
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture(scope="session")
+def catalog_template(tmp_path_factory):
+    """Small synthetic catalog built once; tests get their own copy."""
+    path = str(tmp_path_factory.mktemp("catalog") / "catalog.db")
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        build_bench_db(path, movies=60, shows=15, actors=120, collections=5, analyze=False)
+        # the rest of what app startup adds
+        db = MediaDB(path, read_cache=False)
+        for init in (db.init_library, db.init_plays, db.init_similar, db.init_dedupe):
+            init()
+        db.close()
+    finally:
+        os.chdir(cwd)
+    return path
+
+
+@pytest.fixture
+def db_path(catalog_template, tmp_path):
+    path = str(tmp_path / "media.db")
+    shutil.copy(catalog_template, path)
+    return path
+
+
+def _backend(name: str, path: str):
+    if name == "sqlite":
+        return SQLiteBackend(path)
+    return SQLAlchemyBackend(create_engine(f"sqlite:///{path}"))
+
+
+@pytest.fixture
+def make_backend():
+    """make_backend(name, path): a new "sqlite" or "sqlalchemy" backend."""
+    return _backend
+
+
+@pytest.fixture(params=["sqlite", "sqlalchemy"])
+def backend_name(request):
+    return request.param
+
+
+@pytest.fixture
+def db(backend_name, db_path):
+    """MediaDB over the copied catalog, once per backend."""
+    media_db = MediaDB(db_path, backend=_backend(backend_name, db_path))
+    yield media_db
+    media_db.close()
+
+
+@pytest.fixture
+def make_client(backend_name, db_path):
+    """
+    make_client(*routers, **state): TestClient for a bare app over the copied
+    catalog, once per backend. Services the app would build are None unless
+    given in state.
+    """
+    dbs = []
+
+    def make(*routers, **state):
+        app = FastAPI()
+        app.state.mediaDB = MediaDB(db_path, backend=_backend(backend_name, db_path))
+        dbs.append(app.state.mediaDB)
+        app.state.templates = Jinja2Templates(directory=os.path.join(ROOT, "app/static/templates"))
+        app.state.templates.env.globals["asset_url"] = AssetManifest().url
+        for name in (
+            "thumbnails", "backups", "maintenance", "library", "similar",
+            "costars", "autocomplete", "dedupe", "writes",
+        ):
+            setattr(app.state, name, state.get(name))
+        for router in routers:
+            app.include_router(router)
+        return TestClient(app)
+
+    yield make
+    for media_db in dbs:
+        media_db.close()
@@ -0,0 +1,199 @@
+import sqlite3
+
+import pytest
+
+from app.autocomplete import Autocomplete
+from app.backup import BackupService
+from app.costars import CoStarGraph
+from app.db.db_control import MediaDB
+from app.dedupe import DuplicateFinder
+from app.library import LibraryScanner
+from app.maintenance import MaintenanceService
+from app.similar import SimilarityEngine
+from app.routers import (
+    autocomplete_router,
+    backup_router,
+    changes_router,
+    collections_api_router,
+    costars_router,
+    duplicates_router,
+    library_router,
+    maintenance_router,
+    plays_router,
+    similar_router,
+    stream_router,
+)
+
+
+@pytest.fixture
+def service_db(db_path):
+    """MediaDB for services handed to make_client; the app has its own."""
+    db = MediaDB(db_path, read_cache=False)
+    yield db
+    db.close()
+
+
+def _media_id(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT media_id FROM movies ORDER BY id LIMIT 1;").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_services_not_set_up_answer_501(make_client):
+    client = make_client(
+        backup_router,
+        maintenance_router,
+        library_router,
+        stream_router,
+        similar_router,
+        costars_router,
+        autocomplete_router,
+        duplicates_router,
+    )
+    response = client.get("/api/backup")
+    assert response.status_code == 501
+    assert response.json() == {"detail": "Backups need the SQLite database"}
+    assert client.post("/api/backup").status_code == 501
+    assert client.get("/api/maintenance").status_code == 501
+    assert client.post("/api/maintenance/optimize").status_code == 501
+    assert client.get("/api/media/anything/files").status_code == 501
+    assert client.get("/stream/anything").status_code == 501
+    assert client.get("/api/media/anything/similar").status_code == 501
+    assert client.get("/api/actors/anyone/costars").status_code == 501
+    assert client.get("/api/autocomplete/actors", params={"q": "a"}).status_code == 501
+    assert client.get("/api/duplicates").status_code == 501
+
+
+def test_backup_status(make_client, service_db, tmp_path):
+    client = make_client(backup_router, backups=BackupService(service_db, backup_dir=tmp_path))
+    response = client.get("/api/backup")
+    assert response.status_code == 200
+    assert response.json()["running"] is False
+
+
+def test_maintenance_unknown_job(make_client, service_db):
+    client = make_client(maintenance_router, maintenance=MaintenanceService(service_db))
+    assert client.get("/api/maintenance").status_code == 200
+    assert client.post("/api/maintenance/defrag").status_code == 404
+
+
+def test_library_files(make_client, service_db, db_path, tmp_path):
+    scanner = LibraryScanner(service_db, roots=[str(tmp_path)])
+    client = make_client(library_router, library=scanner)
+    assert client.get("/api/library").status_code == 200
+    response = client.get(f"/api/media/{_media_id(db_path)}/files")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_similar_titles(make_client, service_db, db_path):
+    engine = SimilarityEngine(service_db)
+    engine.refresh(full=True)
+    client = make_client(similar_router, similar=engine)
+    assert client.get("/api/similar").json()["running"] is False
+    media_id = _media_id(db_path)
+    response = client.get(f"/api/media/{media_id}/similar", params={"limit": 3})
+    assert response.status_code == 200
+    items = response.json()
+    assert 0 < len(items) <= 3
+    assert media_id not in {item["media_id"] for item in items}
+
+
+def test_costars_and_path(make_client, service_db, db_path):
+    conn = sqlite3.connect(db_path)
+    a, b = [
+        r[0]
+        for r in conn.execute(
+            "SELECT actor_id FROM actor_movie_relationship "
+            "WHERE movie_id = (SELECT movie_id FROM actor_movie_relationship LIMIT 1) "
+            "ORDER BY billing_order LIMIT 2;"
+        )
+    ]
+    conn.close()
+    client = make_client(costars_router, costars=CoStarGraph(service_db))
+    response = client.get(f"/api/actors/{a}/costars")
+    assert response.status_code == 200
+    assert b in {c["actor_id"] for c in response.json()["costars"]}
+    assert client.get("/api/actors/nobody/costars").status_code == 404
+    path = client.get("/api/path", params={"from": a, "to": b}).json()
+    assert path["degrees"] == 1
+
+
+def test_autocomplete(make_client, service_db):
+    name = service_db.get_actors()[0]["name"]
+    client = make_client(autocomplete_router, autocomplete=Autocomplete(service_db))
+    response = client.get("/api/autocomplete/actors", params={"q": name[:4], "limit": 50})
+    assert response.status_code == 200
+    assert name in {a["name"] for a in response.json()}
+    assert client.get("/api/autocomplete/films", params={"q": "a"}).status_code == 422
+
+
+def test_play_import_is_idempotent(make_client, service_db):
+    title = service_db.get_movies()[0]["title"]
+    export = f"Title,Date\n{title},2024-01-02\nNot In The Catalog,2024-01-03\n".encode()
+    client = make_client(plays_router)
+    for inserted in (2, 0):
+        response = client.post(
+            "/api/plays/import", files={"file": ("history.csv", export, "text/csv")}
+        )
+        assert response.status_code == 200
+        assert response.json()["rows"] == 2
+        assert response.json()["inserted"] == inserted
+    assert client.get("/api/stats/plays").status_code == 200
+
+
+def test_duplicate_scan_and_review(make_client, service_db, db_path):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO actors (id, name) VALUES ('dup00001', 'Zbigniew Kowalczyk');")
+        conn.execute("INSERT INTO actors (id, name) VALUES ('dup00002', 'Zbigniew Kowalczyk.');")
+    conn.close()
+    client = make_client(duplicates_router, dedupe=DuplicateFinder(service_db))
+    # background tasks run before the test client returns
+    assert client.post("/api/duplicates/scan", params={"kind": "actor"}).status_code == 202
+    assert client.get("/api/duplicates/scan").json()["last_run"]["actor"]["added"] >= 1
+    queue = client.get("/api/duplicates", params={"kind": "actor"}).json()["items"]
+    pair = next(c for c in queue if c["drop"]["id"] in ("dup00001", "dup00002"))
+    response = client.post(f"/api/duplicates/{pair['id']}/reject")
+    assert response.json() == {"id": pair["id"], "status": "rejected"}
+    assert client.post("/api/duplicates/999999/approve").status_code == 404
+
+
+def test_change_feed(make_client):
+    client = make_client(changes_router)
+    page = client.get("/api/changes", params={"since": 0, "limit": 10000}).json()
+    assert page["reset"] is False and page["has_more"] is False and page["cursor"] is None
+    assert page["upserts"]["movies"]
+    first = client.get("/api/changes", params={"since": 0, "limit": 5}).json()
+    assert first["has_more"] and first["next"] == page["next"]
+    more = client.get("/api/changes", params={"after": first["cursor"], "limit": 5}).json()
+    assert more["upserts"]["media"][0]["id"] > first["upserts"]["media"][-1]["id"]
+    assert client.get("/api/changes", params={"after": "junk"}).status_code == 400
+    after = client.get("/api/changes", params={"since": page["next"]}).json()
+    assert after["upserts"] == {} and after["deletes"] == {}
+
+
+def test_collection_lifecycle(make_client, service_db):
+    client = make_client(collections_api_router)
+    created = client.post("/api/collections/movie", json={"name": "Router Test"})
+    assert created.status_code == 201
+    collection_id = created.json()["collection_id"]
+    assert client.post("/api/collections/movie", json={"name": "Router Test"}).status_code == 409
+
+    movie_ids = [m["movie_id"] for m in service_db.get_movies()[:5]]
+    members = f"/api/collections/movie/{collection_id}/members"
+    assert client.post(members, json={"ids": movie_ids}).json()["added"] == 5
+    seen, cursor = [], None
+    while True:
+        page = client.get(members, params={"limit": 2, "cursor": cursor}).json()
+        seen += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == 5
+    assert client.get(members, params={"cursor": "not-a-cursor"}).status_code == 400
+
+    assert client.delete(f"/api/collections/movie/{collection_id}").status_code == 200
+    assert client.get(f"/api/collections/movie/{collection_id}").status_code == 404
@@ -0,0 +1,53 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.assets import IMMUTABLE_CACHE_CONTROL, AssetManifest, PrecompressedStaticFiles
+
+CSS = ("body { color: black; }\n" * 100).encode()
+
+
+def _client(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "site.css").write_bytes(CSS)
+    manifest = AssetManifest(sources={"static": src}, build_dir=tmp_path / "build")
+    manifest.build()
+    app = FastAPI()
+    app.mount("/assets", PrecompressedStaticFiles(directory=manifest.build_dir), name="assets")
+    return TestClient(app), manifest.url("static", "site.css")
+
+
+def test_precompressed_variant(tmp_path):
+    client, url = _client(tmp_path)
+    response = client.get(url, headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.content == CSS  # decoded by the client
+    raw = client.get(url, headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in raw.headers and raw.content == CSS
+
+
+def test_precompressed_variant_conditional_get(tmp_path):
+    client, url = _client(tmp_path)
+    etag = client.get(url, headers={"accept-encoding": "gzip"}).headers["etag"]
+    response = client.get(url, headers={"accept-encoding": "gzip", "if-none-match": etag})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_precompressed_variant_rejects_other_methods(tmp_path):
+    client, url = _client(tmp_path)
+    assert client.post(url, headers={"accept-encoding": "gzip"}).status_code == 405
+    head = client.head(url, headers={"accept-encoding": "gzip"})
+    assert head.status_code == 200 and head.content == b""
+
+
+def test_gzip_file_is_valid(tmp_path):
+    _client(tmp_path)
+    built = next((tmp_path / "build").rglob("*.css.gz"))
+    assert gzip.decompress(built.read_bytes()) == CSS
@@ -0,0 +1,40 @@
+import sqlite3
+
+from app.autocomplete import Autocomplete
+from app.db.db_control import MediaDB
+
+
+def test_lookup_changes_stop_at_the_rows_read(db_path):
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        start = db.current_change_seq()
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("INSERT INTO genres (id, name) VALUES ('gnew1', 'Mumblecore');")
+            genre_seq = conn.execute("SELECT MAX(seq) FROM change_log;").fetchone()[0]
+            conn.execute("UPDATE media SET notes = 'later' WHERE rowid = 1;")
+        conn.close()
+        delta = db.get_lookup_changes(start)
+        assert delta["changes"] == [("genres", "gnew1", "upsert")]
+        assert delta["last_seq"] == genre_seq < db.current_change_seq()
+    finally:
+        db.close()
+
+
+def test_index_follows_renames_and_deletes(db_path):
+    db = MediaDB(db_path)
+    try:
+        names = Autocomplete(db)
+        assert names.search("actors", "zebediah") == []
+        assert names.status()["last_seq"] == db.current_change_seq()
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("INSERT INTO actors (id, name) VALUES ('zeb01', 'Zebediah Crane');")
+        assert [a["id"] for a in names.search("actors", "zebediah")] == ["zeb01"]
+        assert [a["id"] for a in names.search("actors", "cran")] == ["zeb01"]
+        with conn:
+            conn.execute("DELETE FROM actors WHERE id = 'zeb01';")
+        conn.close()
+        assert names.search("actors", "zebediah") == []
+    finally:
+        db.close()
@@ -0,0 +1,146 @@
+import sqlite3
+
+import pytest
+
+from app.db.backends import _to_text
+from app.db.db_control import MediaDB
+
+
+def _raw(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_counts(db, db_path):
+    counts = db.get_counts()
+    assert counts["movies"] == _raw(db_path, "SELECT COUNT(*) FROM movies")[0][0]
+    assert counts["actors"] == _raw(db_path, "SELECT COUNT(*) FROM actors")[0][0]
+
+
+def test_movies_by_ids_keeps_order_and_actors(db, db_path):
+    ids = [r[0] for r in _raw(db_path, "SELECT id FROM movies ORDER BY id LIMIT 5")]
+    wanted = ids[::-1] + ["missing"]
+    movies = db.get_movies_by_ids(wanted)
+    assert [m["movie_id"] for m in movies] == ids[::-1]
+    credits = _raw(
+        db_path,
+        "SELECT COUNT(*) FROM actor_movie_relationship WHERE movie_id = ?",
+        (ids[0],),
+    )[0][0]
+    assert len(movies[-1]["actors"]) == credits
+
+
+def test_backends_return_the_same_rows(db_path, make_backend):
+    results = []
+    for name in ("sqlite", "sqlalchemy"):
+        media_db = MediaDB(db_path, backend=make_backend(name, db_path), read_cache=False)
+        try:
+            movies = [dict(r) for r in media_db.get_movies()]
+            actor_ids = [a["actor_id"] for a in media_db.get_actors()[:10]]
+            results.append((movies, media_db.get_actors_by_ids(actor_ids)))
+        finally:
+            media_db.close()
+    assert results[0] == results[1]
+
+
+def test_bulk_update_movies(db, db_path):
+    movie_id = _raw(db_path, "SELECT id FROM movies LIMIT 1")[0][0]
+    db.bulk_update_movies(
+        [
+            {
+                "id": movie_id,
+                "title": "The Zebra Test",
+                "year": 1999,
+                "leading_actors": "New Person, Another Person",
+                "genre": "Drama; Brand New Genre",
+            }
+        ]
+    )
+    movie = db.get_movie_by_id(movie_id)
+    assert movie["title"] == "The Zebra Test"
+    assert movie["year"] == 1999
+    assert sorted(a["full_name"] for a in movie["actors"]) == [
+        "Another Person",
+        "New Person",
+    ]
+
+
+def test_bulk_update_unknown_id_writes_nothing(db, db_path):
+    movie_id = _raw(db_path, "SELECT id FROM movies LIMIT 1")[0][0]
+    before = db.get_movie_by_id(movie_id)["title"]
+    with pytest.raises(KeyError):
+        db.bulk_update_movies(
+            [{"id": movie_id, "title": "Changed"}, {"id": "nope", "title": "x"}]
+        )
+    assert db.get_movie_by_id(movie_id)["title"] == before
+
+
+def _rollups(db_path):
+    return [
+        sorted(_raw(db_path, f"SELECT * FROM {table}"))
+        for table in ("play_rollup_actor", "play_rollup_genre")
+    ]
+
+
+def test_bulk_update_recounts_play_rollups(db, db_path):
+    movie_id, media_id = _raw(db_path, "SELECT id, media_id FROM movies LIMIT 1")[0]
+    old_actors = {r[0] for r in _raw(
+        db_path, "SELECT actor_id FROM actor_movie_relationship WHERE movie_id = ?", (movie_id,)
+    )}
+    plays = [
+        (media_id, None, "t", None, f"2024-01-0{day} 20:00:00", 3600, "p", "tv", "test")
+        for day in range(1, 4)
+    ]
+    assert db.import_plays(plays) == 3
+    db.bulk_update_movies(
+        [{"id": movie_id, "leading_actors": "Rollup Person", "genre": "Rollup Genre"}]
+    )
+    stats = db.get_play_stats(1000)
+    assert {a["name"]: a["plays"] for a in stats["actors"]}["Rollup Person"] == 3
+    assert {g["name"]: g["plays"] for g in stats["genres"]}["Rollup Genre"] == 3
+    assert not old_actors & {a["actor_id"] for a in stats["actors"]}
+    # same numbers as recomputing everything from the raw plays
+    after = _rollups(db_path)
+    db.rebuild_play_rollups()
+    assert _rollups(db_path) == after
+
+
+def test_insert_actor(db, db_path):
+    db.insert_actor("Quentin Question?", "Q: the ? one")
+    rows = _raw(db_path, "SELECT pseudonym FROM actors WHERE name = ?", ("Quentin Question?",))
+    assert rows == [("Q: the ? one",)]
+
+
+def test_collections(db, db_path):
+    ids = [r[0] for r in _raw(db_path, "SELECT id FROM movies LIMIT 3")]
+    coll = db.create_collection("movie", "  Test   Collection ")
+    assert db.add_collection_members("movie", coll, ids) == 3
+    assert db.add_collection_members("movie", coll, ids[:1]) == 0
+    with pytest.raises(KeyError):
+        db.add_collection_members("movie", coll, ["nope"])
+    assert db.get_collection("movie", coll)["name"] == "Test Collection"
+    assert db.remove_collection_members("movie", coll, ids[:2]) == 2
+    assert db.delete_collection("movie", coll)
+
+
+@pytest.mark.parametrize("name", ["sqlite", "sqlalchemy"])
+def test_question_mark_in_literal_is_not_a_placeholder(db_path, make_backend, name):
+    backend = make_backend(name, db_path)
+    try:
+        with backend.connect() as conn:
+            row = conn.execute(
+                "SELECT 'what? :now' AS a, ? AS b, \"name\" AS c -- trailing ?\n"
+                "FROM actors WHERE name != 'it''s ?' LIMIT 1;",
+                (5,),
+            ).fetchone()
+        assert (row["a"], row["b"]) == ("what? :now", 5)
+    finally:
+        backend.close()
+
+
+def test_to_text_binds():
+    clause = _to_text("SELECT ? , '?' , ? /* ? */")
+    assert list(clause._bindparams) == ["p0", "p1"]
@@ -0,0 +1,22 @@
+import os
+from pathlib import Path
+
+from app.backup import BackupService
+from app.db.backends import SQLiteBackend
+from app.db.db_control import MediaDB
+from app.maintenance import MaintenanceService
+
+
+def test_services_use_the_backend_file(db_path, tmp_path):
+    # MediaDB's own name points somewhere else; the backend's file is the database
+    elsewhere = str(tmp_path / "elsewhere.db")
+    db = MediaDB(elsewhere, backend=SQLiteBackend(db_path), read_cache=False)
+    try:
+        assert MaintenanceService(db).db_file == db_path
+        backups = BackupService(db, backup_dir=tmp_path / "backups")
+        result = backups.run()
+        assert result["ok"], result
+        assert result["file"].startswith(Path(db_path).stem + "-")
+        assert not os.path.exists(elsewhere)
+    finally:
+        db.close()
@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from app.db.db_control import SYNC_TABLES, MediaDB
+
+
+def _sync(db, since=0, limit=200):
+    """Page through get_changes like a client; (tables seen, last page)."""
+    seen: dict[str, set] = {}
+    after = None
+    while True:
+        page = db.get_changes(since, limit=limit, after=after)
+        assert sum(len(rows) for rows in page["upserts"].values()) <= limit
+        for table, rows in page["upserts"].items():
+            seen.setdefault(table, set()).update(r["id"] for r in rows if "id" in r)
+        after = page["cursor"]
+        if after is None:
+            since = page["next"]
+        if page["reset"] or not page["has_more"]:
+            return seen, page
+
+
+def _purge_a_tombstone(db, db_path):
+    actor_id = "zzgoneactor"
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO actors (id, name) VALUES (?, 'Gone Actor');", (actor_id,))
+        conn.execute("DELETE FROM actors WHERE id = ?;", (actor_id,))
+        conn.execute("UPDATE change_log SET changed_at = '2000-01-01' WHERE op = 'delete';")
+    conn.close()
+    assert db.compact_change_log(tombstone_days=30)["tombstones"] >= 1
+
+
+def test_full_sync_after_tombstone_purge(db_path):
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        _purge_a_tombstone(db, db_path)
+        seen, last = _sync(db, 0)
+        assert not last["reset"]
+        conn = sqlite3.connect(db_path)
+        movie_ids = {r[0] for r in conn.execute("SELECT id FROM movies;")}
+        max_seq = conn.execute("SELECT MAX(seq) FROM change_log;").fetchone()[0]
+        conn.close()
+        assert seen["movies"] == movie_ids
+        assert last["next"] == max_seq
+    finally:
+        db.close()
+
+
+def test_full_sync_pages_every_row_once(db_path):
+    db = MediaDB(db_path, read_cache=False)
+    conn = sqlite3.connect(db_path)
+    try:
+        first = db.get_changes(0, limit=97)
+        # a write mid-sync lands after `next`, so the log sends it afterwards
+        with conn:
+            conn.execute("UPDATE movies SET duration = 1 WHERE id = (SELECT MIN(id) FROM movies);")
+        pages, page, rows = [first], first, {}
+        while page["cursor"] is not None:
+            assert page["has_more"]
+            page = db.get_changes(0, limit=97, after=page["cursor"])
+            pages.append(page)
+        assert {p["next"] for p in pages} == {first["next"]}
+        for p in pages:
+            for table, batch in p["upserts"].items():
+                rows.setdefault(table, []).extend(batch)
+
+        total = 0
+        for table, key_cols in SYNC_TABLES.items():
+            count = conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+            batch = rows.get(table, [])
+            keys = {tuple(r[c] for c in key_cols) for r in batch}
+            assert len(batch) == len(keys) == count, table
+            total += count
+        assert len(pages) == total // 97 + 1
+        edited = db.get_changes(first["next"])
+        assert [m["duration"] for m in edited["upserts"]["movies"]] == [1]
+    finally:
+        conn.close()
+        db.close()
+
+
+def test_bad_sync_cursor(db_path):
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        for after in ("nope", '{"next": 1, "table": "sqlite_master", "key": ["x"]}',
+                      '{"next": 1, "table": "actor_movie_relationship", "key": ["x"]}'):
+            with pytest.raises(ValueError):
+                db.get_changes(0, after=after)
+    finally:
+        db.close()
+
+
+def test_stale_client_is_told_to_reset(db_path):
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        _purge_a_tombstone(db, db_path)
+        page = db.get_changes(1)
+        assert page["reset"] and page["next"] == 0
+    finally:
+        db.close()
@@ -0,0 +1,32 @@
+import sqlite3
+
+from app.db.db_control import MediaDB
+
+
+def test_init_collections_renames_case_clashes(db_path):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        # a database from before the unique NOCASE index
+        conn.execute("DROP INDEX ux_movie_collections_name_nocase;")
+        conn.executemany(
+            "INSERT INTO movie_collections (id, name) VALUES (?, ?);",
+            [("cl1", "Star Trek"), ("cl2", "STAR TREK"), ("cl3", "star trek"),
+             ("cl4", "Star Trek (2)")],
+        )
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        db.init_collections()
+    finally:
+        db.close()
+    names = dict(conn.execute("SELECT id, name FROM movie_collections WHERE id LIKE 'cl_';"))
+    index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'ux_movie_collections_name_nocase';"
+    ).fetchone()
+    conn.close()
+    assert names == {
+        "cl1": "Star Trek",
+        "cl2": "STAR TREK (3)",
+        "cl3": "star trek (4)",
+        "cl4": "Star Trek (2)",
+    }
+    assert index is not None
@@ -0,0 +1,60 @@
+import sqlite3
+
+from app.costars import CoStarGraph
+from app.db.db_control import MediaDB
+
+
+def test_credit_changes_stop_at_the_rows_read(db_path):
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        start = db.current_change_seq()
+        assert db.get_credit_changes(start)["last_seq"] == start
+        conn = sqlite3.connect(db_path)
+        with conn:
+            movie_id = conn.execute("SELECT id FROM movies LIMIT 1;").fetchone()[0]
+            actor_id = conn.execute("SELECT id FROM actors LIMIT 1 OFFSET 7;").fetchone()[0]
+            conn.execute(
+                "DELETE FROM actor_movie_relationship WHERE movie_id = ? AND actor_id = ?;",
+                (movie_id, actor_id),
+            )
+            conn.execute(
+                "INSERT INTO actor_movie_relationship (movie_id, actor_id, billing_order) "
+                "VALUES (?, ?, 99);",
+                (movie_id, actor_id),
+            )
+            credit_seq = conn.execute("SELECT MAX(seq) FROM change_log;").fetchone()[0]
+            conn.execute("UPDATE media SET notes = 'later' WHERE rowid = 1;")
+        conn.close()
+        delta = db.get_credit_changes(start)
+        assert delta["last_seq"] == credit_seq < db.current_change_seq()
+        assert delta["changes"][-1] == (actor_id, "movie", movie_id, "upsert")
+    finally:
+        db.close()
+
+
+def test_graph_follows_new_credits(db_path):
+    db = MediaDB(db_path)
+    try:
+        graph = CoStarGraph(db)
+        conn = sqlite3.connect(db_path)
+        movie_id = conn.execute("SELECT id FROM movies LIMIT 1;").fetchone()[0]
+        first = conn.execute("SELECT id FROM actors LIMIT 1;").fetchone()[0]
+        assert graph.status()["last_seq"] == 0
+        graph.sync()
+        assert graph.status()["last_seq"] == db.current_change_seq()
+        with conn:
+            conn.execute("INSERT INTO actors (id, name) VALUES ('newcomer01', 'New Comer');")
+            conn.execute(
+                "DELETE FROM actor_movie_relationship WHERE movie_id = ? AND actor_id = ?;",
+                (movie_id, first),
+            )
+            conn.execute(
+                "INSERT INTO actor_movie_relationship (movie_id, actor_id, billing_order) "
+                "VALUES (?, ?, 98), (?, 'newcomer01', 99);",
+                (movie_id, first, movie_id),
+            )
+        conn.close()
+        costars = graph.costars("newcomer01")
+        assert first in {c["actor_id"] for c in costars["costars"]}
+    finally:
+        db.close()
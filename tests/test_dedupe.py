@@ -0,0 +1,50 @@
+import sqlite3
+
+from app.db.db_control import MediaDB
+from app.dedupe import DuplicateFinder
+
+
+def _candidates(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT keep_id, drop_id, status FROM duplicate_candidates WHERE kind = 'actor';"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_scan_review_and_merge_actors(db_path):
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        db.init_dedupe()
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("INSERT INTO actors (id, name) VALUES ('dup00001', 'Zbigniew Kowalczyk');")
+            conn.execute("INSERT INTO actors (id, name) VALUES ('dup00002', 'Zbigniew  Kowalczyk.');")
+            movie_id = conn.execute("SELECT id FROM movies LIMIT 1;").fetchone()[0]
+            conn.execute(
+                "INSERT INTO actor_movie_relationship (movie_id, actor_id, billing_order) "
+                "VALUES (?, 'dup00002', 99);",
+                (movie_id,),
+            )
+        conn.close()
+
+        finder = DuplicateFinder(db)
+        assert finder.scan(["actor"])["actor"]["added"] >= 1
+        pair = [c for c in _candidates(db_path) if "dup00001" in c[:2]]
+        # the side with the credit survives
+        assert pair == [("dup00002", "dup00001", "pending")]
+
+        # a rescan keeps the pair, and a decision, instead of adding it again
+        assert finder.scan(["actor"])["actor"]["added"] == 0
+        queue = db.get_duplicate_candidates("actor", "pending", 500)["items"]
+        ids = [c["id"] for c in queue if c["drop"]["id"] == "dup00001"]
+        assert db.review_duplicates(ids, "approved") == 1
+        assert db.merge_duplicates("actor")["merged"] >= 1
+        conn = sqlite3.connect(db_path)
+        left = {r[0] for r in conn.execute("SELECT id FROM actors WHERE id LIKE 'dup0000%';")}
+        conn.close()
+        assert left == {"dup00002"}
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+import io
+import sqlite3
+
+import pytest
+from PIL import Image
+
+import app.images
+from app.images import ThumbnailCache, ThumbnailService
+from app.routers import images_router
+
+
+def _set_artwork(db_path, path) -> str:
+    conn = sqlite3.connect(db_path)
+    with conn:
+        media_id = conn.execute("SELECT id FROM media ORDER BY rowid LIMIT 1;").fetchone()[0]
+        conn.execute("UPDATE media SET artwork_path = ? WHERE id = ?;", (str(path), media_id))
+    conn.close()
+    return media_id
+
+
+@pytest.fixture
+def thumbs(tmp_path):
+    return ThumbnailService(ThumbnailCache(tmp_path / "thumbs"))
+
+
+@pytest.fixture
+def artwork(db_path, tmp_path):
+    src = tmp_path / "poster.png"
+    Image.new("RGBA", (800, 1200), (200, 40, 40, 128)).save(src)
+    return _set_artwork(db_path, src)
+
+
+def _image(response) -> Image.Image:
+    return Image.open(io.BytesIO(response.content))
+
+
+def test_generated_once_then_served_from_cache(make_client, thumbs, artwork, tmp_path, monkeypatch):
+    renders = []
+    render = app.images.render_thumbnail
+    monkeypatch.setattr(
+        app.images, "render_thumbnail", lambda *a: renders.append(a) or render(*a)
+    )
+    client = make_client(images_router, thumbnails=thumbs)
+    assert not any((tmp_path / "thumbs").rglob("*.*"))
+    for _ in range(3):
+        assert client.get(f"/images/artwork/{artwork}?w=320").status_code == 200
+    assert len(renders) == 1
+    assert len(list((tmp_path / "thumbs").rglob("*.*"))) == 1
+
+
+def test_etag_round_trip(make_client, thumbs, artwork):
+    client = make_client(images_router, thumbnails=thumbs)
+    first = client.get(f"/images/artwork/{artwork}")
+    etag = first.headers["etag"]
+    assert first.headers["vary"] == "Accept"
+    again = client.get(f"/images/artwork/{artwork}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    other = client.get(f"/images/artwork/{artwork}?w=640", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+@pytest.mark.parametrize("w, width", [(None, 160), (1, 160), (161, 320), (320, 320), (5000, 640)])
+def test_width_snaps_to_fixed_sizes(make_client, thumbs, artwork, w, width):
+    client = make_client(images_router, thumbnails=thumbs)
+    params = {"w": w} if w else {}
+    image = _image(client.get(f"/images/artwork/{artwork}", params=params))
+    assert image.size == (width, width * 3 // 2)
+
+
+def test_format_follows_accept(make_client, thumbs, artwork):
+    client = make_client(images_router, thumbnails=thumbs)
+    url = f"/images/artwork/{artwork}"
+    webp = client.get(url, headers={"Accept": "image/avif,image/webp,*/*"})
+    assert webp.headers["content-type"] == "image/webp"
+    assert _image(webp).format == "WEBP"
+    jpeg = client.get(url, headers={"Accept": "image/*"})
+    assert jpeg.headers["content-type"] == "image/jpeg"
+    assert _image(jpeg).format == "JPEG"
+    # an explicit fmt wins over Accept
+    forced = client.get(url, params={"fmt": "jpeg"}, headers={"Accept": "image/webp"})
+    assert forced.headers["content-type"] == "image/jpeg"
+    assert webp.headers["etag"] != jpeg.headers["etag"]
+
+
+def test_unreadable_artwork_is_not_a_500(make_client, thumbs, db_path, tmp_path):
+    bad = tmp_path / "poster.jpg"
+    bad.write_bytes(b"this is not an image")
+    media_id = _set_artwork(db_path, bad)
+    client = make_client(images_router, thumbnails=thumbs)
+    response = client.get(f"/images/artwork/{media_id}")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Image could not be read"}
+    assert not thumbs._key_locks
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ThumbnailCache(tmp_path, max_bytes=250)
+    paths = [tmp_path / f"{n}.webp" for n in range(3)]
+    for path in paths[:2]:
+        path.write_bytes(b"x" * 100)
+        cache.add(path, 100)
+    assert cache.touch(paths[0])  # 1 is now the least recently used
+    paths[2].write_bytes(b"x" * 100)
+    cache.add(paths[2], 100)
+    assert cache.total_bytes == 200
+    assert [p.exists() for p in paths] == [True, False, True]
+    assert not cache.touch(paths[1])
+    # a restart rebuilds the index from what is on disk
+    assert ThumbnailCache(tmp_path, max_bytes=250).total_bytes == 200
@@ -0,0 +1,36 @@
+import pytest
+
+from app.loadtest import DEFAULT_MIX, _percentile, parse_mix
+
+
+@pytest.mark.parametrize(
+    "n, q, expected",
+    [
+        (100, 0.50, 50),
+        (100, 0.95, 95),
+        (100, 0.99, 99),
+        (100, 1.00, 100),
+        (10, 0.50, 5),
+        (10, 0.95, 10),
+        (1, 0.99, 1),
+        (4, 0.0, 1),
+    ],
+)
+def test_percentile_is_nearest_rank(n, q, expected):
+    # sample k (1-based) is k ms, so the value is the rank
+    assert _percentile([float(k) for k in range(1, n + 1)], q) == expected
+
+
+def test_percentile_of_nothing():
+    assert _percentile([], 0.5) is None
+
+
+def test_parse_mix():
+    assert parse_mix(None) == DEFAULT_MIX
+    assert parse_mix("") == DEFAULT_MIX
+    assert parse_mix(" home=10, actor=40 ") == {"home": 10.0, "actor": 40.0}
+    # a bare name gets weight 1
+    assert parse_mix("movies,actor=2.5") == {"movies": 1.0, "actor": 2.5}
+    # the default is a copy, not the module's dict
+    parse_mix(None)["home"] = 0
+    assert DEFAULT_MIX["home"] != 0
@@ -0,0 +1,348 @@
+import json
+import os
+import random
+import sqlite3
+import struct
+
+import pytest
+
+from app.db.db_control import MediaDB
+from app.media_info import MediaInfoExtractor, ProbeError, probe, probe_mkv, probe_mp4
+
+# ====================== MP4 ====================== #
+
+
+def box(kind: bytes, *children: bytes) -> bytes:
+    payload = b"".join(children)
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _full(version: int) -> bytes:
+    return bytes([version, 0, 0, 0])
+
+
+def mvhd(version: int, timescale: int, duration: int) -> bytes:
+    if version == 1:
+        times = struct.pack(">QQIQ", 0, 0, timescale, duration)
+    else:
+        times = struct.pack(">IIII", 0, 0, timescale, duration)
+    return box(b"mvhd", _full(version), times, bytes(80))
+
+
+def _lang(code: str) -> int:
+    a, b, c = (ord(ch) - 0x60 for ch in code)
+    return (a << 10) | (b << 5) | c
+
+
+def mdhd(version: int, timescale: int, duration: int, lang: str = "und") -> bytes:
+    if version == 1:
+        times = struct.pack(">QQIQ", 0, 0, timescale, duration)
+    else:
+        times = struct.pack(">IIII", 0, 0, timescale, duration)
+    return box(b"mdhd", _full(version), times, struct.pack(">HH", _lang(lang), 0))
+
+
+def hdlr(handler: bytes) -> bytes:
+    return box(b"hdlr", _full(0), bytes(4), handler, bytes(12), b"track\0")
+
+
+def stsd(fourcc: bytes, fields: bytes) -> bytes:
+    entry = struct.pack(">I4s", 16 + len(fields), fourcc) + bytes(6) + struct.pack(">H", 1)
+    return box(b"stsd", _full(0), struct.pack(">I", 1), entry, fields)
+
+
+def video_fields(width: int, height: int) -> bytes:
+    return bytes(16) + struct.pack(">HH", width, height) + bytes(50)
+
+
+def audio_fields(channels: int, rate: int) -> bytes:
+    return bytes(8) + struct.pack(">HHHHI", channels, 16, 0, 0, rate << 16)
+
+
+def trak(mdhd_box: bytes, handler: bytes, stsd_box: bytes) -> bytes:
+    stbl = box(b"stbl", stsd_box)
+    return box(b"trak", box(b"mdia", mdhd_box, hdlr(handler), box(b"minf", stbl)))
+
+
+def mp4(*moov_children: bytes, moov_last: bool = False) -> bytes:
+    ftyp = box(b"ftyp", b"isom", bytes(4), b"isomavc1")
+    mdat = box(b"mdat", bytes(64))
+    moov = box(b"moov", *moov_children)
+    return ftyp + (mdat + moov if moov_last else moov + mdat)
+
+
+def _sample_mp4(version: int) -> bytes:
+    return mp4(
+        mvhd(version, 1000, 5_400_500),
+        trak(mdhd(version, 24000, 24000 * 5400, "eng"), b"vide", stsd(b"avc1", video_fields(1920, 1080))),
+        trak(mdhd(version, 48000, 48000 * 5400, "fre"), b"soun", stsd(b"mp4a", audio_fields(6, 48000))),
+        trak(mdhd(version, 1000, 1000), b"subt", stsd(b"tx3g", bytes(8))),
+    )
+
+
+@pytest.mark.parametrize("version", [0, 1])
+def test_mp4_mvhd_and_tracks(version):
+    info = probe_mp4(_sample_mp4(version))
+    assert info["container"] == "mp4"
+    assert info["duration_s"] == pytest.approx(5400.5)
+    video, audio, subs = info["streams"]
+    assert video == {
+        "type": "video", "language": "eng", "codec": "avc1", "width": 1920, "height": 1080,
+    }
+    assert audio == {
+        "type": "audio", "language": "fre", "codec": "mp4a", "channels": 6, "sample_rate": 48000,
+    }
+    # und is no language
+    assert subs == {"type": "subtitle", "codec": "tx3g"}
+
+
+@pytest.mark.parametrize("version", [0, 1])
+def test_mp4_duration_from_longest_mdhd(version):
+    # mvhd duration unknown (all ones): fall back to the tracks
+    unknown = 0xFFFFFFFFFFFFFFFF if version == 1 else 0xFFFFFFFF
+    buf = mp4(
+        mvhd(version, 600, unknown),
+        trak(mdhd(version, 90000, 90000 * 120), b"vide", stsd(b"hvc1", video_fields(3840, 2160))),
+        trak(mdhd(version, 44100, 44100 * 121), b"soun", stsd(b"ac-3", audio_fields(2, 44100))),
+        moov_last=True,
+    )
+    info = probe_mp4(buf)
+    assert info["duration_s"] == 121
+    assert [s["codec"] for s in info["streams"]] == ["hvc1", "ac-3"]
+    assert info["streams"][0]["width"] == 3840
+
+
+def test_mp4_64bit_box_size():
+    moov_payload = mvhd(0, 1000, 2000)
+    large = struct.pack(">I4sQ", 1, b"moov", 16 + len(moov_payload)) + moov_payload
+    assert probe_mp4(box(b"ftyp", b"isom") + large)["duration_s"] == 2
+
+
+# ====================== Matroska ====================== #
+
+EBML, DOC_TYPE, SEGMENT, SEEK_HEAD, SEEK, SEEK_ID, SEEK_POSITION = (
+    0x1A45DFA3, 0x4282, 0x18538067, 0x114D9B74, 0x4DBB, 0x53AB, 0x53AC,
+)
+INFO, TIMECODE_SCALE, DURATION, TRACKS, TRACK_ENTRY, CLUSTER = (
+    0x1549A966, 0x2AD7B1, 0x4489, 0x1654AE6B, 0xAE, 0x1F43B675,
+)
+TRACK_TYPE, CODEC_ID, LANGUAGE, VIDEO, PIXEL_WIDTH, PIXEL_HEIGHT = (
+    0x83, 0x86, 0x22B59C, 0xE0, 0xB0, 0xBA,
+)
+AUDIO, SAMPLING_FREQUENCY, CHANNELS = 0xE1, 0xB5, 0x9F
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def _id(element_id: int) -> bytes:
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+
+
+def el(element_id: int, *children: bytes, unknown: bool = False) -> bytes:
+    payload = b"".join(children)
+    # 8-byte size vints are valid for any element and keep offsets simple
+    size = UNKNOWN_SIZE if unknown else b"\x01" + len(payload).to_bytes(7, "big")
+    return _id(element_id) + size + payload
+
+
+def uint(element_id: int, value: int) -> bytes:
+    return el(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def tracks() -> bytes:
+    video = el(
+        TRACK_ENTRY,
+        uint(TRACK_TYPE, 1),
+        el(CODEC_ID, b"V_VP9"),
+        el(VIDEO, uint(PIXEL_WIDTH, 1280), uint(PIXEL_HEIGHT, 720)),
+    )
+    audio = el(
+        TRACK_ENTRY,
+        uint(TRACK_TYPE, 2),
+        el(CODEC_ID, b"A_OPUS"),
+        el(LANGUAGE, b"ger"),
+        el(AUDIO, el(SAMPLING_FREQUENCY, struct.pack(">d", 48000.0)), uint(CHANNELS, 2)),
+    )
+    return el(TRACKS, video, audio)
+
+
+def mkv(segment_children: bytes, doc_type: bytes = b"matroska", unknown: bool = False) -> bytes:
+    header = el(EBML, el(DOC_TYPE, doc_type))
+    return header + el(SEGMENT, segment_children, unknown=unknown)
+
+
+@pytest.mark.parametrize(
+    "duration, scale, seconds",
+    [
+        (struct.pack(">d", 5400500.0), None, 5400.5),  # default 1ms ticks
+        (struct.pack(">f", 5400.5), 1_000_000_000, 5400.5),  # 4-byte float, 1s ticks
+        (struct.pack(">d", 90_000.0), 60_000_000_000, 5_400_000.0),
+    ],
+)
+def test_mkv_info_duration(duration, scale, seconds):
+    info_children = [el(DURATION, duration)]
+    if scale is not None:
+        info_children.insert(0, uint(TIMECODE_SCALE, scale))
+    info = probe_mkv(mkv(el(INFO, *info_children) + tracks()))
+    assert info["container"] == "mkv"
+    assert info["duration_s"] == pytest.approx(seconds)
+    assert info["streams"] == [
+        {"type": "video", "codec": "V_VP9", "width": 1280, "height": 720},
+        {"type": "audio", "codec": "A_OPUS", "language": "ger", "sample_rate": 48000, "channels": 2},
+    ]
+
+
+def test_mkv_unknown_size_segment_and_cluster():
+    # live recordings: Segment and Cluster sizes are not known up front
+    children = (
+        el(INFO, el(DURATION, struct.pack(">f", 1500.0)))
+        + tracks()
+        + el(CLUSTER, bytes(32), unknown=True)
+    )
+    info = probe_mkv(mkv(children, doc_type=b"webm", unknown=True))
+    assert info["container"] == "webm"
+    assert info["duration_s"] == 1.5
+    assert len(info["streams"]) == 2
+
+
+def test_mkv_info_after_clusters_via_seek_head():
+    cluster = el(CLUSTER, bytes(256))
+    info_el = el(INFO, el(DURATION, struct.pack(">d", 42_000.0)))
+
+    def seek_head(info_pos: int, tracks_pos: int) -> bytes:
+        return el(
+            SEEK_HEAD,
+            el(SEEK, el(SEEK_ID, _id(INFO)), el(SEEK_POSITION, info_pos.to_bytes(8, "big"))),
+            el(SEEK, el(SEEK_ID, _id(TRACKS)), el(SEEK_POSITION, tracks_pos.to_bytes(8, "big"))),
+        )
+
+    head_len = len(seek_head(0, 0))  # fixed-width positions, so the length is stable
+    info_pos = head_len + len(cluster)
+    children = seek_head(info_pos, info_pos + len(info_el)) + cluster + info_el + tracks()
+    info = probe_mkv(mkv(children))
+    assert info["duration_s"] == 42
+    assert len(info["streams"]) == 2
+
+
+# ====================== Bad input ====================== #
+
+
+def _samples() -> dict[str, bytes]:
+    info = el(INFO, el(DURATION, struct.pack(">d", 1000.0)))
+    return {"mp4": _sample_mp4(0), "mkv": mkv(info + tracks())}
+
+
+@pytest.mark.parametrize("kind", ["mp4", "mkv"])
+def test_truncated_input_never_raises(kind):
+    parse = probe_mp4 if kind == "mp4" else probe_mkv
+    data = _samples()[kind]
+    for n in range(len(data)):
+        assert isinstance(parse(data[:n]), dict)
+    # cut inside the container header: nothing to report
+    for n in range(0, 24):
+        assert parse(data[:n]) == {}
+
+
+def test_garbage_returns_empty():
+    rng = random.Random(7)
+    for _ in range(200):
+        junk = rng.randbytes(rng.randint(0, 512))
+        assert probe_mp4(junk) == {}
+        assert isinstance(probe_mkv(junk), dict)
+    assert probe_mkv(b"\x1a\x45\xdf\xa3" + bytes(64)) == {}
+    # a float element with an impossible size
+    bad = mkv(el(INFO, el(DURATION, b"\x00\x01\x02")))
+    assert probe_mkv(bad) == {}
+    assert probe_mp4(box(b"ftyp", b"isom") + box(b"mdat", bytes(100))) == {}
+
+
+def test_probe_reports_bad_files(tmp_path):
+    good = tmp_path / "film.mkv"
+    good.write_bytes(_samples()["mkv"])
+    assert probe(str(good))["duration_s"] == 1
+    for name, data in [("tiny.mp4", b"abc"), ("text.mp4", b"x" * 100), ("cut.mp4", _sample_mp4(0)[:60])]:
+        path = tmp_path / name
+        path.write_bytes(data)
+        with pytest.raises(ProbeError):
+            probe(str(path))
+
+
+# ====================== Extractor and apply_media_info ====================== #
+
+
+def _add_file(db_path, path, media_id):
+    st = os.stat(path)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO media_files (path, dir, media_id, size, mtime_ns) VALUES (?, ?, ?, ?, ?);",
+            (str(path), str(path.parent), media_id, st.st_size, st.st_mtime_ns),
+        )
+    conn.close()
+
+
+def _movie(db_path, duration):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        media_id = conn.execute("SELECT media_id FROM movies ORDER BY id LIMIT 1;").fetchone()[0]
+        conn.execute("UPDATE movies SET duration = ? WHERE media_id = ?;", (duration, media_id))
+    conn.close()
+    return media_id
+
+
+def _duration(db_path, media_id):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT duration FROM movies WHERE media_id = ?;", (media_id,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_extractor_fills_durations(db_path, tmp_path):
+    media_id = _movie(db_path, None)
+    film = tmp_path / "film.mp4"
+    film.write_bytes(_sample_mp4(0))  # 5400.5 s -> 90 minutes
+    broken = tmp_path / "broken.mkv"
+    broken.write_bytes(b"\x1a\x45\xdf\xa3" + bytes(64))
+    _add_file(db_path, film, media_id)
+    _add_file(db_path, broken, media_id)
+
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        extractor = MediaInfoExtractor(db, workers=2)
+        run = extractor.run()
+        assert (run["probed"], run["failed"], run["durations_updated"]) == (2, 1, 1)
+        assert _duration(db_path, media_id) == 90
+        files = {f["path"]: f for f in db.get_media_files(media_id)}
+        assert len(files) == 2
+        # fresh rows are not probed again
+        assert extractor.run()["probed"] == 0
+    finally:
+        db.close()
+
+
+def test_apply_media_info_overwrite(db_path, tmp_path):
+    media_id = _movie(db_path, 95)
+    film = tmp_path / "film.mkv"
+    film.write_bytes(b"")
+    _add_file(db_path, film, media_id)
+    st = os.stat(film)
+    row = (str(film), st.st_size, st.st_mtime_ns, "mkv", 120 * 60.0, json.dumps([]), None)
+
+    db = MediaDB(db_path, read_cache=False)
+    try:
+        # a duration from the CSV is kept...
+        assert db.apply_media_info([row], overwrite=False) == 0
+        assert _duration(db_path, media_id) == 95
+        # ...unless asked to replace it
+        assert db.apply_media_info([row], overwrite=True) == 1
+        assert _duration(db_path, media_id) == 120
+        # already equal: nothing to update
+        assert db.apply_media_info([row], overwrite=True) == 0
+        # a stale probe (file changed since) is ignored
+        stale = (row[0], row[1] + 1, *row[2:4], 30 * 60.0, *row[5:])
+        assert db.apply_media_info([stale], overwrite=True) == 0
+        assert _duration(db_path, media_id) == 120
+    finally:
+        db.close()
@@ -0,0 +1,24 @@
+import sqlite3
+
+from app.routers import actors_router, collections_router, movies_router, shows_router
+
+PAGES = (movies_router, actors_router, shows_router, collections_router)
+
+
+def test_unknown_movie_and_actor_render_404(make_client):
+    client = make_client(*PAGES)
+    for url in ("/movies/doesnotexist", "/actors/doesnotexist"):
+        response = client.get(url)
+        assert response.status_code == 404
+        assert "Not found" in response.text
+
+
+def test_movie_detail(make_client, db_path):
+    conn = sqlite3.connect(db_path)
+    movie_id, title = conn.execute(
+        "SELECT m.id, md.title FROM movies m JOIN media md ON md.id = m.media_id LIMIT 1;"
+    ).fetchone()
+    conn.close()
+    response = make_client(*PAGES).get(f"/movies/{movie_id}")
+    assert response.status_code == 200
+    assert title in response.text
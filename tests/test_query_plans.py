@@ -0,0 +1,69 @@
+import os
+import sqlite3
+
+import pytest
+
+from app.db.bench_data import BENCH_DB
+from app.db.query_plans import (
+    QueryPlan,
+    advise,
+    analyse,
+    assert_no_plan_regressions,
+    compare,
+    explain,
+    findings_for,
+    load_baseline,
+)
+
+
+@pytest.mark.skipif(
+    not os.path.exists(BENCH_DB), reason="build it with python -m app.db.bench_data"
+)
+def test_no_plan_regressions_on_the_bench_catalog():
+    assert_no_plan_regressions(BENCH_DB)
+
+
+def test_workload_covers_the_baseline(catalog_template):
+    plans = analyse(catalog_template, suggest=False)
+    # keys are "<method>#<n>": the baseline only works while they stay stable
+    assert set(load_baseline()) <= {qp.key for qp in plans}
+
+
+def test_findings_skip_small_tables_and_lookups():
+    plan = [
+        "SCAN media",
+        "SEARCH movies USING INDEX sqlite_autoindex_movies_1 (id=?)",
+        "SCAN g",
+        "SCAN json_each VIRTUAL TABLE INDEX 1:",
+        "SCAN a USING COVERING INDEX idx_actor_name",
+        "USE TEMP B-TREE FOR ORDER BY",
+    ]
+    kinds = [(f.kind, f.table) for f in findings_for(plan, small_tables={"g"})]
+    assert kinds == [("scan", "media"), ("index-scan", "a"), ("temp-btree", "")]
+
+
+def test_advisor_suggests_the_missing_index():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, owner TEXT, n INTEGER);")
+    conn.executemany(
+        "INSERT INTO t (owner, n) VALUES (?, ?);", [(f"o{i % 500}", i) for i in range(5000)]
+    )
+    sql = "SELECT id, n FROM t WHERE owner = ?;"
+    findings = findings_for(explain(conn, sql, ("o1",)))
+    assert [f.kind for f in findings] == ["scan"]
+    suggestions = advise(conn, sql, ("o1",), findings)
+    assert suggestions and "(owner" in suggestions[0]
+    # tried in a savepoint, nothing is left behind
+    indexes = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index';")
+    assert indexes.fetchone()[0] == 0
+
+
+def test_compare_flags_new_findings_only():
+    qp = QueryPlan("get_movies#1", "SELECT * FROM media", ["SCAN media"])
+    qp.findings = findings_for(qp.plan)
+    known = {"get_movies#1": qp.to_json()}
+    assert compare([qp], known) == []
+    assert compare([qp], {"get_movies#1": {"findings": []}}) == [
+        "get_movies#1: plan regressed: ['scan:media:SCAN media']"
+    ]
+    assert compare([qp], {})[0].startswith("get_movies#1: new query with findings")
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.db_control import MediaDB
+from app.db.repository import (
+    MOVIE_LIST_MAX_QUERIES,
+    SHOW_LIST_MAX_QUERIES,
+    MediaRepository,
+    assert_max_queries,
+)
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("limit", [5, 50])
+def test_listings_take_a_fixed_number_of_queries(engine, limit):
+    with Session(engine) as session:
+        repo = MediaRepository(session)
+        with assert_max_queries(engine, MOVIE_LIST_MAX_QUERIES):
+            movies = repo.list_movies(limit)
+        with assert_max_queries(engine, SHOW_LIST_MAX_QUERIES):
+            shows = repo.list_shows(limit)
+    assert len(movies) == limit
+    assert len(shows) == min(limit, 15)
+    assert all(m.leading_actors for m in movies)
+
+
+def test_assert_max_queries_fails_loudly(engine):
+    with Session(engine) as session, pytest.raises(AssertionError, match="at most 1"):
+        with assert_max_queries(engine, 1):
+            MediaRepository(session).list_movies(5)
+
+
+def test_movie_detail_matches_mediadb(engine, db_path):
+    conn = sqlite3.connect(db_path)
+    movie_id = conn.execute("SELECT id FROM movies LIMIT 1;").fetchone()[0]
+    conn.close()
+    db = MediaDB(db_path, read_cache=False)
+    expected = db.get_movie_by_id(movie_id)
+    db.close()
+    with Session(engine) as session:
+        repo = MediaRepository(session)
+        movie = repo.get_movie(movie_id)
+        assert repo.get_movie("missing") is None
+    assert movie.title == expected["title"]
+    assert {a.id for a in movie.actors} == {a["id"] for a in expected["actors"]}
+    assert [a.billing_order for a in movie.actors] == sorted(a.billing_order for a in movie.actors)
+
+
+def test_genre_counts(engine, db_path):
+    conn = sqlite3.connect(db_path)
+    linked = conn.execute("SELECT COUNT(*) FROM movie_genre_relationship;").fetchone()[0]
+    conn.close()
+    with Session(engine) as session:
+        counts = MediaRepository(session).genre_counts()
+    assert sum(g.movies for g in counts) == linked
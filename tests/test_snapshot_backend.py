@@ -0,0 +1,59 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app.db.backends import SnapshotSQLiteBackend
+
+
+def _notes(backend):
+    with backend.connect() as conn:
+        return conn.execute("SELECT notes FROM media WHERE rowid = 1;").fetchone()[0]
+
+
+def _commit_notes(db_path, notes):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE media SET notes = ? WHERE rowid = 1;", (notes,))
+    conn.close()
+
+
+@pytest.fixture
+def snapshot(db_path):
+    backend = SnapshotSQLiteBackend(db_path)
+    yield backend
+    backend.close()
+
+
+def test_commits_become_visible(snapshot, db_path):
+    _notes(snapshot)
+    _commit_notes(db_path, "from another worker")
+    assert _notes(snapshot) == "from another worker"
+
+    with snapshot.connect(write=True) as conn:
+        conn.execute("UPDATE media SET notes = 'from here' WHERE rowid = 1;")
+    assert _notes(snapshot) == "from here"
+    assert snapshot.reloads == 3
+
+
+def test_read_connections_are_query_only(snapshot):
+    with snapshot.connect() as conn:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("UPDATE media SET notes = 'lost' WHERE rowid = 1;")
+
+
+def test_readers_keep_the_old_copy_during_a_reload(snapshot, db_path):
+    before = _notes(snapshot)
+    _commit_notes(db_path, "newer")
+    # stand in for a slow reload on another thread
+    assert snapshot._reload_lock.acquire()
+    try:
+        result = []
+        reader = threading.Thread(target=lambda: result.append(_notes(snapshot)))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive(), "reader blocked on the reload"
+        assert result == [before]
+    finally:
+        snapshot._reload_lock.release()
+    assert _notes(snapshot) == "newer"
@@ -0,0 +1,177 @@
+import os
+import random
+import time
+
+import anyio
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from app.streaming import STREAM_CHUNK_SIZE, MediaFileResponse
+
+SIZE = 8 * 1024 * 1024 + 123
+DATA = random.Random(0).randbytes(SIZE)
+
+
+@pytest.fixture(scope="module")
+def media_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("media") / "film.mkv"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+def _run(media_path, check):
+    """Run check(client) against an in-process app serving media_path."""
+
+    async def endpoint(request):
+        return MediaFileResponse(media_path)
+
+    app = Starlette(routes=[Route("/f", endpoint, methods=["GET", "HEAD"])])
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            return await check(client)
+
+    return anyio.run(main)
+
+
+def _get(media_path, method="GET", **headers):
+    async def check(client):
+        return await client.request(method, "/f", headers=headers)
+
+    return _run(media_path, check)
+
+
+def test_full_body(media_path):
+    r = _get(media_path)
+    assert r.status_code == 200 and r.content == DATA
+    assert r.headers["accept-ranges"] == "bytes"
+    assert r.headers["content-type"] == "video/x-matroska"
+    assert int(r.headers["content-length"]) == SIZE
+
+
+@pytest.mark.parametrize(
+    "header, lo, hi",
+    [
+        ("bytes=0-0", 0, 1),
+        ("bytes=100-199", 100, 200),
+        ("bytes=-500", SIZE - 500, SIZE),
+        (f"bytes={SIZE - 10}-", SIZE - 10, SIZE),
+        (f"bytes=1000-{SIZE * 2}", 1000, SIZE),
+        (
+            f"bytes={STREAM_CHUNK_SIZE - 1}-{STREAM_CHUNK_SIZE * 3}",
+            STREAM_CHUNK_SIZE - 1,
+            STREAM_CHUNK_SIZE * 3 + 1,
+        ),
+    ],
+)
+def test_single_range(media_path, header, lo, hi):
+    r = _get(media_path, range=header)
+    assert r.status_code == 206
+    assert r.content == DATA[lo:hi]
+    assert r.headers["content-range"] == f"bytes {lo}-{hi - 1}/{SIZE}"
+    assert int(r.headers["content-length"]) == hi - lo
+
+
+@pytest.mark.parametrize(
+    "header, status",
+    [(f"bytes={SIZE}-", 416), ("items=0-1", 400), ("bytes=9-5", 400), ("bytes=x-", 400)],
+)
+def test_bad_ranges(media_path, header, status):
+    r = _get(media_path, range=header)
+    assert r.status_code == status
+    if status == 416:
+        assert r.headers["content-range"] == f"*/{SIZE}"
+
+
+def test_if_range(media_path):
+    full = _get(media_path)
+    for validator in (full.headers["etag"], full.headers["last-modified"]):
+        r = _get(media_path, range="bytes=5-9", **{"if-range": validator})
+        assert r.status_code == 206 and r.content == DATA[5:10]
+    r = _get(media_path, range="bytes=5-9", **{"if-range": '"stale"'})
+    assert r.status_code == 200 and r.content == DATA
+
+
+def test_head_range(media_path):
+    r = _get(media_path, "HEAD", range="bytes=10-19")
+    assert r.status_code == 206 and r.content == b""
+    assert r.headers["content-length"] == "10"
+
+
+def test_multipart_ranges(media_path):
+    # overlapping ranges are merged, the rest come back in file order
+    r = _get(media_path, range="bytes=20-29,0-9,5-12")
+    assert r.status_code == 206
+    content_type = r.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1].encode()
+    assert int(r.headers["content-length"]) == len(r.content)
+    parts = r.content.split(b"--" + boundary)
+    assert parts[0] == b"" and parts[-1] == b"--\r\n"
+    bodies = []
+    for part in parts[1:-1]:
+        head, _, body = part.partition(b"\r\n\r\n")
+        assert b"Content-Type: video/x-matroska" in head
+        bodies.append((head.split(b"Content-Range: ")[1], body.removesuffix(b"\r\n")))
+    assert bodies == [
+        (f"bytes 0-12/{SIZE}".encode(), DATA[0:13]),
+        (f"bytes 20-29/{SIZE}".encode(), DATA[20:30]),
+    ]
+
+
+def test_concurrent_seeking_throughput(media_path):
+    clients, requests = 32, 20
+    rng = random.Random(1)
+
+    async def check(client):
+        failures, total = [], 0
+
+        async def seeker():
+            nonlocal total
+            for _ in range(requests):
+                start = rng.randrange(SIZE)
+                end = min(SIZE, start + rng.randrange(1, 4 * STREAM_CHUNK_SIZE))
+                r = await client.get("/f", headers={"Range": f"bytes={start}-{end - 1}"})
+                if r.content != DATA[start:end]:
+                    failures.append(f"{start}-{end - 1}")
+                total += len(r.content)
+
+        t0 = time.perf_counter()
+        async with anyio.create_task_group() as tg:
+            for _ in range(clients):
+                tg.start_soon(seeker)
+        seconds = time.perf_counter() - t0
+        print(
+            f"{clients} clients x {requests} random ranges: "
+            f"{total / seconds / 1e6:.1f} MB/s, {clients * requests / seconds:.0f} req/s"
+        )
+        return failures
+
+    assert _run(media_path, check) == []
+
+
+def test_zerocopy_extension(media_path):
+    sent = []
+
+    async def main():
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "headers": [(b"range", b"bytes=100-199")],
+            "extensions": {"http.response.zerocopysend": {}},
+        }
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopysend":
+                body = os.pread(message["file"], message["count"], message["offset"])
+                message = {**message, "body": body}
+            sent.append(message)
+
+        await MediaFileResponse(media_path)(scope, None, send)
+
+    anyio.run(main)
+    assert sent[0]["status"] == 206
+    assert sent[1]["body"] == DATA[100:200] and not sent[1]["more_body"]
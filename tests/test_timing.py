@@ -0,0 +1,74 @@
+import os
+import re
+
+import pytest
+
+import app.timing
+from app.routers import debug_router, movies_router
+from app.timing import (
+    Metrics,
+    ServerTimingMiddleware,
+    TimedJinja2Templates,
+    instrument_backend,
+    normalize_sql,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ENTRY = r'[\w-]+;dur=\d+\.\d{2}(?:;desc="(?:[^"\\]|\\.)*")?'
+_HEADER = re.compile(rf"^{_ENTRY}(?:, {_ENTRY})*$")
+
+
+def test_normalize_sql_folds_literals_and_in_lists():
+    a = normalize_sql(
+        """
+        SELECT * FROM movies -- by id
+        WHERE id IN (?, ?, ?) AND title = 'It''s' AND year > 1990;
+        """
+    )
+    b = normalize_sql("SELECT * FROM movies WHERE id IN (?,?) AND title = 'Heat' AND year > 2001")
+    assert a == b == "SELECT * FROM movies WHERE id IN (?...) AND title = ? AND year > ?"
+    assert normalize_sql("SELECT 1 WHERE x IN (1, 2, 3)") == "SELECT ? WHERE x IN (?...)"
+    # identifiers with digits are not literals
+    assert normalize_sql("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+    assert len(normalize_sql("SELECT " + "x, " * 200 + "y", max_len=40)) == 40
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Turn metrics on for this test, as DEBUG_METRICS=1 would."""
+    metrics = Metrics()
+    monkeypatch.setattr(app.timing, "METRICS", metrics)
+    return metrics
+
+
+def test_server_timing_and_debug_metrics(make_client, metrics):
+    client = make_client(movies_router, debug_router)
+    instrument_backend(client.app.state.mediaDB.backend)
+    templates = TimedJinja2Templates(directory=os.path.join(ROOT, "app/static/templates"))
+    templates.env.globals.update(client.app.state.templates.env.globals)
+    client.app.state.templates = templates
+    client.app.add_middleware(ServerTimingMiddleware, metrics=metrics)
+
+    response = client.get("/movies")
+    assert response.status_code == 200
+    header = response.headers["server-timing"]
+    assert _HEADER.match(header), header
+    names = [entry.split(";")[0] for entry in re.findall(_ENTRY, header)]
+    assert {"db", "render", "q1"} <= set(names)
+    assert names[-1] == "total"
+    assert re.search(r'db;dur=[\d.]+;desc="\d+ quer(y|ies)"', header)
+    assert 'render;dur=' in header and 'desc="movies.html"' in header
+
+    snapshot = client.get("/debug/metrics").json()
+    assert snapshot["routes"]["GET /movies"]["count"] == 1
+    assert snapshot["queries"]
+    # keys are normalised, so the movie list query is one entry
+    assert all(q["sql"] == normalize_sql(q["sql"]) for q in snapshot["queries"])
+
+    assert client.delete("/debug/metrics").json() == {"success": True}
+    assert client.get("/debug/metrics").json()["queries"] == []
+
+
+def test_debug_metrics_off(make_client, monkeypatch):
+    monkeypatch.setattr(app.timing, "METRICS", None)
+    assert make_client(debug_router).get("/debug/metrics").status_code == 404
@@ -0,0 +1,52 @@
+import sqlite3
+import threading
+
+from app.db.backends import SQLiteBackend
+from app.db.db_control import MediaDB
+from app.db.writer import WriteQueue
+
+
+def _queued_db(db_path, **backend_kwargs):
+    db = MediaDB(db_path, backend=SQLiteBackend(db_path, **backend_kwargs))
+    db.writes = WriteQueue(db)
+    db.writes.start()
+    return db
+
+
+def test_group_is_retried_while_database_is_locked(db_path):
+    db = _queued_db(db_path, busy_timeout_ms=10)
+    blocker = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE;")
+    release = threading.Timer(0.15, blocker.execute, ("COMMIT;",))
+    release.start()
+    try:
+        db.insert_actor("Locked Out")
+        assert db.writes.status()["failed"] == 0
+    finally:
+        release.join()
+        blocker.close()
+        db.writes.stop()
+        db.close()
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM actors WHERE name = 'Locked Out';").fetchone()[0] == 1
+    conn.close()
+
+
+def test_reads_in_a_group_see_its_writes(db_path):
+    db = _queued_db(db_path)
+
+    def insert_then_read():
+        db.insert_actor("Seen In Group")
+        names = [a["name"] for a in db.get_actors()]
+        with db.backend.connect() as conn:
+            count = conn.execute(
+                "SELECT COUNT(*) FROM actors WHERE name = 'Seen In Group';"
+            ).fetchone()[0]
+        return "Seen In Group" in names, count
+
+    try:
+        db.get_actors()  # warm the read cache outside the group
+        assert db.writes.call(insert_then_read) == (True, 1)
+    finally:
+        db.writes.stop()
+        db.close()